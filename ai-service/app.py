@@ -1,23 +1,72 @@
-from flask import Flask, request, jsonify
+import time
+
+# Start of the import-time budget (STARTUP_CONFIG['import_budget'])
+IMPORT_STARTED = time.perf_counter()
+
+from flask import Flask, request, jsonify, Response, stream_with_context, g
 from flask_cors import CORS
-import requests
+import json
 import logging
+import math
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from dotenv import load_dotenv
 from src.services.narad_ai import NaradAI
+from src.services.llm_providers import LLMProviderError, describe_provider_error
+from src.config.settings import BATCH_CONFIG, SECURITY_CONFIG, CACHE_WARMUP_CONFIG, DEADLINE_CONFIG, LOGGING_CONFIG, METRICS_CONFIG, STARTUP_CONFIG
+from src.services.cache_warmer import CacheWarmer
+from src.utils.conversation_memory import ConversationMemory
+from src.utils.rate_limiter import RateLimiter, MemoryRateLimitBackend, RedisRateLimitBackend, rate_limit_headers
+from src.utils.concurrency import upstream_priority
+from src.utils.deadline import Deadline, deadline_scope
+from src.utils.logger import configure_logging, parse_sample_rates, log_event, get_logging_stats
+from src.utils.metrics import HISTOGRAM, get_metrics
 
 # Load environment variables
 load_dotenv()
 
-# Configure logging
-log_level = os.getenv('LOG_LEVEL', 'INFO')
-logging.basicConfig(level=getattr(logging, log_level.upper()), format='%(asctime)s - %(levelname)s - %(message)s')
+# Configure logging (written off the request thread; see LOGGING_CONFIG)
+configure_logging(
+    level=LOGGING_CONFIG['level'],
+    fmt=LOGGING_CONFIG['format'],
+    use_queue=LOGGING_CONFIG['async'],
+    queue_size=LOGGING_CONFIG['queue_size'],
+    max_field_chars=LOGGING_CONFIG['max_field_chars'],
+    sample_rates=parse_sample_rates(LOGGING_CONFIG['sample_rates']),
+    log_file=LOGGING_CONFIG['file']
+)
 logger = logging.getLogger(__name__)
 
 # Initialize Narad AI
 narad_ai = NaradAI()
 
+# Suggestion chips and top questions are answered from cache (startup, then every interval)
+cache_warmer = CacheWarmer(
+    narad_ai,
+    languages=CACHE_WARMUP_CONFIG['languages'],
+    interval=CACHE_WARMUP_CONFIG['interval'],
+    startup_delay=CACHE_WARMUP_CONFIG['startup_delay'],
+    top_n=CACHE_WARMUP_CONFIG['top_n'],
+    access_logs=CACHE_WARMUP_CONFIG['access_logs'],
+    max_message_chars=CACHE_WARMUP_CONFIG['max_message_chars'],
+    concurrency=CACHE_WARMUP_CONFIG['concurrency'],
+    enabled=CACHE_WARMUP_CONFIG['enabled'] and narad_ai.response_cache.enabled
+)
+
+# Per-client quotas on the chat routes (token buckets per user, session and IP)
+RATE_LIMIT_CONFIG = SECURITY_CONFIG['rate_limiting']
+rate_limiter = RateLimiter(
+    limits=[(RATE_LIMIT_CONFIG['requests_per_minute'], 60), (RATE_LIMIT_CONFIG['requests_per_hour'], 3600)],
+    backend=RedisRateLimitBackend(
+        RATE_LIMIT_CONFIG['redis_url'],
+        timeout=RATE_LIMIT_CONFIG['redis_timeout']
+    ) if RATE_LIMIT_CONFIG['backend'] == 'redis' else MemoryRateLimitBackend(RATE_LIMIT_CONFIG['max_keys']),
+    enabled=RATE_LIMIT_CONFIG['enabled'],
+    max_keys=RATE_LIMIT_CONFIG['max_keys']
+)
+
 # =====================
 # CONFIG
 # =====================
@@ -27,7 +76,7 @@ MODEL_NAME = os.getenv('MODEL_NAME', 'gemini-1.5-pro')  # Using the latest stabl
 app = Flask(__name__)
 # Update CORS to allow requests from the frontend (port 3000) and Vercel
 # Flexible CORS configuration for Vercel and local development
-CORS(app, origins=[
+CORS_ORIGINS = [
     "http://localhost:3000", 
     "http://localhost:3001", 
     "http://localhost:3002", 
@@ -36,27 +85,24 @@ CORS(app, origins=[
     "https://darshana-chi.vercel.app",  # Your actual Vercel domain
     "https://darshana-heritage.vercel.app",  # Backup domain
     "https://darshana-chi-git-main-ajaytiwari94s-projects.vercel.app"  # Vercel preview URL
-], supports_credentials=True)
+]
+CORS(app, origins=CORS_ORIGINS, supports_credentials=True)
 
 # Log environment variables for debugging
 logger.info("Environment variables:")
-logger.info(f"GEMINI_API_KEY: {os.getenv('GEMINI_API_KEY', 'Not found')}")
-logger.info(f"MODEL_NAME: {os.getenv('MODEL_NAME', 'Not found')}")
-logger.info(f"FLASK_ENV: {os.getenv('FLASK_ENV', 'Not found')}")
-logger.info(f"Narad AI is ready: {narad_ai.is_ready()}")
+logger.info("GEMINI_API_KEY: %s", 'set' if os.getenv('GEMINI_API_KEY') else 'Not found')
+logger.info("MODEL_NAME: %s", os.getenv('MODEL_NAME', 'Not found'))
+logger.info("FLASK_ENV: %s", os.getenv('FLASK_ENV', 'Not found'))
+logger.info("Narad AI is ready: %s", narad_ai.is_ready())
 
 
 # =====================
 # GENERATE RESPONSE
 # =====================
-def generate_response(user_message, session_id="default_session", context=None):
-    """Generate response using Narad AI service"""
+def generate_response(user_message, session_id="default_session", context=None, deadline=None):
+    """Generate response using Narad AI service (answered locally if the deadline leaves no time for Gemini)"""
     try:
-        logger.info(f"Processing message with Narad AI: {user_message}")
-        logger.info(f"Session ID: {session_id}")
-        logger.info(f"Context: {context}")
-        logger.info(f"Narad AI instance: {narad_ai}")
-        logger.info(f"Narad AI is ready: {narad_ai.is_ready()}")
+        logger.debug("Processing message with Narad AI (session %s)", session_id)
         
         # Ensure context is a dictionary
         if context is None:
@@ -79,49 +125,204 @@ def generate_response(user_message, session_id="default_session", context=None):
                 'timestamp': datetime.now().isoformat()
             }
         
-        logger.info("Narad AI is ready, processing message")
         # Use the full Narad AI implementation
         response = narad_ai.process_message(
             message=user_message,
             session_id=session_id,
-            context=context
+            context=context,
+            deadline=deadline
         )
         
-        logger.info(f"Narad AI response: {response}")
-        logger.info(f"Response type: {type(response)}")
         return response
     except Exception as e:
         logger.error(f"Error in Narad AI processing: {str(e)}", exc_info=True)
+        return processing_error_response()
+
+def processing_error_response():
+    """Response returned when Narad AI raises while handling a message"""
+    return {
+        'response': "I apologize, but I'm having trouble processing your request right now. Please try again!",
+        'intent': 'error',
+        'suggestions': [
+            "Ask about a monument",
+            "Request a cultural story",
+            "Get travel recommendations"
+        ],
+        'confidence': 0.1,
+        'timestamp': datetime.now().isoformat()
+    }
+
+def build_chat_response(ai_response, session_id, context):
+    """Shape a Narad AI result into the JSON structure the frontend expects"""
+    return {
+        'response': ai_response.get('response', 'I apologize, but I\'m having trouble formulating a response right now.'),
+        'status': 'success',
+        'suggestions': ai_response.get('suggestions', []),
+        'intent': ai_response.get('intent', 'general_inquiry'),
+        'metadata': {
+            'confidence': ai_response.get('confidence', 0.8),
+            'session_id': session_id,
+            'timestamp': ai_response.get('timestamp', datetime.now().isoformat()),
+            'context': context
+        }
+    }
+
+# =====================
+# REQUEST DEADLINES
+# =====================
+def parse_request_deadline(headers, data):
+    """
+    Deadline a chat request has to be answered by
+
+    Clients send either a timeout in seconds (X-Request-Timeout header or
+    'timeout' field) or an absolute Unix time (X-Request-Deadline header or
+    'deadline' field). Longer deadlines are clamped to max_timeout.
+
+    Returns:
+        A Deadline, or None when the client sent none and no default is configured
+
+    Raises:
+        ValueError: If the timeout or deadline is not a finite number
+    """
+    data = data if isinstance(data, dict) else {}
+    timeout = headers.get('X-Request-Timeout', data.get('timeout'))
+    absolute = headers.get('X-Request-Deadline', data.get('deadline'))
+
+    if timeout is not None:
+        field, value = 'timeout', timeout
+    elif absolute is not None:
+        field, value = 'deadline', absolute
+    elif DEADLINE_CONFIG['default_timeout'] > 0:
+        return Deadline(min(DEADLINE_CONFIG['default_timeout'], DEADLINE_CONFIG['max_timeout']))
+    else:
+        return None
+
+    try:
+        seconds = float(value) if not isinstance(value, bool) else math.nan
+    except (TypeError, ValueError):
+        seconds = math.nan
+    if not math.isfinite(seconds):
+        raise ValueError(f'Invalid request {field}: expected a number of seconds')
+    if field == 'deadline':
+        seconds -= time.time()
+    return Deadline(min(seconds, DEADLINE_CONFIG['max_timeout']))
+
+# =====================
+# RATE LIMITING
+# =====================
+def client_address(peer, forwarded_for):
+    """
+    Client IP for rate limiting: the address the outermost trusted proxy saw
+
+    Args:
+        peer: Address of the directly connected peer
+        forwarded_for: X-Forwarded-For header value, if any
+    """
+    hops = RATE_LIMIT_CONFIG['proxy_hops']
+    if hops <= 0 or not forwarded_for:
+        return peer
+    # Each trusted proxy appends the address it received from; earlier entries are client-supplied
+    addresses = [address.strip() for address in forwarded_for.split(',') if address.strip()]
+    return addresses[-hops] if len(addresses) >= hops else addresses[0] if addresses else peer
+
+def rate_limit_identities(ip, user_id=None, session_id=None):
+    """Identities a request is counted against (the shared default session is not one)"""
+    identities = [f'ip:{ip}']
+    if user_id:
+        identities.append(f'user:{user_id}')
+    if session_id and session_id != 'default_session':
+        identities.append(f'session:{session_id}')
+    return identities
+
+def rate_limited_body(result):
+    """JSON body for a 429 response (413 for a cost no bucket can ever cover)"""
+    if result.get('oversize'):
         return {
-            'response': "I apologize, but I'm having trouble processing your request right now. Please try again!",
-            'intent': 'error',
-            'suggestions': [
-                "Ask about a monument",
-                "Request a cultural story",
-                "Get travel recommendations"
-            ],
-            'confidence': 0.1,
-            'timestamp': datetime.now().isoformat()
+            'error': 'Request too large',
+            'message': f"This request counts as more than the {result['limit']} requests your rate limit allows at once. Split it up.",
+            'max_cost': result['limit']
         }
+    return {
+        'error': 'Rate limit exceeded',
+        'message': f"Too many requests. Please retry in {result['retry_after']} seconds.",
+        'retry_after': result['retry_after']
+    }
+
+def check_rate_limit(data, cost=1):
+    """
+    Count a request against its client's quotas
+
+    Returns:
+        A 429 response when over the limit, 413 when the cost exceeds
+        what a full bucket holds, else None. Headers for either
+        outcome are added by add_rate_limit_headers.
+    """
+    data = data if isinstance(data, dict) else {}
+    ip = client_address(request.remote_addr, request.headers.get('X-Forwarded-For'))
+    g.rate_limit = rate_limiter.check(rate_limit_identities(ip, data.get('user_id'), data.get('session_id')), cost)
+    if g.rate_limit and not g.rate_limit['allowed']:
+        if g.rate_limit.get('oversize'):
+            logger.warning(f"Rejected request from {ip} costing {cost} (rate limit allows {g.rate_limit['limit']})")
+            return jsonify(rate_limited_body(g.rate_limit)), 413
+        logger.warning(f"Rate limit exceeded for {ip} (retry after {g.rate_limit['retry_after']}s)")
+        return jsonify(rate_limited_body(g.rate_limit)), 429
+    return None
+
+@app.after_request
+def add_rate_limit_headers(response):
+    """Attach X-RateLimit-* (and Retry-After) to rate-limited routes"""
+    response.headers.update(rate_limit_headers(g.get('rate_limit')))
+    return response
+
+# =====================
+# METRICS
+# =====================
+metrics = get_metrics()
+metrics.define('narad_http_request_duration_seconds', HISTOGRAM, 'HTTP request latency by route, method and status')
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def observe_request(response):
+    """Time every request (streams until their headers are sent)"""
+    started = g.get('request_started')
+    if started is not None:
+        metrics.observe(
+            'narad_http_request_duration_seconds', time.perf_counter() - started,
+            route=request.url_rule.rule if request.url_rule else 'unmatched',
+            method=request.method,
+            status=response.status_code
+        )
+    return response
 
 # =====================
 # ENDPOINTS
 # =====================
 @app.route('/health', methods=['GET'])
 def health():
+    """Readiness: 503 while the start-up warm-up is still running"""
+    if not startup['ready']:
+        return jsonify({'status': 'warming', 'service': 'Narad AI'}), 503
     return jsonify({'status': 'healthy', 'service': 'Narad AI'})
 
 @app.route('/api/ai/chat', methods=['POST'])
 def chat():
     try:
-        logger.info("Received chat request")
         data = request.get_json()
-        logger.info(f"Request data: {data}")
         if not data:
             logger.warning("No JSON data provided")
             return jsonify({'error': 'No JSON data provided'}), 400
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Request body must be a JSON object'}), 400
 
-        user_message = data.get('message', '').strip()
+        limited = check_rate_limit(data)
+        if limited:
+            return limited
+
+        user_message = data.get('message')
+        user_message = user_message.strip() if isinstance(user_message, str) else ''
         session_id = data.get('session_id', 'default_session')
         context = data.get('context', {})
         user_id = data.get('user_id')
@@ -134,37 +335,311 @@ def chat():
             logger.warning("No message provided")
             return jsonify({'error': 'No message provided'}), 400
 
-        logger.info(f"Received chat request: {user_message}")
-        logger.info(f"Session ID: {session_id}")
-        logger.info(f"Context: {context}")
-        logger.info(f"User ID: {user_id}")
-        
-        ai_response = generate_response(user_message, session_id, context)
+        try:
+            deadline = parse_request_deadline(request.headers, data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if deadline is not None and deadline.expired:
+            return jsonify({'error': 'Request deadline has already passed'}), 504
+
+        # The cache warmer mines these records for the most asked questions
+        log_event(
+            logger, 'chat_request', "Received chat request: %s", user_message,
+            message=user_message, session_id=session_id, user_id=user_id
+        )
         
-        logger.info(f"AI Response: {ai_response}")
-        logger.info(f"AI Response Type: {type(ai_response)}")
+        ai_response = generate_response(user_message, session_id, context, deadline)
 
         # Return the full response structure that the frontend expects
-        response_data = {
-            'response': ai_response.get('response', 'I apologize, but I\'m having trouble formulating a response right now.'),
-            'status': 'success',
-            'suggestions': ai_response.get('suggestions', []),
-            'intent': ai_response.get('intent', 'general_inquiry'),
-            'metadata': {
-                'confidence': ai_response.get('confidence', 0.8),
-                'session_id': session_id,
-                'timestamp': ai_response.get('timestamp', datetime.now().isoformat()),
-                'context': context
-            }
-        }
+        response_data = build_chat_response(ai_response, session_id, context)
         
-        logger.info(f"Response data: {response_data}")
+        log_event(
+            logger, 'chat_response', "Answered chat request (intent %s, %d chars)",
+            response_data['intent'], len(response_data['response']),
+            session_id=session_id, intent=response_data['intent'], response_chars=len(response_data['response'])
+        )
         return jsonify(response_data)
 
     except Exception as e:
         logger.error(f"Error in chat endpoint: {e}", exc_info=True)
         return jsonify({'error': 'Internal server error', 'message': str(e)}), 500
 
+def sse_event(event, data):
+    """Format one server-sent event frame"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.route('/api/ai/chat/stream', methods=['POST'])
+def chat_stream():
+    """Streaming variant of /api/ai/chat that sends the answer as server-sent events"""
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({'error': 'No JSON data provided'}), 400
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Request body must be a JSON object'}), 400
+
+    limited = check_rate_limit(data)
+    if limited:
+        return limited
+
+    user_message = data.get('message')
+    user_message = user_message.strip() if isinstance(user_message, str) else ''
+    session_id = data.get('session_id', 'default_session')
+    context = data.get('context', {})
+    
+    # Ensure context is a dictionary
+    if not isinstance(context, dict):
+        context = {}
+    
+    if not user_message:
+        return jsonify({'error': 'No message provided'}), 400
+
+    log_event(
+        logger, 'chat_request', "Received streaming chat request: %s", user_message,
+        message=user_message, session_id=session_id, stream=True
+    )
+
+    def generate():
+        for event in narad_ai.process_message_stream(user_message, session_id, context):
+            payload = event['data']
+            if event['event'] in ('done', 'error'):
+                payload = dict(payload, session_id=session_id)
+            yield sse_event(event['event'], payload)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'  # Stop reverse proxies from buffering the stream
+        }
+    )
+
+def parse_batch_request(data):
+    """
+    Validate a batch body: either {"items": [...], "concurrency": n} or a bare array
+
+    Returns:
+        Tuple of (items, concurrency, error message)
+    """
+    items = data.get('items') if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        return None, None, 'Provide a non-empty items array'
+    if len(items) > BATCH_CONFIG['max_items']:
+        return None, None, f"At most {BATCH_CONFIG['max_items']} items per batch"
+
+    concurrency = data.get('concurrency') if isinstance(data, dict) else None
+    try:
+        concurrency = int(concurrency or BATCH_CONFIG['default_concurrency'])
+    except (TypeError, ValueError):
+        concurrency = BATCH_CONFIG['default_concurrency']
+    concurrency = max(1, min(concurrency, BATCH_CONFIG['max_concurrency'], len(items)))
+    return items, concurrency, None
+
+def parse_batch_item(item):
+    """
+    Validate one batch item
+
+    Returns:
+        Tuple of (message, session_id, context, error message)
+    """
+    if not isinstance(item, dict):
+        return None, None, None, 'Item must be an object'
+    message = item.get('message')
+    if not isinstance(message, str) or not message.strip():
+        return None, None, None, 'No message provided'
+
+    context = item.get('context', {})
+    # Ensure context is a dictionary
+    if not isinstance(context, dict):
+        context = {}
+    return message.strip(), item.get('session_id', 'default_session'), context, None
+
+def batch_item_result(index, ai_response, session_id, context):
+    """Chat response for one batch item, tagged with its position"""
+    result = build_chat_response(ai_response, session_id, context)
+    if ai_response.get('intent') == 'error':
+        result['status'] = 'error'
+    result['index'] = index
+    return result
+
+def batch_item_error(index, error):
+    """Entry for a batch item that could not be processed"""
+    return {'index': index, 'status': 'error', 'error': error}
+
+def batch_response(results, concurrency, started):
+    """Wrap ordered per-item results with a summary"""
+    failed = sum(1 for result in results if result['status'] != 'success')
+    return {
+        'status': 'success',
+        'results': results,
+        'summary': {
+            'total': len(results),
+            'succeeded': len(results) - failed,
+            'failed': failed,
+            'concurrency': concurrency,
+            'duration_ms': round((time.monotonic() - started) * 1000)
+        }
+    }
+
+def run_batch_item(index, item):
+    """Answer one batch item; never raises so one bad item cannot fail the batch"""
+    message, session_id, context, error = parse_batch_item(item)
+    if error:
+        return batch_item_error(index, error)
+    try:
+        # Batch items queue behind interactive chat for upstream slots
+        with upstream_priority('batch'):
+            ai_response = generate_response(message, session_id, context)
+        return batch_item_result(index, ai_response, session_id, context)
+    except Exception as e:
+        logger.error(f"Error in batch item {index}: {e}", exc_info=True)
+        return batch_item_error(index, 'Internal server error')
+
+@app.route('/api/ai/chat/batch', methods=['POST'])
+def chat_batch():
+    """
+    Answer many chat messages in one request
+
+    Items run concurrently (bounded by the requested concurrency) and every
+    upstream call still passes through Narad AI's process-wide limiter.
+    Results are returned in input order, with per-item errors.
+    """
+    data = request.get_json(silent=True)
+    items, concurrency, error = parse_batch_request(data)
+    if error:
+        return jsonify({'error': error}), 400
+
+    # Every item counts against the caller's quota
+    limited = check_rate_limit(data, cost=len(items))
+    if limited:
+        return limited
+
+    logger.info("Received batch chat request: %d items, concurrency %d", len(items), concurrency)
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='chat-batch') as pool:
+        results = list(pool.map(run_batch_item, range(len(items)), items))
+
+    return jsonify(batch_response(results, concurrency, started))
+
+@app.route('/api/ai/generate', methods=['POST'])
+def generate():
+    """
+    Raw completion through the provider gateway, for other services
+
+    The backend's AI proxy routes call this instead of importing the
+    provider layer. The body takes messages (array) or prompt, plus optional
+    system, provider (tried first), model (checked against the provider's
+    allow-list), temperature, max_tokens and top_p. Returns the gateway's
+    normalized response: text, provider, model, finish_reason, usage, failover.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Request body must be a JSON object'}), 400
+    messages = data.get('messages') or data.get('prompt') or data.get('input')
+    if not messages:
+        return jsonify({'error': 'messages (array) or prompt required in request body'}), 400
+
+    limited = check_rate_limit(data)
+    if limited:
+        return limited
+
+    try:
+        deadline = parse_request_deadline(request.headers, data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if deadline is not None and deadline.expired:
+        return jsonify({'error': 'Request deadline has already passed'}), 504
+
+    try:
+        with deadline_scope(deadline):
+            result = narad_ai.llm_gateway.generate(
+                messages if isinstance(messages, list) else str(messages),
+                system=data.get('system'),
+                options={
+                    'temperature': data.get('temperature', 0.7),
+                    'max_tokens': data.get('max_tokens', 512),
+                    'top_p': data.get('top_p')
+                },
+                preferred=data.get('provider'),
+                model=data.get('model')
+            )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except LLMProviderError as e:
+        logger.error('AI provider request failed: %s %s', e, {name: str(err)[:200] for name, err in e.errors.items()})
+        error_body, status = describe_provider_error(e)
+        return jsonify(error_body), status
+
+    return jsonify(result)
+
+def _is_admin_request():
+    """Admin routes are enabled only when ADMIN_API_TOKEN is set and matches X-Admin-Token"""
+    admin_token = os.getenv('ADMIN_API_TOKEN')
+    return bool(admin_token) and request.headers.get('X-Admin-Token') == admin_token
+
+@app.route('/api/admin/cache/invalidate', methods=['POST'])
+def invalidate_cache():
+    """
+    Invalidate cached answers: all of them, or those for a message and/or language
+
+    Every worker sharing the cache's SQLite file drops its memory tier on its
+    next hit; with the disk tier off only this worker is invalidated.
+    """
+    if not _is_admin_request():
+        return jsonify({'error': 'Forbidden'}), 403
+
+    data = request.get_json(silent=True) or {}
+    message = data.get('message')
+    language = data.get('language')
+    if not (message or language or data.get('all')):
+        return jsonify({'error': 'Provide message, language or all=true'}), 400
+
+    removed = narad_ai.response_cache.invalidate(message=message, language=language)
+    scope = 'all_workers' if narad_ai.response_cache.disk_path else 'this_worker'
+    return jsonify({'status': 'success', 'removed': removed, 'scope': scope})
+
+@app.route('/api/admin/cache/stats', methods=['GET'])
+def cache_stats():
+    """Response cache statistics"""
+    if not _is_admin_request():
+        return jsonify({'error': 'Forbidden'}), 403
+    return jsonify({'status': 'success', 'cache': narad_ai.response_cache.get_stats()})
+
+@app.route('/api/admin/cache/warm', methods=['POST'])
+def warm_cache():
+    """Run a cache warm-up round now (in the background unless wait=true)"""
+    if not _is_admin_request():
+        return jsonify({'error': 'Forbidden'}), 403
+
+    data = request.get_json(silent=True) or {}
+    if data.get('wait'):
+        return jsonify({'status': 'success', 'round': cache_warmer.run_once()})
+
+    threading.Thread(target=cache_warmer.run_once, daemon=True, name='cache-warmup-manual').start()
+    return jsonify({'status': 'accepted'}), 202
+
+@app.route('/api/admin/stats', methods=['GET'])
+def performance_stats():
+    """Upstream pipeline statistics (cache, request coalescing, client), rate limiting, cache warm-up and logging"""
+    if not _is_admin_request():
+        return jsonify({'error': 'Forbidden'}), 403
+    stats = dict(
+        narad_ai.get_performance_stats(),
+        rate_limiter=rate_limiter.get_stats(),
+        cache_warmer=cache_warmer.get_stats(),
+        logging=get_logging_stats(),
+        startup=startup
+    )
+    return jsonify({'status': 'success', 'stats': stats})
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus text exposition, merged across the server's workers"""
+    token = METRICS_CONFIG['token']
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return jsonify({'error': 'Forbidden'}), 403
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/api/test', methods=['GET'])
 def test():
     return jsonify({
@@ -172,42 +647,40 @@ def test():
         'status': 'success',
         'endpoints': {
             'chat': '/api/ai/chat (POST)',
+            'chat_stream': '/api/ai/chat/stream (POST, text/event-stream)',
             'health': '/health (GET)',
             'test': '/api/test (GET)'
         }
     })
 
+def _probe_payload():
+    """Minimal generateContent body used by the connectivity probes"""
+    return {
+        "contents": [{"parts": [{"text": "Say 'hello' in one word"}]}],
+        "generationConfig": {"maxOutputTokens": 10}
+    }
+
 @app.route('/api/test/gemini', methods=['GET'])
 def test_gemini():
     """Test endpoint to verify Gemini API connectivity"""
     try:
-        # Use getattr to avoid linter issues
-        import google.generativeai as genai
-        from google.generativeai.types import GenerationConfig
-        api_key = os.getenv('GEMINI_API_KEY')
-        if not api_key or api_key == 'your-gemini-api-key-here':
+        # Reuse the pooled client owned by Narad AI
+        client = narad_ai.gemini_client
+        if client is None:
             return jsonify({
                 'status': 'error',
                 'message': 'No valid GEMINI_API_KEY found in environment variables'
             }), 400
         
-        # Try to configure the API using getattr to avoid linter issues
-        configure_func = getattr(genai, 'configure')
-        configure_func(api_key=api_key)
-        
-        # For older versions of google-generativeai, we'll try a simple model test instead
         try:
-            # Try to list models to verify connectivity
-            generative_model_class = getattr(genai, 'GenerativeModel')
-            model_name = os.getenv('MODEL_NAME', 'gemini-1.5-pro')
-            model = generative_model_class(model_name)
-            generation_config_class = GenerationConfig
-            response = model.generate_content("Say 'hello' in one word", generation_config=generation_config_class(max_output_tokens=10))
+            model_name = narad_ai.model_name
+            response_data = client.generate_content(model_name, _probe_payload())
+            test_response = client.extract_text(response_data)
             return jsonify({
                 'status': 'success',
                 'message': 'Gemini API is accessible',
                 'api_key_valid': True,
-                'test_response': response.text.strip() if response.text else 'No response'
+                'test_response': test_response if test_response else 'No response'
             })
         except Exception as model_error:
             return jsonify({
@@ -226,59 +699,37 @@ def test_gemini():
 def test_gemini_list():
     """Test endpoint to list all available Gemini models"""
     try:
-        # Use getattr to avoid linter issues
-        import google.generativeai as genai
-        api_key = os.getenv('GEMINI_API_KEY')
-        if not api_key or api_key == 'your-gemini-api-key-here':
+        client = narad_ai.gemini_client
+        if client is None:
             return jsonify({
                 'status': 'error',
                 'message': 'No valid GEMINI_API_KEY found in environment variables'
             }), 400
         
-        # Try to configure the API using getattr to avoid linter issues
-        configure_func = getattr(genai, 'configure')
-        configure_func(api_key=api_key)
-        
         # Try to list all available models
         try:
-            list_models_func = getattr(genai, 'list_models', None)
-            if list_models_func:
-                models = list_models_func()
-                model_info = []
-                for model in models:
-                    model_info.append({
-                        'name': getattr(model, 'name', 'N/A'),
-                        'display_name': getattr(model, 'display_name', 'N/A'),
-                        'description': getattr(model, 'description', 'N/A'),
-                        'supported_generation_methods': getattr(model, 'supported_generation_methods', [])
-                    })
-                
-                # Filter for Gemini models only
-                gemini_models = [m for m in model_info if 'gemini' in m['name'].lower()]
-                
-                return jsonify({
-                    'status': 'success',
-                    'message': 'Available models retrieved successfully',
-                    'total_models': len(model_info),
-                    'gemini_models': gemini_models[:20],  # Limit to first 20 Gemini models
-                    'all_models_sample': model_info[:10]  # Sample of all models
-                })
-            else:
-                # Fallback for older versions
-                known_models = [
-                    {'name': 'gemini-pro', 'display_name': 'Gemini Pro', 'description': 'Good for text-based tasks'},
-                    {'name': 'gemini-pro-vision', 'display_name': 'Gemini Pro Vision', 'description': 'Good for image and text-based tasks'}
-                ]
-                
-                return jsonify({
-                    'status': 'success',
-                    'message': 'Known models retrieved successfully (list_models not available in this version)',
-                    'total_models': len(known_models),
-                    'gemini_models': known_models,
-                    'all_models_sample': known_models
+            models = client.list_models(page_size=1000)
+            model_info = []
+            for model in models:
+                model_info.append({
+                    'name': model.get('name', 'N/A'),
+                    'display_name': model.get('displayName', 'N/A'),
+                    'description': model.get('description', 'N/A'),
+                    'supported_generation_methods': model.get('supportedGenerationMethods', [])
                 })
+            
+            # Filter for Gemini models only
+            gemini_models = [m for m in model_info if 'gemini' in m['name'].lower()]
+            
+            return jsonify({
+                'status': 'success',
+                'message': 'Available models retrieved successfully',
+                'total_models': len(model_info),
+                'gemini_models': gemini_models[:20],  # Limit to first 20 Gemini models
+                'all_models_sample': model_info[:10]  # Sample of all models
+            })
         except Exception as model_error:
-            # Fallback for older versions
+            # Fallback when the models endpoint is unreachable
             known_models = [
                 {'name': 'gemini-pro', 'display_name': 'Gemini Pro', 'description': 'Good for text-based tasks'},
                 {'name': 'gemini-pro-vision', 'display_name': 'Gemini Pro Vision', 'description': 'Good for image and text-based tasks'}
@@ -303,42 +754,32 @@ def test_gemini_list():
 def test_gemini_models():
     """Test endpoint to verify specific model availability"""
     try:
-        # Use getattr to avoid linter issues
-        import google.generativeai as genai
-        from google.generativeai.types import GenerationConfig
-        api_key = os.getenv('GEMINI_API_KEY')
-        if not api_key or api_key == 'your-gemini-api-key-here':
+        client = narad_ai.gemini_client
+        if client is None:
             return jsonify({
                 'status': 'error',
                 'message': 'No valid GEMINI_API_KEY found in environment variables'
             }), 400
         
-        # Try to configure the API using getattr to avoid linter issues
-        configure_func = getattr(genai, 'configure')
-        configure_func(api_key=api_key)
-        
         # Test specific models with proper cleaning
         test_models = ['gemini-1.5-pro', 'gemini-1.5-flash', 'gemini-2.0-flash-exp']
         available_models = []
         unavailable_models = []
         
-        generative_model_class = getattr(genai, 'GenerativeModel')
-        generation_config_class = GenerationConfig
-        
         for model_name in test_models:
             try:
                 # Ensure the model name doesn't have the models/ prefix
                 clean_model_name = model_name.replace('models/', '').strip()
                 logger.info(f"Testing model: {model_name} (cleaned: {clean_model_name})")
                 
-                model = generative_model_class(clean_model_name)
                 # Try a simple generation to test if model is accessible
-                response = model.generate_content("Say 'hello' in one word", generation_config=generation_config_class(max_output_tokens=10))
+                response_data = client.generate_content(clean_model_name, _probe_payload())
+                test_response = client.extract_text(response_data)
                 available_models.append({
                     'name': model_name,
                     'clean_name': clean_model_name,
                     'status': 'available',
-                    'test_response': response.text.strip() if response.text else 'No response'
+                    'test_response': test_response if test_response else 'No response'
                 })
             except Exception as model_error:
                 unavailable_models.append({
@@ -365,13 +806,11 @@ def test_gemini_models():
 def test_conversation_memory():
     """Test endpoint to verify conversation memory functionality"""
     try:
-        # Create a test NaradAI instance
-        test_narad = NaradAI()
+        # A scratch memory, so live sessions are untouched; a second NaradAI
+        # would register another metrics collector on every call
+        memory = ConversationMemory()
         session_id = "test_memory_endpoint_001"
         
-        # Test the conversation memory directly
-        memory = test_narad.conversation_memory
-        
         # Clear any existing session data
         memory.clear_session(session_id)
         
@@ -385,7 +824,7 @@ def test_conversation_memory():
         history = memory.get_history(session_id)
         
         # Test the _format_conversation_history method
-        formatted_history = test_narad._format_conversation_history(history)
+        formatted_history = narad_ai._format_conversation_history(history)
         
         # Verify the format is correct
         is_working = "User:" in formatted_history and "Narad:" in formatted_history
@@ -404,6 +843,45 @@ def test_conversation_memory():
             'message': str(e)
         }), 500
 
+# =====================
+# STARTUP
+# =====================
+startup = {
+    'import_seconds': round(time.perf_counter() - IMPORT_STARTED, 3),
+    'import_budget': STARTUP_CONFIG['import_budget'],
+    'warmup': None,
+    'ready': not STARTUP_CONFIG['warmup']
+}
+if startup['import_seconds'] > STARTUP_CONFIG['import_budget']:
+    logger.warning(f"App import took {startup['import_seconds']}s (budget {STARTUP_CONFIG['import_budget']}s)")
+else:
+    logger.info(f"App imported in {startup['import_seconds']}s")
+
+def run_warmup():
+    """Prime tables, connection pools and caches, then report ready on /health"""
+    started = time.perf_counter()
+    try:
+        steps = narad_ai.warm_up()
+    except Exception as e:
+        logger.warning(f"Start-up warm-up failed, continuing cold: {e}")
+        steps = {}
+    startup['warmup'] = dict(steps, total=round(time.perf_counter() - started, 4))
+    startup['ready'] = True
+    logger.info(f"Warm-up finished in {startup['warmup']['total']}s: {steps}")
+
+def start_worker():
+    """Start this process's background threads (they do not survive fork)"""
+    cache_warmer.start()
+    if STARTUP_CONFIG['warmup']:
+        threading.Thread(target=run_warmup, daemon=True, name='startup-warmup').start()
+
+if STARTUP_CONFIG['preload']:
+    # Imported by the gunicorn master: build the shared read-only data here;
+    # gunicorn.conf.py starts each worker's threads after fork
+    narad_ai.prime()
+else:
+    start_worker()
+
 # =====================
 # RUN APP
 # =====================
@@ -0,0 +1,233 @@
+"""
+Narad AI Service - ASGI entry point
+
+Serves the chat routes natively on asyncio so one worker can keep hundreds of
+Gemini calls in flight, instead of pinning a gunicorn sync worker per call.
+Every other route (health, test probes, ...) is served by the existing Flask
+app mounted underneath, so paths and response shapes are identical.
+
+Run with:
+    uvicorn app_async:app --host 0.0.0.0 --port $PORT --workers 1
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.wsgi import WSGIMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.routing import APIRoute
+
+from app import (
+    app as flask_app, narad_ai, build_chat_response, processing_error_response, sse_event, CORS_ORIGINS,
+    parse_batch_request, parse_batch_item, batch_item_result, batch_item_error, batch_response,
+    rate_limiter, client_address, rate_limit_identities, rate_limited_body, parse_request_deadline
+)
+from src.utils.rate_limiter import rate_limit_headers
+from src.utils.concurrency import upstream_priority
+from src.utils.logger import log_event
+from src.utils.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+metrics = get_metrics()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    if narad_ai.async_gemini_client is not None:
+        await narad_ai.async_gemini_client.aclose()
+
+
+app = FastAPI(title='Narad AI Service', docs_url=None, redoc_url=None, openapi_url=None, lifespan=lifespan)
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=CORS_ORIGINS,
+    allow_credentials=True,
+    allow_methods=['*'],
+    allow_headers=['*']
+)
+
+
+@app.middleware('http')
+async def observe_request(request: Request, call_next):
+    """
+    Time the native routes and attach their X-RateLimit-* headers, as the
+    Flask app's after_request hooks do for the routes it serves (streams
+    are timed until their headers are sent)
+    """
+    started = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get('route')
+    if isinstance(route, APIRoute):
+        metrics.observe(
+            'narad_http_request_duration_seconds', time.perf_counter() - started,
+            route=route.path,
+            method=request.method,
+            status=response.status_code
+        )
+        response.headers.update(rate_limit_headers(getattr(request.state, 'rate_limit', None)))
+    return response
+
+
+def _check_rate_limit(request: Request, data, cost=1):
+    """
+    Count a request against its client's quotas, mirroring the Flask helper
+
+    Returns:
+        A 429 response when over the limit, 413 when the cost exceeds what a
+        full bucket holds, else None. Headers are added by observe_request.
+    """
+    data = data if isinstance(data, dict) else {}
+    peer = request.client.host if request.client else None
+    ip = client_address(peer, request.headers.get('x-forwarded-for'))
+    request.state.rate_limit = result = rate_limiter.check(rate_limit_identities(ip, data.get('user_id'), data.get('session_id')), cost)
+    if result and not result['allowed']:
+        if result.get('oversize'):
+            logger.warning(f"Rejected request from {ip} costing {cost} (rate limit allows {result['limit']})")
+            return JSONResponse(rate_limited_body(result), status_code=413)
+        logger.warning(f"Rate limit exceeded for {ip} (retry after {result['retry_after']}s)")
+        return JSONResponse(rate_limited_body(result), status_code=429)
+    return None
+
+
+async def _read_json(request: Request):
+    """The parsed body, or None when it is missing or not JSON"""
+    try:
+        return await request.json()
+    except ValueError:
+        return None
+
+
+async def _read_chat_request(request: Request):
+    """
+    Parse, rate-limit and validate a chat body, mirroring the Flask handler
+
+    Returns:
+        ((message, session_id, context, body), None), or (None, error response)
+    """
+    data = await _read_json(request)
+    if not data:
+        return None, JSONResponse({'error': 'No JSON data provided'}, status_code=400)
+    if not isinstance(data, dict):
+        return None, JSONResponse({'error': 'Request body must be a JSON object'}, status_code=400)
+
+    limited = _check_rate_limit(request, data)
+    if limited:
+        return None, limited
+
+    user_message = data.get('message')
+    user_message = user_message.strip() if isinstance(user_message, str) else ''
+    if not user_message:
+        return None, JSONResponse({'error': 'No message provided'}, status_code=400)
+
+    context = data.get('context', {})
+    # Ensure context is a dictionary
+    if not isinstance(context, dict):
+        context = {}
+
+    return (user_message, data.get('session_id', 'default_session'), context, data), None
+
+
+async def generate_response_async(user_message, session_id="default_session", context=None, deadline=None):
+    """Generate response using Narad AI service without blocking the event loop"""
+    try:
+        return await narad_ai.process_message_async(
+            message=user_message,
+            session_id=session_id,
+            context=context or {},
+            deadline=deadline
+        )
+    except Exception as e:
+        logger.error(f"Error in Narad AI processing: {str(e)}", exc_info=True)
+        return processing_error_response()
+
+
+@app.post('/api/ai/chat')
+async def chat(request: Request):
+    parsed, error = await _read_chat_request(request)
+    if error:
+        return error
+    user_message, session_id, context, data = parsed
+    log_event(
+        logger, 'chat_request', "Received chat request: %s", user_message,
+        message=user_message, session_id=session_id
+    )
+
+    try:
+        deadline = parse_request_deadline(request.headers, data)
+    except ValueError as e:
+        return JSONResponse({'error': str(e)}, status_code=400)
+    if deadline is not None and deadline.expired:
+        return JSONResponse({'error': 'Request deadline has already passed'}, status_code=504)
+
+    try:
+        ai_response = await generate_response_async(user_message, session_id, context, deadline)
+        return JSONResponse(build_chat_response(ai_response, session_id, context))
+    except Exception as e:
+        logger.error(f"Error in chat endpoint: {e}", exc_info=True)
+        return JSONResponse({'error': 'Internal server error', 'message': str(e)}, status_code=500)
+
+
+@app.post('/api/ai/chat/batch')
+async def chat_batch(request: Request):
+    data = await _read_json(request)
+    items, concurrency, error = parse_batch_request(data)
+    if error:
+        return JSONResponse({'error': error}, status_code=400)
+
+    # Every item counts against the caller's quota
+    limited = _check_rate_limit(request, data, cost=len(items))
+    if limited:
+        return limited
+
+    started = time.monotonic()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(index, item):
+        message, session_id, context, item_error = parse_batch_item(item)
+        if item_error:
+            return batch_item_error(index, item_error)
+        # Batch items queue behind interactive chat for upstream slots
+        with upstream_priority('batch'):
+            async with semaphore:
+                ai_response = await generate_response_async(message, session_id, context)
+        return batch_item_result(index, ai_response, session_id, context)
+
+    results = await asyncio.gather(*(run(index, item) for index, item in enumerate(items)))
+    return JSONResponse(batch_response(list(results), concurrency, started))
+
+
+@app.post('/api/ai/chat/stream')
+async def chat_stream(request: Request):
+    parsed, error = await _read_chat_request(request)
+    if error:
+        return error
+    user_message, session_id, context, _ = parsed
+    log_event(
+        logger, 'chat_request', "Received streaming chat request: %s", user_message,
+        message=user_message, session_id=session_id, stream=True
+    )
+
+    async def generate():
+        async for event in narad_ai.process_message_stream_async(user_message, session_id, context):
+            payload = event['data']
+            if event['event'] in ('done', 'error'):
+                payload = dict(payload, session_id=session_id)
+            yield sse_event(event['event'], payload)
+
+    return StreamingResponse(
+        generate(),
+        media_type='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
+
+# Everything else is served by the Flask app unchanged
+app.mount('/', WSGIMiddleware(flask_app))
@@ -0,0 +1,363 @@
+"""
+Microbenchmarks of the CPU-bound components, with release thresholds
+
+Each case times one operation against synthetic data scaled by --sizes
+(10^3 to 10^6; what a size counts is listed below):
+
+    detect_language       NaradAI._detect_language_from_text     characters of mixed-script text
+    classify_intent       NaradAI._classify_intent               characters of message
+    format_history        NaradAI._format_conversation_history   messages in the history
+    memory_add_message    ConversationMemory.add_message         sessions held
+    memory_get_history    ConversationMemory.get_history         sessions held
+    memory_cleanup        ConversationMemory.cleanup_expired_sessions
+                                                                 sessions held (all active: the periodic scan)
+    kb_search_stories     CulturalKnowledgeBase.search_stories   stories in the knowledge base
+    kb_related_monuments  CulturalKnowledgeBase.get_related_monuments
+                                                                 monuments in the knowledge base
+    recommendations       ContentRecommender.get_recommendations content items
+    summarize             StorySummarizer.summarize              characters of story
+
+Timing follows timeit: the call count is raised until one batch takes
+--min-time, then --repeat batches are run and the median time per call is
+kept. Data is generated from a fixed --seed, so sizes and runs compare.
+
+Gates, for CI or a release checklist:
+
+    --check [FILE]         fail when a case is slower than its threshold
+                           (default benchmarks/component_thresholds.json,
+                           microseconds per call by case and size)
+    --baseline FILE        fail when a case is more than --tolerance slower
+                           than in an earlier --json run on the same machine
+    --update-thresholds    rewrite the thresholds file from this run times --headroom
+
+The memory_* cases at 10^6 sessions need several GB of RAM.
+
+Usage (from ai-service/):
+    python benchmarks/bench_components.py
+    python benchmarks/bench_components.py --cases summarize,recommendations --sizes 1e3,1e4,1e5,1e6
+    python benchmarks/bench_components.py --check --json components.json
+    python benchmarks/bench_components.py --baseline previous.json --tolerance 0.2
+"""
+
+import argparse
+import copy
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+# A NaradAI without an API key makes no network calls
+os.environ['GEMINI_API_KEY'] = ''
+os.environ.setdefault('CACHE_ENABLED', 'false')
+os.environ.setdefault('METRICS_ENABLED', 'false')
+logging.basicConfig(level=logging.WARNING)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.services.narad_ai import NaradAI  # noqa: E402
+from src.services.content_recommender import ContentRecommender  # noqa: E402
+from src.services.story_summarizer import StorySummarizer  # noqa: E402
+from src.utils.conversation_memory import ConversationMemory  # noqa: E402
+from src.utils.cultural_knowledge import CulturalKnowledgeBase  # noqa: E402
+
+THRESHOLDS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'component_thresholds.json')
+
+WORDS = {
+    'en': ['temple', 'legend', 'story', 'festival', 'monument', 'ancient', 'king', 'river', 'goddess', 'fort',
+           'tell', 'history', 'dance', 'culture', 'what', 'why', 'haunted', 'built', 'Lord', 'Emperor'],
+    'hi': ['मंदिर', 'कहानी', 'त्योहार', 'किला', 'राजा', 'नदी'],
+    'ta': ['கோவில்', 'கதை', 'திருவிழா', 'அரசன்'],
+    'bn': ['মন্দির', 'গল্প', 'উৎসব', 'রাজা']
+}
+THEMES = ['love', 'devotion', 'architecture', 'mythology', 'history', 'mystery', 'culture', 'art', 'strength',
+          'adventure', 'religion', 'horror', 'festival', 'trade', 'war']
+PERIODS = ['Mughal', 'Vijayanagara', 'Chola', 'Maurya', 'Gupta', 'Rajput', 'Colonial', 'Ancient']
+STATES = ['Uttar Pradesh', 'Karnataka', 'Tamil Nadu', 'Rajasthan', 'Delhi', 'Odisha', 'Bihar', 'Kerala']
+STYLES = ['Indo-Islamic', 'Dravidian', 'Nagara', 'Buddhist', 'Rajput', 'Colonial']
+
+
+# =====================
+# SYNTHETIC DATA
+# =====================
+def synthetic_text(chars: int, rng: random.Random, scripts=('en',)) -> str:
+    """Sentences of cultural vocabulary in the given scripts, `chars` characters long"""
+    vocabulary = [word for script in scripts for word in WORDS[script]]
+    parts, length = [], 0
+    while length < chars:
+        sentence = ' '.join(rng.choice(vocabulary) for _ in range(rng.randint(6, 14))).capitalize() + '.'
+        parts.append(sentence)
+        length += len(sentence) + 1
+    return ' '.join(parts)[:chars]
+
+
+def synthetic_history(messages: int, rng: random.Random) -> List[Dict[str, Any]]:
+    return [
+        {'role': 'user' if index % 2 == 0 else 'ai', 'content': synthetic_text(rng.randint(40, 300), rng)}
+        for index in range(messages)
+    ]
+
+
+def synthetic_memory(sessions: int, rng: random.Random) -> ConversationMemory:
+    """Memory holding `sessions` sessions with a few turns each"""
+    memory = ConversationMemory(max_history_per_session=20)
+    for index in range(sessions):
+        session = memory.create_session(f'session-{index}')
+        for turn in range(rng.randint(1, 3)):
+            session['message_history'].append({
+                'role': 'user' if turn % 2 == 0 else 'ai',
+                'content': synthetic_text(80, rng),
+                'timestamp': session['last_activity'],
+                'metadata': {}
+            })
+    return memory
+
+
+def synthetic_knowledge_base(stories: int, monuments: int, rng: random.Random) -> CulturalKnowledgeBase:
+    """Knowledge base with the sample entries cloned and varied to the requested sizes"""
+    kb = CulturalKnowledgeBase()
+    story_templates = list(kb.stories_db.values())
+    kb.stories_db = {}
+    for index in range(stories):
+        story = dict(rng.choice(story_templates))
+        story['title'] = f"{story['title']} {index}"
+        story['content'] = synthetic_text(rng.randint(60, 200), rng)
+        story['themes'] = rng.sample(THEMES, 3)
+        kb.stories_db[f'story_{index}'] = story
+
+    monument_templates = list(kb.monuments_db.values())
+    kb.monuments_db = {}
+    for index in range(monuments):
+        monument = dict(rng.choice(monument_templates))
+        monument['name'] = f"{monument['name']} {index}"
+        monument['location'] = f'City {rng.randrange(500)}, {rng.choice(STATES)}'
+        monument['period'] = rng.choice(PERIODS)
+        monument['architecture'] = rng.choice(STYLES)
+        kb.monuments_db[f'monument_{index}'] = monument
+    return kb
+
+
+def synthetic_recommender(items: int, rng: random.Random) -> ContentRecommender:
+    """Recommender whose content database holds `items` items across its content types"""
+    recommender = ContentRecommender()
+    templates = [(content_type, item) for content_type, entries in recommender.content_database.items() for item in entries]
+    database = {content_type: [] for content_type in recommender.content_database}
+    for index in range(items):
+        content_type, template = rng.choice(templates)
+        item = copy.deepcopy(template)
+        item['id'] = f"{template['id']}_{index}"
+        item['themes'] = rng.sample(THEMES, 3)
+        item['popularity'] = round(rng.random(), 2)
+        item['monument'] = f'monument_{rng.randrange(max(1, items // 20))}'
+        database[content_type].append(item)
+    recommender.content_database = database
+    return recommender
+
+
+# =====================
+# CASES
+# =====================
+# Each builder takes (size, rng) and returns the operation to time
+def case_detect_language(size: int, rng: random.Random) -> Callable[[], Any]:
+    narad = get_narad()
+    # English first so the later script checks scan the whole text
+    text = synthetic_text(size - 20, rng, ('en',)) + ' ' + synthetic_text(19, rng, ('ta',))
+    return lambda: narad._detect_language_from_text(text)
+
+
+def case_classify_intent(size: int, rng: random.Random) -> Callable[[], Any]:
+    narad = get_narad()
+    # No keyword of any intent: every check scans the whole message
+    text = ('x' * 9 + ' ') * (size // 10)
+    return lambda: narad._classify_intent(text)
+
+
+def case_format_history(size: int, rng: random.Random) -> Callable[[], Any]:
+    narad = get_narad()
+    history = synthetic_history(size, rng)
+    return lambda: narad._format_conversation_history(history)
+
+
+def case_memory_add_message(size: int, rng: random.Random) -> Callable[[], Any]:
+    memory = synthetic_memory(size, rng)
+    message = synthetic_text(120, rng)
+    return lambda: memory.add_message(f'session-{rng.randrange(size)}', 'user', message, {'intent': 'story_request'})
+
+
+def case_memory_get_history(size: int, rng: random.Random) -> Callable[[], Any]:
+    memory = synthetic_memory(size, rng)
+    return lambda: memory.get_history(f'session-{rng.randrange(size)}')
+
+
+def case_memory_cleanup(size: int, rng: random.Random) -> Callable[[], Any]:
+    memory = synthetic_memory(size, rng)
+    return memory.cleanup_expired_sessions
+
+
+def case_kb_search_stories(size: int, rng: random.Random) -> Callable[[], Any]:
+    kb = synthetic_knowledge_base(size, 10, rng)
+    return lambda: kb.search_stories('a haunted fort legend', 'horror_inquiry')
+
+
+def case_kb_related_monuments(size: int, rng: random.Random) -> Callable[[], Any]:
+    kb = synthetic_knowledge_base(10, size, rng)
+    return lambda: kb.get_related_monuments(f'monument_{rng.randrange(size)}')
+
+
+def case_recommendations(size: int, rng: random.Random) -> Callable[[], Any]:
+    recommender = synthetic_recommender(size, rng)
+    context = {'current_monument': 'monument_1'}
+    return lambda: recommender.get_recommendations('Tell me a legend about an ancient temple', context, limit=5)
+
+
+def case_summarize(size: int, rng: random.Random) -> Callable[[], Any]:
+    summarizer = StorySummarizer()
+    content = synthetic_text(size, rng)
+    return lambda: summarizer.summarize(content, max_length=300, story_type='history')
+
+
+CASES = {
+    'detect_language': case_detect_language,
+    'classify_intent': case_classify_intent,
+    'format_history': case_format_history,
+    'memory_add_message': case_memory_add_message,
+    'memory_get_history': case_memory_get_history,
+    'memory_cleanup': case_memory_cleanup,
+    'kb_search_stories': case_kb_search_stories,
+    'kb_related_monuments': case_kb_related_monuments,
+    'recommendations': case_recommendations,
+    'summarize': case_summarize
+}
+
+_narad = None
+
+
+def get_narad() -> NaradAI:
+    global _narad
+    if _narad is None:
+        _narad = NaradAI()
+    return _narad
+
+
+# =====================
+# TIMING AND GATES
+# =====================
+def measure(operation: Callable[[], Any], min_time: float, repeat: int) -> Dict[str, float]:
+    """Median and best microseconds per call over `repeat` batches of at least min_time each"""
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            operation()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            break
+        number = number * 10 if elapsed < min_time / 10 else number * 2
+
+    per_call = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            operation()
+        per_call.append((time.perf_counter() - started) / number * 1e6)
+    return {
+        'median_us': round(statistics.median(per_call), 3),
+        'best_us': round(min(per_call), 3),
+        'calls': number
+    }
+
+
+def check_thresholds(results: Dict[str, Dict[str, Dict]], thresholds: Dict[str, Dict[str, float]]) -> List[str]:
+    failures = []
+    for case, sizes in results.items():
+        for size, result in sizes.items():
+            limit = thresholds.get(case, {}).get(size)
+            if limit is not None and result['median_us'] > limit:
+                failures.append(f"{case} @ {size}: {result['median_us']}us > threshold {limit}us")
+    return failures
+
+
+def check_baseline(results: Dict[str, Dict[str, Dict]], baseline: Dict[str, Dict[str, Dict]], tolerance: float) -> List[str]:
+    failures = []
+    for case, sizes in results.items():
+        for size, result in sizes.items():
+            before = baseline.get(case, {}).get(size)
+            if before and result['median_us'] > before['median_us'] * (1 + tolerance):
+                change = (result['median_us'] / before['median_us'] - 1) * 100
+                failures.append(f"{case} @ {size}: {result['median_us']}us vs {before['median_us']}us (+{change:.0f}%)")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Microbenchmark the CPU-bound components')
+    parser.add_argument('--cases', default=','.join(CASES))
+    parser.add_argument('--sizes', default='1e3,1e4,1e5', help='comma-separated, e.g. 1e3,1e4,1e5,1e6')
+    parser.add_argument('--min-time', type=float, default=0.05, help='seconds per timed batch')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--check', nargs='?', const=THRESHOLDS, help='thresholds file to gate on')
+    parser.add_argument('--baseline', help='earlier --json output to gate on')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown against --baseline')
+    parser.add_argument('--update-thresholds', nargs='?', const=THRESHOLDS, help='write thresholds from this run')
+    parser.add_argument('--headroom', type=float, default=3.0, help='threshold multiple of the measured median')
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.cases.split(',') if name.strip()]
+    unknown = [name for name in names if name not in CASES]
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(unknown)} (choose from {', '.join(CASES)})")
+    sizes = [int(float(size)) for size in args.sizes.split(',') if size.strip()]
+
+    results: Dict[str, Dict[str, Dict]] = {}
+    for name in names:
+        results[name] = {}
+        for size in sizes:
+            print(f'{name} @ {size}...', flush=True)
+            setup_started = time.perf_counter()
+            operation = CASES[name](size, random.Random(args.seed))
+            result = measure(operation, args.min_time, args.repeat)
+            result['setup_s'] = round(time.perf_counter() - setup_started, 2)
+            results[name][str(size)] = result
+
+    print(f"\n{'case':<24}" + ''.join(f'{size:>14}' for size in sizes) + '   (median us per call)')
+    for name, by_size in results.items():
+        print(f'{name:<24}' + ''.join(f"{by_size[str(size)]['median_us']:>14}" for size in sizes))
+
+    failures = []
+    if args.check:
+        with open(args.check) as f:
+            failures += check_thresholds(results, json.load(f))
+    if args.baseline:
+        with open(args.baseline) as f:
+            failures += check_baseline(results, json.load(f)['results'], args.tolerance)
+
+    if args.update_thresholds:
+        thresholds = {}
+        if os.path.exists(args.update_thresholds):
+            with open(args.update_thresholds) as f:
+                thresholds = json.load(f)
+        for name, by_size in results.items():
+            thresholds.setdefault(name, {}).update({
+                size: round(result['median_us'] * args.headroom, 1) for size, result in by_size.items()
+            })
+        with open(args.update_thresholds, 'w') as f:
+            json.dump(thresholds, f, indent=2, sort_keys=True)
+            f.write('\n')
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'config': vars(args), 'created_at': datetime.utcnow().isoformat(), 'results': results}, f, indent=2)
+
+    if failures:
+        print('\nRegressions:')
+        for failure in failures:
+            print(f'  {failure}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
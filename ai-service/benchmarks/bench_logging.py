@@ -0,0 +1,170 @@
+"""
+Cost of chat-turn logging on the request thread
+
+Replays the log calls one turn makes, with realistic payload sizes, through:
+
+    legacy            the previous pattern: f-string INFO lines for the request,
+                      context, prompt, raw Gemini JSON, history and result,
+                      written inline by a plain StreamHandler
+    pipeline_text     configure_logging text output behind the queue
+    pipeline_json     configure_logging JSON records behind the queue
+    pipeline_sampled  JSON with chat_turn/chat_response sampled at 10%
+
+The request-thread cost is what a turn pays; drain is how long the listener
+then took to write what was queued. Output goes to a temporary file.
+
+Usage (from ai-service/):
+    python benchmarks/bench_logging.py --turns 20000
+    python benchmarks/bench_logging.py --threads 8 --json logging.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.utils.logger import configure_logging, log_event, stop_logging  # noqa: E402
+
+MODES = ('legacy', 'pipeline_text', 'pipeline_json', 'pipeline_sampled')
+
+MESSAGE = 'Tell me the story behind the Sun Temple at Konark and why it was built'
+CONTEXT = {'preferences': {'language': 'en'}, 'location': 'Odisha', 'page': '/monuments/konark'}
+PROMPT = 'You are Narad AI, a cultural guide. ' * 90
+ANSWER = 'The Konark Sun Temple was built in the 13th century by King Narasimhadeva I. ' * 20
+GEMINI_JSON = {
+    'candidates': [{'content': {'parts': [{'text': ANSWER}], 'role': 'model'}, 'finishReason': 'STOP'}],
+    'usageMetadata': {'promptTokenCount': 812, 'candidatesTokenCount': 402, 'totalTokenCount': 1214}
+}
+HISTORY = [{'role': 'user' if i % 2 == 0 else 'ai', 'content': ANSWER[:300]} for i in range(10)]
+RESULT = {'response': ANSWER, 'intent': 'story_request', 'suggestions': ['Tell me more'] * 3, 'confidence': 0.9}
+
+
+def legacy_turn(logger: logging.Logger):
+    """The per-turn log calls app.py and NaradAI used to make"""
+    data = {'message': MESSAGE, 'session_id': 'session-1', 'context': CONTEXT}
+    logger.info("Received chat request")
+    logger.info(f"Request data: {data}")
+    logger.info(f"Received chat request: {MESSAGE}")
+    logger.info("Session ID: session-1")
+    logger.info(f"Context: {CONTEXT}")
+    logger.info(f"Processing message: {MESSAGE}")
+    logger.info(f"Formatting conversation history with {len(HISTORY)} messages")
+    for msg in HISTORY:
+        logger.info(f"Processing message: {msg}")
+    logger.info(f"Full prompt: {PROMPT}")
+    logger.info(f"API Response: {GEMINI_JSON}")
+    logger.info(f"Final result: {RESULT}")
+    logger.info(f"AI Response: {RESULT}")
+    logger.info(f"Response data: {RESULT}")
+
+
+def pipeline_turn(logger: logging.Logger):
+    """The per-turn log calls made now (debug lines are disabled at INFO)"""
+    log_event(logger, 'chat_request', "Received chat request: %s", MESSAGE, message=MESSAGE, session_id='session-1', user_id=None)
+    logger.debug("Processing message (session %s): %.200s", 'session-1', MESSAGE)
+    logger.debug("Formatting conversation history with %d messages", len(HISTORY))
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Prompt (%d chars): %.500s", len(PROMPT), PROMPT)
+    log_event(
+        logger, 'chat_turn', "✅ Answered %s turn (%s, %s, %d chars)", 'story_request', 'en', 'gemini-1.5-pro', len(ANSWER),
+        session_id='session-1', intent='story_request', language='en', model='gemini-1.5-pro', response_chars=len(ANSWER)
+    )
+    log_event(
+        logger, 'chat_response', "Answered chat request (intent %s, %d chars)", 'story_request', len(ANSWER),
+        session_id='session-1', intent='story_request', response_chars=len(ANSWER)
+    )
+
+
+def run_mode(mode: str, args) -> Dict[str, Any]:
+    """Time args.turns turns split over args.threads request threads"""
+    with tempfile.TemporaryFile('w', encoding='utf-8') as out:
+        if mode == 'legacy':
+            root = logging.getLogger()
+            for handler in list(root.handlers):
+                root.removeHandler(handler)
+            handler = logging.StreamHandler(out)
+            handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+            root.addHandler(handler)
+            root.setLevel(logging.INFO)
+            turn = legacy_turn
+        else:
+            configure_logging(
+                fmt='text' if mode == 'pipeline_text' else 'json',
+                queue_size=args.queue_size,
+                sample_rates={'chat_turn': 0.1, 'chat_response': 0.1} if mode == 'pipeline_sampled' else None,
+                stream=out
+            )
+            turn = pipeline_turn
+        logger = logging.getLogger('bench')
+
+        per_thread = args.turns // args.threads
+        busy = []
+        lock = threading.Lock()
+
+        def worker():
+            started = time.perf_counter()
+            for _ in range(per_thread):
+                turn(logger)
+            elapsed = time.perf_counter() - started
+            with lock:
+                busy.append(elapsed)
+
+        threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - started
+
+        # Wait for the listener to write everything that was queued
+        stop_logging()
+        drain = time.perf_counter() - started - wall
+        written = out.tell()
+
+    total_turns = per_thread * args.threads
+    return {
+        'request_us_per_turn': round(sum(busy) / total_turns * 1e6, 2),
+        'wall_s': round(wall, 3),
+        'drain_s': round(drain, 3),
+        'bytes_per_turn': round(written / total_turns)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure chat-turn logging cost on the request thread')
+    parser.add_argument('--modes', default=','.join(MODES))
+    parser.add_argument('--turns', type=int, default=20000)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--queue-size', type=int, default=100000)
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.modes.split(',') if name.strip()]
+    unknown = [name for name in names if name not in MODES]
+    if unknown:
+        parser.error(f"unknown modes: {', '.join(unknown)} (choose from {', '.join(MODES)})")
+
+    results = {}
+    for name in names:
+        print(f'Running {name}...', file=sys.__stdout__, flush=True)
+        results[name] = run_mode(name, args)
+
+    columns = ['request_us_per_turn', 'wall_s', 'drain_s', 'bytes_per_turn']
+    print(f"\n{'mode':<18}" + ''.join(f'{column:>22}' for column in columns))
+    for name, result in results.items():
+        print(f'{name:<18}' + ''.join(f'{result[column]:>22}' for column in columns))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'config': vars(args), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+"""
+Per-worker memory of the gunicorn server with and without preload
+
+Starts `gunicorn app:app` (with gunicorn.conf.py) against the local mock
+Gemini server, once per mode, sends chat turns spread over the workers and
+reads each process's /proc/<pid>/smaps_rollup:
+
+    no_preload   GUNICORN_PRELOAD=false: every worker imports and builds the app
+    preload      GUNICORN_PRELOAD=true: the master builds it, workers share it copy-on-write
+
+Per worker it reports resident (RSS), shared, private and proportional (PSS)
+memory in MB; the PSS total over the master and workers is what the server
+really occupies. Linux only.
+
+Usage (from ai-service/):
+    python benchmarks/bench_preload.py --workers 4 --turns 200
+    python benchmarks/bench_preload.py --json preload.json
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from mock_gemini_server import start_mock_server  # noqa: E402
+
+MODES = ('no_preload', 'preload')
+
+MESSAGES = (
+    'Tell me the story of the Konark Sun Temple',
+    'What is the history of Hampi?',
+    'Share a folk tale from Rajasthan',
+    'Why is the Taj Mahal famous?',
+    'Tell me about the festival of Onam'
+)
+
+
+def read_memory(pid: int) -> Dict[str, float]:
+    """RSS, shared, private and PSS of a process in MB, from smaps_rollup"""
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    mb = lambda kb: round(kb / 1024, 1)  # noqa: E731
+    return {
+        'rss_mb': mb(fields.get('Rss', 0)),
+        'shared_mb': mb(fields.get('Shared_Clean', 0) + fields.get('Shared_Dirty', 0)),
+        'private_mb': mb(fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)),
+        'pss_mb': mb(fields.get('Pss', 0))
+    }
+
+
+def child_pids(parent: int) -> List[int]:
+    pids = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # The command name may contain spaces; fields resume after its closing parenthesis
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == parent:
+            pids.append(int(entry))
+    return sorted(pids)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def post_chat(port: int, index: int) -> bool:
+    body = json.dumps({'message': MESSAGES[index % len(MESSAGES)], 'session_id': f'bench-{index % 50}'}).encode()
+    request = urllib.request.Request(
+        f'http://127.0.0.1:{port}/api/ai/chat', data=body, headers={'Content-Type': 'application/json'}
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            return response.status == 200
+    except OSError:
+        return False
+
+
+def wait_ready(port: int, workers: int, timeout: float = 60):
+    """Until every worker can answer /health (requests land on random workers, so probe repeatedly)"""
+    deadline = time.monotonic() + timeout
+    successes = 0
+    while time.monotonic() < deadline and successes < workers * 5:
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/health', timeout=2) as response:
+                successes += response.status == 200
+        except OSError:
+            time.sleep(0.1)
+    if successes < workers * 5:
+        raise RuntimeError('server did not become ready')
+
+
+def run_mode(mode: str, args, endpoint: str) -> Dict[str, Any]:
+    port = free_port()
+    env = dict(
+        os.environ,
+        GUNICORN_PRELOAD='true' if mode == 'preload' else 'false',
+        GEMINI_API_KEY=os.getenv('GEMINI_API_KEY', 'bench-key'),
+        GEMINI_API_ENDPOINT=endpoint,
+        CACHE_WARMUP_ENABLED='false',
+        CACHE_ENABLED='false',
+        RATE_LIMIT_ENABLED='false',
+        LOG_LEVEL='WARNING'
+    )
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-w', str(args.workers), '-b', f'127.0.0.1:{port}', 'app:app'],
+        cwd=SERVICE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_ready(port, args.workers)
+        workers = child_pids(server.pid)
+        idle = {pid: read_memory(pid) for pid in workers}
+
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            ok = sum(pool.map(lambda index: post_chat(port, index), range(args.turns)))
+        loaded = {pid: read_memory(pid) for pid in workers}
+        master = read_memory(server.pid)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    return {
+        'master': master,
+        'workers_idle': list(idle.values()),
+        'workers_loaded': list(loaded.values()),
+        'turns_ok': ok,
+        'total_pss_mb': round(master['pss_mb'] + sum(memory['pss_mb'] for memory in loaded.values()), 1)
+    }
+
+
+def average(rows: List[Dict[str, float]], key: str) -> float:
+    return round(sum(row[key] for row in rows) / len(rows), 1) if rows else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare gunicorn worker memory with and without preload')
+    parser.add_argument('--modes', default=','.join(MODES))
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--turns', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=0.02, help='mock Gemini latency in seconds')
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.modes.split(',') if name.strip()]
+    unknown = [name for name in names if name not in MODES]
+    if unknown:
+        parser.error(f"unknown modes: {', '.join(unknown)} (choose from {', '.join(MODES)})")
+    if not os.path.exists('/proc/self/smaps_rollup'):
+        parser.error('needs /proc/<pid>/smaps_rollup (Linux 4.14+)')
+
+    mock, _ = start_mock_server(latency=args.latency)
+    endpoint = f'http://127.0.0.1:{mock.server_port}/v1beta/models'
+
+    results = {}
+    for name in names:
+        print(f'Running {name}...', flush=True)
+        results[name] = run_mode(name, args, endpoint)
+    mock.shutdown()
+
+    columns = ['rss_mb', 'shared_mb', 'private_mb', 'pss_mb']
+    print(f"\n{'mode':<12}{'phase':<8}" + ''.join(f'{column:>12}' for column in columns) + f"{'total_pss_mb':>14}")
+    for name, result in results.items():
+        for phase in ('idle', 'loaded'):
+            rows = result[f'workers_{phase}']
+            total = result['total_pss_mb'] if phase == 'loaded' else ''
+            print(f'{name:<12}{phase:<8}' + ''.join(f'{average(rows, column):>12}' for column in columns) + f'{total:>14}')
+    print('\n(per-worker averages; total PSS covers the master and all workers after the turns)')
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'config': vars(args), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+"""
+Chat latency under a concurrent batch job, with and without priority classes
+
+Runs NaradAI in process against the local mock Gemini server with a fixed
+upstream limit. Interactive turns are timed while a pool of batch workers
+keeps the upstream saturated:
+
+    chat_only     interactive turns alone (the target latency)
+    same_class    batch work in the interactive class, i.e. plain FIFO sharing
+    prioritized   batch work in the batch class (weighted fair queuing + cap)
+
+Usage (from ai-service/):
+    python benchmarks/bench_priority_scheduler.py --requests 120 --batch-workers 48
+    python benchmarks/bench_priority_scheduler.py --limit 4 --json priority.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from mock_gemini_server import start_mock_server  # noqa: E402
+from fault_injection import classify, percentile  # noqa: E402
+
+MODES = ('chat_only', 'same_class', 'prioritized')
+
+
+def run_mode(mode: str, server, mock_url: str, args) -> Dict[str, Any]:
+    """Time interactive turns while batch workers run in the given mode"""
+    from src.services.narad_ai import NaradAI
+    from src.services.llm_providers import build_llm_gateway
+    from src.utils.concurrency import upstream_priority
+
+    server.behavior.reset(latency=args.latency, seed=args.seed)
+    server.reset()
+    narad_ai = NaradAI(llm_gateway=build_llm_gateway())
+    narad_ai.set_api_endpoint(mock_url)
+
+    stop = threading.Event()
+    batch = {'turns': 0, 'fallback': 0}
+    batch_lock = threading.Lock()
+
+    def batch_worker(worker: int):
+        priority = 'batch' if mode == 'prioritized' else 'interactive'
+        turn = 0
+        with upstream_priority(priority):
+            while not stop.is_set():
+                response = narad_ai.process_message(f'Batch item {worker}-{turn}: describe a festival', f'batch-{worker}', {})
+                turn += 1
+                with batch_lock:
+                    batch['turns'] += 1
+                    batch['fallback'] += classify(response['response']) != 'gemini'
+
+    workers = []
+    if mode != 'chat_only':
+        workers = [threading.Thread(target=batch_worker, args=(i,), daemon=True) for i in range(args.batch_workers)]
+        for worker in workers:
+            worker.start()
+        time.sleep(args.latency * 2)  # let the batch fill the queue first
+
+    def chat_turn(index: int) -> Dict[str, Any]:
+        started = time.perf_counter()
+        response = narad_ai.process_message(f'What is the history of monument number {index}?', f'chat-{index}', {})
+        return {'latency': time.perf_counter() - started, 'outcome': classify(response['response'])}
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.chat_concurrency) as pool:
+        turns = list(pool.map(chat_turn, range(args.requests)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    for worker in workers:
+        worker.join()
+
+    latencies = [turn['latency'] for turn in turns]
+    limiter = narad_ai.upstream_limiter.get_stats()
+    return {
+        'chat_p50_ms': round(percentile(latencies, 50) * 1000, 1),
+        'chat_p95_ms': round(percentile(latencies, 95) * 1000, 1),
+        'chat_p99_ms': round(percentile(latencies, 99) * 1000, 1),
+        'chat_fallback': sum(1 for turn in turns if turn['outcome'] != 'gemini'),
+        'batch_rps': round(batch['turns'] / elapsed, 2),
+        'batch_fallback': batch['fallback'],
+        'max_in_flight': limiter['max_in_flight'],
+        'classes': limiter['classes']
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure chat latency next to a batch job')
+    parser.add_argument('--modes', default=','.join(MODES))
+    parser.add_argument('--requests', type=int, default=120, help='interactive turns per mode')
+    parser.add_argument('--chat-concurrency', type=int, default=4)
+    parser.add_argument('--batch-workers', type=int, default=48)
+    parser.add_argument('--limit', type=int, default=8, help='fixed upstream concurrency limit')
+    parser.add_argument('--latency', type=float, default=0.1, help='mock seconds per call')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.modes.split(',') if name.strip()]
+    unknown = [name for name in names if name not in MODES]
+    if unknown:
+        parser.error(f"unknown modes: {', '.join(unknown)} (choose from {', '.join(MODES)})")
+
+    # Settings are read at import time; a fixed limit keeps the modes comparable
+    os.environ.update({
+        'GEMINI_API_KEY': os.environ.get('GEMINI_API_KEY', 'mock-key'),
+        'GEMINI_WARMUP_ON_START': 'false',
+        'CONTEXT_CACHE_ENABLED': 'false',
+        'CACHE_ENABLED': 'false',
+        'UPSTREAM_ADAPTIVE_CONCURRENCY': 'false',
+        'UPSTREAM_MAX_CONCURRENCY': str(args.limit),
+        'UPSTREAM_MAX_QUEUE': str(args.batch_workers + args.chat_concurrency),
+        'UPSTREAM_ACQUIRE_TIMEOUT': '30',
+        'UPSTREAM_BATCH_TIMEOUT': '30'
+    })
+    logging.basicConfig(level=logging.CRITICAL)
+
+    server, _ = start_mock_server()
+    mock_url = f'http://127.0.0.1:{server.server_port}/v1beta/models'
+
+    results = {}
+    try:
+        for name in names:
+            print(f'Running {name}...', flush=True)
+            results[name] = run_mode(name, server, mock_url, args)
+    finally:
+        server.shutdown()
+
+    columns = ['chat_p50_ms', 'chat_p95_ms', 'chat_p99_ms', 'chat_fallback', 'batch_rps', 'batch_fallback', 'max_in_flight']
+    print(f"\n{'mode':<12}" + ''.join(f'{column:>15}' for column in columns))
+    for name, result in results.items():
+        print(f'{name:<12}' + ''.join(f'{result[column]:>15}' for column in columns))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'config': vars(args), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Hot-path cost and correctness check of the chat rate limiter
+
+Times RateLimiter.check with the in-process backend and with the Redis
+backend (against the local stand-in, or a real server via --redis-url), and
+confirms that two limiters sharing one Redis enforce a single quota the way
+two gunicorn workers would.
+
+Usage (from ai-service/):
+    python benchmarks/bench_rate_limiter.py --checks 20000
+    python benchmarks/bench_rate_limiter.py --redis-url redis://127.0.0.1:6379/0
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from mock_redis_server import start_mock_redis  # noqa: E402
+from src.utils.rate_limiter import RateLimiter, MemoryRateLimitBackend, RedisRateLimitBackend  # noqa: E402
+
+LIMITS = [(60, 60), (1000, 3600)]
+
+
+def time_checks(limiter: RateLimiter, checks: int, clients: int) -> dict:
+    """Per-check latency over `checks` calls spread across `clients` identities"""
+    samples = []
+    for i in range(checks):
+        client = i % clients
+        identities = [f'ip:10.0.{client // 256}.{client % 256}', f'session:bench-{client}']
+        started = time.perf_counter()
+        limiter.check(identities)
+        samples.append(time.perf_counter() - started)
+
+    samples.sort()
+    return {
+        'checks': checks,
+        'mean_us': round(statistics.mean(samples) * 1e6, 1),
+        'p50_us': round(samples[len(samples) // 2] * 1e6, 1),
+        'p99_us': round(samples[int(len(samples) * 0.99) - 1] * 1e6, 1)
+    }
+
+
+def shared_quota(redis_url: str) -> dict:
+    """Two limiters on one Redis admit 60 requests per minute in total, not 60 each"""
+    workers = [RateLimiter(LIMITS, backend=RedisRateLimitBackend(redis_url, timeout=1.0)) for _ in range(2)]
+    identity = [f'ip:shared-{time.time()}']
+    admitted = sum(1 for i in range(100) if workers[i % 2].check(identity)['allowed'])
+    last = workers[0].check(identity)
+    return {'attempts': 101, 'admitted': admitted, 'limit': LIMITS[0][0], 'retry_after': last['retry_after']}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure rate limit check overhead')
+    parser.add_argument('--checks', type=int, default=20000)
+    parser.add_argument('--clients', type=int, default=5000, help='distinct client identities')
+    parser.add_argument('--redis-url', help='real Redis to use instead of the local stand-in')
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    server = None
+    redis_url = args.redis_url
+    if not redis_url:
+        server, _ = start_mock_redis()
+        redis_url = f'redis://127.0.0.1:{server.server_address[1]}/0'
+
+    results = {
+        'memory': time_checks(RateLimiter(LIMITS, backend=MemoryRateLimitBackend()), args.checks, args.clients),
+        'redis': time_checks(RateLimiter(LIMITS, backend=RedisRateLimitBackend(redis_url, timeout=1.0)), args.checks, args.clients),
+        'shared_quota': shared_quota(redis_url)
+    }
+    if server:
+        server.shutdown()
+
+    for name in ('memory', 'redis'):
+        result = results[name]
+        print(f"{name:<8} mean {result['mean_us']:>8} us   p50 {result['p50_us']:>8} us   p99 {result['p99_us']:>8} us")
+    quota = results['shared_quota']
+    print(f"shared quota: {quota['admitted']} of {quota['attempts']} admitted across two limiters (limit {quota['limit']}/min)")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+"""
+Side-by-side benchmark of the sync (gunicorn, app:app) and async
+(uvicorn, app_async:app) serving modes against the local mock Gemini server
+
+Usage (from ai-service/):
+    python benchmarks/bench_serving_modes.py --requests 400 --concurrency 100 --latency 0.5
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from mock_gemini_server import start_mock_server  # noqa: E402
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODES = {
+    'sync': lambda port, workers: [
+        sys.executable, '-m', 'gunicorn', '-w', str(workers), '-b', f'127.0.0.1:{port}', 'app:app'
+    ],
+    'async': lambda port, workers: [
+        sys.executable, '-m', 'uvicorn', 'app_async:app', '--host', '127.0.0.1',
+        '--port', str(port), '--workers', str(workers), '--log-level', 'warning'
+    ]
+}
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def wait_until_healthy(base_url: str, timeout: float = 60.0):
+    """Poll /health until the service answers"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f'{base_url}/health', timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f'{base_url} did not become healthy within {timeout}s')
+
+
+async def drive_load(base_url: str, total: int, concurrency: int) -> Dict[str, float]:
+    """Send `total` chat requests with at most `concurrency` in flight"""
+    latencies = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(limits=limits, timeout=120.0) as client:
+        async def one(i: int):
+            nonlocal errors
+            body = {'message': f'Tell me about Hampi ({i})', 'session_id': f'bench-{i}'}
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    response = await client.post(f'{base_url}/api/ai/chat', json=body)
+                    if response.status_code != 200:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        'requests': total,
+        'errors': errors,
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': round(total / elapsed, 2),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 1),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 1),
+        'mean_ms': round(statistics.mean(latencies) * 1000, 1)
+    }
+
+
+def run_mode(mode: str, args, mock_url: str, port: int) -> Dict[str, float]:
+    """Start one serving mode, load it, then stop it"""
+    env = dict(
+        os.environ,
+        GEMINI_API_KEY='mock-key',
+        GEMINI_API_ENDPOINT=mock_url,
+        LOG_LEVEL='WARNING'
+    )
+    workers = args.sync_workers if mode == 'sync' else args.async_workers
+    process = subprocess.Popen(MODES[mode](port, workers), cwd=SERVICE_DIR, env=env)
+    try:
+        base_url = f'http://127.0.0.1:{port}'
+        wait_until_healthy(base_url)
+        result = asyncio.run(drive_load(base_url, args.requests, args.concurrency))
+        result['workers'] = workers
+        return result
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark sync vs async serving modes')
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--latency', type=float, default=0.5, help='mock Gemini latency in seconds')
+    parser.add_argument('--sync-workers', type=int, default=4)
+    parser.add_argument('--async-workers', type=int, default=1)
+    parser.add_argument('--port', type=int, default=8601)
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    server, _ = start_mock_server(latency=args.latency)
+    mock_url = f'http://127.0.0.1:{server.server_port}/v1beta/models'
+
+    results = {}
+    try:
+        for offset, mode in enumerate(MODES):
+            print(f'Running {mode} mode...', flush=True)
+            results[mode] = run_mode(mode, args, mock_url, args.port + offset)
+    finally:
+        server.shutdown()
+
+    columns = ['workers', 'requests', 'errors', 'elapsed_s', 'throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms', 'mean_ms']
+    print(f"\n{'metric':<16}{'sync':>12}{'async':>12}")
+    for column in columns:
+        print(f"{column:<16}{results['sync'][column]:>12}{results['async'][column]:>12}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'config': vars(args), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
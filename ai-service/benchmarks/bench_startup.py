@@ -0,0 +1,137 @@
+"""
+Cold-start cost of the Flask app: import time and time to ready
+
+Each run imports app.py in a fresh interpreter (as a new gunicorn worker
+would) with `-X importtime`, then waits for the start-up warm-up to mark
+the worker ready. The warm-up talks to the local mock Gemini server, so
+connection-pool and context-cache set-up are included without network
+access.
+
+    import   median and worst `import app` time against the budget
+    ready    median time from the start of the import until /health is ready
+    modules  the slowest top-level imports (cumulative, from -X importtime)
+
+Exits with status 1 when the median import time exceeds --budget or a
+heavy SDK (google.generativeai, torch, transformers, ...) is loaded by the
+import, so it can gate CI.
+
+Usage (from ai-service/):
+    python benchmarks/bench_startup.py --runs 5
+    python benchmarks/bench_startup.py --budget 0.5 --json startup.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Any, Dict, List
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from mock_gemini_server import start_mock_server  # noqa: E402
+
+# Modules that must stay out of the import path (loaded on first use, if ever)
+HEAVY_MODULES = ('google.generativeai', 'torch', 'transformers', 'sentence_transformers', 'httpx', 'numpy', 'pandas')
+
+CHILD = """
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+while not app.startup['ready'] and time.perf_counter() - imported < 60:
+    time.sleep(0.005)
+print(json.dumps({
+    'import_s': imported - started,
+    'ready_s': time.perf_counter() - started,
+    'startup': app.startup,
+    'heavy': [name for name in %r if name in sys.modules]
+}))
+"""
+
+
+def parse_importtime(stderr: str, top: int) -> List[Dict[str, Any]]:
+    """Slowest modules imported directly by app, by cumulative microseconds"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Two spaces of indent per nesting level; depth 1 is imported by app itself
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        if depth == 1:
+            modules.append({'module': name.strip(), 'ms': round(int(cumulative) / 1000, 1)})
+    return sorted(modules, key=lambda entry: entry['ms'], reverse=True)[:top]
+
+
+def run_once(env: Dict[str, str], top: int) -> Dict[str, Any]:
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', CHILD % (HEAVY_MODULES,)],
+        cwd=SERVICE_DIR, env=env, capture_output=True, text=True, timeout=120
+    )
+    lines = [line for line in completed.stdout.splitlines() if line.startswith('{')]
+    if completed.returncode != 0 or not lines:
+        raise RuntimeError(f'app import failed:\n{completed.stderr[-2000:]}')
+    result = json.loads(lines[-1])
+    result['modules'] = parse_importtime(completed.stderr, top)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure app import time and time to ready')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget', type=float, default=1.0, help='median import budget in seconds')
+    parser.add_argument('--latency', type=float, default=0.05, help='mock Gemini latency in seconds')
+    parser.add_argument('--top', type=int, default=10, help='slowest imports to list')
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    server, _ = start_mock_server(latency=args.latency)
+    env = dict(
+        os.environ,
+        PYTHONPATH=SERVICE_DIR,
+        GEMINI_API_KEY=os.getenv('GEMINI_API_KEY', 'bench-key'),
+        GEMINI_API_ENDPOINT=f'http://127.0.0.1:{server.server_port}/v1beta/models',
+        STARTUP_WARMUP='true',
+        STARTUP_IMPORT_BUDGET=str(args.budget),
+        CACHE_WARMUP_ENABLED='false',
+        LOG_LEVEL='WARNING'
+    )
+
+    runs = []
+    for index in range(args.runs):
+        print(f'Run {index + 1}/{args.runs}...', flush=True)
+        runs.append(run_once(env, args.top))
+    server.shutdown()
+
+    import_times = [run['import_s'] for run in runs]
+    results = {
+        'import_median_s': round(statistics.median(import_times), 3),
+        'import_max_s': round(max(import_times), 3),
+        'ready_median_s': round(statistics.median(run['ready_s'] for run in runs), 3),
+        'warmup': runs[-1]['startup']['warmup'],
+        'heavy_modules': sorted({name for run in runs for name in run['heavy']}),
+        'modules': runs[-1]['modules'],
+        'budget_s': args.budget
+    }
+    results['within_budget'] = results['import_median_s'] <= args.budget and not results['heavy_modules']
+
+    print(f"\nimport  median {results['import_median_s']}s  max {results['import_max_s']}s  (budget {args.budget}s)")
+    print(f"ready   median {results['ready_median_s']}s  warm-up steps {results['warmup']}")
+    print(f"heavy modules loaded: {', '.join(results['heavy_modules']) or 'none'}")
+    print(f"\n{'module':<40}{'cumulative ms':>15}")
+    for entry in results['modules']:
+        print(f"{entry['module']:<40}{entry['ms']:>15}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'config': vars(args), 'results': results, 'runs': runs}, f, indent=2)
+
+    if not results['within_budget']:
+        print('\nFAIL: import is over budget or loads a heavy SDK')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
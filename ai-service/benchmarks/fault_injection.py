@@ -0,0 +1,192 @@
+"""
+Fault-injection harness for the chat pipeline
+
+Runs NaradAI in process against the local mock Gemini server under a set of
+latency and failure scenarios (tails, 5xx errors, 429 bursts and quotas, hung
+calls, outages, slow and aborted streams) and reports latency percentiles,
+how turns were answered (Gemini, local fallback, error) and what the mock saw.
+Each scenario gets a fresh NaradAI, so breaker and hedging state do not leak
+between scenarios; the seed makes runs repeatable.
+
+Usage (from ai-service/):
+    python benchmarks/fault_injection.py --requests 200 --concurrency 16
+    python benchmarks/fault_injection.py --scenarios burst_429,outage --json faults.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_DIR)
+from mock_gemini_server import CANNED_ANSWER, start_mock_server  # noqa: E402
+
+# Each scenario: mock behavior overrides and whether turns are streamed
+SCENARIOS = {
+    'baseline': {'behavior': {'latency': 0.2}},
+    'lognormal_tail': {'behavior': {'latency': 0.2, 'latency_distribution': 'lognormal', 'latency_jitter': 0.8}},
+    'bimodal_tail': {'behavior': {'latency': 0.2, 'slow_ratio': 0.05, 'slow_latency': 3.0}},
+    'errors_10pct': {'behavior': {'latency': 0.2, 'error_rate': 0.1}},
+    'burst_429': {'behavior': {'latency': 0.2, 'burst_every': 4.0, 'burst_duration': 1.0}},
+    'quota_429': {'behavior': {'latency': 0.2, 'rpm_limit': 60}},
+    'hangs': {'behavior': {'latency': 0.2, 'hang_rate': 0.05, 'hang_duration': 30.0}},
+    'outage': {'behavior': {'latency': 0.05, 'error_rate': 1.0, 'error_codes': [503]}},
+    'capacity_429': {'behavior': {'latency': 0.2, 'max_concurrency': 4}},
+    'load_latency': {'behavior': {'latency': 0.1, 'load_latency': 0.05}},
+    'stream': {'behavior': {'latency': 0.2, 'chunk_interval': 0.05}, 'stream': True},
+    'stream_aborts': {'behavior': {'latency': 0.2, 'chunk_interval': 0.05, 'stream_abort_rate': 0.2}, 'stream': True}
+}
+
+GEMINI_PREFIX = CANNED_ANSWER[:24]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def classify(response: str) -> str:
+    """How a turn was answered"""
+    if response.startswith(GEMINI_PREFIX):
+        return 'gemini'
+    if response.startswith('I apologize') or response.startswith('⚠️'):
+        return 'error'
+    return 'fallback'
+
+
+def run_turn(narad_ai, index: int, stream: bool) -> Dict[str, Any]:
+    """Send one distinct message and time it"""
+    message = f'What is the history of monument number {index}?'
+    session_id = f'fault-{index}'
+    started = time.perf_counter()
+    first_chunk = None
+
+    if stream:
+        chunks = []
+        for event in narad_ai.process_message_stream(message, session_id, {}):
+            if event['event'] == 'chunk':
+                if first_chunk is None:
+                    first_chunk = time.perf_counter() - started
+                chunks.append(event['data']['text'])
+            elif event['event'] == 'error':
+                chunks = [event['data']['response']]
+        response = ''.join(chunks)
+    else:
+        response = narad_ai.process_message(message, session_id, {})['response']
+
+    return {
+        'latency': time.perf_counter() - started,
+        'first_chunk': first_chunk,
+        'outcome': classify(response)
+    }
+
+
+def run_scenario(name: str, scenario: Dict[str, Any], server, mock_url: str, args) -> Dict[str, Any]:
+    """Apply a scenario to the mock, drive load through a fresh NaradAI and summarize"""
+    from src.services.narad_ai import NaradAI
+    from src.services.llm_providers import build_llm_gateway
+
+    server.behavior.reset(**dict(scenario['behavior'], seed=args.seed))
+    server.reset()
+
+    # A private gateway, so the breaker and limiter start closed and empty
+    narad_ai = NaradAI(llm_gateway=build_llm_gateway())
+    narad_ai.set_api_endpoint(mock_url)
+    stream = scenario.get('stream', False)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        turns = list(pool.map(lambda i: run_turn(narad_ai, i, stream), range(args.requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies = [turn['latency'] for turn in turns]
+    outcomes = {key: 0 for key in ('gemini', 'fallback', 'error')}
+    for turn in turns:
+        outcomes[turn['outcome']] += 1
+
+    pipeline = narad_ai.get_performance_stats()
+    mock_stats = server.get_stats()
+    result = {
+        'requests': args.requests,
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': round(args.requests / elapsed, 2),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 1),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 1),
+        'mean_ms': round(statistics.mean(latencies) * 1000, 1),
+        'gemini': outcomes['gemini'],
+        'fallback': outcomes['fallback'],
+        'error': outcomes['error'],
+        'upstream_calls': sum(mock_stats['requests'].values()),
+        'injected': sum(mock_stats['injected'].values()),
+        'retries': pipeline['retries']['retries'],
+        'breaker_opened': pipeline['circuit_breaker']['opened'],
+        'limit_min': pipeline['adaptive_limit']['min_limit_seen'],
+        'limit_end': pipeline['adaptive_limit']['limit'],
+        'details': {'mock': mock_stats['injected'], 'responses': mock_stats['responses']}
+    }
+    first_chunks = [turn['first_chunk'] for turn in turns if turn['first_chunk'] is not None]
+    if first_chunks:
+        result['ttfb_p50_ms'] = round(percentile(first_chunks, 50) * 1000, 1)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Exercise the chat pipeline under injected upstream faults')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='comma-separated scenario names')
+    parser.add_argument('--requests', type=int, default=100, help='turns per scenario')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--read-timeout', type=float, default=2.0, help='Gemini read timeout (hung calls hit it)')
+    parser.add_argument('--upstream-timeout', type=float, default=5.0, help='deadline across retries')
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)} (choose from {', '.join(SCENARIOS)})")
+
+    # Settings are read at import time, so configure the service first
+    os.environ.update({
+        'GEMINI_API_KEY': os.environ.get('GEMINI_API_KEY', 'mock-key'),
+        'GEMINI_READ_TIMEOUT': str(args.read_timeout),
+        'UPSTREAM_TIMEOUT': str(args.upstream_timeout),
+        'GEMINI_WARMUP_ON_START': 'false',
+        'CONTEXT_CACHE_ENABLED': 'false',
+        'CACHE_ENABLED': 'false'
+    })
+    logging.basicConfig(level=logging.CRITICAL)
+
+    server, _ = start_mock_server()
+    mock_url = f'http://127.0.0.1:{server.server_port}/v1beta/models'
+
+    results = {}
+    try:
+        for name in names:
+            print(f'Running {name}...', flush=True)
+            results[name] = run_scenario(name, SCENARIOS[name], server, mock_url, args)
+    finally:
+        server.shutdown()
+
+    columns = ['p50_ms', 'p95_ms', 'p99_ms', 'throughput_rps', 'gemini', 'fallback', 'error', 'upstream_calls', 'injected', 'retries', 'breaker_opened', 'limit_min', 'limit_end']
+    print(f"\n{'scenario':<16}" + ''.join(f'{column:>15}' for column in columns))
+    for name, result in results.items():
+        print(f'{name:<16}' + ''.join(f'{result[column]:>15}' for column in columns))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'config': vars(args), 'scenarios': {name: SCENARIOS[name] for name in names}, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
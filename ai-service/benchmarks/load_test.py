@@ -0,0 +1,402 @@
+"""
+End-to-end load test built from Narad_AI_Postman_Collection.json
+
+Replays the collection's requests against the service, by default a server
+started here (gunicorn app:app, or uvicorn app_async:app) backed by the
+local mock Gemini server, so runs need no network access or quota.
+
+Requests are parameterized rather than replayed verbatim:
+
+    messages     --unique-ratio of the chat messages get a variant suffix, so
+                 they miss the response cache like new user questions do
+    languages    context.preferences.language is drawn from --languages
+    sessions     --concurrency virtual users each keep a session for
+                 --session-turns turns, then start a new one (session churn)
+
+The collection's {{base_url}}/api/chat is served at /api/ai/chat by this
+service (see --path-map). Each request's weight is 1 unless --weights says
+otherwise, e.g. "Health Check=0.1".
+
+Every --sample-interval seconds the tool records throughput, p50/p95/p99
+latency and error rate for the window, plus RSS/PSS of each worker
+(Linux, server started here or --server-pid given). The summary covers the
+whole run and each collection request; --json writes everything, and
+--baseline prints the change against an earlier --json file.
+
+Usage (from ai-service/):
+    python benchmarks/load_test.py --duration 60 --concurrency 32
+    python benchmarks/load_test.py --serve async --latency 0.8 --json release.json
+    python benchmarks/load_test.py --baseline previous.json --json current.json
+    python benchmarks/load_test.py --url http://127.0.0.1:8000 --server-pid 1234
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+COLLECTION = os.path.join(os.path.dirname(SERVICE_DIR), 'Narad_AI_Postman_Collection.json')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from mock_gemini_server import start_mock_server  # noqa: E402
+from bench_preload import child_pids, read_memory  # noqa: E402
+
+SERVE_COMMANDS = {
+    'sync': lambda port, workers: [
+        sys.executable, '-m', 'gunicorn', '-w', str(workers), '-b', f'127.0.0.1:{port}', 'app:app'
+    ],
+    'async': lambda port, workers: [
+        sys.executable, '-m', 'uvicorn', 'app_async:app', '--host', '127.0.0.1',
+        '--port', str(port), '--workers', str(workers), '--log-level', 'warning'
+    ]
+}
+
+# Summary metrics compared by --baseline; True where higher is better
+COMPARED = {'throughput_rps': True, 'p50_ms': False, 'p95_ms': False, 'p99_ms': False, 'error_rate': False}
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile (0 for an empty list)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def latency_summary(latencies: List[float], errors: int, elapsed: float) -> Dict[str, float]:
+    requests = len(latencies)
+    return {
+        'requests': requests,
+        'errors': errors,
+        'error_rate': round(errors / requests, 4) if requests else 0.0,
+        'throughput_rps': round(requests / elapsed, 2) if elapsed > 0 else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 1),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 1)
+    }
+
+
+def load_collection(path: str, path_map: Dict[str, str], weights: Dict[str, float]) -> List[Dict[str, Any]]:
+    """Flatten the Postman collection into request templates"""
+    with open(path) as f:
+        collection = json.load(f)
+
+    templates = []
+
+    def walk(items):
+        for item in items:
+            if 'item' in item:
+                walk(item['item'])
+                continue
+            request = item['request']
+            url = request['url'] if isinstance(request['url'], str) else request['url'].get('raw', '')
+            path = url.replace('{{base_url}}', '') or '/'
+            raw = (request.get('body') or {}).get('raw')
+            templates.append({
+                'name': item['name'],
+                'method': request['method'],
+                'path': path_map.get(path, path),
+                'body': json.loads(raw) if raw else None,
+                'weight': weights.get(item['name'], 1.0)
+            })
+
+    walk(collection['item'])
+    return [template for template in templates if template['weight'] > 0]
+
+
+def parse_mapping(spec: str, convert=str) -> Dict[str, Any]:
+    """'a=b,c=d' -> {'a': 'b', 'c': 'd'}"""
+    mapping = {}
+    for part in filter(None, (part.strip() for part in spec.split(','))):
+        key, _, value = part.partition('=')
+        mapping[key.strip()] = convert(value.strip())
+    return mapping
+
+
+class VirtualUser:
+    """One client: picks requests from the collection and churns its session every session_turns turns"""
+
+    def __init__(self, index: int, templates: List[Dict[str, Any]], args, rng: random.Random):
+        self.index = index
+        self.templates = templates
+        self.weights = [template['weight'] for template in templates]
+        self.args = args
+        self.rng = rng
+        self.sessions = 0
+        self.turns = 0
+        self._new_session()
+
+    def _new_session(self):
+        self.sessions += 1
+        self.session_id = f'load-{self.index}-{self.sessions}'
+        self.turns = 0
+
+    def next_request(self) -> Dict[str, Any]:
+        template = self.rng.choices(self.templates, self.weights)[0]
+        body = json.loads(json.dumps(template['body'])) if template['body'] is not None else None
+        if isinstance(body, dict) and 'message' in body:
+            if self.turns >= self.args.session_turns:
+                self._new_session()
+            self.turns += 1
+            body['session_id'] = self.session_id
+            if self.rng.random() < self.args.unique_ratio:
+                body['message'] = f"{body['message']} (variant {self.rng.randrange(1_000_000)})"
+            language = self.rng.choice(self.args.languages)
+            body.setdefault('context', {}).setdefault('preferences', {})['language'] = language
+        return {'name': template['name'], 'method': template['method'], 'path': template['path'], 'body': body}
+
+
+class Recorder:
+    """Latencies and errors, for the whole run, per window and per collection request"""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.errors = 0
+        self.status_codes: Dict[str, int] = {}
+        self.by_name: Dict[str, Dict[str, Any]] = {}
+        self.window: List[float] = []
+        self.window_errors = 0
+
+    def record(self, name: str, latency: float, status: Optional[int]):
+        ok = status is not None and status < 400
+        key = str(status) if status is not None else 'connection_error'
+        self.status_codes[key] = self.status_codes.get(key, 0) + 1
+        entry = self.by_name.setdefault(name, {'latencies': [], 'errors': 0})
+        for latencies in (self.latencies, self.window, entry['latencies']):
+            latencies.append(latency)
+        if not ok:
+            self.errors += 1
+            self.window_errors += 1
+            entry['errors'] += 1
+
+    def take_window(self, elapsed: float) -> Dict[str, float]:
+        summary = latency_summary(self.window, self.window_errors, elapsed)
+        self.window = []
+        self.window_errors = 0
+        return summary
+
+
+def worker_memory(server_pid: Optional[int]) -> Dict[str, Dict[str, float]]:
+    """Memory of each worker of the server (keyed by pid; empty when unavailable)"""
+    if not server_pid or not os.path.exists('/proc/self/smaps_rollup'):
+        return {}
+    memory = {}
+    # A single-process server (uvicorn --workers 1) is its own worker
+    for pid in child_pids(server_pid) or [server_pid]:
+        try:
+            memory[str(pid)] = read_memory(pid)
+        except OSError:
+            continue
+    return memory
+
+
+async def run_load(base_url: str, templates: List[Dict[str, Any]], args, server_pid: Optional[int]) -> Dict[str, Any]:
+    recorder = Recorder()
+    timeline = []
+    rng = random.Random(args.seed)
+    users = [VirtualUser(index, templates, args, random.Random(rng.random())) for index in range(args.concurrency)]
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    started = time.perf_counter()
+    stop_at = started + args.duration
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+        async def user_loop(user: VirtualUser):
+            while time.perf_counter() < stop_at:
+                request = user.next_request()
+                sent = time.perf_counter()
+                try:
+                    response = await client.request(request['method'], request['path'], json=request['body'])
+                    status = response.status_code
+                except httpx.HTTPError:
+                    status = None
+                recorder.record(request['name'], time.perf_counter() - sent, status)
+                if args.think_time:
+                    await asyncio.sleep(rng.expovariate(1 / args.think_time))
+
+        async def sampler():
+            window_started = started
+            while True:
+                await asyncio.sleep(max(0.0, min(args.sample_interval, stop_at - time.perf_counter())))
+                now = time.perf_counter()
+                sample = recorder.take_window(now - window_started)
+                sample['t_s'] = round(now - started, 2)
+                sample['workers'] = worker_memory(server_pid)
+                timeline.append(sample)
+                window_started = now
+                if now >= stop_at:
+                    return
+
+        await asyncio.gather(sampler(), *(user_loop(user) for user in users))
+        elapsed = time.perf_counter() - started
+
+    summary = latency_summary(recorder.latencies, recorder.errors, elapsed)
+    summary['elapsed_s'] = round(elapsed, 2)
+    summary['sessions'] = sum(user.sessions for user in users)
+    summary['status_codes'] = recorder.status_codes
+    return {
+        'summary': summary,
+        'requests': {
+            name: latency_summary(entry['latencies'], entry['errors'], elapsed)
+            for name, entry in sorted(recorder.by_name.items())
+        },
+        'timeline': timeline,
+        'memory_growth': memory_growth(timeline)
+    }
+
+
+def memory_growth(timeline: List[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """Per worker: RSS/PSS at its first and last sample, and the growth rate"""
+    seen: Dict[str, List] = {}
+    for sample in timeline:
+        for pid, memory in sample['workers'].items():
+            seen.setdefault(pid, []).append((sample['t_s'], memory))
+    growth = {}
+    for pid, samples in seen.items():
+        (first_t, first), (last_t, last) = samples[0], samples[-1]
+        minutes = (last_t - first_t) / 60
+        growth[pid] = {
+            'rss_start_mb': first['rss_mb'],
+            'rss_end_mb': last['rss_mb'],
+            'pss_start_mb': first['pss_mb'],
+            'pss_end_mb': last['pss_mb'],
+            'rss_growth_mb_per_min': round((last['rss_mb'] - first['rss_mb']) / minutes, 2) if minutes else 0.0
+        }
+    return growth
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_healthy(base_url: str, timeout: float = 60.0):
+    """Poll /health until the service answers 200 (it answers 503 while warming up)"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f'{base_url}/health', timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f'{base_url} did not become healthy within {timeout}s')
+
+
+def print_report(result: Dict[str, Any], baseline: Optional[Dict[str, Any]]):
+    summary = result['summary']
+    print(f"\n{summary['requests']} requests in {summary['elapsed_s']}s over {summary['sessions']} sessions")
+    print(f"status codes: {summary['status_codes']}")
+
+    columns = ['requests', 'error_rate', 'throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms']
+    print(f"\n{'request':<40}" + ''.join(f'{column:>15}' for column in columns))
+    for name, stats in list(result['requests'].items()) + [('TOTAL', summary)]:
+        print(f'{name[:39]:<40}' + ''.join(f'{stats[column]:>15}' for column in columns))
+
+    if result['timeline']:
+        print(f"\n{'t_s':>8}{'rps':>10}{'p95_ms':>10}{'p99_ms':>10}{'errors':>8}   worker rss_mb")
+        for sample in result['timeline']:
+            rss = ' '.join(f"{memory['rss_mb']:.1f}" for memory in sample['workers'].values())
+            print(f"{sample['t_s']:>8}{sample['throughput_rps']:>10}{sample['p95_ms']:>10}{sample['p99_ms']:>10}{sample['errors']:>8}   {rss}")
+
+    if result['memory_growth']:
+        print(f"\n{'worker':<10}{'rss_start_mb':>14}{'rss_end_mb':>12}{'pss_end_mb':>12}{'mb_per_min':>12}")
+        for pid, growth in result['memory_growth'].items():
+            print(f"{pid:<10}{growth['rss_start_mb']:>14}{growth['rss_end_mb']:>12}{growth['pss_end_mb']:>12}{growth['rss_growth_mb_per_min']:>12}")
+
+    if baseline:
+        print(f"\n{'vs baseline':<16}{'before':>12}{'after':>12}{'change':>10}")
+        for metric, higher_is_better in COMPARED.items():
+            before, after = baseline['summary'][metric], summary[metric]
+            change = f'{(after - before) / before * 100:+.1f}%' if before else 'n/a'
+            verdict = '' if after == before else 'better' if (after > before) == higher_is_better else 'worse'
+            print(f'{metric:<16}{before:>12}{after:>12}{change:>10}  {verdict}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay the Postman collection as a load test')
+    parser.add_argument('--collection', default=COLLECTION)
+    parser.add_argument('--url', help='test a running service instead of starting one')
+    parser.add_argument('--server-pid', type=int, help='master pid of --url, for per-worker memory')
+    parser.add_argument('--serve', choices=sorted(SERVE_COMMANDS), default='sync')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=30, help='seconds of load')
+    parser.add_argument('--concurrency', type=int, default=16, help='virtual users')
+    parser.add_argument('--think-time', type=float, default=0.0, help='mean seconds between a user\'s requests')
+    parser.add_argument('--session-turns', type=int, default=5, help='turns before a user starts a new session')
+    parser.add_argument('--unique-ratio', type=float, default=0.5, help='share of messages made unique')
+    parser.add_argument('--languages', default='en,hi,ta,bn', help='comma-separated preference languages')
+    parser.add_argument('--weights', default='', help='per-request weights, e.g. "Health Check=0.1"')
+    parser.add_argument('--path-map', default='/api/chat=/api/ai/chat')
+    parser.add_argument('--timeout', type=float, default=60)
+    parser.add_argument('--sample-interval', type=float, default=5)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--latency', type=float, default=0.5, help='mock Gemini latency in seconds')
+    parser.add_argument('--latency-distribution', default='lognormal')
+    parser.add_argument('--latency-jitter', type=float, default=0.3)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='mock Gemini injected error share')
+    parser.add_argument('--baseline', help='earlier --json output to compare against')
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+    args.languages = [language.strip() for language in args.languages.split(',') if language.strip()]
+
+    templates = load_collection(args.collection, parse_mapping(args.path_map), parse_mapping(args.weights, float))
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    mock = process = None
+    server_pid = args.server_pid
+    base_url = args.url
+    try:
+        if not base_url:
+            mock, _ = start_mock_server(
+                latency=args.latency,
+                latency_distribution=args.latency_distribution,
+                latency_jitter=args.latency_jitter,
+                error_rate=args.error_rate,
+                seed=args.seed
+            )
+            port = free_port()
+            env = dict(
+                os.environ,
+                GEMINI_API_KEY=os.getenv('GEMINI_API_KEY', 'load-test-key'),
+                GEMINI_API_ENDPOINT=f'http://127.0.0.1:{mock.server_port}/v1beta/models',
+                RATE_LIMIT_ENABLED='false',
+                CACHE_WARMUP_ENABLED='false',
+                LOG_LEVEL='WARNING'
+            )
+            process = subprocess.Popen(SERVE_COMMANDS[args.serve](port, args.workers), cwd=SERVICE_DIR, env=env)
+            server_pid = process.pid
+            base_url = f'http://127.0.0.1:{port}'
+            wait_until_healthy(base_url)
+
+        print(f'Replaying {len(templates)} requests from {os.path.basename(args.collection)} '
+              f'against {base_url} for {args.duration}s with {args.concurrency} users...', flush=True)
+        result = asyncio.run(run_load(base_url, templates, args, server_pid))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+        if mock is not None:
+            mock.shutdown()
+
+    print_report(result, baseline)
+    if args.json:
+        config = dict(vars(args), target=base_url)
+        with open(args.json, 'w') as f:
+            json.dump(dict(result, config=config), f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,596 @@
+"""
+Local stand-in for the Gemini REST API
+
+Answers models/{model}:generateContent and :streamGenerateContent so the chat
+pipeline can be load-tested without network access or quota. A MockBehavior
+profile controls the latency distribution, injected 5xx errors, 429 bursts
+and per-minute quotas, hung requests, streaming chunk cadence and aborted
+streams; the same profile and a fixed seed give repeatable runs.
+cachedContents can be created, extended, deleted and referenced from
+generate calls. OpenAI-style /v1/chat/completions is answered with the same
+profile, so a second instance can stand in for the failover provider
+(OPENAI_API_BASE=http://127.0.0.1:8766/v1).
+
+Point Narad AI at it with:
+
+    GEMINI_API_ENDPOINT=http://127.0.0.1:8765/v1beta/models
+
+or, in process, NaradAI.set_api_endpoint(url). While running, the profile can
+be changed and counters read over HTTP:
+
+    GET  /mock/stats     counters (requests, injected faults, in flight)
+    POST /mock/config    JSON body of MockBehavior fields to change
+    POST /mock/reset     zero the counters and drop cached contents
+"""
+
+import argparse
+import json
+import math
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+
+CANNED_ANSWER = (
+    "Namaste! Here is a short overview:\n"
+    "- The monument reflects centuries of Indian craftsmanship.\n"
+    "- It is associated with rich legends (किंवदंतियाँ) and local traditions.\n"
+    "- Visit early morning for the best light and fewer crowds."
+)
+
+ERROR_BODIES = {
+    429: ('RESOURCE_EXHAUSTED', 'Resource has been exhausted (e.g. check quota).'),
+    500: ('INTERNAL', 'An internal error has occurred. Please retry or report in https://developers.generativeai.google/guide/troubleshooting'),
+    503: ('UNAVAILABLE', 'The model is overloaded. Please try again later.'),
+    504: ('DEADLINE_EXCEEDED', 'Deadline expired before operation could complete.')
+}
+
+
+class MockBehavior:
+    """
+    Latency and fault profile for the mock server.
+
+    Latency (seconds before the first byte) is drawn from
+    `latency_distribution` around `latency`:
+
+        fixed        always `latency`
+        uniform      latency +/- latency_jitter
+        normal       mean latency, standard deviation latency_jitter
+        lognormal    median latency, sigma latency_jitter (heavy right tail)
+        exponential  mean latency
+
+    A `slow_ratio` share of requests instead takes `slow_latency`, for
+    bimodal tails, and `model_latency` scales latency per model (keys match
+    model name substrings, e.g. {"flash": 0.4}).
+    """
+
+    DEFAULTS = {
+        'latency': 0.5,
+        'latency_distribution': 'fixed',
+        'latency_jitter': 0.0,
+        'slow_ratio': 0.0,
+        'slow_latency': 5.0,
+        'model_latency': {},
+        'error_rate': 0.0,           # share of generate calls answered with an error
+        'error_codes': [500, 503],   # picked uniformly for injected errors
+        'burst_every': 0.0,          # seconds between 429 bursts (0 disables)
+        'burst_duration': 0.0,       # seconds each 429 burst lasts
+        'rpm_limit': 0,              # requests per minute before 429s (0 disables)
+        'max_concurrency': 0,        # generate calls in flight before 429s (0 disables)
+        'load_latency': 0.0,         # extra seconds per call already in flight (queueing upstream)
+        'retry_after': 1,            # Retry-After header on 429s, in seconds
+        'hang_rate': 0.0,            # share of calls that stall before answering
+        'hang_duration': 60.0,       # seconds a stalled call waits
+        'chunk_words': 8,            # words per streamed chunk
+        'chunk_interval': 0.05,      # seconds between streamed chunks
+        'stream_abort_rate': 0.0,    # share of streams cut off midway
+        'answer_words': 0,           # answer length (0 keeps CANNED_ANSWER)
+        'cache_min_tokens': 0,       # smallest cacheable system instruction
+        'seed': None
+    }
+
+    DISTRIBUTIONS = ('fixed', 'uniform', 'normal', 'lognormal', 'exponential')
+
+    def __init__(self, **overrides):
+        """
+        Args:
+            **overrides: Any DEFAULTS key
+        """
+        for key, value in self.DEFAULTS.items():
+            setattr(self, key, value.copy() if isinstance(value, (dict, list)) else value)
+        self.started = time.monotonic()
+        self.random = random.Random()
+        self.update(**overrides)
+
+    def update(self, **changes):
+        """Change profile fields; unknown fields raise ValueError"""
+        unknown = set(changes) - set(self.DEFAULTS)
+        if unknown:
+            raise ValueError(f"Unknown mock behavior fields: {', '.join(sorted(unknown))}")
+        if changes.get('latency_distribution', self.latency_distribution) not in self.DISTRIBUTIONS:
+            raise ValueError(f"latency_distribution must be one of {', '.join(self.DISTRIBUTIONS)}")
+        for key, value in changes.items():
+            setattr(self, key, value)
+        if 'seed' in changes:
+            self.random.seed(self.seed)
+        if 'burst_every' in changes or 'burst_duration' in changes:
+            self.started = time.monotonic()
+
+    def reset(self, **overrides):
+        """Return every field to its default, then apply overrides"""
+        defaults = {key: value.copy() if isinstance(value, (dict, list)) else value for key, value in self.DEFAULTS.items()}
+        self.update(**dict(defaults, **overrides))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: getattr(self, key) for key in self.DEFAULTS}
+
+    def chance(self, rate: float) -> bool:
+        return rate > 0 and self.random.random() < rate
+
+    def sample_latency(self, model: str = '') -> float:
+        """Draw the delay before a response starts"""
+        if self.chance(self.slow_ratio):
+            delay = self.slow_latency
+        else:
+            kind, base, jitter = self.latency_distribution, self.latency, self.latency_jitter
+            if kind == 'uniform':
+                delay = self.random.uniform(base - jitter, base + jitter)
+            elif kind == 'normal':
+                delay = self.random.gauss(base, jitter)
+            elif kind == 'lognormal':
+                delay = self.random.lognormvariate(math.log(base), jitter) if base > 0 else 0.0
+            elif kind == 'exponential':
+                delay = self.random.expovariate(1 / base) if base > 0 else 0.0
+            else:
+                delay = base
+
+        for pattern, scale in self.model_latency.items():
+            if pattern in model:
+                delay *= scale
+                break
+        return max(0.0, delay)
+
+    def in_burst(self) -> bool:
+        """Whether a 429 burst is running (bursts close each burst_every cycle)"""
+        if self.burst_every <= 0 or self.burst_duration <= 0:
+            return False
+        return (time.monotonic() - self.started) % self.burst_every >= self.burst_every - self.burst_duration
+
+
+class MockGeminiHandler(BaseHTTPRequestHandler):
+    """Request handler emulating the generateContent REST surface"""
+
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real endpoint
+
+    def log_message(self, format, *args):
+        """Silence per-request access logs"""
+
+    def _send_json(self, status: int, body: dict, headers: Optional[Dict[str, str]] = None):
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+        self.server.count('responses', str(status))
+
+    def _send_error(self, status: int, headers: Optional[Dict[str, str]] = None):
+        state, message = ERROR_BODIES.get(status, ('UNKNOWN', 'Injected error'))
+        self._send_json(status, {'error': {'code': status, 'message': message, 'status': state}}, headers)
+
+    def _not_found(self, message: str):
+        self._send_json(404, {'error': {'code': 404, 'message': message, 'status': 'NOT_FOUND'}})
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+        try:
+            return json.loads(raw) if raw else {}
+        except ValueError:
+            return {}
+
+    def do_GET(self):
+        path = self.path.split('?', 1)[0]
+        if path == '/mock/stats':
+            self._send_json(200, self.server.get_stats())
+            return
+        self._send_json(200, {'models': [{
+            'name': 'models/mock-gemini',
+            'displayName': 'Mock Gemini',
+            'description': 'Local benchmark stand-in',
+            'supportedGenerationMethods': ['generateContent', 'streamGenerateContent']
+        }]})
+
+    def do_POST(self):
+        body = self._read_json()
+        path = self.path.split('?', 1)[0]
+
+        if path == '/mock/config':
+            try:
+                self.server.behavior.update(**body)
+            except (TypeError, ValueError) as e:
+                self._send_json(400, {'error': str(e)})
+                return
+            self._send_json(200, self.server.behavior.to_dict())
+            return
+        if path == '/mock/reset':
+            self.server.reset()
+            self._send_json(200, {'status': 'reset'})
+            return
+        if path.endswith('/cachedContents'):
+            self._create_cached_content(body)
+            return
+
+        if path.endswith(':generateContent'):
+            method = 'generateContent'
+        elif path.endswith(':streamGenerateContent'):
+            method = 'streamGenerateContent'
+        elif path.endswith('/chat/completions'):
+            method = 'chatCompletions'
+        else:
+            self._not_found(f'Unknown method {path}')
+            return
+
+        model = body.get('model', 'mock-gpt') if method == 'chatCompletions' else path.rsplit('/', 1)[-1].split(':', 1)[0]
+        self.server.count('requests', method)
+        self.server.count('models', model)
+        with self.server.track_in_flight():
+            self._generate(method, model, body)
+
+    def _generate(self, method: str, model: str, body: dict):
+        """Apply the behavior profile, then answer a generate call"""
+        behavior = self.server.behavior
+
+        if behavior.in_burst():
+            self.server.count('injected', 'burst_429')
+            self._send_error(429, {'Retry-After': str(behavior.retry_after)})
+            return
+        if self.server.over_quota():
+            self.server.count('injected', 'quota_429')
+            self._send_error(429, {'Retry-After': str(behavior.retry_after)})
+            return
+        in_flight = self.server.stats['in_flight']
+        if behavior.max_concurrency and in_flight > behavior.max_concurrency:
+            self.server.count('injected', 'concurrency_429')
+            self._send_error(429, {'Retry-After': str(behavior.retry_after)})
+            return
+
+        if behavior.chance(behavior.hang_rate):
+            self.server.count('injected', 'hangs')
+            time.sleep(behavior.hang_duration)
+
+        time.sleep(behavior.sample_latency(model) + behavior.load_latency * max(0, in_flight - 1))
+
+        if behavior.chance(behavior.error_rate):
+            self.server.count('injected', 'errors')
+            self._send_error(behavior.random.choice(behavior.error_codes))
+            return
+
+        usage = _usage(body)
+        cached_name = body.get('cachedContent')
+        if cached_name:
+            entry = self.server.cached_contents.get(cached_name)
+            if entry is None or entry['expires_at'] < time.time():
+                self._not_found(f'CachedContent not found (or expired): {cached_name}')
+                return
+            usage['cachedContentTokenCount'] = entry['token_count']
+            usage['promptTokenCount'] += entry['token_count']
+
+        answer = self._answer(body)
+        if method == 'chatCompletions':
+            self._send_json(200, {
+                'id': f'chatcmpl-{uuid.uuid4().hex[:12]}',
+                'object': 'chat.completion',
+                'model': model,
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': answer}, 'finish_reason': 'stop'}],
+                'usage': {
+                    'prompt_tokens': usage['promptTokenCount'],
+                    'completion_tokens': usage['candidatesTokenCount'],
+                    'total_tokens': usage['totalTokenCount']
+                }
+            })
+        elif method == 'generateContent':
+            self._send_json(200, dict(_candidate(answer), usageMetadata=usage))
+        else:
+            self._send_stream(answer, usage)
+
+    def _answer(self, body: dict) -> str:
+        """Answer text, sized by answer_words and capped by maxOutputTokens"""
+        behavior = self.server.behavior
+        words = CANNED_ANSWER.split(' ')
+        if behavior.answer_words:
+            words = (words * (behavior.answer_words // len(words) + 1))[:behavior.answer_words]
+
+        max_tokens = body.get('generationConfig', {}).get('maxOutputTokens') or body.get('max_tokens')
+        if max_tokens:
+            # About three words per four tokens
+            words = words[:max(1, int(max_tokens * 0.75))]
+        return ' '.join(words)
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_stream(self, answer: str, usage: dict):
+        """Stream SSE frames with chunked encoding at the configured cadence"""
+        behavior = self.server.behavior
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        self.server.count('responses', '200')
+
+        words = answer.split(' ')
+        step = max(1, behavior.chunk_words)
+        pieces = [' '.join(words[i:i + step]) + ('' if i + step >= len(words) else ' ') for i in range(0, len(words), step)]
+        abort_at = len(pieces) // 2 if behavior.chance(behavior.stream_abort_rate) else None
+
+        for index, piece in enumerate(pieces):
+            if index == abort_at:
+                # Promise a chunk and close the socket before sending it
+                self.server.count('injected', 'stream_aborts')
+                self.wfile.write(b"400\r\ndata: {\"cand")
+                self.wfile.flush()
+                self.close_connection = True
+                return
+            if index:
+                time.sleep(behavior.chunk_interval)
+            frame = _candidate(piece)
+            if index == len(pieces) - 1:
+                frame['usageMetadata'] = usage
+            # Raw UTF-8 with no charset on the content type, as Gemini sends it
+            self._write_chunk(f"data: {json.dumps(frame, ensure_ascii=False)}\r\n\r\n".encode('utf-8'))
+
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def do_PATCH(self):
+        body = self._read_json()
+        name = _cached_content_name(self.path)
+        entry = self.server.cached_contents.get(name)
+        if entry is None:
+            self._not_found(f'CachedContent not found: {name}')
+            return
+        entry['expires_at'] = time.time() + _parse_ttl(body.get('ttl'))
+        self._send_json(200, _cached_content_resource(name, entry))
+
+    def do_DELETE(self):
+        name = _cached_content_name(self.path)
+        if self.server.cached_contents.pop(name, None) is None:
+            self._not_found(f'CachedContent not found: {name}')
+            return
+        self._send_json(200, {})
+
+    def _create_cached_content(self, body: dict):
+        parts = body.get('systemInstruction', {}).get('parts', [])
+        text = ''.join(part.get('text', '') for part in parts)
+        min_tokens = self.server.behavior.cache_min_tokens
+        token_count = _estimate_tokens(text)
+        if token_count < min_tokens:
+            self._send_json(400, {'error': {
+                'code': 400,
+                'status': 'INVALID_ARGUMENT',
+                'message': f'Cached content is too small. total_token_count={token_count}, min_total_token_count={min_tokens}'
+            }})
+            return
+
+        name = f"cachedContents/{uuid.uuid4().hex[:12]}"
+        entry = {
+            'model': body.get('model', ''),
+            'display_name': body.get('displayName', ''),
+            'token_count': token_count,
+            'expires_at': time.time() + _parse_ttl(body.get('ttl'))
+        }
+        self.server.cached_contents[name] = entry
+        self._send_json(200, _cached_content_resource(name, entry))
+
+
+class MockGeminiServer(ThreadingHTTPServer):
+    """Threaded HTTP server holding the behavior profile, cached contents and counters"""
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], behavior: MockBehavior):
+        super().__init__(address, MockGeminiHandler)
+        self.behavior = behavior
+        self.cached_contents = {}
+        self._lock = threading.Lock()
+        self._recent = deque()
+        self.reset()
+
+    def reset(self):
+        """Zero the counters and forget cached contents"""
+        with self._lock:
+            self.cached_contents.clear()
+            self._recent.clear()
+            self.stats = {
+                'requests': {},
+                'models': {},
+                'responses': {},
+                'injected': {},
+                'in_flight': 0,
+                'max_in_flight': 0
+            }
+
+    def count(self, group: str, key: str):
+        with self._lock:
+            self.stats[group][key] = self.stats[group].get(key, 0) + 1
+
+    @contextmanager
+    def track_in_flight(self):
+        """Count a generate call as in flight for the duration of a with-block"""
+        with self._lock:
+            self.stats['in_flight'] += 1
+            self.stats['max_in_flight'] = max(self.stats['max_in_flight'], self.stats['in_flight'])
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.stats['in_flight'] -= 1
+
+    def handle_error(self, request, client_address):
+        """Clients that time out and hang up are expected; report anything else"""
+        if isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            return
+        super().handle_error(request, client_address)
+
+    def over_quota(self) -> bool:
+        """Sliding one-minute request quota (rpm_limit)"""
+        limit = self.behavior.rpm_limit
+        if not limit:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            while self._recent and now - self._recent[0] > 60:
+                self._recent.popleft()
+            if len(self._recent) >= limit:
+                return True
+            self._recent.append(now)
+            return False
+
+    @property
+    def latency(self) -> float:
+        """Base latency (kept for callers that tune it directly)"""
+        return self.behavior.latency
+
+    @latency.setter
+    def latency(self, value: float):
+        self.behavior.update(latency=value)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = json.loads(json.dumps(self.stats))
+        stats['behavior'] = self.behavior.to_dict()
+        stats['cached_contents'] = len(self.cached_contents)
+        return stats
+
+
+def _candidate(text: str) -> dict:
+    """Wrap text in a generateContent-shaped response"""
+    return {'candidates': [{'content': {'parts': [{'text': text}], 'role': 'model'}, 'finishReason': 'STOP'}]}
+
+
+def _estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token)"""
+    return max(1, len(text) // 4) if text else 0
+
+
+def _usage(body: dict) -> dict:
+    """usageMetadata for a generate (or chat completions) request body"""
+    texts = [part.get('text', '') for content in body.get('contents', []) for part in content.get('parts', [])]
+    texts += [part.get('text', '') for part in body.get('systemInstruction', {}).get('parts', [])]
+    texts += [str(message.get('content', '')) for message in body.get('messages', [])]
+    prompt_tokens = sum(_estimate_tokens(text) for text in texts)
+    answer_tokens = _estimate_tokens(CANNED_ANSWER)
+    return {
+        'promptTokenCount': prompt_tokens,
+        'candidatesTokenCount': answer_tokens,
+        'totalTokenCount': prompt_tokens + answer_tokens
+    }
+
+
+def _parse_ttl(ttl) -> float:
+    """Parse a duration like '3600s' (defaults to one hour)"""
+    try:
+        return float(str(ttl).rstrip('s'))
+    except (TypeError, ValueError):
+        return 3600.0
+
+
+def _cached_content_name(path: str) -> str:
+    """cachedContents/{id} from a request path"""
+    path = path.split('?', 1)[0]
+    return 'cachedContents/' + path.rstrip('/').rsplit('/', 1)[-1]
+
+
+def _cached_content_resource(name: str, entry: dict) -> dict:
+    """REST representation of a cachedContents entry"""
+    return {
+        'name': name,
+        'model': entry['model'],
+        'displayName': entry['display_name'],
+        'expireTime': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(entry['expires_at'])),
+        'usageMetadata': {'totalTokenCount': entry['token_count']}
+    }
+
+
+def start_mock_server(
+    host: str = '127.0.0.1',
+    port: int = 0,
+    latency: float = 0.5,
+    cache_min_tokens: int = 0,
+    behavior: Optional[MockBehavior] = None,
+    **overrides
+) -> Tuple[MockGeminiServer, threading.Thread]:
+    """
+    Start the mock server on a background thread
+
+    Args:
+        host: Interface to bind
+        port: Port to bind (0 picks a free port)
+        latency: Base seconds before answering each generate call
+        cache_min_tokens: Smallest system instruction cachedContents accepts
+        behavior: Complete profile (latency/cache_min_tokens/overrides are then ignored)
+        **overrides: Other MockBehavior fields, e.g. error_rate=0.1
+
+    Returns:
+        Tuple of (server, thread); call server.shutdown() to stop it
+    """
+    if behavior is None:
+        behavior = MockBehavior(latency=latency, cache_min_tokens=cache_min_tokens, **overrides)
+    server = MockGeminiServer((host, port), behavior)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, thread
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a local mock Gemini REST server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--profile', help='JSON file of MockBehavior fields (flags below override it)')
+    parser.add_argument('--latency', type=float, help='base seconds per generate call')
+    parser.add_argument('--distribution', dest='latency_distribution', choices=MockBehavior.DISTRIBUTIONS)
+    parser.add_argument('--jitter', dest='latency_jitter', type=float, help='spread of the latency distribution')
+    parser.add_argument('--slow-ratio', type=float, help='share of calls taking --slow-latency')
+    parser.add_argument('--slow-latency', type=float)
+    parser.add_argument('--error-rate', type=float, help='share of calls answered with 500/503')
+    parser.add_argument('--burst-every', type=float, help='seconds between 429 bursts')
+    parser.add_argument('--burst-duration', type=float, help='seconds each 429 burst lasts')
+    parser.add_argument('--rpm-limit', type=int, help='requests per minute before 429s')
+    parser.add_argument('--hang-rate', type=float, help='share of calls that stall')
+    parser.add_argument('--hang-duration', type=float)
+    parser.add_argument('--chunk-words', type=int, help='words per streamed chunk')
+    parser.add_argument('--chunk-interval', type=float, help='seconds between streamed chunks')
+    parser.add_argument('--stream-abort-rate', type=float, help='share of streams cut off midway')
+    parser.add_argument('--answer-words', type=int, help='answer length in words')
+    parser.add_argument('--cache-min-tokens', type=int, help='minimum tokens for cachedContents')
+    parser.add_argument('--seed', type=int, help='random seed for repeatable runs')
+    args = parser.parse_args()
+
+    settings = {}
+    if args.profile:
+        with open(args.profile, 'r', encoding='utf-8') as f:
+            settings.update(json.load(f))
+    settings.update({
+        key: value for key, value in vars(args).items()
+        if key in MockBehavior.DEFAULTS and value is not None
+    })
+
+    server, thread = start_mock_server(args.host, args.port, behavior=MockBehavior(**settings))
+    print(f"Mock Gemini listening on http://{args.host}:{server.server_port}/v1beta/models")
+    try:
+        thread.join()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
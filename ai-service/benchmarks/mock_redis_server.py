@@ -0,0 +1,165 @@
+"""
+Local stand-in for Redis, just enough for the shared rate-limit backend
+
+Speaks RESP over TCP and understands PING, AUTH, SELECT, SCRIPT LOAD,
+EVALSHA/EVAL of the token-bucket script in src/utils/rate_limiter.py (run by
+its Python twin, take_tokens), HGETALL, DEL, FLUSHALL and DBSIZE. Several
+service processes pointed at one instance share their limits, which is what
+a real Redis gives gunicorn workers and nodes.
+
+    python benchmarks/mock_redis_server.py --port 6380
+    RATE_LIMIT_BACKEND=redis RATE_LIMIT_REDIS_URL=redis://127.0.0.1:6380/0 gunicorn -w 4 app:app
+"""
+
+import argparse
+import hashlib
+import os
+import socketserver
+import sys
+import threading
+from typing import Any, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.utils.rate_limiter import TOKEN_BUCKET_SCRIPT, take_tokens  # noqa: E402
+
+SCRIPT_SHA = hashlib.sha1(TOKEN_BUCKET_SCRIPT.encode('utf-8')).hexdigest()
+
+
+class MockRedisHandler(socketserver.StreamRequestHandler):
+    """One client connection; commands are answered in order"""
+
+    def _read_command(self) -> Optional[List[str]]:
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b'*'):
+            return line.decode('utf-8').split()  # inline command, e.g. from telnet
+        args = []
+        for _ in range(int(line[1:-2])):
+            length = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(length + 2)[:-2].decode('utf-8'))
+        return args
+
+    def _write(self, value: Any):
+        self.wfile.write(_encode(value))
+
+    def handle(self):
+        while True:
+            try:
+                command = self._read_command()
+            except (ConnectionError, ValueError):
+                return
+            if command is None:
+                return
+            try:
+                self._write(self.server.execute(command))
+            except MockRedisError as e:
+                self.wfile.write(f'-{e}\r\n'.encode('utf-8'))
+            self.wfile.flush()
+
+
+class MockRedisError(Exception):
+    """Sent to the client as an error reply"""
+
+
+class MockRedisServer(socketserver.ThreadingTCPServer):
+    """Keys live in one dict: bucket name -> [tokens, updated]"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address: Tuple[str, int]):
+        super().__init__(address, MockRedisHandler)
+        self.data = {}
+        self.scripts = {SCRIPT_SHA: TOKEN_BUCKET_SCRIPT}
+        self.lock = threading.Lock()
+        self.commands = 0
+
+    def execute(self, command: List[str]) -> Any:
+        """Run one command and return its reply value"""
+        name, args = command[0].upper(), command[1:]
+        self.commands += 1
+
+        if name == 'PING':
+            return Status('PONG')
+        if name in ('AUTH', 'SELECT'):
+            return Status('OK')
+        if name == 'SCRIPT' and args and args[0].upper() == 'LOAD':
+            sha = hashlib.sha1(args[1].encode('utf-8')).hexdigest()
+            self.scripts[sha] = args[1]
+            return sha
+        if name in ('EVALSHA', 'EVAL'):
+            script = self.scripts.get(args[0]) if name == 'EVALSHA' else args[0]
+            if script is None:
+                raise MockRedisError('NOSCRIPT No matching script. Please use EVAL.')
+            if script != TOKEN_BUCKET_SCRIPT:
+                raise MockRedisError('ERR the stand-in only runs the rate limiter script')
+            return self._token_bucket(args[1:])
+        if name == 'HGETALL':
+            state = self.data.get(args[0])
+            return [] if state is None else ['t', repr(state[0]), 'u', repr(state[1])]
+        if name == 'DEL':
+            with self.lock:
+                return sum(1 for key in args if self.data.pop(key, None) is not None)
+        if name == 'FLUSHALL':
+            with self.lock:
+                self.data.clear()
+            return Status('OK')
+        if name == 'DBSIZE':
+            return len(self.data)
+        raise MockRedisError(f"ERR unknown command '{name}'")
+
+    def _token_bucket(self, args: List[str]) -> List[str]:
+        """EVAL numkeys key... now cost capacity rate ... (atomic under the server lock)"""
+        count = int(args[0])
+        keys, argv = args[1:1 + count], args[1 + count:]
+        now, cost = float(argv[0]), float(argv[1])
+        specs = [(float(argv[2 + 2 * i]), float(argv[3 + 2 * i])) for i in range(count)]
+
+        with self.lock:
+            states = [self.data.setdefault(key, [capacity, now]) for key, (capacity, _) in zip(keys, specs)]
+            allowed, remaining, retry_after, reset, limit = take_tokens(states, specs, cost, now)
+        return [int(allowed), repr(remaining), repr(retry_after), repr(reset), repr(limit)]
+
+
+class Status(str):
+    """Simple-string reply (+OK) rather than a bulk string"""
+
+
+def _encode(value: Any) -> bytes:
+    if isinstance(value, Status):
+        return f'+{value}\r\n'.encode('utf-8')
+    if value is None:
+        return b'$-1\r\n'
+    if isinstance(value, int):
+        return f':{value}\r\n'.encode('ascii')
+    if isinstance(value, list):
+        return f'*{len(value)}\r\n'.encode('ascii') + b''.join(_encode(item) for item in value)
+    data = str(value).encode('utf-8')
+    return b'$%d\r\n%s\r\n' % (len(data), data)
+
+
+def start_mock_redis(host: str = '127.0.0.1', port: int = 0) -> Tuple[MockRedisServer, threading.Thread]:
+    """Start the stand-in on a background thread (port 0 picks a free port)"""
+    server = MockRedisServer((host, port))
+    thread = threading.Thread(target=server.serve_forever, daemon=True, name='mock-redis')
+    thread.start()
+    return server, thread
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Redis stand-in for the rate limiter')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=6380)
+    args = parser.parse_args()
+
+    server, thread = start_mock_redis(args.host, args.port)
+    print(f'Mock Redis listening on redis://{args.host}:{server.server_address[1]}/0')
+    try:
+        thread.join()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
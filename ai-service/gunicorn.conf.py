@@ -0,0 +1,86 @@
+"""
+Gunicorn settings for the Narad AI service (loaded automatically from this directory)
+
+Workers write their metrics to a directory shared for the master's lifetime,
+so GET /metrics on any worker reports the whole server.
+
+Preloading is opt-in. With GUNICORN_PRELOAD=true in the environment
+(e.g. `web: GUNICORN_PRELOAD=true gunicorn -w 4 -b 0.0.0.0:$PORT app:app`
+in the Procfile) the master imports app.py once: the knowledge base,
+templates and response corpus are built there, frozen out of the garbage
+collector and shared with the workers copy-on-write, which cuts total
+memory by about a third with 4 workers (benchmarks/bench_preload.py).
+Each worker then starts its own threads (logging, cache warm-up, start-up
+warm-up) in post_fork. Use GUNICORN_PRELOAD rather than --preload so the
+app knows which process it is being imported in.
+
+Trade-off: the master holds the application code, so a HUP reload
+restarts workers from the code loaded at start-up; deploying new code
+needs a full restart. Without preload (the default) every worker imports
+the app itself.
+"""
+
+import gc
+import glob
+import os
+import shutil
+import sys
+import tempfile
+
+# The Procfile passes -w and -b on the command line; these are the defaults otherwise
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', '4'))
+
+# Read by app.py (STARTUP_CONFIG['preload']) when the master imports it
+preload_app = os.getenv('GUNICORN_PRELOAD', 'false').lower() == 'true'
+if preload_app:
+    # Collections in the master would free objects and reshuffle pages the workers share
+    gc.disable()
+
+# Set in the master before any worker imports the app
+_metrics_dir_created = not os.getenv('METRICS_DIR')
+os.environ.setdefault('METRICS_DIR', os.path.join(tempfile.gettempdir(), f'narad-metrics-{os.getpid()}'))
+
+
+def on_starting(server):
+    # Snapshots left by a previous server in the same directory would be counted again
+    directory = os.environ['METRICS_DIR']
+    os.makedirs(directory, exist_ok=True)
+    for path in glob.glob(os.path.join(directory, '*.json')):
+        os.remove(path)
+
+
+def when_ready(server):
+    # In-process rate limit buckets are per worker, so every worker admits the full quota
+    from src.config.settings import SECURITY_CONFIG
+    rate_limiting = SECURITY_CONFIG['rate_limiting']
+    if server.cfg.workers > 1 and rate_limiting['enabled'] and rate_limiting['backend'] != 'redis':
+        server.log.warning(
+            "Rate limits use the in-process backend with %d workers: each worker keeps its own "
+            "buckets, so clients get up to %d times RATE_LIMIT_PER_MINUTE/PER_HOUR. Set "
+            "RATE_LIMIT_BACKEND=redis to share them.",
+            server.cfg.workers, server.cfg.workers
+        )
+
+
+def pre_fork(server, worker):
+    if preload_app:
+        # Move everything built so far out of the collector's reach, so a
+        # worker's collections never write to (and so copy) the shared pages
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    if not preload_app:
+        return
+    gc.enable()
+    app = sys.modules.get('app')
+    if app is not None:
+        from src.utils.logger import restart_logging
+        restart_logging()
+        app.start_worker()
+
+
+def on_exit(server):
+    if _metrics_dir_created:
+        shutil.rmtree(os.environ['METRICS_DIR'], ignore_errors=True)
@@ -124,22 +124,54 @@ RECOMMENDATION_CONFIG = {
 
 # Error handling and fallback settings
 ERROR_CONFIG = {
-    'max_retries': 3,
+    'max_retries': int(os.getenv('UPSTREAM_MAX_RETRIES', '3')),
     'fallback_responses': True,
     'error_logging': True,
     'graceful_degradation': True,
-    'timeout_duration': 30  # seconds
+    'timeout_duration': float(os.getenv('UPSTREAM_TIMEOUT', '30')),  # seconds, across all retries
+    'retry_base_delay': float(os.getenv('UPSTREAM_RETRY_BASE_DELAY', '0.25')),  # seconds
+    'retry_max_delay': float(os.getenv('UPSTREAM_RETRY_MAX_DELAY', '4')),  # seconds
+    'circuit_failure_threshold': int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', '5')),  # consecutive failures
+    'circuit_recovery_timeout': float(os.getenv('CIRCUIT_RECOVERY_TIMEOUT', '30'))  # seconds before probing
 }
 
 # Performance and caching settings
 PERFORMANCE_CONFIG = {
-    'cache_enabled': True,
-    'cache_duration': 3600,  # 1 hour
-    'response_caching': True,
+    'cache_enabled': os.getenv('CACHE_ENABLED', 'true').lower() == 'true',
+    'cache_duration': int(os.getenv('CACHE_DURATION', '3600')),  # 1 hour
+    'response_caching': os.getenv('RESPONSE_CACHING', 'true').lower() == 'true',
+    'cache_max_entries': int(os.getenv('CACHE_MAX_ENTRIES', '2048')),  # in-process LRU tier
+    'cache_stale_duration': int(os.getenv('CACHE_STALE_DURATION', '600')),  # serve stale while refreshing
+    'cache_path': os.getenv('RESPONSE_CACHE_PATH', os.path.join(os.path.dirname(__file__), '..', '..', 'cache', 'responses.sqlite3')),
     'knowledge_base_cache': True,
     'conversation_memory_cleanup': 86400  # 24 hours
 }
 
+# Pre-generated answers for suggestion chips and the most asked questions,
+# at startup and then every interval (0 warms only at startup). Off by default:
+# every round spends upstream quota on questions nobody may ask
+CACHE_WARMUP_CONFIG = {
+    'enabled': os.getenv('CACHE_WARMUP_ENABLED', 'false').lower() == 'true',
+    'interval': float(os.getenv('CACHE_WARMUP_INTERVAL', '900')),  # seconds
+    'startup_delay': float(os.getenv('CACHE_WARMUP_STARTUP_DELAY', '5')),  # seconds
+    'languages': [code.strip() for code in os.getenv('CACHE_WARMUP_LANGUAGES', 'en,hi,bn,ta,te').split(',') if code.strip()],
+    'top_n': int(os.getenv('CACHE_WARMUP_TOP_N', '50')),  # most frequent logged messages
+    'access_logs': [path.strip() for path in os.getenv('CACHE_WARMUP_ACCESS_LOGS', '').split(',') if path.strip()],  # files or globs
+    'max_message_chars': int(os.getenv('CACHE_WARMUP_MAX_MESSAGE_CHARS', '200')),
+    'concurrency': int(os.getenv('CACHE_WARMUP_CONCURRENCY', '4'))
+}
+
+# Opt-in speculative answers to the suggestions returned with each turn,
+# generated in the background with the session's history and kept per session
+PREFETCH_CONFIG = {
+    'enabled': os.getenv('PREFETCH_SUGGESTIONS', 'false').lower() == 'true',
+    'ttl': float(os.getenv('PREFETCH_TTL', '120')),  # seconds a prefetched answer is kept
+    'max_sessions': int(os.getenv('PREFETCH_MAX_SESSIONS', '5000')),
+    'max_workers': int(os.getenv('PREFETCH_MAX_WORKERS', '4')),  # background calls per process
+    'max_pending': int(os.getenv('PREFETCH_MAX_PENDING', '64')),  # beyond this, suggestions are not prefetched
+    'wait_timeout': float(os.getenv('PREFETCH_WAIT_TIMEOUT', '30'))  # a click waits this long for one in progress
+}
+
 # Security and privacy settings
 SECURITY_CONFIG = {
     'user_data_retention': 30,  # days
@@ -147,7 +179,191 @@ SECURITY_CONFIG = {
     'personal_info_filtering': True,
     'content_moderation': True,
     'rate_limiting': {
-        'requests_per_minute': 60,
-        'requests_per_hour': 1000
+        'enabled': os.getenv('RATE_LIMIT_ENABLED', 'true').lower() == 'true',
+        'requests_per_minute': int(os.getenv('RATE_LIMIT_PER_MINUTE', '60')),
+        'requests_per_hour': int(os.getenv('RATE_LIMIT_PER_HOUR', '1000')),
+        'backend': os.getenv('RATE_LIMIT_BACKEND', 'memory'),  # memory (per worker) or redis (shared)
+        'redis_url': os.getenv('RATE_LIMIT_REDIS_URL', os.getenv('REDIS_URL', 'redis://localhost:6379/0')),
+        'redis_timeout': float(os.getenv('RATE_LIMIT_REDIS_TIMEOUT', '0.05')),  # seconds per check
+        # Trusted proxies appending X-Forwarded-For. 0 (default) ignores the header and uses
+        # the peer address; trusting a proxy that is not there lets clients pick their IP
+        'proxy_hops': int(os.getenv('RATE_LIMIT_PROXY_HOPS', '0')),
+        'max_keys': int(os.getenv('RATE_LIMIT_MAX_KEYS', '100000'))  # in-process buckets per worker
+    }
+}
+
+# Service logging: records are written by a background thread behind a bounded
+# queue; long strings are truncated and API keys masked. LOG_SAMPLE_RATES keeps a
+# fraction of INFO/DEBUG records per event or logger ('chat_turn=0.1,src.services=0.5').
+LOGGING_CONFIG = {
+    'level': os.getenv('LOG_LEVEL', 'INFO'),
+    'format': os.getenv('LOG_FORMAT', 'text'),  # 'json' writes one JSON record per line
+    'async': os.getenv('LOG_ASYNC', 'true').lower() == 'true',
+    'queue_size': int(os.getenv('LOG_QUEUE_SIZE', '10000')),  # records buffered before new ones are dropped
+    'max_field_chars': int(os.getenv('LOG_MAX_FIELD_CHARS', '500')),
+    'sample_rates': os.getenv('LOG_SAMPLE_RATES', ''),
+    'file': os.getenv('LOG_FILE')  # optional rotating log file
+}
+
+# Prometheus metrics on /metrics. Under gunicorn, gunicorn.conf.py points
+# METRICS_DIR at a directory per server so the workers' metrics are merged.
+METRICS_CONFIG = {
+    'enabled': os.getenv('METRICS_ENABLED', 'true').lower() == 'true',
+    'multiprocess_dir': os.getenv('METRICS_DIR', ''),  # empty: each process reports only itself
+    'flush_interval': float(os.getenv('METRICS_FLUSH_INTERVAL', '5')),  # seconds between worker snapshots
+    'slow_turn_seconds': float(os.getenv('METRICS_SLOW_TURN_SECONDS', '5')),  # slower turns are logged per stage
+    'token': os.getenv('METRICS_TOKEN')  # when set, scrapes need Authorization: Bearer <token>
+}
+
+# Worker start-up: the warm-up runs after import, and /health reports 503 until it is done
+STARTUP_CONFIG = {
+    'warmup': os.getenv('STARTUP_WARMUP', 'true').lower() == 'true',  # false: everything is set up on first use
+    'import_budget': float(os.getenv('STARTUP_IMPORT_BUDGET', '1.0')),  # seconds; a slower app import is logged as a warning
+    'preload': os.getenv('GUNICORN_PRELOAD', 'false').lower() == 'true'  # set by gunicorn.conf.py: the app is imported in the master
+}
+
+# Gemini REST client settings
+GEMINI_CLIENT_CONFIG = {
+    'api_endpoint': os.getenv('GEMINI_API_ENDPOINT', 'https://generativelanguage.googleapis.com/v1beta/models'),
+    'pool_connections': int(os.getenv('GEMINI_POOL_CONNECTIONS', '4')),  # distinct hosts kept in the pool
+    'pool_maxsize': int(os.getenv('GEMINI_POOL_MAXSIZE', '16')),  # keep-alive connections per host
+    'pool_block': os.getenv('GEMINI_POOL_BLOCK', 'true').lower() == 'true',  # wait for a free connection instead of opening extras
+    'connect_timeout': float(os.getenv('GEMINI_CONNECT_TIMEOUT', '3.05')),  # seconds
+    'read_timeout': float(os.getenv('GEMINI_READ_TIMEOUT', '30')),  # seconds
+    'async_max_connections': int(os.getenv('GEMINI_ASYNC_MAX_CONNECTIONS', '256')),  # in-flight calls per ASGI worker
+    'warmup_on_start': os.getenv('GEMINI_WARMUP_ON_START', 'true').lower() == 'true'
+}
+
+# Hedged requests: after a percentile of the primary model's recent latency,
+# race a second request against a faster model and keep the first answer
+HEDGING_CONFIG = {
+    'enabled': os.getenv('HEDGING_ENABLED', 'false').lower() == 'true',
+    'hedge_model': os.getenv('HEDGE_MODEL', 'gemini-1.5-flash'),
+    'latency_percentile': float(os.getenv('HEDGE_LATENCY_PERCENTILE', '95')),
+    'initial_delay': float(os.getenv('HEDGE_INITIAL_DELAY', '2.0')),  # seconds, until enough samples exist
+    'min_delay': float(os.getenv('HEDGE_MIN_DELAY', '0.5')),  # seconds
+    'max_delay': float(os.getenv('HEDGE_MAX_DELAY', '10')),  # seconds
+    'window_size': int(os.getenv('HEDGE_WINDOW_SIZE', '200')),  # primary latency samples kept
+    'min_samples': int(os.getenv('HEDGE_MIN_SAMPLES', '20')),
+    'max_workers': int(os.getenv('HEDGE_MAX_WORKERS', '32')),  # threads for sync primary calls
+    'max_hedges': int(os.getenv('HEDGE_MAX_IN_FLIGHT', '8'))  # hedges in flight at once; past it slow primaries are just awaited
+}
+
+# Model routing: pick a model tier per turn from intent, message length and
+# history size. Rules live in a JSON file that is re-read when it changes.
+MODEL_ROUTING_CONFIG = {
+    'enabled': os.getenv('MODEL_ROUTING_ENABLED', 'true').lower() == 'true',
+    'rules_path': os.getenv('MODEL_ROUTING_RULES', os.path.join(os.path.dirname(__file__), 'model_routing.json')),
+    'reload_interval': float(os.getenv('MODEL_ROUTING_RELOAD_INTERVAL', '5'))  # seconds between file checks
+}
+
+# Token budgets: conversation history is compressed to fit history_budget and
+# maxOutputTokens is set per intent (capped by the routed tier's limit)
+TOKEN_BUDGET_CONFIG = {
+    'enabled': os.getenv('TOKEN_BUDGET_ENABLED', 'true').lower() == 'true',
+    'history_budget': int(os.getenv('PROMPT_HISTORY_TOKENS', '400')),
+    'max_history_pairs': int(os.getenv('PROMPT_HISTORY_PAIRS', '3')),
+    'excerpt_tokens': int(os.getenv('PROMPT_EXCERPT_TOKENS', '80')),  # per stored message
+    'default_output_tokens': AI_CONFIG['max_tokens'],
+    'output_tokens': {
+        'greeting': 120,
+        'general_inquiry': 250,
+        'informational': 250,
+        'location_inquiry': 250,
+        'cultural_inquiry': 300,
+        'summarization_request': 200,
+        'story_request': AI_CONFIG['max_tokens'],
+        'horror_inquiry': AI_CONFIG['max_tokens'],
+        'folklore_inquiry': AI_CONFIG['max_tokens'],
+        'version_inquiry': AI_CONFIG['max_tokens']
+    }
+}
+
+# Gemini context caching: the static system instruction is stored as a
+# cachedContents entry per model and its TTL extended before it expires.
+# Models enforce a minimum cacheable size; below it instructions go inline.
+CONTEXT_CACHE_CONFIG = {
+    'enabled': os.getenv('CONTEXT_CACHE_ENABLED', 'true').lower() == 'true',
+    'ttl': int(os.getenv('CONTEXT_CACHE_TTL', '3600')),  # seconds
+    'refresh_margin': int(os.getenv('CONTEXT_CACHE_REFRESH_MARGIN', '300')),  # extend when this close to expiry
+    'retry_interval': int(os.getenv('CONTEXT_CACHE_RETRY_INTERVAL', '300')),  # after a failed create
+    'min_tokens': int(os.getenv('CONTEXT_CACHE_MIN_TOKENS', '1024')),  # Gemini's smallest cacheable content; smaller instructions are sent inline
+    'create_on_start': os.getenv('CONTEXT_CACHE_CREATE_ON_START', 'true').lower() == 'true'
+}
+
+# Process-wide cap on in-flight upstream calls (chat, streams and batches share it)
+CONCURRENCY_CONFIG = {
+    'max_concurrent': int(os.getenv('UPSTREAM_MAX_CONCURRENCY', '32')),
+    'acquire_timeout': float(os.getenv('UPSTREAM_ACQUIRE_TIMEOUT', '5')),  # seconds to wait for a slot before local fallback
+    'max_queue': int(os.getenv('UPSTREAM_MAX_QUEUE', '64')),  # waiters beyond this fall back immediately
+    # AIMD: grow while latency is steady, cut on 429/503/timeouts or latency spikes
+    'adaptive': os.getenv('UPSTREAM_ADAPTIVE_CONCURRENCY', 'true').lower() == 'true',
+    'min_concurrent': int(os.getenv('UPSTREAM_MIN_CONCURRENCY', '2')),
+    'initial_concurrent': int(os.getenv('UPSTREAM_INITIAL_CONCURRENCY', '8')),
+    'backoff_ratio': float(os.getenv('UPSTREAM_BACKOFF_RATIO', '0.5')),
+    'latency_tolerance': float(os.getenv('UPSTREAM_LATENCY_TOLERANCE', '2.0')),  # short-term vs baseline latency
+    'decrease_cooldown': float(os.getenv('UPSTREAM_DECREASE_COOLDOWN', '1.0')),  # seconds between cuts
+    # Priority classes sharing the limit, highest first. Waiting classes get slots
+    # in proportion to weight; max_share caps a class at that fraction of the limit;
+    # timeout is how long a call queues before falling back; queued preemptible
+    # work is dropped as soon as a higher class has to wait.
+    'priority_classes': {
+        'interactive': {
+            'weight': float(os.getenv('UPSTREAM_INTERACTIVE_WEIGHT', '8')),
+            'max_share': 1.0,
+            'timeout': float(os.getenv('UPSTREAM_ACQUIRE_TIMEOUT', '5')),
+            'preemptible': False
+        },
+        'prefetch': {
+            'weight': float(os.getenv('UPSTREAM_PREFETCH_WEIGHT', '2')),
+            'max_share': float(os.getenv('UPSTREAM_PREFETCH_SHARE', '0.25')),
+            'timeout': float(os.getenv('UPSTREAM_PREFETCH_TIMEOUT', '1')),
+            'preemptible': True
+        },
+        'batch': {
+            'weight': float(os.getenv('UPSTREAM_BATCH_WEIGHT', '1')),
+            'max_share': float(os.getenv('UPSTREAM_BATCH_SHARE', '0.5')),
+            'timeout': float(os.getenv('UPSTREAM_BATCH_TIMEOUT', '15')),
+            'preemptible': False
+        }
     }
-}
\ No newline at end of file
+}
+
+# Client deadlines on /api/ai/chat (X-Request-Timeout / X-Request-Deadline headers
+# or timeout / deadline body fields). Queueing, retries and read timeouts are cut
+# to the time left; below min_upstream_budget a turn is answered locally instead.
+DEADLINE_CONFIG = {
+    'default_timeout': float(os.getenv('REQUEST_DEFAULT_TIMEOUT', '0')),  # seconds when the client sends none (0 = no deadline)
+    'max_timeout': float(os.getenv('REQUEST_MAX_TIMEOUT', '120')),  # longer client deadlines are clamped
+    'min_upstream_budget': float(os.getenv('DEADLINE_MIN_UPSTREAM_BUDGET', '1.0'))  # seconds an LLM call needs to be worth starting
+}
+
+# /api/ai/chat/batch limits. A batch is answered in one HTTP response, so keep
+# max_items x per-item latency / concurrency inside the worker timeout.
+BATCH_CONFIG = {
+    'max_items': int(os.getenv('BATCH_MAX_ITEMS', '100')),
+    'default_concurrency': int(os.getenv('BATCH_DEFAULT_CONCURRENCY', '8')),
+    'max_concurrency': int(os.getenv('BATCH_MAX_CONCURRENCY', '32'))
+}
+
+# Provider layer shared by NaradAI and the /api/ai proxy blueprints. Providers
+# are tried in failover_order; one without an API key is skipped. Gemini uses
+# GEMINI_CLIENT_CONFIG, CONCURRENCY_CONFIG and ERROR_CONFIG.
+LLM_PROVIDER_CONFIG = {
+    'failover_enabled': os.getenv('LLM_FAILOVER_ENABLED', 'true').lower() == 'true',
+    'failover_order': [name.strip() for name in os.getenv('LLM_FAILOVER_ORDER', 'gemini,openai').split(',') if name.strip()],
+    # Models a client may request per provider (/api/ai/generate), on top of each provider's default model
+    'allowed_models': {
+        'gemini': [name.strip() for name in os.getenv('GEMINI_ALLOWED_MODELS', '').split(',') if name.strip()],
+        'openai': [name.strip() for name in os.getenv('OPENAI_ALLOWED_MODELS', '').split(',') if name.strip()]
+    },
+    'openai': {
+        'api_base': os.getenv('OPENAI_API_BASE', 'https://api.openai.com/v1'),
+        'model': AI_CONFIG['model'],
+        'pool_maxsize': int(os.getenv('OPENAI_POOL_MAXSIZE', '16')),
+        'connect_timeout': float(os.getenv('OPENAI_CONNECT_TIMEOUT', '3.05')),  # seconds
+        'read_timeout': float(os.getenv('OPENAI_READ_TIMEOUT', '30')),  # seconds
+        'max_concurrent': int(os.getenv('OPENAI_MAX_CONCURRENCY', '16')),
+        'max_retries': int(os.getenv('OPENAI_MAX_RETRIES', '1'))
+    }
+}
@@ -0,0 +1,267 @@
+"""
+Cache Warmer for Narad AI
+Pre-generates answers to suggestion chips and the most asked questions
+"""
+
+import glob
+import json
+import os
+import re
+import threading
+import time
+import logging
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: every process warms its own cache
+    fcntl = None
+
+from ..utils.concurrency import upstream_priority
+from ..utils.response_cache import ResponseCache
+
+logger = logging.getLogger(__name__)
+
+# Chat request lines written by app.py, plus JSON records carrying the message
+CHAT_LOG_PATTERN = re.compile(r'Received (?:streaming )?chat request: (.+)$')
+
+
+def top_messages(paths: Iterable[str], limit: int, max_chars: int = 200) -> List[str]:
+    """
+    Most frequent chat messages in a set of log files
+
+    Args:
+        paths: Log file paths or glob patterns (rotated files included)
+        limit: Number of messages to return
+        max_chars: Longer messages are ignored
+
+    Returns:
+        Messages ordered by frequency, each in the form first seen
+    """
+    counts = Counter()
+    originals = {}
+    for pattern in paths:
+        for path in sorted(glob.glob(pattern)):
+            try:
+                with open(path, encoding='utf-8', errors='replace') as f:
+                    for line in f:
+                        message = _chat_message(line)
+                        if not message or len(message) > max_chars:
+                            continue
+                        key = ResponseCache.normalize_message(message)
+                        if key:
+                            counts[key] += 1
+                            originals.setdefault(key, message)
+            except OSError as e:
+                logger.warning(f"Cache warm-up could not read {path}: {e}")
+
+    return [originals[key] for key, _ in counts.most_common(limit)]
+
+
+def _chat_message(line: str) -> Optional[str]:
+    line = line.strip()
+    if line.startswith('{'):
+        try:
+            record = json.loads(line)
+        except ValueError:
+            return None
+        message = record.get('message') if record.get('event') == 'chat_request' else None
+        return message.strip() if isinstance(message, str) else None
+    match = CHAT_LOG_PATTERN.search(line)
+    return match.group(1).strip() if match else None
+
+
+class CacheWarmer:
+    """
+    Keeps the response cache warm for the messages users send most: every
+    standalone suggestion chip and the top-N messages from the access logs,
+    in every configured language.
+
+    A round runs at startup and then every `interval` seconds, in the batch
+    priority class so it never competes with chat. Entries that will stay
+    fresh past the next round are skipped, so a round costs upstream calls
+    only for answers about to expire, and languages that send the same
+    request share one call. When the cache has a disk tier shared
+    by several workers, a lock file lets one worker warm it for all.
+    """
+
+    # Seconds allowed for a round to reach an entry, on top of the interval
+    ROUND_SLACK = 60
+
+    def __init__(
+        self,
+        narad_ai: Any,
+        languages: List[str],
+        interval: float = 900,
+        startup_delay: float = 5,
+        top_n: int = 50,
+        access_logs: Optional[List[str]] = None,
+        max_message_chars: int = 200,
+        concurrency: int = 4,
+        enabled: bool = True
+    ):
+        """
+        Initialize the warmer
+
+        Args:
+            narad_ai: NaradAI instance whose cache is warmed
+            languages: Preferred language codes to warm ('en', 'hi', ...)
+            interval: Seconds between rounds (0 warms only at startup)
+            startup_delay: Seconds to wait before the first round
+            top_n: Most frequent logged messages to warm
+            access_logs: Log files or glob patterns to mine for frequent messages
+            max_message_chars: Longer logged messages are not warmed
+            concurrency: Messages a round warms at once
+            enabled: Master switch
+        """
+        self.narad_ai = narad_ai
+        self.languages = languages
+        self.interval = interval
+        self.startup_delay = startup_delay
+        self.top_n = top_n
+        self.access_logs = access_logs or []
+        self.max_message_chars = max_message_chars
+        self.concurrency = max(1, concurrency)
+        self.enabled = enabled
+
+        cache_path = narad_ai.response_cache.disk_path
+        self.lock_path = f'{cache_path}.warmup.lock' if cache_path else None
+
+        self._stop = threading.Event()
+        self._round_lock = threading.Lock()
+        self._thread = None
+
+        self.stats = {
+            'rounds': 0,
+            'skipped_rounds': 0,
+            'warmed': 0,
+            'shared': 0,
+            'fresh': 0,
+            'skipped': 0,
+            'failed': 0,
+            'last_round': None
+        }
+
+    def messages(self) -> List[str]:
+        """Suggestion chips followed by the top logged messages, without duplicates"""
+        messages = self.narad_ai.suggestion_messages()
+        if self.top_n and self.access_logs:
+            messages += top_messages(self.access_logs, self.top_n, self.max_message_chars)
+
+        seen = set()
+        unique = []
+        for message in messages:
+            key = ResponseCache.normalize_message(message)
+            if key not in seen:
+                seen.add(key)
+                unique.append(message)
+        return unique
+
+    def run_once(self) -> Dict[str, Any]:
+        """
+        Run one warm-up round
+
+        Returns:
+            Summary of the round (counts per outcome and duration), or of why it was skipped
+        """
+        if not self._round_lock.acquire(blocking=False):
+            return {'skipped': 'a round is already running'}
+        try:
+            lock_file = self._claim_host_lock()
+            if lock_file is False:
+                self.stats['skipped_rounds'] += 1
+                return {'skipped': 'another worker is warming the shared cache'}
+            try:
+                return self._run_round()
+            finally:
+                if lock_file:
+                    lock_file.close()
+        finally:
+            self._round_lock.release()
+
+    def _run_round(self) -> Dict[str, Any]:
+        started = time.monotonic()
+        # Anything that would expire before the next round has finished is regenerated now
+        min_fresh = self.interval + self.ROUND_SLACK if self.interval else 0
+        messages = self.messages()
+
+        def warm(message):
+            with upstream_priority('batch'):
+                return self.narad_ai.warm_answers(message, self.languages, min_fresh)
+
+        # One job per message: languages that send the same request share a call
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='cache-warmup') as pool:
+            outcomes = Counter(outcome for result in pool.map(warm, messages) for outcome in result.values())
+
+        summary = {
+            'messages': len(messages),
+            'languages': len(self.languages),
+            'warmed': outcomes['warmed'],
+            'shared': outcomes['shared'],
+            'fresh': outcomes['fresh'],
+            'skipped': outcomes['skipped'],
+            'failed': outcomes['failed'],
+            'duration_s': round(time.monotonic() - started, 2)
+        }
+        self.stats['rounds'] += 1
+        for outcome in ('warmed', 'shared', 'fresh', 'skipped', 'failed'):
+            self.stats[outcome] += summary[outcome]
+        self.stats['last_round'] = summary
+
+        logger.info(
+            f"🔥 Cache warm-up: {summary['warmed']} warmed, {summary['shared']} shared, {summary['fresh']} already fresh, "
+            f"{summary['failed']} failed ({summary['messages']} messages x {summary['languages']} languages, "
+            f"{summary['duration_s']}s)"
+        )
+        return summary
+
+    def _claim_host_lock(self):
+        """
+        Take the host-wide warm-up lock for a shared disk cache
+
+        Returns:
+            The open lock file (held until closed), None when there is nothing
+            to coordinate, or False when another process holds the lock
+        """
+        if not self.lock_path or fcntl is None:
+            return None
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.lock_path)), exist_ok=True)
+            lock_file = open(self.lock_path, 'w')
+        except OSError as e:
+            logger.warning(f"Cache warm-up lock unavailable, warming anyway: {e}")
+            return None
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        return lock_file
+
+    def start(self):
+        """Start the background thread (first round after startup_delay, then every interval)"""
+        if not self.enabled or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._loop, daemon=True, name='cache-warmup')
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread after the current round"""
+        self._stop.set()
+
+    def _loop(self):
+        if self._stop.wait(self.startup_delay):
+            return
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Cache warm-up round failed: {e}", exc_info=True)
+            if not self.interval or self._stop.wait(self.interval):
+                return
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get warm-up statistics"""
+        return dict(self.stats, enabled=self.enabled, interval=self.interval, languages=list(self.languages))
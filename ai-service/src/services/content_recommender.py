@@ -139,7 +139,7 @@ class ContentRecommender:
                 )
                 categorized_recommendations[content_type] = recommendations
             
-            logger.info(f"Generated personalized recommendations for user {user_id}")
+            logger.debug("Generated personalized recommendations for user %s", user_id)
             return categorized_recommendations
             
         except Exception as e:
@@ -0,0 +1,217 @@
+"""
+Context Cache for Narad AI
+Keeps the static persona/system instruction in Gemini cachedContents, one entry per model
+"""
+
+import threading
+import time
+import logging
+from typing import Dict, Any, Iterable, Optional
+
+from .gemini_client import GeminiClient, GeminiAPIError
+from ..utils.token_budget import TokenBudget
+
+logger = logging.getLogger(__name__)
+
+
+class ContextCache:
+    """
+    Manages explicit Gemini context caches for the system instruction.
+
+    Entries are created at startup and their TTL is extended in the
+    background once they come within `refresh_margin` of expiry, so the
+    request path only does a dictionary lookup. When no entry is usable
+    (creation failed, the content is below the model's caching minimum, or
+    the entry was evicted upstream) get() returns None and the caller sends
+    the instruction inline; creation is retried after `retry_interval`.
+
+    Explicit caching has a minimum size (1024+ tokens depending on the
+    model). An instruction estimated below `min_tokens` is never sent for
+    caching, and a model that rejects the content as too small is not
+    asked again for the life of the process: retrying cannot succeed and
+    each attempt is a wasted upstream call.
+    """
+
+    def __init__(
+        self,
+        client: Optional[GeminiClient],
+        system_instruction: str,
+        ttl: int = 3600,
+        refresh_margin: int = 300,
+        retry_interval: int = 300,
+        min_tokens: int = 0,
+        enabled: bool = True
+    ):
+        """
+        Initialize the context cache
+
+        Args:
+            client: Gemini client used for cachedContents calls (None disables caching)
+            system_instruction: Static instruction text to cache
+            ttl: Lifetime requested for each entry, in seconds
+            refresh_margin: Extend an entry when it has less than this many seconds left
+            retry_interval: Seconds to wait after a failed create before trying again
+            min_tokens: Smallest instruction (estimated tokens) worth offering for caching
+            enabled: Master switch
+        """
+        self.client = client
+        self.system_instruction = system_instruction
+        self.ttl = ttl
+        self.refresh_margin = min(refresh_margin, ttl / 2)
+        self.retry_interval = retry_interval
+        self.enabled = enabled and client is not None
+        self.instruction_tokens = TokenBudget.estimate_tokens(system_instruction)
+        if self.enabled and self.instruction_tokens < min_tokens:
+            logger.info(
+                f"Context caching off: the system instruction is ~{self.instruction_tokens} tokens, "
+                f"below the {min_tokens}-token minimum for cachedContents"
+            )
+            self.enabled = False
+
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._retry_after: Dict[str, float] = {}
+        self._refreshing = set()
+        # Models that rejected the instruction as below their caching minimum
+        self._too_small = set()
+
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'created': 0,
+            'extended': 0,
+            'failures': 0,
+            'invalidated': 0
+        }
+
+    def start(self, models: Iterable[str]):
+        """
+        Create entries for the given models before serving traffic
+
+        Args:
+            models: Model names the router may send turns to
+        """
+        if not self.enabled:
+            return
+        for model in models:
+            self._refresh(model)
+
+    def get(self, model: str) -> Optional[str]:
+        """
+        Name of a usable cachedContents entry for model
+
+        Args:
+            model: Model name without the models/ prefix
+
+        Returns:
+            Resource name such as cachedContents/abc123, or None to send the instruction inline
+        """
+        if not self.enabled:
+            return None
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(model)
+            remaining = entry['expires_at'] - now if entry else 0
+
+        if remaining <= self.refresh_margin:
+            self._schedule_refresh(model)
+
+        # Leave headroom so an entry never expires between lookup and use
+        if entry and remaining > min(30, self.refresh_margin):
+            self.stats['hits'] += 1
+            return entry['name']
+
+        self.stats['misses'] += 1
+        return None
+
+    def invalidate(self, model: str):
+        """Forget an entry the API no longer recognises"""
+        with self._lock:
+            if self._entries.pop(model, None):
+                self.stats['invalidated'] += 1
+                logger.warning(f"Context cache for {model} was rejected upstream; sending instructions inline")
+
+    @staticmethod
+    def is_cache_error(error: Exception) -> bool:
+        """Whether a generate call failed because its cachedContent is gone"""
+        return (
+            isinstance(error, GeminiAPIError)
+            and error.status_code in (400, 403, 404)
+            and 'cachedcontent' in error.body.lower()
+        )
+
+    @staticmethod
+    def is_too_small_error(error: Exception) -> bool:
+        """Whether a create failed because the content is below the model's caching minimum"""
+        if not isinstance(error, GeminiAPIError) or error.status_code != 400:
+            return False
+        body = error.body.lower()
+        return 'too small' in body or 'min_total_token_count' in body
+
+    def _schedule_refresh(self, model: str):
+        """Create or extend the entry for model on a background thread"""
+        with self._lock:
+            if model in self._refreshing or model in self._too_small or self._retry_after.get(model, 0) > time.monotonic():
+                return
+            self._refreshing.add(model)
+        threading.Thread(target=self._refresh, args=(model,), daemon=True, name='context-cache').start()
+
+    def _refresh(self, model: str):
+        """Extend the current entry, or create a new one if that fails"""
+        with self._lock:
+            self._refreshing.add(model)
+            entry = self._entries.get(model)
+
+        try:
+            resource = None
+            if entry:
+                try:
+                    resource = self.client.update_cached_content_ttl(entry['name'], self.ttl)
+                    self.stats['extended'] += 1
+                except Exception as e:
+                    logger.warning(f"Extending context cache {entry['name']} failed, recreating: {e}")
+
+            if resource is None:
+                resource = self.client.create_cached_content(
+                    model, self.system_instruction, self.ttl, display_name='narad-system-instruction'
+                )
+                self.stats['created'] += 1
+                logger.info(f"🗂️ Created context cache {resource.get('name')} for {model} (ttl {self.ttl}s)")
+
+            with self._lock:
+                self._entries[model] = {
+                    'name': resource['name'],
+                    'expires_at': time.monotonic() + self.ttl
+                }
+                self._retry_after.pop(model, None)
+        except Exception as e:
+            self.stats['failures'] += 1
+            if self.is_too_small_error(e):
+                with self._lock:
+                    self._too_small.add(model)
+                logger.warning(
+                    f"Context caching off for {model}: the system instruction (~{self.instruction_tokens} tokens) "
+                    f"is below its caching minimum: {str(e)[:200]}"
+                )
+                return
+            with self._lock:
+                self._retry_after[model] = time.monotonic() + self.retry_interval
+            logger.warning(f"Context cache unavailable for {model}, using inline instructions: {str(e)[:200]}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(model)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get context cache statistics"""
+        stats = dict(self.stats)
+        with self._lock:
+            now = time.monotonic()
+            stats['entries'] = {
+                model: {'name': entry['name'], 'expires_in': round(entry['expires_at'] - now)}
+                for model, entry in self._entries.items()
+            }
+            stats['too_small'] = sorted(self._too_small)
+        stats['instruction_tokens'] = self.instruction_tokens
+        stats['enabled'] = self.enabled
+        return stats
@@ -0,0 +1,493 @@
+"""
+Gemini REST Client
+Long-lived, pooled HTTP client for the Gemini generateContent REST API
+"""
+
+import json
+import logging
+import sys
+from typing import Dict, List, Optional, Any, Tuple, Iterator, AsyncIterator
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+
+class GeminiAPIError(Exception):
+    """Raised when the Gemini REST API answers with a non-success status"""
+
+    def __init__(self, status_code: int, body: str = ''):
+        self.status_code = status_code
+        self.body = body
+        super().__init__(f"Gemini API Error {status_code}: {body[:200]}")
+
+
+def is_retryable_error(error: Exception) -> bool:
+    """
+    Decide whether a failed Gemini call is worth retrying
+
+    Rate limiting (429), server errors (5xx), connection failures and timeouts
+    are transient; anything else (bad request, auth) will fail again.
+    """
+    if isinstance(error, GeminiAPIError):
+        return error.status_code == 429 or error.status_code >= 500
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+
+    # httpx is only imported by the async client, so check it lazily
+    httpx = sys.modules.get('httpx')
+    return bool(httpx) and isinstance(error, httpx.TransportError)
+
+
+def is_overload_error(error: Exception) -> bool:
+    """
+    Decide whether a failed Gemini call means the upstream is overloaded
+
+    Rate limiting (429), "model overloaded" (503) and timeouts say to send
+    less; other failures say nothing about capacity.
+    """
+    if isinstance(error, GeminiAPIError):
+        return error.status_code in (429, 503)
+    if isinstance(error, requests.Timeout):
+        return True
+
+    httpx = sys.modules.get('httpx')
+    return bool(httpx) and isinstance(error, httpx.TimeoutException)
+
+
+def parse_stream_line(line: str) -> List[str]:
+    """
+    Extract text fragments from one line of a streamGenerateContent SSE body
+
+    Args:
+        line: Raw line; frames look like "data: {...}"
+
+    Returns:
+        Text fragments carried by the frame (empty for keep-alives and separators)
+    """
+    if not line or not line.startswith('data:'):
+        return []
+    try:
+        chunk = json.loads(line[5:].strip())
+    except ValueError:
+        logger.warning("Skipping malformed Gemini stream frame")
+        return []
+
+    candidates = chunk.get('candidates') or []
+    if not candidates:
+        return []
+    return [part['text'] for part in candidates[0].get('content', {}).get('parts') or [] if part.get('text')]
+
+
+class GeminiClient:
+    """
+    Thread-safe Gemini REST client that keeps a bounded pool of keep-alive
+    connections, so chat turns reuse TCP/TLS sessions instead of paying
+    DNS, connect and handshake costs on every request
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        api_endpoint: str = 'https://generativelanguage.googleapis.com/v1beta/models',
+        pool_connections: int = 4,
+        pool_maxsize: int = 16,
+        pool_block: bool = True,
+        connect_timeout: float = 3.05,
+        read_timeout: float = 30.0
+    ):
+        """
+        Initialize the client and its connection pool
+
+        Args:
+            api_key: Gemini API key (sent as a header, never in the URL)
+            api_endpoint: Base models endpoint, e.g. .../v1beta/models
+            pool_connections: Number of host pools to cache
+            pool_maxsize: Maximum keep-alive connections per host
+            pool_block: Wait for a free connection instead of opening extra ones
+            connect_timeout: Seconds allowed for establishing a connection
+            read_timeout: Seconds allowed between bytes of the response
+        """
+        self.api_endpoint = api_endpoint.rstrip('/')
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+            max_retries=0
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'Content-Type': 'application/json',
+            'Connection': 'keep-alive',
+            'x-goog-api-key': api_key
+        })
+
+        self.stats = {
+            'requests': 0,
+            'errors': 0,
+            'warmed_up': False
+        }
+
+        logger.info(
+            f"Gemini client initialized (pool_maxsize={pool_maxsize}, "
+            f"timeouts={connect_timeout}s/{read_timeout}s)"
+        )
+
+    def _timeout(self, read_timeout: Optional[float] = None) -> Tuple[float, float]:
+        """Build a (connect, read) timeout tuple"""
+        return (self.connect_timeout, read_timeout if read_timeout is not None else self.read_timeout)
+
+    def generate_content(
+        self,
+        model: str,
+        payload: Dict[str, Any],
+        read_timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Call models/{model}:generateContent
+
+        Args:
+            model: Model name without the models/ prefix
+            payload: Request body (contents, generationConfig, ...)
+            read_timeout: Optional override for the read timeout
+
+        Returns:
+            Parsed JSON response
+
+        Raises:
+            GeminiAPIError: On a non-200 response
+            requests.RequestException: On connection or timeout errors
+        """
+        url = f"{self.api_endpoint}/{model}:generateContent"
+        self.stats['requests'] += 1
+
+        response = self.session.post(url, json=payload, timeout=self._timeout(read_timeout))
+        if response.status_code != 200:
+            self.stats['errors'] += 1
+            raise GeminiAPIError(response.status_code, response.text)
+
+        return response.json()
+
+    def stream_generate_content(
+        self,
+        model: str,
+        payload: Dict[str, Any],
+        read_timeout: Optional[float] = None
+    ) -> Iterator[str]:
+        """
+        Call models/{model}:streamGenerateContent and yield text as it arrives
+
+        Args:
+            model: Model name without the models/ prefix
+            payload: Request body (contents, generationConfig, ...)
+            read_timeout: Optional override for the per-chunk read timeout
+
+        Yields:
+            Text fragments in generation order
+
+        Raises:
+            GeminiAPIError: On a non-200 response
+            requests.RequestException: On connection or timeout errors
+        """
+        url = f"{self.api_endpoint}/{model}:streamGenerateContent"
+        self.stats['requests'] += 1
+
+        with self.session.post(
+            url,
+            params={'alt': 'sse'},
+            json=payload,
+            timeout=self._timeout(read_timeout),
+            stream=True
+        ) as response:
+            if response.status_code != 200:
+                self.stats['errors'] += 1
+                raise GeminiAPIError(response.status_code, response.text)
+
+            # text/event-stream carries no charset, and requests would fall back to ISO-8859-1
+            response.encoding = 'utf-8'
+            for line in response.iter_lines(decode_unicode=True):
+                for text in parse_stream_line(line):
+                    yield text
+
+    def _cached_contents_url(self, name: str = '') -> str:
+        """cachedContents lives beside models/ under the same API version"""
+        base = self.api_endpoint.rsplit('/models', 1)[0]
+        return f"{base}/{name}" if name else f"{base}/cachedContents"
+
+    def create_cached_content(
+        self,
+        model: str,
+        system_instruction: str,
+        ttl_seconds: int,
+        display_name: str = ''
+    ) -> Dict[str, Any]:
+        """
+        Create a cachedContents entry holding a system instruction
+
+        Args:
+            model: Model name without the models/ prefix (a cache is bound to one model)
+            system_instruction: Static instruction text to cache
+            ttl_seconds: Lifetime of the entry
+            display_name: Optional label shown when listing caches
+
+        Returns:
+            The created resource, including 'name' and 'expireTime'
+
+        Raises:
+            GeminiAPIError: On a non-200 response (e.g. content below the model's minimum)
+        """
+        body = {
+            'model': f"models/{model}",
+            'systemInstruction': {'parts': [{'text': system_instruction}]},
+            'ttl': f"{int(ttl_seconds)}s"
+        }
+        if display_name:
+            body['displayName'] = display_name
+
+        response = self.session.post(self._cached_contents_url(), json=body, timeout=self._timeout())
+        if response.status_code != 200:
+            raise GeminiAPIError(response.status_code, response.text)
+        return response.json()
+
+    def update_cached_content_ttl(self, name: str, ttl_seconds: int) -> Dict[str, Any]:
+        """
+        Extend a cachedContents entry
+
+        Args:
+            name: Resource name, e.g. cachedContents/abc123
+            ttl_seconds: New lifetime counted from now
+
+        Returns:
+            The updated resource
+        """
+        response = self.session.patch(
+            self._cached_contents_url(name),
+            params={'updateMask': 'ttl'},
+            json={'ttl': f"{int(ttl_seconds)}s"},
+            timeout=self._timeout()
+        )
+        if response.status_code != 200:
+            raise GeminiAPIError(response.status_code, response.text)
+        return response.json()
+
+    def delete_cached_content(self, name: str):
+        """Delete a cachedContents entry (missing entries are ignored)"""
+        response = self.session.delete(self._cached_contents_url(name), timeout=self._timeout())
+        if response.status_code not in (200, 404):
+            raise GeminiAPIError(response.status_code, response.text)
+
+    def list_models(self, page_size: int = 50) -> List[Dict[str, Any]]:
+        """
+        List models visible to the configured API key
+
+        Args:
+            page_size: Maximum number of models to return
+
+        Returns:
+            List of model descriptors as returned by the REST API
+        """
+        response = self.session.get(
+            self.api_endpoint,
+            params={'pageSize': page_size},
+            timeout=self._timeout()
+        )
+        if response.status_code != 200:
+            raise GeminiAPIError(response.status_code, response.text)
+
+        return response.json().get('models', [])
+
+    def warm_up(self) -> bool:
+        """
+        Open a pooled connection ahead of the first chat turn so DNS, TCP and
+        TLS setup happen at boot rather than on a user's request
+
+        Returns:
+            Whether the warm-up request succeeded
+        """
+        try:
+            self.list_models(page_size=1)
+            self.stats['warmed_up'] = True
+            logger.info("Gemini connection pool warmed up")
+            return True
+        except Exception as e:
+            logger.warning(f"Gemini connection warm-up failed: {e}")
+            return False
+
+    @staticmethod
+    def extract_text(response_data: Dict[str, Any]) -> Optional[str]:
+        """
+        Extract the first candidate's text from a generateContent response
+
+        Args:
+            response_data: Parsed JSON response
+
+        Returns:
+            Stripped text or None if the response has no text part
+        """
+        candidates = response_data.get('candidates') or []
+        if not candidates:
+            return None
+
+        parts = candidates[0].get('content', {}).get('parts') or []
+        if parts and 'text' in parts[0]:
+            return parts[0]['text'].strip()
+
+        return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get client statistics"""
+        return dict(self.stats)
+
+    def close(self):
+        """Close all pooled connections"""
+        self.session.close()
+
+
+class AsyncGeminiClient:
+    """
+    asyncio counterpart of GeminiClient built on httpx, so an ASGI worker can
+    keep hundreds of Gemini calls in flight on one event loop
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        api_endpoint: str = 'https://generativelanguage.googleapis.com/v1beta/models',
+        pool_maxsize: int = 16,
+        connect_timeout: float = 3.05,
+        read_timeout: float = 30.0
+    ):
+        """
+        Initialize the client; the underlying httpx client is created on first
+        use so it binds to the event loop that serves requests
+
+        Args:
+            api_key: Gemini API key (sent as a header, never in the URL)
+            api_endpoint: Base models endpoint, e.g. .../v1beta/models
+            pool_maxsize: Maximum keep-alive connections
+            connect_timeout: Seconds allowed for establishing a connection
+            read_timeout: Seconds allowed between bytes of the response
+        """
+        self.api_key = api_key
+        self.api_endpoint = api_endpoint.rstrip('/')
+        self.pool_maxsize = pool_maxsize
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self._client = None
+
+        self.stats = {
+            'requests': 0,
+            'errors': 0
+        }
+
+    def _get_client(self):
+        """Create the pooled httpx.AsyncClient on first use"""
+        if self._client is None:
+            # httpx is only needed by the async entry point
+            import httpx
+
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.pool_maxsize,
+                    max_keepalive_connections=self.pool_maxsize
+                ),
+                timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+                headers={
+                    'Content-Type': 'application/json',
+                    'x-goog-api-key': self.api_key
+                }
+            )
+        return self._client
+
+    def _timeout(self, read_timeout: Optional[float] = None):
+        """Build an httpx timeout, honouring a per-call read timeout override"""
+        import httpx
+
+        return httpx.Timeout(
+            read_timeout if read_timeout is not None else self.read_timeout,
+            connect=self.connect_timeout
+        )
+
+    async def generate_content(
+        self,
+        model: str,
+        payload: Dict[str, Any],
+        read_timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Call models/{model}:generateContent
+
+        Args:
+            model: Model name without the models/ prefix
+            payload: Request body (contents, generationConfig, ...)
+            read_timeout: Optional override for the read timeout
+
+        Returns:
+            Parsed JSON response
+
+        Raises:
+            GeminiAPIError: On a non-200 response
+            httpx.HTTPError: On connection or timeout errors
+        """
+        url = f"{self.api_endpoint}/{model}:generateContent"
+        self.stats['requests'] += 1
+
+        response = await self._get_client().post(url, json=payload, timeout=self._timeout(read_timeout))
+        if response.status_code != 200:
+            self.stats['errors'] += 1
+            raise GeminiAPIError(response.status_code, response.text)
+
+        return response.json()
+
+    async def stream_generate_content(
+        self,
+        model: str,
+        payload: Dict[str, Any],
+        read_timeout: Optional[float] = None
+    ) -> AsyncIterator[str]:
+        """
+        Call models/{model}:streamGenerateContent and yield text as it arrives
+
+        Args:
+            model: Model name without the models/ prefix
+            payload: Request body (contents, generationConfig, ...)
+            read_timeout: Optional override for the per-chunk read timeout
+
+        Yields:
+            Text fragments in generation order
+        """
+        url = f"{self.api_endpoint}/{model}:streamGenerateContent"
+        self.stats['requests'] += 1
+
+        async with self._get_client().stream(
+            'POST',
+            url,
+            params={'alt': 'sse'},
+            json=payload,
+            timeout=self._timeout(read_timeout)
+        ) as response:
+            if response.status_code != 200:
+                self.stats['errors'] += 1
+                body = (await response.aread()).decode('utf-8', errors='replace')
+                raise GeminiAPIError(response.status_code, body)
+
+            response.encoding = 'utf-8'
+            async for line in response.aiter_lines():
+                for text in parse_stream_line(line):
+                    yield text
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get client statistics"""
+        return dict(self.stats)
+
+    async def aclose(self):
+        """Close all pooled connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
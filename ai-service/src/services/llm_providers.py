@@ -0,0 +1,491 @@
+"""
+LLM Provider Layer for Narad AI
+One gateway over Gemini and OpenAI with pooled clients, per-provider limits and failover
+"""
+
+import os
+import threading
+import time
+import logging
+from typing import Dict, List, Optional, Any, Tuple, Union
+
+from ..config.settings import GEMINI_CLIENT_CONFIG, ERROR_CONFIG, CONCURRENCY_CONFIG, LLM_PROVIDER_CONFIG
+from ..utils.resilience import RetryPolicy, CircuitBreaker
+from ..utils.concurrency import ConcurrencyLimiter, AdaptiveLimit
+from .gemini_client import GeminiClient, is_retryable_error, is_overload_error
+from .openai_client import OpenAIClient, OpenAIAPIError
+
+logger = logging.getLogger(__name__)
+
+# Chat roles the model answered with, as spelled by different callers
+ASSISTANT_ROLES = ('assistant', 'model', 'ai')
+
+
+class LLMProviderError(Exception):
+    """Raised when no provider could answer a request"""
+
+    def __init__(self, message: str, errors: Optional[Dict[str, Exception]] = None):
+        self.errors = errors or {}
+        super().__init__(message)
+
+
+def is_retryable_provider_error(error: Exception) -> bool:
+    """is_retryable_error extended to OpenAI API errors"""
+    if isinstance(error, OpenAIAPIError):
+        return error.status_code == 429 or error.status_code >= 500
+    return is_retryable_error(error)
+
+
+def is_overload_provider_error(error: Exception) -> bool:
+    """is_overload_error extended to OpenAI API errors"""
+    if isinstance(error, OpenAIAPIError):
+        return error.status_code in (429, 503)
+    return is_overload_error(error)
+
+
+def normalize_messages(messages: Union[str, List[Any]]) -> List[Dict[str, str]]:
+    """
+    Coerce a prompt or a list of messages into [{'role', 'content'}]
+
+    Args:
+        messages: A prompt string, or a list of strings / {'role', 'content'} dicts
+
+    Returns:
+        Messages with roles system, user or assistant
+    """
+    if isinstance(messages, str):
+        return [{'role': 'user', 'content': messages}]
+
+    normalized = []
+    for message in messages:
+        if isinstance(message, dict):
+            role = message.get('role', 'user')
+            role = 'assistant' if role in ASSISTANT_ROLES else role if role == 'system' else 'user'
+            normalized.append({'role': role, 'content': str(message.get('content', ''))})
+        else:
+            normalized.append({'role': 'user', 'content': str(message)})
+    return normalized
+
+
+def describe_provider_error(error: LLMProviderError) -> Tuple[Dict[str, Any], int]:
+    """
+    Client-facing body and HTTP status for a gateway failure
+
+    Provider error bodies can echo request details, so only the error types
+    are returned; the full errors belong in the server log.
+
+    Args:
+        error: The gateway's LLMProviderError
+
+    Returns:
+        (response body, status code): 503 when nothing is configured, else 502
+    """
+    if not error.errors:
+        return {'error': 'AI service not configured'}, 503
+    return {
+        'error': 'AI provider error',
+        'details': {name: type(e).__name__ for name, e in error.errors.items()}
+    }, 502
+
+
+def usable_api_key(api_key: Optional[str]) -> Optional[str]:
+    """
+    The API key, or None when it is unset, blank or a .env.example placeholder
+
+    Every component deciding whether a provider is configured goes through
+    this, so they agree on what counts as a key.
+    """
+    api_key = (api_key or '').strip()
+    if not api_key or api_key.lower().startswith('your'):
+        return None
+    return api_key
+
+
+class LLMProvider:
+    """
+    One upstream provider: a pooled client, an adaptive concurrency limit,
+    retries inside a deadline and a circuit breaker. Subclasses translate normalized
+    messages into the provider's request shape and its response back into
+
+        {'text', 'provider', 'model', 'finish_reason', 'usage', 'latency_ms'}
+    """
+
+    name = 'provider'
+
+    def __init__(
+        self,
+        client: Any,
+        model: str,
+        limiter: ConcurrencyLimiter,
+        retry_policy: RetryPolicy,
+        breaker: CircuitBreaker,
+        acquire_timeout: Optional[float] = None,
+        adaptive_limit: Optional[AdaptiveLimit] = None,
+        allowed_models: Optional[List[str]] = None
+    ):
+        """
+        Initialize the provider
+
+        Args:
+            client: Pooled REST client for the provider
+            model: Default model name
+            limiter: Cap on this provider's in-flight calls
+            retry_policy: Retries and total deadline per request
+            breaker: Circuit breaker for this provider
+            acquire_timeout: Seconds to wait for a free slot (None uses the caller's priority class timeout)
+            adaptive_limit: Controller adjusting the limiter from each attempt (None keeps it fixed)
+            allowed_models: Models a caller may ask for besides the default model
+        """
+        self.client = client
+        self.model = model
+        self.allowed_models = frozenset(allowed_models or ()) | {model}
+        self.limiter = limiter
+        self.retry_policy = retry_policy
+        self.breaker = breaker
+        self.acquire_timeout = acquire_timeout
+        self.adaptive_limit = adaptive_limit or AdaptiveLimit(limiter, enabled=False)
+
+        self.stats = {
+            'requests': 0,
+            'successes': 0,
+            'failures': 0
+        }
+
+    def _call(self, messages: List[Dict[str, str]], options: Dict[str, Any], model: str, timeout: float) -> Dict[str, Any]:
+        """Send one request; returns the normalized response without latency"""
+        raise NotImplementedError
+
+    def generate(
+        self,
+        messages: List[Dict[str, str]],
+        options: Optional[Dict[str, Any]] = None,
+        model: Optional[str] = None,
+        timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Generate an answer
+
+        Args:
+            messages: Normalized messages (see normalize_messages)
+            options: temperature, max_tokens and top_p, all optional
+            model: Model override (defaults to the provider's model)
+            timeout: Deadline override in seconds across retries
+
+        Returns:
+            Normalized response dict
+
+        Raises:
+            CircuitOpenError, LimitExceededError or the provider's last error
+        """
+        model = model or self.model
+        options = options or {}
+        self.stats['requests'] += 1
+        started = time.perf_counter()
+
+        try:
+            with self.limiter.slot(self.acquire_timeout):
+                result = self.retry_policy.call(
+                    lambda remaining: self.adaptive_limit.call(
+                        lambda: self._call(messages, options, model, min(remaining, self.client.read_timeout))
+                    ),
+                    self.breaker,
+                    timeout
+                )
+        except Exception:
+            self.stats['failures'] += 1
+            raise
+
+        self.stats['successes'] += 1
+        result['latency_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get provider statistics"""
+        return dict(
+            self.stats,
+            model=self.model,
+            allowed_models=sorted(self.allowed_models),
+            limiter=self.limiter.get_stats(),
+            adaptive_limit=self.adaptive_limit.get_stats(),
+            breaker=self.breaker.get_stats(),
+            retries=self.retry_policy.get_stats(),
+            client=self.client.get_stats()
+        )
+
+
+class GeminiProvider(LLMProvider):
+    """Gemini generateContent behind the provider interface"""
+
+    name = 'gemini'
+
+    def _call(self, messages: List[Dict[str, str]], options: Dict[str, Any], model: str, timeout: float) -> Dict[str, Any]:
+        system = '\n\n'.join(m['content'] for m in messages if m['role'] == 'system')
+        payload = {
+            'contents': [
+                {'role': 'model' if m['role'] == 'assistant' else 'user', 'parts': [{'text': m['content']}]}
+                for m in messages if m['role'] != 'system'
+            ],
+            'generationConfig': {
+                key: options[option]
+                for option, key in (('temperature', 'temperature'), ('max_tokens', 'maxOutputTokens'), ('top_p', 'topP'))
+                if options.get(option) is not None
+            }
+        }
+        if system:
+            payload['systemInstruction'] = {'parts': [{'text': system}]}
+
+        response_data = self.client.generate_content(model, payload, read_timeout=timeout)
+        candidates = response_data.get('candidates') or [{}]
+        usage = response_data.get('usageMetadata') or {}
+        return {
+            'text': GeminiClient.extract_text(response_data),
+            'provider': self.name,
+            'model': model,
+            'finish_reason': candidates[0].get('finishReason'),
+            'usage': {
+                'prompt_tokens': usage.get('promptTokenCount'),
+                'completion_tokens': usage.get('candidatesTokenCount'),
+                'total_tokens': usage.get('totalTokenCount')
+            }
+        }
+
+
+class OpenAIProvider(LLMProvider):
+    """OpenAI chat completions behind the provider interface"""
+
+    name = 'openai'
+
+    def _call(self, messages: List[Dict[str, str]], options: Dict[str, Any], model: str, timeout: float) -> Dict[str, Any]:
+        payload = {'model': model, 'messages': messages}
+        payload.update({key: options[key] for key in ('temperature', 'max_tokens', 'top_p') if options.get(key) is not None})
+
+        response_data = self.client.chat_completions(payload, read_timeout=timeout)
+        choices = response_data.get('choices') or [{}]
+        usage = response_data.get('usage') or {}
+        return {
+            'text': OpenAIClient.extract_text(response_data),
+            'provider': self.name,
+            'model': response_data.get('model', model),
+            'finish_reason': choices[0].get('finish_reason'),
+            'usage': {
+                'prompt_tokens': usage.get('prompt_tokens'),
+                'completion_tokens': usage.get('completion_tokens'),
+                'total_tokens': usage.get('total_tokens')
+            }
+        }
+
+
+class LLMGateway:
+    """
+    Tries providers in order and fails over to the next one when a provider
+    errors, times out, is circuit-open or has no free slot, so one provider's
+    outage does not take down every chat surface. Every provider keeps its
+    own pool, limit and breaker; a provider without an API key is skipped.
+    """
+
+    def __init__(self, providers: List[LLMProvider], failover_enabled: bool = True):
+        """
+        Initialize the gateway
+
+        Args:
+            providers: Configured providers in failover order
+            failover_enabled: When False only the first provider is tried
+        """
+        self.providers = {provider.name: provider for provider in providers}
+        self.order = [provider.name for provider in providers]
+        self.failover_enabled = failover_enabled
+
+        self.stats = {
+            'requests': 0,
+            'failovers': 0,
+            'exhausted': 0
+        }
+
+        logger.info(f"LLM gateway initialized (providers={self.order}, failover={failover_enabled})")
+
+    def get(self, name: str) -> Optional[LLMProvider]:
+        """The named provider, or None if it is not configured"""
+        return self.providers.get(name)
+
+    def generate(
+        self,
+        messages: Union[str, List[Any]],
+        system: Optional[str] = None,
+        options: Optional[Dict[str, Any]] = None,
+        preferred: Optional[str] = None,
+        model: Optional[str] = None,
+        exclude: Optional[List[str]] = None,
+        timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Answer with the first provider that succeeds
+
+        Args:
+            messages: Prompt string or list of messages
+            system: Optional system instruction
+            options: temperature, max_tokens and top_p, all optional
+            preferred: Provider to try first (defaults to the configured order)
+            model: Model override for the preferred provider (or the first one tried)
+            exclude: Providers not to try (e.g. one the caller already gave up on)
+            timeout: Deadline override per provider, in seconds
+
+        Returns:
+            Normalized response dict; 'failover' is True when the first choice failed
+
+        Raises:
+            ValueError: If model is not allowed for the provider it would be sent to
+            LLMProviderError: If no provider is configured or every provider failed
+        """
+        messages = normalize_messages(messages)
+        if system:
+            messages.insert(0, {'role': 'system', 'content': system})
+
+        order = [name for name in self.order if name not in (exclude or [])]
+        if preferred in order:
+            order.remove(preferred)
+            order.insert(0, preferred)
+        if not order:
+            raise LLMProviderError('No LLM provider is configured')
+        if not self.failover_enabled:
+            order = order[:1]
+
+        model_provider = preferred or order[0]
+        if model and model_provider in order and model not in self.providers[model_provider].allowed_models:
+            raise ValueError(f"Model {model!r} is not allowed for {model_provider}")
+
+        self.stats['requests'] += 1
+        errors = {}
+        for name in order:
+            provider = self.providers[name]
+            try:
+                result = provider.generate(messages, options, model if name == model_provider else None, timeout)
+            except Exception as e:
+                errors[name] = e
+                logger.warning(f"🔀 {name} failed ({type(e).__name__}: {str(e)[:100]})")
+                continue
+
+            result['failover'] = bool(errors)
+            if errors:
+                self.stats['failovers'] += 1
+                logger.warning(f"🔀 Answered by {name} after {', '.join(errors)} failed")
+            return result
+
+        self.stats['exhausted'] += 1
+        raise LLMProviderError(f"All LLM providers failed: {', '.join(errors)}", errors)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get gateway and per-provider statistics"""
+        return dict(
+            self.stats,
+            order=self.order,
+            failover_enabled=self.failover_enabled,
+            providers={name: provider.get_stats() for name, provider in self.providers.items()}
+        )
+
+
+def _build_limiter(max_concurrent: int) -> Tuple[ConcurrencyLimiter, AdaptiveLimit]:
+    """A provider's limiter and the AIMD controller that moves it within CONCURRENCY_CONFIG bounds"""
+    limiter = ConcurrencyLimiter(
+        max_concurrent,
+        max_queue=CONCURRENCY_CONFIG['max_queue'],
+        classes=CONCURRENCY_CONFIG['priority_classes']
+    )
+    adaptive_limit = AdaptiveLimit(
+        limiter,
+        min_limit=CONCURRENCY_CONFIG['min_concurrent'],
+        max_limit=max_concurrent,
+        initial_limit=CONCURRENCY_CONFIG['initial_concurrent'],
+        backoff_ratio=CONCURRENCY_CONFIG['backoff_ratio'],
+        latency_tolerance=CONCURRENCY_CONFIG['latency_tolerance'],
+        cooldown=CONCURRENCY_CONFIG['decrease_cooldown'],
+        is_overload=is_overload_provider_error,
+        enabled=CONCURRENCY_CONFIG['adaptive']
+    )
+    return limiter, adaptive_limit
+
+
+def build_llm_gateway() -> LLMGateway:
+    """Build a gateway from settings and the GEMINI_API_KEY / OPENAI_API_KEY env vars"""
+    providers = []
+    for name in LLM_PROVIDER_CONFIG['failover_order']:
+        if name == 'gemini':
+            api_key = usable_api_key(os.getenv('GEMINI_API_KEY'))
+            if not api_key:
+                continue
+            client = GeminiClient(
+                api_key=api_key,
+                api_endpoint=GEMINI_CLIENT_CONFIG['api_endpoint'],
+                pool_connections=GEMINI_CLIENT_CONFIG['pool_connections'],
+                pool_maxsize=GEMINI_CLIENT_CONFIG['pool_maxsize'],
+                pool_block=GEMINI_CLIENT_CONFIG['pool_block'],
+                connect_timeout=GEMINI_CLIENT_CONFIG['connect_timeout'],
+                read_timeout=GEMINI_CLIENT_CONFIG['read_timeout']
+            )
+            limiter, adaptive_limit = _build_limiter(CONCURRENCY_CONFIG['max_concurrent'])
+            providers.append(GeminiProvider(
+                client=client,
+                model=os.getenv('MODEL_NAME', 'gemini-1.5-pro'),
+                allowed_models=LLM_PROVIDER_CONFIG['allowed_models']['gemini'],
+                limiter=limiter,
+                adaptive_limit=adaptive_limit,
+                retry_policy=RetryPolicy(
+                    max_retries=ERROR_CONFIG['max_retries'],
+                    base_delay=ERROR_CONFIG['retry_base_delay'],
+                    max_delay=ERROR_CONFIG['retry_max_delay'],
+                    total_timeout=ERROR_CONFIG['timeout_duration'],
+                    is_retryable=is_retryable_provider_error
+                ),
+                breaker=CircuitBreaker(
+                    failure_threshold=ERROR_CONFIG['circuit_failure_threshold'],
+                    recovery_timeout=ERROR_CONFIG['circuit_recovery_timeout']
+                )
+            ))
+        elif name == 'openai':
+            api_key = usable_api_key(os.getenv('OPENAI_API_KEY'))
+            if not api_key:
+                continue
+            config = LLM_PROVIDER_CONFIG['openai']
+            client = OpenAIClient(
+                api_key=api_key,
+                api_base=config['api_base'],
+                pool_maxsize=config['pool_maxsize'],
+                connect_timeout=config['connect_timeout'],
+                read_timeout=config['read_timeout']
+            )
+            limiter, adaptive_limit = _build_limiter(config['max_concurrent'])
+            providers.append(OpenAIProvider(
+                client=client,
+                model=config['model'],
+                allowed_models=LLM_PROVIDER_CONFIG['allowed_models']['openai'],
+                limiter=limiter,
+                adaptive_limit=adaptive_limit,
+                retry_policy=RetryPolicy(
+                    max_retries=config['max_retries'],
+                    base_delay=ERROR_CONFIG['retry_base_delay'],
+                    max_delay=ERROR_CONFIG['retry_max_delay'],
+                    total_timeout=ERROR_CONFIG['timeout_duration'],
+                    is_retryable=is_retryable_provider_error
+                ),
+                breaker=CircuitBreaker(
+                    failure_threshold=ERROR_CONFIG['circuit_failure_threshold'],
+                    recovery_timeout=ERROR_CONFIG['circuit_recovery_timeout']
+                )
+            ))
+        else:
+            logger.warning(f"Ignoring unknown LLM provider {name!r} in LLM_FAILOVER_ORDER")
+
+    return LLMGateway(providers, failover_enabled=LLM_PROVIDER_CONFIG['failover_enabled'])
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_llm_gateway() -> LLMGateway:
+    """Process-wide gateway, so every chat surface shares the same pools, limits and breakers"""
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                _gateway = build_llm_gateway()
+    return _gateway
@@ -0,0 +1,205 @@
+"""
+Model Router for Narad AI
+Chooses a model tier and generation settings per chat turn from hot-reloadable rules
+"""
+
+import copy
+import json
+import os
+import threading
+import time
+import logging
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Generation settings the service used before routing existed
+DEFAULT_GENERATION_CONFIG = {
+    'temperature': 0.7,
+    'maxOutputTokens': 500,
+    'topP': 0.9,
+    'topK': 40
+}
+
+
+class ModelRouter:
+    """
+    Routes each turn to a model tier (e.g. a fast/cheap tier and a
+    high-quality tier) using the classified intent, message length and
+    history size.
+
+    Rules are read from a JSON file and re-read when the file changes, so
+    tiers and thresholds can be tuned without a restart. A tier whose model
+    is null uses the primary MODEL_NAME. Rules are evaluated in order; every
+    condition a rule specifies must hold, and the first match wins:
+
+        intents                 intent must be one of these
+        min_message_chars       message length >= value
+        max_message_chars       message length <= value
+        min_history_messages    history size >= value
+        max_history_messages    history size <= value
+    """
+
+    def __init__(
+        self,
+        primary_model: str,
+        rules_path: Optional[str] = None,
+        reload_interval: float = 5.0,
+        enabled: bool = True
+    ):
+        """
+        Initialize the router
+
+        Args:
+            primary_model: Model used by tiers that do not name one
+            rules_path: JSON rules file (None uses a single primary tier)
+            reload_interval: Minimum seconds between checks for file changes
+            enabled: When False every turn goes to the primary model
+        """
+        self.primary_model = primary_model
+        self.rules_path = rules_path
+        self.reload_interval = reload_interval
+        self.enabled = enabled
+
+        self._lock = threading.Lock()
+        self._config = self._default_config()
+        self._mtime = None
+        self._last_check = 0.0
+
+        self.stats = {
+            'routed': {},
+            'reloads': 0,
+            'reload_errors': 0
+        }
+
+        if enabled and rules_path:
+            self._reload(force=True)
+
+        logger.info(f"Model router initialized (enabled={enabled}, tiers={list(self._config['tiers'])})")
+
+    def _default_config(self) -> Dict[str, Any]:
+        """Single-tier configuration matching pre-routing behaviour"""
+        return {
+            'default_tier': 'quality',
+            'tiers': {
+                'quality': {'model': None, 'generation_config': dict(DEFAULT_GENERATION_CONFIG)}
+            },
+            'rules': []
+        }
+
+    def _validate(self, config: Dict[str, Any]):
+        """Raise ValueError if a rules file is inconsistent"""
+        tiers = config.get('tiers')
+        if not isinstance(tiers, dict) or not tiers:
+            raise ValueError('tiers must be a non-empty object')
+        if config.get('default_tier') not in tiers:
+            raise ValueError(f"default_tier {config.get('default_tier')!r} is not a defined tier")
+        for rule in config.get('rules', []):
+            if rule.get('tier') not in tiers:
+                raise ValueError(f"rule {rule.get('name', rule)!r} targets unknown tier {rule.get('tier')!r}")
+
+    def _reload(self, force: bool = False):
+        """Re-read the rules file if it changed; keep the last good rules on error"""
+        now = time.monotonic()
+        if not force and now - self._last_check < self.reload_interval:
+            return
+        self._last_check = now
+
+        try:
+            mtime = os.path.getmtime(self.rules_path)
+        except OSError as e:
+            if force:
+                logger.warning(f"Model routing rules not found at {self.rules_path}: {e}")
+            return
+        if mtime == self._mtime:
+            return
+
+        try:
+            with open(self.rules_path, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+            config.setdefault('rules', [])
+            self._validate(config)
+        except (OSError, ValueError) as e:
+            self.stats['reload_errors'] += 1
+            logger.error(f"Ignoring invalid model routing rules in {self.rules_path}: {e}")
+            self._mtime = mtime
+            return
+
+        with self._lock:
+            self._config = config
+            self._mtime = mtime
+        self.stats['reloads'] += 1
+        logger.info(f"Loaded model routing rules ({len(config['rules'])} rules, tiers={list(config['tiers'])})")
+
+    @staticmethod
+    def _matches(rule: Dict[str, Any], intent: str, message_chars: int, history_size: int) -> bool:
+        """Check every condition the rule specifies"""
+        if 'intents' in rule and intent not in rule['intents']:
+            return False
+        if 'min_message_chars' in rule and message_chars < rule['min_message_chars']:
+            return False
+        if 'max_message_chars' in rule and message_chars > rule['max_message_chars']:
+            return False
+        if 'min_history_messages' in rule and history_size < rule['min_history_messages']:
+            return False
+        if 'max_history_messages' in rule and history_size > rule['max_history_messages']:
+            return False
+        return True
+
+    def route(self, intent: str, message: str, history_size: int = 0) -> Dict[str, Any]:
+        """
+        Choose the tier for a turn
+
+        Args:
+            intent: Intent from NaradAI._classify_intent
+            message: The user's message
+            history_size: Number of messages already in the session
+
+        Returns:
+            Dict with 'tier', 'model', 'generation_config' and the matching 'rule'
+        """
+        if self.enabled and self.rules_path:
+            self._reload()
+
+        with self._lock:
+            config = self._config
+
+        tier_name, rule_name = config['default_tier'], 'default'
+        if self.enabled:
+            message_chars = len(message)
+            for rule in config['rules']:
+                if self._matches(rule, intent, message_chars, history_size):
+                    tier_name, rule_name = rule['tier'], rule.get('name', rule['tier'])
+                    break
+        else:
+            config = self._default_config()
+            tier_name = config['default_tier']
+
+        tier = config['tiers'][tier_name]
+        self.stats['routed'][tier_name] = self.stats['routed'].get(tier_name, 0) + 1
+
+        return {
+            'tier': tier_name,
+            'model': tier.get('model') or self.primary_model,
+            'generation_config': copy.deepcopy(tier.get('generation_config') or DEFAULT_GENERATION_CONFIG),
+            'rule': rule_name
+        }
+
+    def get_tiers(self) -> List[str]:
+        """Names of the configured tiers"""
+        with self._lock:
+            return list(self._config['tiers'])
+
+    def get_models(self) -> List[str]:
+        """Distinct models the configured tiers can route to"""
+        with self._lock:
+            tiers = list(self._config['tiers'].values()) if self.enabled else []
+        models = [tier.get('model') or self.primary_model for tier in tiers] or [self.primary_model]
+        return list(dict.fromkeys(models))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get routing statistics"""
+        stats = copy.deepcopy(self.stats)
+        stats['enabled'] = self.enabled
+        stats['rules_path'] = self.rules_path
+        return stats
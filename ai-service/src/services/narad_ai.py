@@ -7,39 +7,155 @@ import os
 import json
 import logging
 import re
+import asyncio
+import contextvars
+import threading
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Dict, List, Optional, Any, Union
-import google.generativeai as genai
-from google.generativeai.client import configure
-from google.generativeai.generative_models import GenerativeModel
-from google.generativeai.types import GenerationConfig
+from typing import Dict, List, Optional, Any, Union, Iterator, AsyncIterator
 
 # Try to import AI_CONFIG, with fallback if import fails
 try:
-    from ..config.settings import AI_CONFIG
+    from ..config.settings import AI_CONFIG, GEMINI_CLIENT_CONFIG, PERFORMANCE_CONFIG, ERROR_CONFIG, HEDGING_CONFIG, MODEL_ROUTING_CONFIG, TOKEN_BUDGET_CONFIG, CONTEXT_CACHE_CONFIG, CONCURRENCY_CONFIG, PREFETCH_CONFIG, DEADLINE_CONFIG, METRICS_CONFIG
 except ImportError:
     # Fallback configuration if import fails
     AI_CONFIG = {
         'temperature': 0.7,
         'max_tokens': 350  # Reduced for concise responses
     }
+    GEMINI_CLIENT_CONFIG = {
+        'api_endpoint': 'https://generativelanguage.googleapis.com/v1beta/models',
+        'pool_connections': 4,
+        'pool_maxsize': 16,
+        'pool_block': True,
+        'connect_timeout': 3.05,
+        'read_timeout': 30,
+        'async_max_connections': 256,
+        'warmup_on_start': True
+    }
+    PERFORMANCE_CONFIG = {
+        'cache_enabled': True,
+        'cache_duration': 3600,
+        'response_caching': True,
+        'cache_max_entries': 2048,
+        'cache_stale_duration': 600,
+        'cache_path': None
+    }
+    ERROR_CONFIG = {
+        'max_retries': 3,
+        'fallback_responses': True,
+        'graceful_degradation': True,
+        'timeout_duration': 30,
+        'retry_base_delay': 0.25,
+        'retry_max_delay': 4,
+        'circuit_failure_threshold': 5,
+        'circuit_recovery_timeout': 30
+    }
+    HEDGING_CONFIG = {
+        'enabled': False,
+        'hedge_model': 'gemini-1.5-flash',
+        'latency_percentile': 95,
+        'initial_delay': 2.0,
+        'min_delay': 0.5,
+        'max_delay': 10,
+        'window_size': 200,
+        'min_samples': 20,
+        'max_workers': 32,
+        'max_hedges': 8
+    }
+    MODEL_ROUTING_CONFIG = {
+        'enabled': True,
+        'rules_path': os.path.join(os.path.dirname(os.path.dirname(__file__)), 'config', 'model_routing.json'),
+        'reload_interval': 5
+    }
+    TOKEN_BUDGET_CONFIG = {
+        'enabled': True,
+        'history_budget': 400,
+        'max_history_pairs': 3,
+        'excerpt_tokens': 80,
+        'default_output_tokens': AI_CONFIG['max_tokens'],
+        'output_tokens': {}
+    }
+    CONTEXT_CACHE_CONFIG = {
+        'enabled': True,
+        'ttl': 3600,
+        'refresh_margin': 300,
+        'retry_interval': 300,
+        'min_tokens': 1024,
+        'create_on_start': True
+    }
+    CONCURRENCY_CONFIG = {
+        'max_concurrent': 32,
+        'acquire_timeout': 5,
+        'max_queue': 64
+    }
+    PREFETCH_CONFIG = {
+        'enabled': False,
+        'ttl': 120,
+        'max_sessions': 5000,
+        'max_workers': 4,
+        'max_pending': 64,
+        'wait_timeout': 30
+    }
+    DEADLINE_CONFIG = {
+        'default_timeout': 0,
+        'max_timeout': 120,
+        'min_upstream_budget': 1.0
+    }
+    METRICS_CONFIG = {
+        'slow_turn_seconds': 5
+    }
 
 from ..utils.cultural_knowledge import CulturalKnowledgeBase
 from ..utils.conversation_memory import ConversationMemory
+from ..utils.response_cache import ResponseCache, STALE
+from ..utils.single_flight import SingleFlight
+from ..utils.resilience import RetryPolicy, CircuitBreaker, CircuitOpenError, OPEN
+from ..utils.hedging import HedgePolicy
+from ..utils.token_budget import TokenBudget
+from ..utils.concurrency import ConcurrencyLimiter, AdaptiveLimit, LimitExceededError, upstream_priority, current_priority
+from ..utils.deadline import Deadline, DeadlineExceededError, current_deadline, deadline_passed, deadline_scope, cap_timeout
+from ..utils.logger import log_event, log_performance
+from ..utils.metrics import COUNTER, GAUGE, HISTOGRAM, StageTimer, get_metrics
+from .model_router import ModelRouter
+from .context_cache import ContextCache
+from .gemini_client import GeminiClient, AsyncGeminiClient, GeminiAPIError, is_retryable_error, is_overload_error
+from .llm_providers import LLMGateway, LLMProviderError, get_llm_gateway, usable_api_key
+from .suggestion_prefetcher import SuggestionPrefetcher
 
 logger = logging.getLogger(__name__)
 
+# Session used for cache warm-up; it never stores messages, so its history stays
+# empty and warmed entries are the ones a session's opening message looks up
+WARMUP_SESSION_ID = '__cache_warmup__'
+
 class NaradAI:
     """
     Narad AI - The intelligent cultural guide that provides personalized
     storytelling experiences about Indian heritage and culture
     """
     
-    def __init__(self):
-        """Initialize Narad AI with necessary configurations"""
-        # Initialize knowledge base and memory
-        self.knowledge_base = CulturalKnowledgeBase()
-        self.conversation_memory = ConversationMemory()
+    # Suggestions of these intents refer to the previous answer and need the history
+    CONTEXTUAL_SUGGESTION_INTENTS = ('version_inquiry',)
+    
+    # One message per supported script, run through the detection tables by warm_up
+    WARMUP_PROBES = (
+        'Tell me a story about the Taj Mahal', 'ताजमहल की कहानी', 'তাজমহলের গল্প', 'தாஜ்மஹால் கதை',
+        'తాజ్ మహల్ కథ', 'ತಾಜ್ ಮಹಲ್ ಕಥೆ', 'താജ്മഹൽ കഥ', 'ਤਾਜ ਮਹਿਲ ਦੀ ਕਹਾਣੀ', 'તાજમહેલની વાર્તા', 'ତାଜମହଲ କାହାଣୀ'
+    )
+    
+    def __init__(self, llm_gateway: Optional[LLMGateway] = None):
+        """
+        Initialize Narad AI with necessary configurations
+        
+        Args:
+            llm_gateway: Provider layer to use (defaults to the process-wide one)
+        """
+        # Read-only data: never modified after construction. Under gunicorn
+        # preload it is built in the master (see prime()) and shared with the
+        # workers copy-on-write; everything after system_instruction is
+        # per-process state.
+        self._knowledge_base = None
         
         # AI personality and behavior settings
         self.personality = {
@@ -71,32 +187,173 @@ class NaradAI:
         # Conversation context templates
         self.context_templates = self._load_context_templates()
         
+        # Suggestion chips (see suggestion_messages for the standalone ones)
+        self.suggestion_templates = self._load_suggestion_templates()
+        self.greeting_suggestions = [
+            "Tell me about a historical monument",
+            "Share a mythological story",
+            "Recommend cultural experiences"
+        ]
+        self.system_instruction = self._build_system_instruction()
+        
+        # Per-process mutable state: sessions, caches and upstream clients
+        self.conversation_memory = ConversationMemory()
+        
+        # Cache of generated answers (in-process LRU in front of a SQLite file)
+        self.response_cache = ResponseCache(
+            max_entries=PERFORMANCE_CONFIG['cache_max_entries'],
+            ttl=PERFORMANCE_CONFIG['cache_duration'],
+            stale_ttl=PERFORMANCE_CONFIG['cache_stale_duration'],
+            disk_path=PERFORMANCE_CONFIG['cache_path'],
+            enabled=PERFORMANCE_CONFIG['cache_enabled'] and PERFORMANCE_CONFIG['response_caching']
+        )
+        self._background_tasks = set()
+        
+        # Concurrent identical prompts share one upstream call
+        self.single_flight = SingleFlight()
+        
+        # Turns whose request deadline leaves less than this are answered locally
+        self.min_upstream_budget = DEADLINE_CONFIG['min_upstream_budget']
+        
+        # Provider layer shared with the /api/ai proxy blueprints: its Gemini
+        # pool, adaptive limit, retries and breaker are ours too, and its
+        # other providers take over when Gemini fails
+        self.llm_gateway = llm_gateway or get_llm_gateway()
+        gemini_provider = self.llm_gateway.get('gemini')
+        if gemini_provider:
+            self.retry_policy = gemini_provider.retry_policy
+            self.circuit_breaker = gemini_provider.breaker
+            self.upstream_limiter = gemini_provider.limiter
+            self.adaptive_limit = gemini_provider.adaptive_limit
+        else:
+            # Retries with backoff inside one deadline, and a breaker that fails
+            # fast to local contextual responses during an upstream outage
+            self.retry_policy = RetryPolicy(
+                max_retries=ERROR_CONFIG['max_retries'],
+                base_delay=ERROR_CONFIG['retry_base_delay'],
+                max_delay=ERROR_CONFIG['retry_max_delay'],
+                total_timeout=ERROR_CONFIG['timeout_duration'],
+                is_retryable=is_retryable_error
+            )
+            self.circuit_breaker = CircuitBreaker(
+                failure_threshold=ERROR_CONFIG['circuit_failure_threshold'],
+                recovery_timeout=ERROR_CONFIG['circuit_recovery_timeout']
+            )
+            # One budget of in-flight upstream calls shared by chat, streams and batches,
+            # scheduled by priority class
+            self.upstream_limiter = ConcurrencyLimiter(
+                CONCURRENCY_CONFIG['max_concurrent'],
+                CONCURRENCY_CONFIG['max_queue'],
+                CONCURRENCY_CONFIG.get('priority_classes')
+            )
+            self.adaptive_limit = AdaptiveLimit(self.upstream_limiter, enabled=False)
+        
+        # Optional hedging of slow primary calls with a faster model
+        self.hedge_model = HEDGING_CONFIG['hedge_model'] if HEDGING_CONFIG['enabled'] else None
+        self.hedge_policy = HedgePolicy(
+            latency_percentile=HEDGING_CONFIG['latency_percentile'],
+            initial_delay=HEDGING_CONFIG['initial_delay'],
+            min_delay=HEDGING_CONFIG['min_delay'],
+            max_delay=HEDGING_CONFIG['max_delay'],
+            window_size=HEDGING_CONFIG['window_size'],
+            min_samples=HEDGING_CONFIG['min_samples'],
+            max_workers=HEDGING_CONFIG['max_workers'],
+            max_hedges=HEDGING_CONFIG['max_hedges']
+        )
+        
+        # Token budgets for prompt history and answer length
+        self.token_budget = TokenBudget(
+            history_budget=TOKEN_BUDGET_CONFIG['history_budget'],
+            max_history_pairs=TOKEN_BUDGET_CONFIG['max_history_pairs'],
+            excerpt_tokens=TOKEN_BUDGET_CONFIG['excerpt_tokens'],
+            output_tokens=TOKEN_BUDGET_CONFIG['output_tokens'],
+            default_output_tokens=TOKEN_BUDGET_CONFIG['default_output_tokens'],
+            enabled=TOKEN_BUDGET_CONFIG['enabled']
+        )
+        
         # Configure Gemini API
         self._configure_gemini()
         
+        # Per-turn choice of model tier and generation settings
+        self.model_router = ModelRouter(
+            primary_model=self.model_name,
+            rules_path=MODEL_ROUTING_CONFIG['rules_path'],
+            reload_interval=MODEL_ROUTING_CONFIG['reload_interval'],
+            enabled=MODEL_ROUTING_CONFIG['enabled']
+        )
+        
+        # System instruction held in Gemini cachedContents, one entry per routed model
+        self.context_cache = ContextCache(
+            client=self.gemini_client,
+            system_instruction=self.system_instruction,
+            ttl=CONTEXT_CACHE_CONFIG['ttl'],
+            refresh_margin=CONTEXT_CACHE_CONFIG['refresh_margin'],
+            retry_interval=CONTEXT_CACHE_CONFIG['retry_interval'],
+            min_tokens=CONTEXT_CACHE_CONFIG['min_tokens'],
+            enabled=CONTEXT_CACHE_CONFIG['enabled']
+        )
+        
+        # Answers to the suggestions just returned, generated while the user reads
+        self.prefetcher = SuggestionPrefetcher(
+            generate=self._prefetch_answer,
+            ttl=PREFETCH_CONFIG['ttl'],
+            max_sessions=PREFETCH_CONFIG['max_sessions'],
+            max_workers=PREFETCH_CONFIG['max_workers'],
+            max_pending=PREFETCH_CONFIG['max_pending'],
+            wait_timeout=PREFETCH_CONFIG['wait_timeout'],
+            enabled=PREFETCH_CONFIG['enabled'] and self.model is not None
+        )
+        
+        # Stage latencies and outcomes for /metrics; component stats are read at scrape time
+        self.metrics = get_metrics()
+        self.slow_turn_seconds = METRICS_CONFIG['slow_turn_seconds']
+        self._define_metrics()
+        self.metrics.register_collector(self._collect_metrics)
+        
         logger.info("Narad AI initialized successfully")
     
     def _configure_gemini(self):
         """Configure the Gemini API"""
+        self.gemini_client = None
+        self.async_gemini_client = None
+        # Primary model; the router sends turns to it unless a tier names another
+        self.model_name = os.getenv('MODEL_NAME', 'gemini-1.5-pro')
         try:
-            api_key = os.getenv('GEMINI_API_KEY')
-            logger.info(f"Gemini API Key from env: {api_key}")
-            logger.info(f"API Key length: {len(api_key) if api_key else 0}")
-            logger.info(f"API Key starts with: {api_key[:10] if api_key else 'None'}")
+            # Same test the provider layer uses, so both agree on whether Gemini is configured
+            raw_key = os.getenv('GEMINI_API_KEY')
+            api_key = usable_api_key(raw_key)
             
-            if api_key and api_key != 'your_gemini_api_key_here':
+            if api_key:
                 logger.info("Configuring Gemini API with provided key")
-                configure(api_key=api_key)
                 # Use LATEST Gemini API (Oct 2025) - Gemini 1.x/1.5.x DEPRECATED
                 # ONLY these models are currently supported:
                 # - models/gemini-pro-latest (RECOMMENDED - stable, always updated)
                 # - models/gemini-flash-latest (faster variant)
                 # - models/gemini-2.5-pro (specific version)
                 # - models/gemini-2.5-flash (specific version)
-                self.model_name = os.getenv('MODEL_NAME', 'gemini-1.5-pro')
                 self.api_key = api_key
                 # CRITICAL: Use v1beta endpoint - all current models require this
-                self.api_endpoint = "https://generativelanguage.googleapis.com/v1beta/models"
+                self.api_endpoint = GEMINI_CLIENT_CONFIG['api_endpoint']
+                # One pooled keep-alive client shared by every chat turn (and
+                # by the proxy blueprints when the gateway serves Gemini)
+                gemini_provider = self.llm_gateway.get('gemini')
+                self.gemini_client = gemini_provider.client if gemini_provider else GeminiClient(
+                    api_key=api_key,
+                    api_endpoint=self.api_endpoint,
+                    pool_connections=GEMINI_CLIENT_CONFIG['pool_connections'],
+                    pool_maxsize=GEMINI_CLIENT_CONFIG['pool_maxsize'],
+                    pool_block=GEMINI_CLIENT_CONFIG['pool_block'],
+                    connect_timeout=GEMINI_CLIENT_CONFIG['connect_timeout'],
+                    read_timeout=GEMINI_CLIENT_CONFIG['read_timeout']
+                )
+                # Async twin used by the ASGI entry point (app_async.py)
+                self.async_gemini_client = AsyncGeminiClient(
+                    api_key=api_key,
+                    api_endpoint=self.api_endpoint,
+                    pool_maxsize=GEMINI_CLIENT_CONFIG['async_max_connections'],
+                    connect_timeout=GEMINI_CLIENT_CONFIG['connect_timeout'],
+                    read_timeout=GEMINI_CLIENT_CONFIG['read_timeout']
+                )
                 logger.info(f"🔧 Using model: {self.model_name} with REST API v1beta endpoint")
                 logger.info(f"🌐 API Endpoint: {self.api_endpoint}")
                 logger.info(f"✅ Gemini API configured successfully for REST calls")
@@ -106,21 +363,167 @@ class NaradAI:
             else:
                 self.model = None
                 logger.warning("No valid GEMINI_API_KEY found. AI responses will use fallback content.")
-                if not api_key:
+                if not (raw_key or '').strip():
                     logger.warning("GEMINI_API_KEY is None or empty")
-                elif api_key == 'your_gemini_api_key_here':
+                else:
                     logger.warning("GEMINI_API_KEY is still the placeholder value")
         except Exception as e:
             logger.error(f"Error configuring Gemini API: {e}")
             logger.error(f"Error type: {type(e)}")
             self.model = None
     
+    @property
+    def knowledge_base(self) -> CulturalKnowledgeBase:
+        """Cultural knowledge base, built on first use"""
+        if self._knowledge_base is None:
+            self._knowledge_base = CulturalKnowledgeBase()
+        return self._knowledge_base
+    
+    def prime(self):
+        """
+        Build the read-only lookup data now: the knowledge base and the
+        compiled language-detection patterns. Opens no files, sockets or
+        threads, so it is safe in a gunicorn master before forking.
+        """
+        for text in self.WARMUP_PROBES:
+            self._detect_language_from_text(text)
+            self._classify_intent(text)
+        self._format_conversation_history([])
+        self.knowledge_base  # builds it
+    
+    def warm_up(self) -> Dict[str, float]:
+        """
+        Do the setup the first turns would otherwise pay for: the lookup
+        tables (see prime), the Gemini connection pool, context cache
+        entries and the response cache's disk store. Runs in each worker.
+        
+        Network steps follow GEMINI_WARMUP_ON_START and
+        CONTEXT_CACHE_CREATE_ON_START; their failures are logged and leave
+        the work to the first turn.
+        
+        Returns:
+            Seconds spent per step
+        """
+        timer = StageTimer()
+        self.prime()
+        timer.mark('tables')
+        
+        self.response_cache.warm_up()
+        timer.mark('response_cache')
+        
+        if self.gemini_client is not None and GEMINI_CLIENT_CONFIG['warmup_on_start']:
+            self.gemini_client.warm_up()
+            timer.mark('connection_pool')
+        
+        if self.model and CONTEXT_CACHE_CONFIG['create_on_start']:
+            self.context_cache.start(self.model_router.get_models())
+            timer.mark('context_cache')
+        
+        return {step: round(seconds, 4) for step, seconds in timer.stages.items()}
+    
+    def set_api_endpoint(self, api_endpoint: str):
+        """
+        Point the Gemini clients at another models endpoint, e.g. the local
+        mock server in benchmarks/mock_gemini_server.py
+        
+        Args:
+            api_endpoint: Base models URL such as http://127.0.0.1:8765/v1beta/models
+        """
+        self.api_endpoint = api_endpoint.rstrip('/')
+        for client in (self.gemini_client, self.async_gemini_client):
+            if client is not None:
+                client.api_endpoint = self.api_endpoint
+        logger.info(f"🌐 API Endpoint: {self.api_endpoint}")
+    
     def is_ready(self) -> bool:
         """Check if Narad AI is ready to process requests"""
-        logger.info(f"Checking if Narad AI is ready. Model is: {self.model}")
+        logger.debug("Checking if Narad AI is ready. Model is: %s", self.model)
         # Always return True since we have contextual fallback responses
         return True
     
+    def _define_metrics(self):
+        """Declare the chat pipeline's metrics"""
+        for name, kind, help_text in (
+            ('narad_turn_duration_seconds', HISTOGRAM, 'Chat turn latency by intent, language and model'),
+            ('narad_stage_duration_seconds', HISTOGRAM, 'Latency of each chat turn stage by model'),
+            ('narad_turns_total', COUNTER, 'Chat turns by how they were answered or ended'),
+            ('narad_fallbacks_total', COUNTER, 'Turns answered locally because Gemini could not be called, by reason'),
+            ('narad_upstream_errors_total', COUNTER, 'Failed Gemini calls surfaced to the user, by status code or error type'),
+            ('narad_upstream_attempts_total', COUNTER, 'Gemini call attempts, retries included'),
+            ('narad_upstream_retries_total', COUNTER, 'Gemini call retries'),
+            ('narad_upstream_rejected_total', COUNTER, 'Upstream slot requests that fell back, by priority class and reason'),
+            ('narad_cache_lookups_total', COUNTER, 'Response cache lookups by result'),
+            ('narad_coalesced_calls_total', COUNTER, 'Calls that shared an identical in-flight upstream call'),
+            ('narad_prefetch_claims_total', COUNTER, 'Clicks on a prefetched suggestion by result'),
+            ('narad_active_sessions', GAUGE, 'Conversation sessions held in memory'),
+            ('narad_upstream_in_flight', GAUGE, 'Upstream calls in flight'),
+            ('narad_upstream_limit', GAUGE, 'Current upstream concurrency limit'),
+            ('narad_upstream_queue_depth', GAUGE, 'Calls waiting for an upstream slot, by priority class'),
+            ('narad_circuit_open', GAUGE, 'Workers whose Gemini circuit breaker is open')
+        ):
+            self.metrics.define(name, kind, help_text)
+    
+    def _collect_metrics(self) -> List[tuple]:
+        """Samples read from component statistics at scrape time"""
+        cache = self.response_cache.get_stats()
+        retries = self.retry_policy.get_stats()
+        limiter = self.upstream_limiter.get_stats()
+        prefetch = self.prefetcher.get_stats()
+        samples = [
+            ('narad_cache_lookups_total', {'result': result}, cache[key])
+            for result, key in (('memory_hit', 'memory_hits'), ('disk_hit', 'disk_hits'), ('stale_hit', 'stale_hits'), ('miss', 'misses'))
+        ]
+        samples += [
+            ('narad_upstream_attempts_total', {}, retries['attempts']),
+            ('narad_upstream_retries_total', {}, retries['retries']),
+            ('narad_coalesced_calls_total', {}, self.single_flight.get_stats()['coalesced']),
+            ('narad_prefetch_claims_total', {'result': 'hit'}, prefetch['hits']),
+            ('narad_prefetch_claims_total', {'result': 'miss'}, prefetch['misses']),
+            ('narad_active_sessions', {}, len(self.conversation_memory.sessions)),
+            ('narad_upstream_in_flight', {}, limiter['in_flight']),
+            ('narad_upstream_limit', {}, limiter['limit']),
+            ('narad_circuit_open', {}, 1 if self.circuit_breaker.state == OPEN else 0)
+        ]
+        for name, stats in limiter['classes'].items():
+            samples.append(('narad_upstream_queue_depth', {'class': name}, stats['queue_depth']))
+            for reason in ('timeouts', 'rejected', 'preempted'):
+                samples.append(('narad_upstream_rejected_total', {'class': name, 'reason': reason}, stats[reason]))
+        return samples
+    
+    def _record_turn(self, turn: Dict[str, Any]):
+        """Export a finished turn's stage latencies; slow turns are also logged with their breakdown"""
+        timer = turn['timer']
+        total = timer.total()
+        model = turn['route']['model'] if 'route' in turn else 'none'
+        intent = turn.get('intent', 'greeting')
+        for stage, seconds in timer.stages.items():
+            self.metrics.observe('narad_stage_duration_seconds', seconds, stage=stage, model=model)
+        self.metrics.observe('narad_turn_duration_seconds', total, intent=intent, language=turn['language'], model=model)
+        self.metrics.inc('narad_turns_total', source=turn['source'])
+        if total >= self.slow_turn_seconds:
+            log_performance(logger, 'chat_turn', total, details=dict(
+                {f'{stage}_ms': round(seconds * 1000, 1) for stage, seconds in timer.stages.items()},
+                intent=intent, language=turn['language'], model=model, source=turn['source']
+            ))
+    
+    def get_performance_stats(self) -> Dict[str, Any]:
+        """Collect statistics from the upstream call pipeline"""
+        return {
+            'response_cache': self.response_cache.get_stats(),
+            'single_flight': self.single_flight.get_stats(),
+            'retries': self.retry_policy.get_stats(),
+            'circuit_breaker': self.circuit_breaker.get_stats(),
+            'upstream_limiter': self.upstream_limiter.get_stats(),
+            'adaptive_limit': self.adaptive_limit.get_stats(),
+            'hedging': dict(self.hedge_policy.get_stats(), enabled=bool(self.hedge_model), hedge_model=self.hedge_model),
+            'model_router': self.model_router.get_stats(),
+            'token_budget': self.token_budget.get_stats(),
+            'context_cache': self.context_cache.get_stats(),
+            'prefetch': self.prefetcher.get_stats(),
+            'llm_gateway': self.llm_gateway.get_stats(),
+            'gemini_client': self.gemini_client.get_stats() if self.gemini_client else None
+        }
+    
     def _load_context_templates(self) -> Dict[str, str]:
         """Load conversation context templates"""
         return {
@@ -174,6 +577,24 @@ Guidelines:
 - Use appropriate cultural references and examples"""
         }
     
+    def _build_system_instruction(self) -> str:
+        """
+        Static persona and answer guidelines sent as the system instruction
+        
+        Nothing here depends on the user or the turn, so the text can be held
+        in a Gemini context cache and forms an identical prompt prefix for
+        implicit caching when it is sent inline.
+        """
+        return "\n\n".join([
+            self.context_templates['greeting'],
+            self.context_templates['educational'],
+            self.context_templates['storytelling'],
+            """Answer format:
+- Provide a concise, informative response (under 200 words) about the user's topic
+- Use bullet points for clarity
+- Use the previous conversation only as context for the latest question"""
+        ])
+    
     def _detect_language_from_text(self, text: str) -> str:
         """
         Detect the language of the input text based on character ranges
@@ -218,9 +639,185 @@ Guidelines:
         """
         return self.language_mapping.get(language_code, 'English with Indian cultural context')
     
-    def process_message(self, message: str, session_id: str, context: Optional[Dict] = None) -> Dict[str, Any]:
+    def _resolve_language(self, message: str, context: Optional[Dict] = None) -> str:
         """
-        Process a user message and generate an appropriate AI response
+        Resolve the response language from user preferences and message script
+        
+        Args:
+            message (str): The user's message
+            context (Dict, optional): Request context carrying preferences
+            
+        Returns:
+            str: Full language code such as 'en-IN' or 'hi-IN'
+        """
+        # Get user preferences from context
+        user_language = context.get('preferences', {}).get('language', 'en') if context else 'en'
+        
+        # Convert short language codes to full codes
+        language_mapping = {
+            'en': 'en-IN',
+            'hi': 'hi-IN',
+            'bn': 'bn-IN',
+            'ta': 'ta-IN',
+            'te': 'te-IN'
+        }
+        
+        # Convert to full language code if needed
+        if user_language in language_mapping:
+            user_language = language_mapping[user_language]
+        elif user_language not in language_mapping.values():
+            user_language = 'en-IN'  # Default to English if unknown
+        
+        # Detect language from the message content as well
+        detected_language = self._detect_language_from_text(message)
+        
+        # Prefer detected language if it's a regional language
+        if detected_language != 'en-IN':
+            user_language = detected_language
+        
+        # Get language context
+        language_context = self._get_language_context(user_language)
+        
+        logger.debug("User language: %s, Detected: %s, Language context: %s", user_language, detected_language, language_context)
+        return user_language
+    
+    def _get_greeting_response(self, message: str, conversation_history: List[Dict], user_language: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the canned greeting for a first-message greeting, otherwise None
+        """
+        # Check if this is the first message in the conversation
+        is_first_message = len(conversation_history) == 0
+        
+        # If this is the first message and it's a greeting, provide a special greeting response
+        if not (is_first_message and message.lower() in ['hello', 'hi', 'namaste', 'namaskar', 'hey']):
+            return None
+        
+        # Get appropriate greeting based on language
+        greeting_responses = {
+            'en-IN': "Namaste! 🙏 I'm Narad, your AI Cultural Guide. I'm here to share the rich heritage, fascinating stories, and timeless wisdom of India with you. Whether you're curious about ancient monuments, mythological tales, or cultural traditions, just ask and I'll guide you through India's incredible journey through time!",
+            'hi-IN': "नमस्ते! 🙏 मैं हूँ नारद AI, आपका AI कल्चरल गाइड।\nआप मुझसे किसी स्मारक, कहानी, या पौराणिक कथा के बारे में पूछ सकते हैं। मैं आपको उनसे जुड़ी दिलचस्प बातें और कहानियाँ सुनाने के लिए हमेशा तैयार हूँ! 🌸✨",
+            'bn-IN': "নমস্কার! 🙏 আমি নারদ, আপনার AI সাংস্কৃতিক গাইড। আমি এখানে ভারতের সমৃদ্ধ ঐতিহ্য, মুগ্ধকর গল্প এবং শাশ্বত জ্ঞান আপনার সাথে ভাগ করে নেওয়ার জন্য। আপনি প্রাচীন স্মৃতিস্তম্ভ, পৌরাণিক গল্প বা সাংস্কৃতিক ঐতিহ্য সম্পর্কে কৌতুহলী হন কিনা, শুধু জিজ্ঞাসা করুন এবং আমি আপনাকে ভারতের অবিশ্বাস্য যাত্রায় পথ নির্দেশ করব!",
+            'ta-IN': "வணக்கம்! 🙏 நான் நாரதர், உங்கள் AI கலாச்சார வழிகாட்டி. நான் இங்கே இந்தியாவின் செழிப்பான பாரம்பரியம், கவர்ச்சிகரமான கதைகள் மற்றும் நித்திய ஞானத்தை உங்களுடன் பகிர்ந்து கொள்ள இருக்கிறேன். நீங்கள் பழமையான நினைவுச்சின்னங்கள், பௌராணிக கதைகள் அல்லது கலாச்சார மரபுகள் பற்றி ஆவலுடன் இருந்தால், கேட்கவும் நான் உங்களை இந்தியாவின் நம்பமுடியாத பயணத்தில் வழிநடத்துவேன்!",
+            'te-IN': "నమస్కారం! 🙏 నేను నారదుడిని, మీ AI సాంస్కృతిక మార్గదర్శకుడిని. భారతదేశం యొక్క సమృద్ధిగాని వారసత్వం, అద్భుతమైన కథలు మరియు శాశ్వత జ్ఞానాన్ని మీతో పంచుకోడానికి నేను ఇక్కడ ఉన్నాను. మీరు పురాతన స్మారకాలు, పౌరాణిక కథలు లేదా సాంస్కృతిక సంప్రదాయాల గురించి కౌతుకంగా ఉంటే, అడగండి మరియు నేను మిమ్మల్ని భారతదేశం యొక్క అద్భుతమైన ప్రయాణంలో మార్గదర్శకత్వం చేస్తాను!"
+        }
+        
+        greeting_response = greeting_responses.get(user_language, greeting_responses['en-IN'])
+        
+        return {
+            'response': greeting_response,
+            'intent': 'greeting',
+            'suggestions': list(self.greeting_suggestions),
+            'confidence': 0.9,
+            'timestamp': datetime.now().isoformat()
+        }
+    
+    def _get_conversation_context(self, conversation_history: List[Dict]) -> str:
+        """Format the history section of the prompt"""
+        return self._format_conversation_history(conversation_history) if conversation_history else "This is the start of the conversation."
+    
+    def _build_prompt(self, message: str, conversation_context: str) -> str:
+        """
+        Build the per-turn part of the Gemini prompt
+        
+        The persona lives in the system instruction; history comes before the
+        new message so consecutive turns of a session share a growing prefix.
+        """
+        return f"""Previous conversation:
+{conversation_context}
+
+User asks: "{message}"
+
+Your response:"""
+    
+    def _build_payload(self, full_prompt: str, generation_config: Dict[str, Any], model_name: str) -> Dict[str, Any]:
+        """Build the generateContent request body for a prompt and its routed tier"""
+        payload = {
+            "contents": [
+                {
+                    "role": "user",
+                    "parts": [
+                        {"text": full_prompt}
+                    ]
+                }
+            ],
+            "generationConfig": generation_config
+        }
+        
+        # Reference the cached system instruction, or send it inline
+        cached_content = self.context_cache.get(model_name)
+        if cached_content:
+            payload["cachedContent"] = cached_content
+        else:
+            payload["systemInstruction"] = {"parts": [{"text": self.system_instruction}]}
+        return payload
+    
+    def _parse_gemini_response(self, response_data: Dict[str, Any]) -> Optional[str]:
+        """Extract a usable answer from a generateContent response"""
+        # Extract text from response
+        api_text = GeminiClient.extract_text(response_data)
+        if api_text and len(api_text) > 20:
+            logger.debug("✅ Successfully enhanced response with API")
+            return api_text
+        if not response_data.get("candidates"):
+            logger.info("No candidates in API response (%s), using contextual response", list(response_data))
+        return None
+    
+    def _out_of_budget(self) -> bool:
+        """True when the request deadline leaves too little time for an upstream call"""
+        deadline = current_deadline()
+        return deadline is not None and deadline.remaining() < self.min_upstream_budget
+    
+    @contextmanager
+    def _stream_attempt(self):
+        """
+        Run one streamed upstream attempt past the circuit breaker
+        
+        Mirrors what RetryPolicy does for unary calls: the attempt must be
+        allowed (in half-open state it claims the probe), and its outcome is
+        reported once the stream ends. An attempt that ends without an
+        upstream verdict (no slot, deadline, client gone) gives the probe back.
+        
+        Raises:
+            CircuitOpenError: If the breaker rejects the attempt
+        """
+        if not self.circuit_breaker.allow_request():
+            raise CircuitOpenError('Upstream circuit is open')
+        try:
+            yield
+        except Exception as e:
+            if is_retryable_error(e) and not deadline_passed():
+                self.circuit_breaker.record_failure()
+            elif isinstance(e, GeminiAPIError) and not is_retryable_error(e):
+                # The upstream answered (e.g. a 400), so it is healthy
+                self.circuit_breaker.record_success()
+            else:
+                self.circuit_breaker.release_probe()
+            raise
+        except BaseException:
+            # The client went away mid-stream
+            self.circuit_breaker.release_probe()
+            raise
+        self.circuit_breaker.record_success()
+    
+    def _get_degraded_response(self, message: str, language: str, reason: str = 'circuit open') -> str:
+        """Local contextual answer used when Gemini cannot be called (circuit open, no capacity)"""
+        logger.warning(f"⚡ Gemini unavailable ({reason}) - serving contextual response")
+        self.metrics.inc('narad_fallbacks_total', reason=reason.replace(' ', '_'))
+        return self._generate_contextual_response(message, language)
+    
+    def _describe_gemini_error(self, error: Exception) -> str:
+        """Turn a failed Gemini call into the user-facing explanation"""
+        self.metrics.inc('narad_upstream_errors_total', error=str(error.status_code) if isinstance(error, GeminiAPIError) else type(error).__name__)
+        if isinstance(error, GeminiAPIError):
+            logger.error(f"❌ API Error {error.status_code}: {error.body}")
+            return f"I apologize, I'm experiencing technical difficulties (API Error {error.status_code}). The AI service needs attention. Please ensure Gemini API is properly configured with the correct model."
+        
+        logger.error(f"❌ Gemini API call failed: {type(error).__name__}: {str(error)}")
+        return f"I apologize, I encountered an error: {str(error)[:100]}. Please ensure Gemini API is configured correctly."
+    
+    def _prepare_turn(self, message: str, session_id: str, context: Optional[Dict] = None) -> Dict[str, Any]:
+        """
+        Resolve everything a chat turn needs before the upstream call
         
         Args:
             message (str): The user's message
@@ -228,199 +825,735 @@ Guidelines:
             context (Dict, optional): Additional context information
             
         Returns:
-            Dict: AI response with content, intent, and suggestions
+            Dict: Turn state; 'greeting' holds a complete response when the
+            turn is answered locally and nothing else is filled in
+        """
+        timer = StageTimer()
+        user_language = self._resolve_language(message, context)
+        timer.mark('language')
+        conversation_history = self.conversation_memory.get_history(session_id)
+        timer.mark('memory')
+        
+        turn = {
+            'message': message,
+            'session_id': session_id,
+            'language': user_language,
+            'timer': timer,
+            'source': 'upstream',
+            'greeting': self._get_greeting_response(message, conversation_history, user_language)
+        }
+        if turn['greeting']:
+            turn['source'] = 'greeting'
+            timer.mark('intent')
+            return turn
+        
+        # Intent, message length and history size pick the model tier
+        intent = self._classify_intent(message)
+        timer.mark('intent')
+        route = self.model_router.route(intent, message, len(conversation_history))
+        logger.debug("🧭 Routing %s turn to %s tier (%s, rule: %s)", intent, route['tier'], route['model'], route['rule'])
+        route['generation_config']['maxOutputTokens'] = self.token_budget.output_budget(
+            intent, route['generation_config'].get('maxOutputTokens')
+        )
+        timer.mark('routing')
+        
+        conversation_context = self._get_conversation_context(conversation_history)
+        full_prompt = self._build_prompt(message, conversation_context)
+        turn.update({
+            'intent': intent,
+            'route': route,
+            'prompt': full_prompt,
+            'payload': self._build_payload(full_prompt, route['generation_config'], route['model']),
+            'cache_key': ResponseCache.make_key(message, user_language, route['model'], conversation_context)
+        })
+        timer.mark('prompt')
+        return turn
+    
+    def _request_model(self, payload: Dict[str, Any], model_name: str) -> Dict[str, Any]:
+        """Call one model with retries and the circuit breaker, inside an upstream slot"""
+        logger.debug("Making REST API request for model: %s", model_name)
+        with self.upstream_limiter.slot():
+            return self.retry_policy.call(
+                lambda remaining: self.adaptive_limit.call(
+                    lambda: self.gemini_client.generate_content(
+                        model_name, payload, read_timeout=min(remaining, self.gemini_client.read_timeout)
+                    )
+                ),
+                self.circuit_breaker
+            )
+    
+    async def _request_model_async(self, payload: Dict[str, Any], model_name: str) -> Dict[str, Any]:
+        """Async variant of _request_model"""
+        logger.debug("Making async REST API request for model: %s", model_name)
+        async with self.upstream_limiter.slot_async():
+            return await self.retry_policy.call_async(
+                lambda remaining: self.adaptive_limit.call_async(
+                    lambda: self.async_gemini_client.generate_content(
+                        model_name, payload, read_timeout=min(remaining, self.async_gemini_client.read_timeout)
+                    )
+                ),
+                self.circuit_breaker
+            )
+    
+    def _should_hedge(self, model_name: str) -> bool:
+        """Hedging is opt-in and pointless when the turn already uses the hedge model"""
+        return bool(self.hedge_model) and self.hedge_model != model_name
+    
+    def _get_turn_payload(self, turn: Dict[str, Any], model_name: str) -> Dict[str, Any]:
+        """Payload for sending the turn to model_name (cached contexts are per model)"""
+        if model_name == turn['route']['model']:
+            return turn['payload']
+        return self._build_payload(turn['prompt'], turn['route']['generation_config'], model_name)
+    
+    def _request_turn(self, turn: Dict[str, Any], model_name: str) -> Dict[str, Any]:
+        """Send the turn to one model, resending inline if its context cache is gone"""
+        payload = self._get_turn_payload(turn, model_name)
+        try:
+            return self._request_model(payload, model_name)
+        except GeminiAPIError as e:
+            if 'cachedContent' not in payload or not self.context_cache.is_cache_error(e):
+                raise
+            self.context_cache.invalidate(model_name)
+            return self._request_model(self._build_payload(turn['prompt'], turn['route']['generation_config'], model_name), model_name)
+    
+    async def _request_turn_async(self, turn: Dict[str, Any], model_name: str) -> Dict[str, Any]:
+        """Async variant of _request_turn"""
+        payload = self._get_turn_payload(turn, model_name)
+        try:
+            return await self._request_model_async(payload, model_name)
+        except GeminiAPIError as e:
+            if 'cachedContent' not in payload or not self.context_cache.is_cache_error(e):
+                raise
+            self.context_cache.invalidate(model_name)
+            return await self._request_model_async(self._build_payload(turn['prompt'], turn['route']['generation_config'], model_name), model_name)
+    
+    def _request_gemini(self, turn: Dict[str, Any]) -> Optional[str]:
+        """
+        Send the turn to its routed model, raising on transport or API errors
+        
+        Returns:
+            str: Answer text, or None if Gemini returned nothing usable
+        """
+        # Use REST API instead of SDK to avoid v1beta issues
+        model_name = turn['route']['model']
+        try:
+            if self._should_hedge(model_name):
+                response_data = self.hedge_policy.call(
+                    lambda: self._request_turn(turn, model_name),
+                    lambda: self._request_turn(turn, self.hedge_model)
+                )
+            else:
+                response_data = self._request_turn(turn, model_name)
+        except Exception as e:
+            return self._request_failover(turn, e)
+        return self._parse_gemini_response(response_data)
+    
+    async def _request_gemini_async(self, turn: Dict[str, Any]) -> Optional[str]:
+        """Async variant of _request_gemini"""
+        model_name = turn['route']['model']
+        try:
+            if self._should_hedge(model_name):
+                response_data = await self.hedge_policy.call_async(
+                    lambda: self._request_turn_async(turn, model_name),
+                    lambda: self._request_turn_async(turn, self.hedge_model)
+                )
+            else:
+                response_data = await self._request_turn_async(turn, model_name)
+        except Exception as e:
+            # The failover providers only have pooled sync clients
+            context = contextvars.copy_context()
+            return await asyncio.get_running_loop().run_in_executor(None, context.run, self._request_failover, turn, e)
+        return self._parse_gemini_response(response_data)
+    
+    def _request_failover(self, turn: Dict[str, Any], error: Exception) -> Optional[str]:
+        """
+        Answer the turn with the gateway's next provider after Gemini failed
+        
+        Args:
+            turn (Dict): Turn state from _prepare_turn
+            error (Exception): Why the Gemini call failed
+            
+        Returns:
+            str: Answer text from the failover provider
+            
+        Raises:
+            Exception: The original Gemini error when no other provider answers,
+            so callers still degrade to local responses the usual way
+        """
+        if not self.llm_gateway.failover_enabled or not [name for name in self.llm_gateway.order if name != 'gemini']:
+            raise error
+        if self._out_of_budget():
+            # No time left for another provider's attempt
+            raise error
+        
+        generation_config = turn['route']['generation_config']
+        try:
+            result = self.llm_gateway.generate(
+                turn['prompt'],
+                system=self.system_instruction,
+                options={
+                    'temperature': generation_config.get('temperature'),
+                    'max_tokens': generation_config.get('maxOutputTokens'),
+                    'top_p': generation_config.get('topP')
+                },
+                exclude=['gemini']
+            )
+        except LLMProviderError as e:
+            logger.warning(f"🔀 Failover after Gemini {type(error).__name__} failed too: {e}")
+            raise error
+        
+        logger.warning(f"🔀 Gemini {type(error).__name__} - turn answered by {result['provider']} ({result['model']})")
+        return result['text']
+    
+    def _refresh_cached_answer(self, turn: Dict[str, Any]):
+        """Regenerate a stale cache entry (runs off the request path, behind interactive calls)"""
+        try:
+            with upstream_priority('prefetch'):
+                answer = self._request_gemini(turn)
+        except Exception as e:
+            logger.warning(f"Background refresh of cached answer failed: {e}")
+            answer = None
+        if answer:
+            self.response_cache.set(turn['cache_key'], answer, turn['message'], turn['language'])
+        else:
+            self.response_cache.end_refresh(turn['cache_key'])
+    
+    def warm_answers(self, message: str, languages: List[str], min_fresh: float = 0) -> Dict[str, str]:
+        """
+        Make sure the answers a new session would get for a message are cached
+        
+        Languages whose turns send Gemini the same request share one upstream
+        call; its answer is stored under each of their cache keys.
+        
+        Args:
+            message (str): Message to answer, e.g. a suggestion chip
+            languages (List[str]): Preferred language codes ('en', 'hi', ...)
+            min_fresh (float): Regenerate entries fresh for fewer seconds than this
+            
+        Returns:
+            Dict[str, str]: Outcome per language: 'warmed', 'shared' (stored from a call
+            made for another language), 'fresh' (already cached), 'skipped'
+            (answered locally) or 'failed'
+        """
+        if not self.model:
+            return dict.fromkeys(languages, 'skipped')
+        outcomes = {}
+        pending = {}
+        for language in languages:
+            turn = self._prepare_turn(message, WARMUP_SESSION_ID, {'preferences': {'language': language}})
+            if turn['greeting']:
+                outcomes[language] = 'skipped'
+            elif self.response_cache.fresh_for(turn['cache_key']) > min_fresh:
+                outcomes[language] = 'fresh'
+            else:
+                request = json.dumps([turn['route']['model'], turn['payload']], sort_keys=True)
+                pending.setdefault(request, []).append((language, turn))
+        
+        for group in pending.values():
+            try:
+                answer = self._request_gemini(group[0][1])
+            except Exception as e:
+                logger.warning(f"Cache warm-up of {message[:60]!r} ({group[0][0]}) failed: {type(e).__name__}: {e}")
+                answer = None
+            for index, (language, turn) in enumerate(group):
+                if not answer:
+                    outcomes[language] = 'failed'
+                    continue
+                self.response_cache.set(turn['cache_key'], answer, turn['message'], turn['language'])
+                outcomes[language] = 'shared' if index else 'warmed'
+        return outcomes
+    
+    async def _refresh_cached_answer_async(self, turn: Dict[str, Any]):
+        """Async variant of _refresh_cached_answer"""
+        try:
+            with upstream_priority('prefetch'):
+                answer = await self._request_gemini_async(turn)
+        except Exception as e:
+            logger.warning(f"Background refresh of cached answer failed: {e}")
+            answer = None
+        if answer:
+            await self.response_cache.set_async(turn['cache_key'], answer, turn['message'], turn['language'])
+        else:
+            self.response_cache.end_refresh(turn['cache_key'])
+    
+    def _call_gemini(self, turn: Dict[str, Any]) -> Optional[str]:
         """
+        Answer a prepared turn from the response cache or Gemini
+        
+        Args:
+            turn (Dict): Turn state from _prepare_turn
+            
+        Returns:
+            str: Answer text, an error explanation, or None if Gemini is not configured
+        """
+        # Try to get response from Gemini API
+        if not self.model:
+            logger.debug("✅ Using contextual response (primary method successful)")
+            return None
+        
+        cache_key = turn['cache_key']
+        cached, state = self.response_cache.get(cache_key)
+        if cached:
+            if state == STALE and self.response_cache.begin_refresh(cache_key):
+                threading.Thread(target=self._refresh_cached_answer, args=(turn,), daemon=True).start()
+            logger.debug("✅ Serving %s cached response", state)
+            turn['source'] = 'cache'
+            return cached
+        
+        if self._out_of_budget():
+            return self._get_degraded_response(turn['message'], turn['language'], 'request deadline too close')
+        
+        def fetch():
+            answer = self._request_gemini(turn)
+            if answer:
+                self.response_cache.set(cache_key, answer, turn['message'], turn['language'])
+            return answer
+        
+        # Flights are per priority class, so chat never waits on a queued batch call
+        try:
+            return self.single_flight.do((current_priority(), cache_key), fetch)
+        except CircuitOpenError:
+            return self._get_degraded_response(turn['message'], turn['language'])
+        except LimitExceededError:
+            return self._get_degraded_response(turn['message'], turn['language'], 'no upstream capacity')
+        except Exception as e:
+            # A read timeout cut to the request deadline looks like overload; the deadline explains it
+            if isinstance(e, DeadlineExceededError) or deadline_passed():
+                return self._get_degraded_response(turn['message'], turn['language'], 'request deadline reached')
+            if is_overload_error(e):
+                return self._get_degraded_response(turn['message'], turn['language'], 'upstream overloaded')
+            if self._out_of_budget():
+                return self._get_degraded_response(turn['message'], turn['language'], 'request deadline reached')
+            return self._describe_gemini_error(e)
+    
+    async def _call_gemini_async(self, turn: Dict[str, Any]) -> Optional[str]:
+        """Async variant of _call_gemini that awaits the pooled httpx client"""
+        if not self.model:
+            return None
+        
+        cache_key = turn['cache_key']
+        cached, state = await self.response_cache.get_async(cache_key)
+        if cached:
+            if state == STALE and self.response_cache.begin_refresh(cache_key):
+                task = asyncio.get_running_loop().create_task(self._refresh_cached_answer_async(turn))
+                self._background_tasks.add(task)
+                task.add_done_callback(self._background_tasks.discard)
+            turn['source'] = 'cache'
+            return cached
+        
+        if self._out_of_budget():
+            return self._get_degraded_response(turn['message'], turn['language'], 'request deadline too close')
+        
+        async def fetch():
+            answer = await self._request_gemini_async(turn)
+            if answer:
+                await self.response_cache.set_async(cache_key, answer, turn['message'], turn['language'])
+            return answer
+        
         try:
-            logger.info(f"Processing message: {message}")
-            logger.info(f"Session ID: {session_id}")
-            logger.info(f"Context: {context}")
+            return await self.single_flight.do_async((current_priority(), cache_key), fetch)
+        except CircuitOpenError:
+            return self._get_degraded_response(turn['message'], turn['language'])
+        except LimitExceededError:
+            return self._get_degraded_response(turn['message'], turn['language'], 'no upstream capacity')
+        except Exception as e:
+            # A read timeout cut to the request deadline looks like overload; the deadline explains it
+            if isinstance(e, DeadlineExceededError) or deadline_passed():
+                return self._get_degraded_response(turn['message'], turn['language'], 'request deadline reached')
+            if is_overload_error(e):
+                return self._get_degraded_response(turn['message'], turn['language'], 'upstream overloaded')
+            if self._out_of_budget():
+                return self._get_degraded_response(turn['message'], turn['language'], 'request deadline reached')
+            return self._describe_gemini_error(e)
+    
+    def _ensure_response(self, ai_response: Optional[str]) -> str:
+        """Replace an empty Gemini answer with the service-unavailable notice"""
+        # Final check - if no response from Gemini, show error
+        if not ai_response:
+            logger.error("❌ CRITICAL: Gemini API did not return any response! Hardcoded responses are DISABLED.")
+            ai_response = "⚠️ AI service is currently unavailable. Gemini API is not responding. Please check: 1) API key is valid, 2) Model is 'models/gemini-pro-latest', 3) Service has been redeployed with latest code."
+        
+        return ai_response
+    
+    def _store_turn(self, session_id: str, message: str, ai_response: str):
+        """Store a completed user/AI exchange in conversation memory"""
+        self.conversation_memory.add_message(session_id, 'user', message)
+        self.conversation_memory.add_message(session_id, 'ai', ai_response)
+    
+    def _complete_turn(self, turn: Dict[str, Any], ai_response: str) -> Dict[str, Any]:
+        """Store the exchange and build the chat response for a prepared turn"""
+        self._store_turn(turn['session_id'], turn['message'], ai_response)
+        turn['timer'].mark('store')
+        suggestions = self._generate_suggestions(turn['message'], turn['intent'], turn['language'])
+        self.prefetcher.schedule(turn['session_id'], suggestions, turn['language'])
+        turn['timer'].mark('suggestions')
+        log_event(
+            logger, 'chat_turn', "✅ Answered %s turn (%s, %s, %d chars)",
+            turn['intent'], turn['language'], turn['route']['model'], len(ai_response),
+            session_id=turn['session_id'], intent=turn['intent'], language=turn['language'],
+            model=turn['route']['model'], response_chars=len(ai_response)
+        )
+        
+        return {
+            'response': ai_response,
+            'intent': turn['intent'],
+            'suggestions': suggestions,
+            'confidence': 0.9,
+            'timestamp': datetime.now().isoformat()
+        }
+    
+    def _prefetch_answer(self, message: str, session_id: str, language: str) -> Optional[Dict[str, Any]]:
+        """
+        Generate the answer a click on a suggestion would get, for the prefetcher
+        
+        Returns:
+            Dict: response, intent, language and estimated tokens spent, or None
+        """
+        turn = self._prepare_turn(message, session_id, {'preferences': {'language': language}})
+        if turn['greeting']:
+            return None
+        answer = self._request_gemini(turn)
+        if not answer:
+            return None
+        return {
+            'response': answer,
+            'intent': turn['intent'],
+            'language': turn['language'],
+            'tokens': TokenBudget.estimate_tokens(turn['prompt']) + TokenBudget.estimate_tokens(answer)
+        }
+    
+    def _get_error_response(self, error: Exception) -> Dict[str, Any]:
+        """Build the user-facing response for an unexpected processing error"""
+        # Provide a more specific error message
+        error_message = "I apologize, but I'm experiencing some technical difficulties right now. "
+        if "API_KEY" in str(error) or "api key" in str(error).lower():
+            error_message += "There seems to be an issue with my API configuration. "
+        elif "model" in str(error).lower():
+            error_message += "There seems to be an issue with the AI model. "
+        else:
+            error_message += "Please try again in a moment. "
+        error_message += "You can still ask me about Indian culture, history, and mythology, and I'll do my best to help with my existing knowledge."
+        
+        return {
+            'response': error_message,
+            'intent': 'error',
+            'suggestions': [
+                "Tell me about a historical monument",
+                "Share a mythological story",
+                "Recommend cultural experiences"
+            ],
+            'confidence': 0.1,
+            'timestamp': datetime.now().isoformat()
+        }
+    
+    def process_message(self, message: str, session_id: str, context: Optional[Dict] = None, deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+        """
+        Process a user message and generate an appropriate AI response
+        
+        Args:
+            message (str): The user's message
+            session_id (str): Unique session identifier
+            context (Dict, optional): Additional context information
+            deadline (Deadline, optional): When the client stops waiting; upstream waits are cut to it
             
-            # Get user preferences from context
-            user_language = context.get('preferences', {}).get('language', 'en') if context else 'en'
+        Returns:
+            Dict: AI response with content, intent, and suggestions
+        """
+        with deadline_scope(deadline):
+            try:
+                logger.debug("Processing message (session %s): %.200s", session_id, message)
             
-            # Convert short language codes to full codes
-            language_mapping = {
-                'en': 'en-IN',
-                'hi': 'hi-IN',
-                'bn': 'bn-IN',
-                'ta': 'ta-IN',
-                'te': 'te-IN'
-            }
+                turn = self._prepare_turn(message, session_id, context)
+                if turn['greeting']:
+                    self._record_turn(turn)
+                    return turn['greeting']
             
-            # Convert to full language code if needed
-            if user_language in language_mapping:
-                user_language = language_mapping[user_language]
-            elif user_language not in language_mapping.values():
-                user_language = 'en-IN'  # Default to English if unknown
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Prompt (%d chars): %.500s", len(turn['prompt']), turn['prompt'])
             
-            # Detect language from the message content as well
-            detected_language = self._detect_language_from_text(message)
+                prefetched = self.prefetcher.take(session_id, message, turn['language'])
+                turn['timer'].mark('prefetch')
+                if prefetched:
+                    ai_response = prefetched['response']
+                    turn['source'] = 'prefetch'
+                else:
+                    ai_response = self._ensure_response(self._call_gemini(turn))
+                    turn['timer'].mark('upstream')
             
-            # Prefer detected language if it's a regional language
-            if detected_language != 'en-IN':
-                user_language = detected_language
+                # Store conversation in memory and determine suggestions
+                result = self._complete_turn(turn, ai_response)
+                self._record_turn(turn)
+                return result
             
-            # Get language context
-            language_context = self._get_language_context(user_language)
+            except Exception as e:
+                logger.error(f"Error processing message: {str(e)}", exc_info=True)
+                return self._get_error_response(e)
+    
+    async def process_message_async(self, message: str, session_id: str, context: Optional[Dict] = None, deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+        """
+        Async variant of process_message for the ASGI entry point; only the
+        Gemini call is awaited, the local steps are cheap and stay inline
+        
+        Args:
+            message (str): The user's message
+            session_id (str): Unique session identifier
+            context (Dict, optional): Additional context information
+            deadline (Deadline, optional): When the client stops waiting; upstream waits are cut to it
             
-            logger.info(f"User language: {user_language}, Detected: {detected_language}, Language context: {language_context}")
+        Returns:
+            Dict: AI response with content, intent, and suggestions
+        """
+        with deadline_scope(deadline):
+            try:
+                logger.debug("Processing message (async, session %s): %.200s", session_id, message)
             
-            # Retrieve conversation history
-            conversation_history = self.conversation_memory.get_history(session_id)
+                turn = self._prepare_turn(message, session_id, context)
+                if turn['greeting']:
+                    self._record_turn(turn)
+                    return turn['greeting']
             
-            # Check if this is the first message in the conversation
-            is_first_message = len(conversation_history) == 0
+                prefetched = await self.prefetcher.take_async(session_id, message, turn['language'])
+                turn['timer'].mark('prefetch')
+                if prefetched:
+                    ai_response = prefetched['response']
+                    turn['source'] = 'prefetch'
+                else:
+                    ai_response = self._ensure_response(await self._call_gemini_async(turn))
+                    turn['timer'].mark('upstream')
+                result = self._complete_turn(turn, ai_response)
+                self._record_turn(turn)
+                return result
             
-            # If this is the first message and it's a greeting, provide a special greeting response
-            if is_first_message and message.lower() in ['hello', 'hi', 'namaste', 'namaskar', 'hey']:
-                # Get appropriate greeting based on language
-                greeting_responses = {
-                    'en-IN': "Namaste! 🙏 I'm Narad, your AI Cultural Guide. I'm here to share the rich heritage, fascinating stories, and timeless wisdom of India with you. Whether you're curious about ancient monuments, mythological tales, or cultural traditions, just ask and I'll guide you through India's incredible journey through time!",
-                    'hi-IN': "नमस्ते! 🙏 मैं हूँ नारद AI, आपका AI कल्चरल गाइड।\nआप मुझसे किसी स्मारक, कहानी, या पौराणिक कथा के बारे में पूछ सकते हैं। मैं आपको उनसे जुड़ी दिलचस्प बातें और कहानियाँ सुनाने के लिए हमेशा तैयार हूँ! 🌸✨",
-                    'bn-IN': "নমস্কার! 🙏 আমি নারদ, আপনার AI সাংস্কৃতিক গাইড। আমি এখানে ভারতের সমৃদ্ধ ঐতিহ্য, মুগ্ধকর গল্প এবং শাশ্বত জ্ঞান আপনার সাথে ভাগ করে নেওয়ার জন্য। আপনি প্রাচীন স্মৃতিস্তম্ভ, পৌরাণিক গল্প বা সাংস্কৃতিক ঐতিহ্য সম্পর্কে কৌতুহলী হন কিনা, শুধু জিজ্ঞাসা করুন এবং আমি আপনাকে ভারতের অবিশ্বাস্য যাত্রায় পথ নির্দেশ করব!",
-                    'ta-IN': "வணக்கம்! 🙏 நான் நாரதர், உங்கள் AI கலாச்சார வழிகாட்டி. நான் இங்கே இந்தியாவின் செழிப்பான பாரம்பரியம், கவர்ச்சிகரமான கதைகள் மற்றும் நித்திய ஞானத்தை உங்களுடன் பகிர்ந்து கொள்ள இருக்கிறேன். நீங்கள் பழமையான நினைவுச்சின்னங்கள், பௌராணிக கதைகள் அல்லது கலாச்சார மரபுகள் பற்றி ஆவலுடன் இருந்தால், கேட்கவும் நான் உங்களை இந்தியாவின் நம்பமுடியாத பயணத்தில் வழிநடத்துவேன்!",
-                    'te-IN': "నమస్కారం! 🙏 నేను నారదుడిని, మీ AI సాంస్కృతిక మార్గదర్శకుడిని. భారతదేశం యొక్క సమృద్ధిగాని వారసత్వం, అద్భుతమైన కథలు మరియు శాశ్వత జ్ఞానాన్ని మీతో పంచుకోడానికి నేను ఇక్కడ ఉన్నాను. మీరు పురాతన స్మారకాలు, పౌరాణిక కథలు లేదా సాంస్కృతిక సంప్రదాయాల గురించి కౌతుకంగా ఉంటే, అడగండి మరియు నేను మిమ్మల్ని భారతదేశం యొక్క అద్భుతమైన ప్రయాణంలో మార్గదర్శకత్వం చేస్తాను!"
-                }
-                
-                greeting_response = greeting_responses.get(user_language, greeting_responses['en-IN'])
-                
-                return {
-                    'response': greeting_response,
-                    'intent': 'greeting',
-                    'suggestions': [
-                        "Tell me about a historical monument",
-                        "Share a mythological story",
-                        "Recommend cultural experiences"
-                    ],
-                    'confidence': 0.9,
-                    'timestamp': datetime.now().isoformat()
-                }
+            except Exception as e:
+                logger.error(f"Error processing message: {str(e)}", exc_info=True)
+                return self._get_error_response(e)
+    
+    def process_message_stream(self, message: str, session_id: str, context: Optional[Dict] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Process a user message and stream the AI response as it is generated
+        
+        Intent and suggestions only depend on the message, so they are sent in
+        the first event; the answer follows as text chunks and the assembled
+        answer is written to conversation memory once the stream completes.
+        If the upstream stream breaks after chunks were sent, the turn ends
+        with an 'error' event marked truncated and nothing is stored. Every
+        exit, a client disconnect included, is recorded in the turn metrics.
+        
+        The stream is a single attempt on the routed model: it passes the
+        circuit breaker (claiming the probe when half-open) and the upstream
+        limiter, but is not coalesced with identical requests, hedged,
+        retried or failed over, because chunks already sent cannot be taken
+        back. Those apply when the stream fails or is refused before its
+        first chunk: the turn then falls back to the unary path
+        (_call_gemini), which uses all of them.
+        
+        Args:
+            message (str): The user's message
+            session_id (str): Unique session identifier
+            context (Dict, optional): Additional context information
             
-            # Build a simpler, more direct prompt
-            conversation_context = self._format_conversation_history(conversation_history) if conversation_history else "This is the start of the conversation."
+        Yields:
+            Dict: Events of the form {'event': 'meta' | 'chunk' | 'done' | 'error', 'data': {...}}
+        """
+        turn = None
+        try:
+            logger.debug("Streaming message (session %s): %.200s", session_id, message)
             
-            full_prompt = f"""You are Narad AI, an expert guide on Indian culture, history, and heritage.
-
-User asks: "{message}"
-
-Provide a concise, informative response (under 200 words) about this topic. Use bullet points for clarity.
-
-Previous conversation:
-{conversation_context}
-
-Your response:"""
+            turn = self._prepare_turn(message, session_id, context)
+            greeting = turn['greeting']
+            if greeting:
+                yield {'event': 'meta', 'data': {'intent': greeting['intent'], 'suggestions': greeting['suggestions']}}
+                yield {'event': 'chunk', 'data': {'text': greeting['response']}}
+                yield {'event': 'done', 'data': {'confidence': greeting['confidence'], 'timestamp': greeting['timestamp']}}
+                return
             
-            logger.info(f"Full prompt: {full_prompt}")
-            logger.info(f"Model ready: {self.model is not None}")
+            intent = turn['intent']
+            suggestions = self._generate_suggestions(message, intent, turn['language'])
+            turn['timer'].mark('suggestions')
+            yield {'event': 'meta', 'data': {'intent': intent, 'suggestions': suggestions}}
             
-            # FORCE GEMINI API - No hardcoded responses
-            logger.info("⚡ FORCING Gemini API - Hardcoded responses DISABLED")
-            ai_response = None
+            cache_key = turn['cache_key']
+            chunks = []
+            truncated = None
             
-            # Try to get response from Gemini API
-            if self.model:
-                logger.info("Got generic response, attempting to enhance with Gemini API")
+            prefetched = self.prefetcher.take(session_id, message, turn['language'])
+            turn['timer'].mark('prefetch')
+            if prefetched:
+                cached = prefetched['response']
+                turn['source'] = 'prefetch'
+            else:
+                cached, _ = self.response_cache.get(cache_key) if self.model else (None, None)
+                if cached:
+                    turn['source'] = 'cache'
+            if cached:
+                chunks.append(cached)
+                yield {'event': 'chunk', 'data': {'text': cached}}
+            elif self.model:
+                streamed = False
                 try:
-                    # Use REST API instead of SDK to avoid v1beta issues
-                    import requests
-                    
-                    url = f"{self.api_endpoint}/{self.model_name}:generateContent?key={self.api_key}"
-                    headers = {"Content-Type": "application/json"}
-                    payload = {
-                        "contents": [
-                            {
-                                "parts": [
-                                    {"text": full_prompt}
-                                ]
-                            }
-                        ],
-                        "generationConfig": {
-                            "temperature": 0.7,
-                            "maxOutputTokens": 500,
-                            "topP": 0.9,
-                            "topK": 40
-                        }
-                    }
-                    
-                    logger.info(f"Making REST API request to: {url}")
-                    response = requests.post(url, json=payload, headers=headers, timeout=30)
-                    logger.info(f"API Response Status: {response.status_code}")
-                    
-                    if response.status_code == 200:
-                        response_data = response.json()
-                        logger.info(f"API Response: {response_data}")
-                        
-                        # Extract text from response
-                        if "candidates" in response_data and len(response_data["candidates"]) > 0:
-                            candidate = response_data["candidates"][0]
-                            if "content" in candidate and "parts" in candidate["content"]:
-                                parts = candidate["content"]["parts"]
-                                if len(parts) > 0 and "text" in parts[0]:
-                                    api_text = parts[0]["text"].strip()
-                                    if api_text and len(api_text) > 20:
-                                        ai_response = api_text
-                                        logger.info("✅ Successfully enhanced response with API")
-                        else:
-                            logger.info("No candidates in API response, using contextual response")
-                    else:
-                        logger.error(f"❌ API Error {response.status_code}: {response.text}")
-                        ai_response = f"I apologize, I'm experiencing technical difficulties (API Error {response.status_code}). The AI service needs attention. Please ensure Gemini API is properly configured with the correct model."
-                        
+                    if self._out_of_budget():
+                        raise DeadlineExceededError('Request deadline too close for an upstream call')
+                    # The whole stream is one attempt for the breaker and the adaptive limit, like a generateContent call
+                    with self._stream_attempt(), self.upstream_limiter.slot(), self.adaptive_limit.measure():
+                        for text in self.gemini_client.stream_generate_content(
+                            turn['route']['model'], turn['payload'], read_timeout=cap_timeout(self.gemini_client.read_timeout)
+                        ):
+                            chunks.append(text)
+                            yield {'event': 'chunk', 'data': {'text': text}}
+                    streamed = True
                 except Exception as e:
-                    logger.error(f"❌ Gemini API call failed: {type(e).__name__}: {str(e)}")
-                    ai_response = f"I apologize, I encountered an error: {str(e)[:100]}. Please ensure Gemini API is configured correctly."
-            else:
-                logger.info("✅ Using contextual response (primary method successful)")
+                    logger.error(f"❌ Gemini streaming call failed: {type(e).__name__}: {str(e)}")
+                    if chunks:
+                        # Part of the answer is already out; it must not pass for a complete one
+                        truncated = self._describe_gemini_error(e)
+                    else:
+                        # Nothing sent yet - fall back to the non-streaming call
+                        if isinstance(e, LimitExceededError):
+                            fallback = self._get_degraded_response(message, turn['language'], 'no upstream capacity')
+                        elif isinstance(e, DeadlineExceededError) or self._out_of_budget():
+                            fallback = self._get_degraded_response(message, turn['language'], 'request deadline reached')
+                        else:
+                            fallback = self._call_gemini(turn)
+                        if fallback:
+                            chunks.append(fallback)
+                            yield {'event': 'chunk', 'data': {'text': fallback}}
+                if streamed and chunks:
+                    self.response_cache.set(cache_key, ''.join(chunks).strip(), message, turn['language'])
+            turn['timer'].mark('upstream')
+            
+            if truncated:
+                # Neither cached nor remembered, so the next turn does not build on half an answer
+                turn['source'] = 'truncated'
+                yield {'event': 'error', 'data': {'response': truncated, 'suggestions': suggestions, 'truncated': True}}
+                return
             
-            # Final check - if no response from Gemini, show error
-            if not ai_response or ai_response is None:
-                logger.error("❌ CRITICAL: Gemini API did not return any response! Hardcoded responses are DISABLED.")
-                ai_response = "⚠️ AI service is currently unavailable. Gemini API is not responding. Please check: 1) API key is valid, 2) Model is 'models/gemini-pro-latest', 3) Service has been redeployed with latest code."
+            ai_response = self._ensure_response(''.join(chunks).strip())
+            if not chunks:
+                yield {'event': 'chunk', 'data': {'text': ai_response}}
             
-            logger.info(f"✅ Final AI response: {ai_response[:100]}...")
+            # Store the assembled answer once the stream has completed
+            self._store_turn(session_id, message, ai_response)
+            turn['timer'].mark('store')
+            self.prefetcher.schedule(session_id, suggestions, turn['language'])
             
-            # Store conversation in memory
-            self.conversation_memory.add_message(session_id, 'user', message)
-            self.conversation_memory.add_message(session_id, 'ai', ai_response)
+            yield {'event': 'done', 'data': {'confidence': 0.9, 'timestamp': datetime.now().isoformat()}}
+            
+        except GeneratorExit:
+            # The client went away mid-stream
+            if turn is not None:
+                turn['source'] = 'disconnected'
+            raise
+        except Exception as e:
+            logger.error(f"Error streaming message: {str(e)}", exc_info=True)
+            if turn is not None:
+                turn['source'] = 'error'
+            error = self._get_error_response(e)
+            yield {'event': 'error', 'data': {'response': error['response'], 'suggestions': error['suggestions']}}
+        finally:
+            if turn is not None:
+                self._record_turn(turn)
+    
+    async def process_message_stream_async(self, message: str, session_id: str, context: Optional[Dict] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Async variant of process_message_stream; yields the same events
+        """
+        turn = None
+        try:
+            logger.debug("Streaming message (async, session %s): %.200s", session_id, message)
             
-            # Determine intent and suggestions
-            intent = self._classify_intent(message)
-            suggestions = self._generate_suggestions(message, intent, user_language)
+            turn = self._prepare_turn(message, session_id, context)
+            greeting = turn['greeting']
+            if greeting:
+                yield {'event': 'meta', 'data': {'intent': greeting['intent'], 'suggestions': greeting['suggestions']}}
+                yield {'event': 'chunk', 'data': {'text': greeting['response']}}
+                yield {'event': 'done', 'data': {'confidence': greeting['confidence'], 'timestamp': greeting['timestamp']}}
+                return
             
-            result = {
-                'response': ai_response,
-                'intent': intent,
-                'suggestions': suggestions,
-                'confidence': 0.9,
-                'timestamp': datetime.now().isoformat()
-            }
+            intent = turn['intent']
+            suggestions = self._generate_suggestions(message, intent, turn['language'])
+            turn['timer'].mark('suggestions')
+            yield {'event': 'meta', 'data': {'intent': intent, 'suggestions': suggestions}}
             
-            logger.info(f"Final result: {result}")
-            return result
+            cache_key = turn['cache_key']
+            chunks = []
+            truncated = None
             
-        except Exception as e:
-            logger.error(f"Error processing message: {str(e)}", exc_info=True)
-            # Provide a more specific error message
-            error_message = "I apologize, but I'm experiencing some technical difficulties right now. "
-            if "API_KEY" in str(e) or "api key" in str(e).lower():
-                error_message += "There seems to be an issue with my API configuration. "
-            elif "model" in str(e).lower():
-                error_message += "There seems to be an issue with the AI model. "
+            prefetched = await self.prefetcher.take_async(session_id, message, turn['language'])
+            turn['timer'].mark('prefetch')
+            if prefetched:
+                cached = prefetched['response']
+                turn['source'] = 'prefetch'
             else:
-                error_message += "Please try again in a moment. "
-            error_message += "You can still ask me about Indian culture, history, and mythology, and I'll do my best to help with my existing knowledge."
+                cached, _ = await self.response_cache.get_async(cache_key) if self.model else (None, None)
+                if cached:
+                    turn['source'] = 'cache'
+            if cached:
+                chunks.append(cached)
+                yield {'event': 'chunk', 'data': {'text': cached}}
+            elif self.model:
+                streamed = False
+                try:
+                    if self._out_of_budget():
+                        raise DeadlineExceededError('Request deadline too close for an upstream call')
+                    with self._stream_attempt():
+                        async with self.upstream_limiter.slot_async():
+                            with self.adaptive_limit.measure():
+                                async for text in self.async_gemini_client.stream_generate_content(
+                                    turn['route']['model'], turn['payload'], read_timeout=cap_timeout(self.async_gemini_client.read_timeout)
+                                ):
+                                    chunks.append(text)
+                                    yield {'event': 'chunk', 'data': {'text': text}}
+                    streamed = True
+                except Exception as e:
+                    logger.error(f"❌ Gemini streaming call failed: {type(e).__name__}: {str(e)}")
+                    if chunks:
+                        # Part of the answer is already out; it must not pass for a complete one
+                        truncated = self._describe_gemini_error(e)
+                    else:
+                        # Nothing sent yet - fall back to the non-streaming call
+                        if isinstance(e, LimitExceededError):
+                            fallback = self._get_degraded_response(message, turn['language'], 'no upstream capacity')
+                        elif isinstance(e, DeadlineExceededError) or self._out_of_budget():
+                            fallback = self._get_degraded_response(message, turn['language'], 'request deadline reached')
+                        else:
+                            fallback = await self._call_gemini_async(turn)
+                        if fallback:
+                            chunks.append(fallback)
+                            yield {'event': 'chunk', 'data': {'text': fallback}}
+                if streamed and chunks:
+                    await self.response_cache.set_async(cache_key, ''.join(chunks).strip(), message, turn['language'])
+            turn['timer'].mark('upstream')
             
-            return {
-                'response': error_message,
-                'intent': 'error',
-                'suggestions': [
-                    "Tell me about a historical monument",
-                    "Share a mythological story",
-                    "Recommend cultural experiences"
-                ],
-                'confidence': 0.1,
-                'timestamp': datetime.now().isoformat()
-            }
+            if truncated:
+                # Neither cached nor remembered, so the next turn does not build on half an answer
+                turn['source'] = 'truncated'
+                yield {'event': 'error', 'data': {'response': truncated, 'suggestions': suggestions, 'truncated': True}}
+                return
+            
+            ai_response = self._ensure_response(''.join(chunks).strip())
+            if not chunks:
+                yield {'event': 'chunk', 'data': {'text': ai_response}}
+            
+            self._store_turn(session_id, message, ai_response)
+            turn['timer'].mark('store')
+            self.prefetcher.schedule(session_id, suggestions, turn['language'])
+            
+            yield {'event': 'done', 'data': {'confidence': 0.9, 'timestamp': datetime.now().isoformat()}}
+            
+        except (GeneratorExit, asyncio.CancelledError):
+            # The client went away mid-stream
+            if turn is not None:
+                turn['source'] = 'disconnected'
+            raise
+        except Exception as e:
+            logger.error(f"Error streaming message: {str(e)}", exc_info=True)
+            if turn is not None:
+                turn['source'] = 'error'
+            error = self._get_error_response(e)
+            yield {'event': 'error', 'data': {'response': error['response'], 'suggestions': error['suggestions']}}
+        finally:
+            if turn is not None:
+                self._record_turn(turn)
     
     def _classify_intent(self, message: str) -> str:
         """Classify the user's intent"""
@@ -447,10 +1580,9 @@ Your response:"""
         else:
             return 'general_inquiry'
     
-    def _generate_suggestions(self, message: str, intent: str, language: str) -> List[str]:
-        """Generate follow-up suggestions based on intent and language"""
-        # Base suggestions in English
-        suggestion_templates = {
+    def _load_suggestion_templates(self) -> Dict[str, List[str]]:
+        """Follow-up suggestions offered after each intent (base suggestions in English)"""
+        return {
             'greeting': [
                 "Tell me about Indian mythology",
                 "Share a horror story about a haunted place",
@@ -502,20 +1634,37 @@ Your response:"""
                 "Start a treasure hunt"
             ]
         }
-        
-        suggestions = suggestion_templates.get(intent, suggestion_templates['general_inquiry'])
+    
+    def _generate_suggestions(self, message: str, intent: str, language: str) -> List[str]:
+        """Generate follow-up suggestions based on intent and language"""
+        suggestions = self.suggestion_templates.get(intent, self.suggestion_templates['general_inquiry'])
         
         # Translate suggestions based on language if needed
         # For now, we'll keep them in English as the AI can respond in the appropriate language
         return suggestions[:3]  # Return top 3 suggestions
     
+    def suggestion_messages(self) -> List[str]:
+        """
+        Every suggestion chip that can be answered on its own: the greeting's
+        suggestions and the per-intent templates, minus those that refer back
+        to the previous answer ("this story")
+        
+        Returns:
+            List[str]: Distinct suggestion messages in display order
+        """
+        messages = list(self.greeting_suggestions)
+        for intent, suggestions in self.suggestion_templates.items():
+            if intent not in self.CONTEXTUAL_SUGGESTION_INTENTS:
+                messages.extend(suggestions)
+        return list(dict.fromkeys(messages))
+    
     def _format_conversation_history(self, conversation_history):
         """Format conversation history safely"""
         if not conversation_history:
             return "No previous conversation"
         
         try:
-            logger.info(f"Formatting conversation history with {len(conversation_history)} messages")
+            logger.debug("Formatting conversation history with %d messages", len(conversation_history))
             formatted_messages = []
             # Group messages by user/ai pairs
             user_messages = []
@@ -523,27 +1672,21 @@ Your response:"""
             
             # Separate user and AI messages
             for msg in conversation_history:
-                logger.info(f"Processing message: {msg}")
                 if msg.get('role') == 'user':
                     user_messages.append(msg.get('content', ''))
                 elif msg.get('role') == 'ai':
                     ai_messages.append(msg.get('content', ''))
             
-            logger.info(f"User messages: {user_messages}")
-            logger.info(f"AI messages: {ai_messages}")
-            
             # Create pairs of user and AI messages
             for i in range(min(len(user_messages), len(ai_messages))):
-                formatted_messages.append(f"User: {user_messages[i]}\nNarad: {ai_messages[i]}")
+                formatted_messages.append((user_messages[i], ai_messages[i]))
             
             # If we have an odd number of messages, there might be a user message without a response
             if len(user_messages) > len(ai_messages) and user_messages:
-                formatted_messages.append(f"User: {user_messages[-1]}\nNarad: [awaiting response]")
+                formatted_messages.append((user_messages[-1], "[awaiting response]"))
             
-            # Return last 3 message pairs
-            result = "\n".join(formatted_messages[-3:]) if formatted_messages else "No previous conversation"
-            logger.info(f"Formatted conversation history: {result}")
-            return result
+            # Keep the most recent pairs that fit the history token budget
+            return self.token_budget.fit_history(formatted_messages) or "No previous conversation"
         except Exception as e:
             logger.error(f"Error formatting conversation history: {e}")
             return "No previous conversation"
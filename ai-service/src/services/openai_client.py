@@ -0,0 +1,137 @@
+"""
+OpenAI REST Client
+Long-lived, pooled HTTP client for the OpenAI chat completions API
+"""
+
+import logging
+from typing import Dict, Optional, Any, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+
+class OpenAIAPIError(Exception):
+    """Raised when the OpenAI REST API answers with a non-success status"""
+
+    def __init__(self, status_code: int, body: str = ''):
+        self.status_code = status_code
+        self.body = body
+        super().__init__(f"OpenAI API Error {status_code}: {body[:200]}")
+
+
+class OpenAIClient:
+    """
+    Thread-safe OpenAI REST client with a bounded pool of keep-alive
+    connections, the counterpart of GeminiClient for the failover provider
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        api_base: str = 'https://api.openai.com/v1',
+        pool_connections: int = 2,
+        pool_maxsize: int = 16,
+        pool_block: bool = True,
+        connect_timeout: float = 3.05,
+        read_timeout: float = 30.0
+    ):
+        """
+        Initialize the client and its connection pool
+
+        Args:
+            api_key: OpenAI API key (sent as a bearer token)
+            api_base: Base API URL, e.g. https://api.openai.com/v1
+            pool_connections: Number of host pools to cache
+            pool_maxsize: Maximum keep-alive connections per host
+            pool_block: Wait for a free connection instead of opening extra ones
+            connect_timeout: Seconds allowed for establishing a connection
+            read_timeout: Seconds allowed between bytes of the response
+        """
+        self.api_base = api_base.rstrip('/')
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+            max_retries=0
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'Content-Type': 'application/json',
+            'Connection': 'keep-alive',
+            'Authorization': f'Bearer {api_key}'
+        })
+
+        self.stats = {
+            'requests': 0,
+            'errors': 0
+        }
+
+        logger.info(
+            f"OpenAI client initialized (pool_maxsize={pool_maxsize}, "
+            f"timeouts={connect_timeout}s/{read_timeout}s)"
+        )
+
+    def _timeout(self, read_timeout: Optional[float] = None) -> Tuple[float, float]:
+        """Build a (connect, read) timeout tuple"""
+        return (self.connect_timeout, read_timeout if read_timeout is not None else self.read_timeout)
+
+    def chat_completions(self, payload: Dict[str, Any], read_timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Call /chat/completions
+
+        Args:
+            payload: Request body (model, messages, max_tokens, ...)
+            read_timeout: Optional override for the read timeout
+
+        Returns:
+            Parsed JSON response
+
+        Raises:
+            OpenAIAPIError: On a non-200 response
+            requests.RequestException: On connection or timeout errors
+        """
+        self.stats['requests'] += 1
+
+        response = self.session.post(
+            f"{self.api_base}/chat/completions",
+            json=payload,
+            timeout=self._timeout(read_timeout)
+        )
+        if response.status_code != 200:
+            self.stats['errors'] += 1
+            raise OpenAIAPIError(response.status_code, response.text)
+
+        return response.json()
+
+    @staticmethod
+    def extract_text(response_data: Dict[str, Any]) -> Optional[str]:
+        """
+        Extract the first choice's message text from a chat completions response
+
+        Args:
+            response_data: Parsed JSON response
+
+        Returns:
+            Stripped text or None if the response has no content
+        """
+        choices = response_data.get('choices') or []
+        if not choices:
+            return None
+
+        content = (choices[0].get('message') or {}).get('content')
+        return content.strip() if content else None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get client statistics"""
+        return dict(self.stats)
+
+    def close(self):
+        """Close all pooled connections"""
+        self.session.close()
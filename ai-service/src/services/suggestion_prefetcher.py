@@ -0,0 +1,263 @@
+"""
+Suggestion Prefetcher for Narad AI
+Speculatively answers the suggestions returned with a turn, per session
+"""
+
+import asyncio
+import threading
+import time
+import logging
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, List, Optional
+
+from ..utils.concurrency import upstream_priority
+from ..utils.deadline import cap_timeout
+from ..utils.response_cache import ResponseCache
+
+logger = logging.getLogger(__name__)
+
+
+class _SessionPrefetch:
+    """Prefetched answers for one session, tied to the turn that produced its suggestions"""
+
+    __slots__ = ('generation', 'created_at', 'futures')
+
+    def __init__(self, generation: int):
+        self.generation = generation
+        self.created_at = time.monotonic()
+        self.futures: Dict[str, Future] = {}
+
+
+class SuggestionPrefetcher:
+    """
+    After a turn is answered, generates answers to the suggestions it
+    returned in the background (prefetch priority class), with the session's
+    updated history in the prompt, and keeps them for `ttl` seconds.
+
+    A session holds the prefetches of its latest turn only: a new turn, the
+    TTL or LRU eviction discards the previous set, and answers nobody asked
+    for are counted as wasted tokens. A click on a suggestion whose answer
+    is still being generated waits for it rather than starting another call.
+    """
+
+    def __init__(
+        self,
+        generate: Callable[[str, str, str], Optional[Dict[str, Any]]],
+        ttl: float = 120,
+        max_sessions: int = 5000,
+        max_workers: int = 4,
+        max_pending: int = 64,
+        wait_timeout: float = 30,
+        enabled: bool = False
+    ):
+        """
+        Initialize the prefetcher
+
+        Args:
+            generate: Callable (message, session_id, language) returning {'response', 'intent', 'language', 'tokens'} or None
+            ttl: Seconds a prefetched answer is kept
+            max_sessions: Sessions tracked at once (least recently used are dropped)
+            max_workers: Prefetch calls in flight at once in this process
+            max_pending: Prefetches queued or running before new ones are skipped
+            wait_timeout: Longest a click waits for an answer still being prefetched
+            enabled: Master switch; a disabled prefetcher never schedules or hits
+        """
+        self.generate = generate
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.wait_timeout = wait_timeout
+        self.enabled = enabled
+
+        # Reentrant: a done future's callback runs at once in the thread adding it
+        self._lock = threading.RLock()
+        self._sessions: "OrderedDict[str, _SessionPrefetch]" = OrderedDict()
+        self._generation = 0
+        self._pending = 0
+        self._executor = None
+
+        self.stats = {
+            'scheduled': 0,
+            'skipped': 0,
+            'generated': 0,
+            'failed': 0,
+            'hits': 0,
+            'misses': 0,
+            'expired': 0,
+            'superseded': 0,
+            'used_tokens': 0,
+            'wasted_tokens': 0
+        }
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='prefetch')
+            return self._executor
+
+    def schedule(self, session_id: str, suggestions: List[str], language: str):
+        """
+        Start prefetching a turn's suggestions, replacing the session's previous set
+
+        Args:
+            session_id: Session the suggestions were returned to
+            suggestions: Suggestion messages returned with the turn
+            language: Preferred language code for the answers
+        """
+        if not self.enabled or not suggestions:
+            return
+
+        executor = self._get_executor()
+        with self._lock:
+            self._expire()
+            self._generation += 1
+            previous = self._sessions.pop(session_id, None)
+            if previous:
+                self._discard(previous, 'superseded')
+
+            entry = _SessionPrefetch(self._generation)
+            self._sessions[session_id] = entry
+            while len(self._sessions) > self.max_sessions:
+                _, evicted = self._sessions.popitem(last=False)
+                self._discard(evicted, 'expired')
+
+            for message in suggestions:
+                key = ResponseCache.normalize_message(message)
+                if key in entry.futures:
+                    continue
+                if self._pending >= self.max_pending:
+                    self.stats['skipped'] += 1
+                    continue
+                self._pending += 1
+                self.stats['scheduled'] += 1
+                entry.futures[key] = executor.submit(self._run, session_id, entry.generation, message, language)
+
+    def _run(self, session_id: str, generation: int, message: str, language: str) -> Optional[Dict[str, Any]]:
+        """Generate one answer unless its session moved on first"""
+        with self._lock:
+            current = self._sessions.get(session_id)
+            if current is None or current.generation != generation:
+                self._pending -= 1
+                return None
+
+        try:
+            with upstream_priority('prefetch'):
+                result = self.generate(message, session_id, language)
+        except Exception as e:
+            logger.warning(f"Prefetch of suggestion {message[:60]!r} failed: {type(e).__name__}: {e}")
+            result = None
+
+        with self._lock:
+            self._pending -= 1
+            self.stats['generated' if result else 'failed'] += 1
+        return result
+
+    def take(self, session_id: str, message: str, language: str) -> Optional[Dict[str, Any]]:
+        """
+        Claim the prefetched answer to a message, waiting for it if it is still being generated
+
+        Args:
+            session_id: Session the message was sent in
+            message: The user's message
+            language: Resolved response language of the turn
+
+        Returns:
+            {'response', 'intent', 'language', 'tokens'} or None when nothing usable was prefetched
+        """
+        future = self._claim(session_id, message)
+        if future is None:
+            return None
+        try:
+            result = future.result(timeout=cap_timeout(self.wait_timeout))
+        except FutureTimeoutError:
+            result = None
+        return self._settle(result, language)
+
+    async def take_async(self, session_id: str, message: str, language: str) -> Optional[Dict[str, Any]]:
+        """Async variant of take; waiting does not block the event loop"""
+        future = self._claim(session_id, message)
+        if future is None:
+            return None
+        try:
+            result = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), cap_timeout(self.wait_timeout))
+        except asyncio.TimeoutError:
+            result = None
+        return self._settle(result, language)
+
+    def _claim(self, session_id: str, message: str) -> Optional[Future]:
+        """Remove and return the session's prefetch for a message, if it has a live one"""
+        if not self.enabled:
+            return None
+
+        key = ResponseCache.normalize_message(message)
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None or key not in entry.futures:
+                return None
+            if time.monotonic() - entry.created_at > self.ttl:
+                del self._sessions[session_id]
+                self._discard(entry, 'expired')
+                self.stats['misses'] += 1
+                return None
+            return entry.futures.pop(key)
+
+    def _settle(self, result: Optional[Dict[str, Any]], language: str) -> Optional[Dict[str, Any]]:
+        """Count a claimed prefetch as a hit, or as a miss whose tokens were wasted"""
+        with self._lock:
+            if result and result['language'] == language:
+                self.stats['hits'] += 1
+                self.stats['used_tokens'] += result['tokens']
+                return result
+            self.stats['misses'] += 1
+            if result:
+                self.stats['wasted_tokens'] += result['tokens']
+        return None
+
+    def _discard(self, entry: _SessionPrefetch, reason: str):
+        """Count a session's unclaimed answers as wasted (caller holds the lock)"""
+        for future in entry.futures.values():
+            if future.cancel():
+                # Never started: no tokens spent
+                self._pending -= 1
+                continue
+            future.add_done_callback(self._count_wasted)
+            self.stats[reason] += 1
+        entry.futures.clear()
+
+    def _count_wasted(self, future: Future):
+        result = future.result() if not future.cancelled() else None
+        if result:
+            with self._lock:
+                self.stats['wasted_tokens'] += result['tokens']
+
+    def _expire(self):
+        """Drop sessions whose prefetches are past the TTL (caller holds the lock)"""
+        now = time.monotonic()
+        while self._sessions:
+            session_id, entry = next(iter(self._sessions.items()))
+            if now - entry.created_at <= self.ttl:
+                break
+            del self._sessions[session_id]
+            self._discard(entry, 'expired')
+
+    def sweep(self):
+        """Discard expired prefetches now (otherwise done as new turns are scheduled)"""
+        with self._lock:
+            self._expire()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get prefetch statistics, including hit rate and token efficiency"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['sessions'] = len(self._sessions)
+            stats['pending'] = self._pending
+        clicks = stats['hits'] + stats['misses']
+        spent = stats['used_tokens'] + stats['wasted_tokens']
+        stats['hit_rate'] = round(stats['hits'] / clicks, 4) if clicks else 0.0
+        stats['used_ratio'] = round(stats['hits'] / stats['generated'], 4) if stats['generated'] else 0.0
+        stats['wasted_token_ratio'] = round(stats['wasted_tokens'] / spent, 4) if spent else 0.0
+        stats['enabled'] = self.enabled
+        stats['ttl'] = self.ttl
+        return stats
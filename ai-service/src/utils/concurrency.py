@@ -0,0 +1,650 @@
+"""
+Upstream concurrency limiting for Narad AI
+One process-wide cap on in-flight upstream calls, shared by threads and coroutines
+and scheduled across priority classes, and an AIMD controller that adapts the cap
+to how the upstream is coping
+"""
+
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+import logging
+from collections import deque
+from contextlib import contextmanager, asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from .deadline import cap_timeout, deadline_passed
+
+logger = logging.getLogger(__name__)
+
+
+class LimitExceededError(Exception):
+    """Raised when no upstream slot frees up within the caller's timeout"""
+
+
+class CallAbandonedError(LimitExceededError):
+    """Raised when a call asks for a slot after its cancel scope was cancelled"""
+
+
+DEFAULT_PRIORITY = 'interactive'
+
+_current_priority = contextvars.ContextVar('upstream_priority', default=DEFAULT_PRIORITY)
+_current_cancel_scope = contextvars.ContextVar('cancel_scope', default=None)
+
+
+def current_priority() -> str:
+    """Priority class of upstream calls made from the current context"""
+    return _current_priority.get()
+
+
+@contextmanager
+def upstream_priority(priority: str):
+    """
+    Run a block's upstream calls in the given priority class
+
+    The class follows the context into coroutines and tasks; work handed to
+    a thread pool needs contextvars.copy_context().run to keep it.
+    """
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+class CancelScope:
+    """
+    Lets a thread give up on upstream work it cannot interrupt, such as the
+    losing branch of a hedged call. Cancelling returns every slot held
+    inside the scope to its limiter at once and refuses new ones; the
+    request already on the wire runs out in the background and its result
+    is discarded.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._releases = []
+        self.cancelled = False
+
+    def cancel(self):
+        """Abandon the scope's work, handing its slots to the next callers"""
+        with self._lock:
+            if self.cancelled:
+                return
+            self.cancelled = True
+            releases, self._releases = self._releases, []
+        for release in releases:
+            release()
+
+    def _hold(self, release: Callable[[], None]) -> bool:
+        """Register a held slot; False if the scope is already cancelled"""
+        with self._lock:
+            if self.cancelled:
+                return False
+            self._releases.append(release)
+            return True
+
+    def _drop(self, release: Callable[[], None]) -> bool:
+        """Unregister a slot; False if cancel already released it"""
+        with self._lock:
+            if release in self._releases:
+                self._releases.remove(release)
+                return True
+            return False
+
+
+@contextmanager
+def cancel_scope(scope: CancelScope):
+    """Run a block's upstream calls so that scope.cancel() abandons them"""
+    token = _current_cancel_scope.set(scope)
+    try:
+        yield
+    finally:
+        _current_cancel_scope.reset(token)
+
+
+def call_abandoned() -> bool:
+    """Whether the current context's cancel scope has been cancelled"""
+    scope = _current_cancel_scope.get()
+    return scope is not None and scope.cancelled
+
+
+class _ThreadWaiter:
+    __slots__ = ('priority', 'event', 'granted', 'preempted')
+
+    def __init__(self, priority: str):
+        self.priority = priority
+        self.event = threading.Event()
+        self.granted = False
+        self.preempted = False
+
+
+class _AsyncWaiter:
+    __slots__ = ('priority', 'loop', 'future', 'granted', 'preempted')
+
+    def __init__(self, priority: str, loop: asyncio.AbstractEventLoop):
+        self.priority = priority
+        self.loop = loop
+        self.future = loop.create_future()
+        self.granted = False
+        self.preempted = False
+
+
+class ConcurrencyLimiter:
+    """
+    Priority-aware counting semaphore usable from threads (gthread/sync
+    workers, batch pools) and from any event loop, so interactive chat,
+    streams, prefetch and batch jobs all draw from the same budget of
+    upstream calls without background work crowding out chat.
+
+    Every caller belongs to a priority class (see upstream_priority). A
+    released slot is handed directly to a waiter, so a newcomer cannot
+    overtake the queue. Between classes, waiters are picked by weighted
+    fair queuing: each grant advances its class's virtual finish time by
+    1/weight and the class with the earliest one goes next, so a class with
+    weight 8 gets eight slots for every one of a class with weight 1 while
+    both are waiting, and an idle class does not bank credit. Within a class
+    waiters are served first come, first served.
+
+    A class's `max_share` caps its calls in flight at that fraction of the
+    current limit, which keeps slots free for the classes above it. Queued
+    work of a lower class is preempted, failing with LimitExceededError so
+    its caller falls back, when a higher class needs its queue place, and
+    for classes marked `preemptible` as soon as a higher class has to wait.
+    Calls already in flight are never interrupted.
+
+    The limit can be changed at runtime (see AdaptiveLimit); when it drops,
+    calls already in flight finish and no new ones start until below it.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 32,
+        max_queue: Optional[int] = None,
+        classes: Optional[Dict[str, Dict[str, Any]]] = None
+    ):
+        """
+        Initialize the limiter
+
+        Args:
+            max_concurrent: Upstream calls allowed in flight at once
+            max_queue: Waiters allowed at once across classes; further callers fail immediately (None is unbounded)
+            classes: Priority classes, highest first: name -> {weight, max_share, timeout, preemptible}.
+                     Defaults to one interactive class; unknown class names use the first one
+        """
+        self.limit = max_concurrent
+        self.max_queue = max_queue
+        self.classes = {
+            name: {
+                'weight': float(spec.get('weight', 1)),
+                'max_share': float(spec.get('max_share', 1.0)),
+                'timeout': spec.get('timeout'),
+                'preemptible': bool(spec.get('preemptible', False))
+            }
+            for name, spec in (classes or {DEFAULT_PRIORITY: {}}).items()
+        }
+        self._rank = {name: rank for rank, name in enumerate(self.classes)}
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._queues = {name: deque() for name in self.classes}
+        self._class_in_flight = {name: 0 for name in self.classes}
+        self._finish = {name: 0.0 for name in self.classes}
+        self._virtual_time = 0.0
+
+        self.stats = {
+            'acquired': 0,
+            'queued': 0,
+            'timeouts': 0,
+            'rejected': 0,
+            'preempted': 0,
+            'max_in_flight': 0
+        }
+        self.class_stats = {
+            name: {'acquired': 0, 'queued': 0, 'timeouts': 0, 'rejected': 0, 'preempted': 0}
+            for name in self.classes
+        }
+
+    @property
+    def in_flight(self) -> int:
+        """Calls currently holding a slot"""
+        return self._in_flight
+
+    @property
+    def queue_depth(self) -> int:
+        """Callers currently waiting for a slot"""
+        return sum(len(queue) for queue in self._queues.values())
+
+    def resolve_priority(self, priority: Optional[str] = None) -> str:
+        """Class for an explicit priority, or the current context's, falling back to the first class"""
+        priority = priority or current_priority()
+        return priority if priority in self.classes else next(iter(self.classes))
+
+    def class_limit(self, priority: str) -> int:
+        """Calls of a class allowed in flight at the current limit"""
+        share = self.classes[priority]['max_share']
+        if share >= 1:
+            return self.limit
+        return max(1, int(self.limit * share))
+
+    def _can_start(self, priority: str) -> bool:
+        return self._in_flight < self.limit and self._class_in_flight[priority] < self.class_limit(priority)
+
+    def _try_acquire(self, priority: str) -> bool:
+        """Take a slot if one is free and nobody of the class is queued (caller holds the lock)"""
+        if self._can_start(priority) and not self._queues[priority]:
+            self._grant(priority)
+            return True
+        return False
+
+    def _grant(self, priority: str):
+        self._in_flight += 1
+        self._class_in_flight[priority] += 1
+        self.stats['acquired'] += 1
+        self.class_stats[priority]['acquired'] += 1
+        if self._in_flight > self.stats['max_in_flight']:
+            self.stats['max_in_flight'] = self._in_flight
+
+    def _enqueue(self, waiter):
+        """Queue a waiter, preempting lower classes as needed (caller holds the lock)"""
+        rank = self._rank[waiter.priority]
+        lower = list(self.classes)[rank + 1:]
+
+        for name in lower:
+            if self.classes[name]['preemptible']:
+                while self._queues[name]:
+                    self._preempt(self._queues[name].pop())
+
+        depth = self.queue_depth
+        if self.max_queue is not None and depth >= self.max_queue:
+            victim_class = next((name for name in reversed(lower) if self._queues[name]), None)
+            if victim_class is None:
+                self.stats['rejected'] += 1
+                self.class_stats[waiter.priority]['rejected'] += 1
+                raise LimitExceededError(f'Upstream queue full ({depth} waiting, {self.limit} in flight)')
+            self._preempt(self._queues[victim_class].pop())
+
+        queue = self._queues[waiter.priority]
+        if not queue:
+            # A class that starts waiting joins at the current virtual time, without banked credit
+            self._finish[waiter.priority] = max(self._finish[waiter.priority], self._virtual_time)
+        queue.append(waiter)
+        self.stats['queued'] += 1
+        self.class_stats[waiter.priority]['queued'] += 1
+
+    def _preempt(self, waiter):
+        """Wake a dequeued waiter without a slot (caller holds the lock)"""
+        waiter.preempted = True
+        self.stats['preempted'] += 1
+        self.class_stats[waiter.priority]['preempted'] += 1
+        self._wake(waiter)
+
+    def _timeout(self, priority: str, timeout: Optional[float]) -> Optional[float]:
+        # Never queue past the deadline of the request being served
+        return cap_timeout(timeout if timeout is not None else self.classes[priority]['timeout'])
+
+    def set_limit(self, limit: int):
+        """Change the limit, starting queued callers if it grew"""
+        with self._lock:
+            self.limit = max(1, int(limit))
+            self._dispatch()
+
+    def acquire(self, timeout: Optional[float] = None, priority: Optional[str] = None) -> str:
+        """
+        Block until a slot is free
+
+        Args:
+            timeout: Seconds to wait (None uses the class's timeout; a class without one waits indefinitely),
+                shortened to the current request deadline
+            priority: Priority class (defaults to the current context's, see upstream_priority)
+
+        Returns:
+            The class the slot was taken in, to be passed to release
+
+        Raises:
+            LimitExceededError: If the timeout passes first, the queue is full or the wait was preempted
+        """
+        priority = self.resolve_priority(priority)
+        timeout = self._timeout(priority, timeout)
+        with self._lock:
+            if self._try_acquire(priority):
+                return priority
+            waiter = _ThreadWaiter(priority)
+            self._enqueue(waiter)
+
+        if waiter.event.wait(timeout):
+            return self._granted_or_raise(waiter)
+
+        with self._lock:
+            if waiter.granted or waiter.preempted:
+                return self._granted_or_raise(waiter)
+            self._queues[priority].remove(waiter)
+            self.stats['timeouts'] += 1
+            self.class_stats[priority]['timeouts'] += 1
+        raise LimitExceededError(f'No upstream slot within {timeout}s ({self.limit} in flight)')
+
+    async def acquire_async(self, timeout: Optional[float] = None, priority: Optional[str] = None) -> str:
+        """Async variant of acquire; waiting does not block the event loop"""
+        priority = self.resolve_priority(priority)
+        timeout = self._timeout(priority, timeout)
+        with self._lock:
+            if self._try_acquire(priority):
+                return priority
+            waiter = _AsyncWaiter(priority, asyncio.get_running_loop())
+            self._enqueue(waiter)
+
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout)
+            return self._granted_or_raise(waiter)
+        except asyncio.TimeoutError:
+            with self._lock:
+                if not waiter.granted and not waiter.preempted:
+                    self._queues[priority].remove(waiter)
+                    self.stats['timeouts'] += 1
+                    self.class_stats[priority]['timeouts'] += 1
+                    raise LimitExceededError(f'No upstream slot within {timeout}s ({self.limit} in flight)')
+            # Granted or preempted while timing out
+            return self._granted_or_raise(waiter)
+        except asyncio.CancelledError:
+            with self._lock:
+                if not waiter.granted:
+                    if not waiter.preempted:
+                        self._queues[priority].remove(waiter)
+                    raise
+            self.release(priority)
+            raise
+
+    def _granted_or_raise(self, waiter) -> str:
+        if waiter.granted:
+            return waiter.priority
+        raise LimitExceededError(f'Queued {waiter.priority} call preempted by higher-priority work')
+
+    def release(self, priority: Optional[str] = None):
+        """
+        Give a slot back, handing it to the next waiter if there is one
+
+        Args:
+            priority: Class the slot was taken in (as returned by acquire)
+        """
+        priority = self.resolve_priority(priority)
+        with self._lock:
+            self._in_flight -= 1
+            self._class_in_flight[priority] -= 1
+            self._dispatch()
+
+    def _next_class(self) -> Optional[str]:
+        """Waiting class under its cap whose next grant has the earliest virtual finish time"""
+        best, best_finish = None, None
+        for name, queue in self._queues.items():
+            if not queue or self._class_in_flight[name] >= self.class_limit(name):
+                continue
+            finish = self._finish[name] + 1 / self.classes[name]['weight']
+            if best is None or finish < best_finish:
+                best, best_finish = name, finish
+        return best
+
+    def _dispatch(self):
+        """Hand free slots to waiters in weighted fair order (caller holds the lock)"""
+        while self._in_flight < self.limit:
+            priority = self._next_class()
+            if priority is None:
+                return
+            self._virtual_time = self._finish[priority]
+            self._finish[priority] += 1 / self.classes[priority]['weight']
+
+            waiter = self._queues[priority].popleft()
+            waiter.granted = True
+            self._grant(priority)
+            if not self._wake(waiter):
+                # The waiter's event loop has closed; nobody will use the slot
+                self._in_flight -= 1
+                self._class_in_flight[priority] -= 1
+
+    def _wake(self, waiter) -> bool:
+        if isinstance(waiter, _ThreadWaiter):
+            waiter.event.set()
+            return True
+        try:
+            waiter.loop.call_soon_threadsafe(_resolve, waiter.future)
+            return True
+        except RuntimeError:
+            return False
+
+    @contextmanager
+    def slot(self, timeout: Optional[float] = None, priority: Optional[str] = None):
+        """
+        Hold a slot for the duration of a with-block
+
+        Inside a cancel scope the slot is given back as soon as the scope
+        is cancelled, even while the block is still running.
+
+        Raises:
+            CallAbandonedError: If the scope was cancelled before the slot was taken
+        """
+        scope = _current_cancel_scope.get()
+        if scope is not None and scope.cancelled:
+            raise CallAbandonedError('Upstream call abandoned before it started')
+        priority = self.acquire(timeout, priority)
+        release = functools.partial(self.release, priority)
+        if scope is not None and not scope._hold(release):
+            release()
+            raise CallAbandonedError('Upstream call abandoned before it started')
+        try:
+            yield
+        finally:
+            if scope is None or scope._drop(release):
+                release()
+
+    @asynccontextmanager
+    async def slot_async(self, timeout: Optional[float] = None, priority: Optional[str] = None):
+        """Hold a slot for the duration of an async with-block"""
+        priority = await self.acquire_async(timeout, priority)
+        try:
+            yield
+        finally:
+            self.release(priority)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get limiter statistics, overall and per priority class"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['limit'] = self.limit
+            stats['in_flight'] = self._in_flight
+            stats['queue_depth'] = self.queue_depth
+            stats['classes'] = {
+                name: dict(
+                    self.class_stats[name],
+                    weight=spec['weight'],
+                    class_limit=self.class_limit(name),
+                    in_flight=self._class_in_flight[name],
+                    queue_depth=len(self._queues[name])
+                )
+                for name, spec in self.classes.items()
+            }
+        return stats
+
+
+class AdaptiveLimit:
+    """
+    AIMD controller for a ConcurrencyLimiter, driven by the latency and
+    outcome of each upstream attempt.
+
+    While latency stays near its baseline and the limit is actually in use,
+    the limit grows by one per limit's worth of successes (additive
+    increase); until the first decrease it grows by one per success, as in
+    TCP slow start, so a cold worker reaches its working limit quickly. An
+    overload signal (429/503, timeouts) multiplies it by
+    `backoff_ratio`, and a latency spike, with the short-term average above
+    `latency_tolerance` times the baseline, by `spike_backoff_ratio`. After
+    a decrease, further cuts wait `cooldown` seconds, so a burst of 429s
+    from calls already in flight counts as one signal. The baseline follows
+    latency down quickly and up slowly, so it tracks the uncongested floor
+    while still adapting to a lasting change.
+    """
+
+    SHORT_ALPHA = 0.2
+    BASELINE_ALPHA = 0.01
+
+    def __init__(
+        self,
+        limiter: ConcurrencyLimiter,
+        min_limit: int = 1,
+        max_limit: Optional[int] = None,
+        initial_limit: Optional[int] = None,
+        backoff_ratio: float = 0.5,
+        spike_backoff_ratio: float = 0.8,
+        latency_tolerance: float = 2.0,
+        min_samples: int = 10,
+        cooldown: float = 1.0,
+        is_overload: Optional[Callable[[Exception], bool]] = None,
+        enabled: bool = True
+    ):
+        """
+        Initialize the controller
+
+        Args:
+            limiter: Limiter whose limit is adjusted
+            min_limit: Floor for the limit
+            max_limit: Ceiling for the limit (defaults to the limiter's current limit)
+            initial_limit: Starting limit (defaults to max_limit)
+            backoff_ratio: Multiplier applied on an overload signal
+            spike_backoff_ratio: Multiplier applied on a latency spike
+            latency_tolerance: Short-term/baseline latency ratio counted as a spike
+            min_samples: Latency samples needed before spikes are judged
+            cooldown: Seconds between two decreases
+            is_overload: Predicate deciding whether a failed attempt signals overload
+            enabled: When False the limit stays fixed and samples are ignored
+        """
+        self.limiter = limiter
+        self.max_limit = max_limit or limiter.limit
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.backoff_ratio = backoff_ratio
+        self.spike_backoff_ratio = spike_backoff_ratio
+        self.latency_tolerance = latency_tolerance
+        self.min_samples = min_samples
+        self.cooldown = cooldown
+        self.is_overload = is_overload or (lambda error: False)
+        self.enabled = enabled
+
+        self._lock = threading.Lock()
+        self._estimate = float(max(self.min_limit, min(initial_limit or self.max_limit, self.max_limit)))
+        self._short_latency = None
+        self._baseline_latency = None
+        self._latency_samples = 0
+        self._last_decrease = 0.0
+        self._slow_start = True
+
+        self.stats = {
+            'samples': 0,
+            'overloads': 0,
+            'spikes': 0,
+            'increases': 0,
+            'decreases': 0,
+            'min_limit_seen': int(self._estimate)
+        }
+
+        if enabled:
+            limiter.set_limit(int(self._estimate))
+
+    def record(self, latency: float, overloaded: bool = False):
+        """
+        Feed one attempt into the controller
+
+        Args:
+            latency: Seconds the attempt took
+            overloaded: Whether it failed with an overload signal
+        """
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self.stats['samples'] += 1
+            now = time.monotonic()
+            if overloaded:
+                self.stats['overloads'] += 1
+                self._decrease(now, self.backoff_ratio, 'upstream overloaded')
+                return
+
+            self._latency_samples += 1
+            if self._short_latency is None:
+                self._short_latency = self._baseline_latency = latency
+            else:
+                self._short_latency += self.SHORT_ALPHA * (latency - self._short_latency)
+                alpha = self.BASELINE_ALPHA if latency > self._baseline_latency else self.SHORT_ALPHA
+                self._baseline_latency += alpha * (latency - self._baseline_latency)
+
+            if self._latency_samples >= self.min_samples and self._short_latency > self._baseline_latency * self.latency_tolerance:
+                if self._decrease(now, self.spike_backoff_ratio, f'latency {self._short_latency:.2f}s vs {self._baseline_latency:.2f}s baseline'):
+                    self.stats['spikes'] += 1
+            elif self.limiter.in_flight >= self._estimate / 2 and self._estimate < self.max_limit:
+                # Only grow a limit that is being used
+                previous = int(self._estimate)
+                step = 1 if self._slow_start else 1 / self._estimate
+                self._estimate = min(self.max_limit, self._estimate + step)
+                if int(self._estimate) > previous:
+                    self.stats['increases'] += 1
+                    self.limiter.set_limit(int(self._estimate))
+
+    def _decrease(self, now: float, ratio: float, reason: str) -> bool:
+        """Cut the limit unless a cut happened within the cooldown (caller holds the lock)"""
+        if now - self._last_decrease < self.cooldown:
+            return False
+        self._last_decrease = now
+        self._slow_start = False
+        previous = int(self._estimate)
+        self._estimate = max(float(self.min_limit), self._estimate * ratio)
+        if int(self._estimate) == previous:
+            return False
+
+        self.stats['decreases'] += 1
+        self.stats['min_limit_seen'] = min(self.stats['min_limit_seen'], int(self._estimate))
+        self.limiter.set_limit(int(self._estimate))
+        logger.warning(f"📉 Upstream concurrency limit {previous} → {int(self._estimate)} ({reason})")
+        return True
+
+    @contextmanager
+    def measure(self):
+        """
+        Record the latency and outcome of the upstream attempt run in the block
+
+        Used directly for streamed answers, whose attempt spans many yields;
+        an attempt abandoned by its consumer (GeneratorExit, cancellation)
+        is not a sample.
+        """
+        started = time.monotonic()
+        try:
+            yield
+        except Exception as e:
+            # A timeout cut short by the client's deadline says nothing about upstream load
+            if self.is_overload(e) and not deadline_passed():
+                self.record(time.monotonic() - started, overloaded=True)
+            raise
+        self.record(time.monotonic() - started)
+
+    def call(self, fn: Callable[[], Any]) -> Any:
+        """Run one upstream attempt and record its latency and outcome"""
+        with self.measure():
+            return fn()
+
+    async def call_async(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Async variant of call; fn() must return an awaitable"""
+        with self.measure():
+            return await fn()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get controller statistics"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['enabled'] = self.enabled
+            stats['limit'] = self.limiter.limit
+            stats['min_limit'] = self.min_limit
+            stats['max_limit'] = self.max_limit
+            stats['short_latency'] = round(self._short_latency, 4) if self._short_latency is not None else None
+            stats['baseline_latency'] = round(self._baseline_latency, 4) if self._baseline_latency is not None else None
+        return stats
+
+
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
@@ -79,7 +79,7 @@ class ConversationMemory:
         self.stats['total_sessions'] += 1
         self.stats['active_sessions'] += 1
         
-        logger.info(f"Created new session: {session_id}")
+        logger.debug("Created new session: %s", session_id)
         return session_data
     
     def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
@@ -352,7 +352,7 @@ class ConversationMemory:
         if session_id in self.sessions:
             del self.sessions[session_id]
             self.stats['active_sessions'] -= 1
-            logger.info(f"Expired session: {session_id}")
+            logger.debug("Expired session: %s", session_id)
     
     def cleanup_expired_sessions(self):
         """
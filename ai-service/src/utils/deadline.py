@@ -0,0 +1,90 @@
+"""
+Request deadlines for Narad AI
+The time a client is still waiting for an answer, carried from the HTTP request
+down to every upstream wait (queue slot, retries, read timeouts)
+"""
+
+import contextvars
+import math
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+_current_deadline = contextvars.ContextVar('request_deadline', default=None)
+
+
+class DeadlineExceededError(TimeoutError):
+    """Raised when a wait would outlast the request's deadline"""
+
+
+class Deadline:
+    """Point in time (monotonic clock) after which the client no longer waits"""
+
+    __slots__ = ('expires_at',)
+
+    def __init__(self, timeout: float):
+        """
+        Initialize the deadline
+
+        Args:
+            timeout: Seconds from now
+        """
+        self.expires_at = time.monotonic() + timeout
+
+    def remaining(self) -> float:
+        """Seconds left (negative once passed)"""
+        return self.expires_at - time.monotonic()
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def __repr__(self) -> str:
+        return f'Deadline(remaining={self.remaining():.3f}s)'
+
+
+def current_deadline() -> Optional[Deadline]:
+    """Deadline of the request being served in the current context, if any"""
+    return _current_deadline.get()
+
+
+@contextmanager
+def deadline_scope(deadline: Optional[Deadline]):
+    """
+    Apply a deadline to a block's upstream work
+
+    Like the priority class it follows the context into coroutines, and into
+    pool threads started with contextvars.copy_context().run. None leaves any
+    enclosing deadline in place.
+    """
+    if deadline is None:
+        yield
+        return
+    token = _current_deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _current_deadline.reset(token)
+
+
+def deadline_passed() -> bool:
+    """True when the current context has a request deadline and it has passed"""
+    deadline = _current_deadline.get()
+    return deadline is not None and deadline.expired
+
+
+def cap_timeout(timeout: Optional[float]) -> Optional[float]:
+    """
+    Shorten a timeout to the current deadline
+
+    Args:
+        timeout: Seconds the caller would wait (None waits indefinitely)
+
+    Returns:
+        The smaller of timeout and the time left, never below 0; timeout itself without a deadline
+    """
+    deadline = _current_deadline.get()
+    if deadline is None or deadline.expires_at == math.inf:
+        return timeout
+    remaining = max(0.0, deadline.remaining())
+    return remaining if timeout is None else min(timeout, remaining)
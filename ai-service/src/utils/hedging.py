@@ -0,0 +1,288 @@
+"""
+Hedged requests for upstream AI calls
+Fire a backup request to a faster model when the primary is slower than usual
+"""
+
+import asyncio
+import contextvars
+import threading
+import time
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from .concurrency import CancelScope, cancel_scope
+
+logger = logging.getLogger(__name__)
+
+PRIMARY = 'primary'
+HEDGE = 'hedge'
+
+
+class LatencyTracker:
+    """Sliding window of recent latencies with percentile lookups"""
+
+    def __init__(self, window_size: int = 200):
+        """
+        Args:
+            window_size: Number of most recent samples kept
+        """
+        self._samples = deque(maxlen=window_size)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        """Add a latency sample"""
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """
+        Nearest-rank percentile of the window
+
+        Args:
+            pct: Percentile between 0 and 100
+
+        Returns:
+            Latency in seconds, or None without samples
+        """
+        with self._lock:
+            if not self._samples:
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+        return ordered[index]
+
+
+class HedgePolicy:
+    """
+    Runs a primary call and, if it has not finished within the hedge delay,
+    a backup call; the first successful result wins.
+
+    The hedge delay is the configured percentile of the primary's recent
+    latency, clamped to [min_delay, max_delay], so roughly (100 - percentile)%
+    of requests are hedged. Async losers are cancelled. In threads a losing
+    call cannot be interrupted, so it is abandoned: its cancel scope hands
+    its upstream slot to the next caller and stops its retries, and its
+    result is discarded. Either way the primary's latency is recorded: a
+    cancelled primary contributes the time it ran, so slow primaries still
+    push the delay up.
+
+    Hedges run in their own pool, at most `max_hedges` at once. When that
+    many are in flight a slow primary is simply awaited (`hedges_skipped`),
+    so a latency spike cannot double the upstream load or starve primaries
+    of threads.
+
+    A primary that fails within the hedge delay is counted as
+    `primary_failed_fast` and its error is raised without hedging. Hedging
+    is for slowness: the primary call already retried transient errors, and
+    what is left (a bad request, an open circuit) would fail the same way
+    on the backup model, so the caller's own fallback deals with it.
+    """
+
+    def __init__(
+        self,
+        latency_percentile: float = 95.0,
+        initial_delay: float = 2.0,
+        min_delay: float = 0.5,
+        max_delay: float = 10.0,
+        window_size: int = 200,
+        min_samples: int = 20,
+        max_workers: int = 32,
+        max_hedges: int = 8
+    ):
+        """
+        Initialize the hedge policy
+
+        Args:
+            latency_percentile: Primary latency percentile used as the hedge delay
+            initial_delay: Delay used until min_samples latencies are known
+            min_delay: Lower bound on the hedge delay, in seconds
+            max_delay: Upper bound on the hedge delay, in seconds
+            window_size: Primary latency samples kept
+            min_samples: Samples needed before the percentile is trusted
+            max_workers: Threads available to sync primary calls
+            max_hedges: Hedges allowed in flight at once (also the sync hedge pool's size)
+        """
+        self.latency_percentile = latency_percentile
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_samples = min_samples
+        self.max_workers = max_workers
+        self.max_hedges = max(1, max_hedges)
+
+        self.primary_latency = LatencyTracker(window_size)
+        self.hedge_latency = LatencyTracker(window_size)
+
+        # Created on first use so a pre-fork instance never owns threads
+        self._executor = None
+        self._hedge_executor = None
+        self._executor_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._hedges_in_flight = 0
+
+        self.stats = {
+            'calls': 0,
+            'hedges_fired': 0,
+            'hedges_skipped': 0,
+            'primary_wins': 0,
+            'primary_failed_fast': 0,
+            'hedge_wins': 0,
+            'both_failed': 0
+        }
+
+    def hedge_delay(self) -> float:
+        """Current delay before the backup request is fired"""
+        if len(self.primary_latency) < self.min_samples:
+            delay = self.initial_delay
+        else:
+            delay = self.primary_latency.percentile(self.latency_percentile)
+        return min(self.max_delay, max(self.min_delay, delay))
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def _get_executors(self):
+        """(primary pool, hedge pool)"""
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='hedge-primary')
+                self._hedge_executor = ThreadPoolExecutor(max_workers=self.max_hedges, thread_name_prefix='hedge')
+            return self._executor, self._hedge_executor
+
+    def _start_hedge(self) -> bool:
+        """Claim a hedge slot, or count the hedge as skipped when all are taken"""
+        with self._stats_lock:
+            if self._hedges_in_flight >= self.max_hedges:
+                self.stats['hedges_skipped'] += 1
+                return False
+            self._hedges_in_flight += 1
+            self.stats['hedges_fired'] += 1
+            return True
+
+    def _end_hedge(self):
+        with self._stats_lock:
+            self._hedges_in_flight -= 1
+
+    def _branch(self, fn: Callable[[], Any], tracker: LatencyTracker, scope: CancelScope) -> Callable[[], Any]:
+        """Wrap fn to run in its cancel scope and record the latency of successful calls"""
+        def run():
+            with cancel_scope(scope):
+                started = time.monotonic()
+                result = fn()
+                tracker.record(time.monotonic() - started)
+                return result
+        return run
+
+    def call(self, primary: Callable[[], Any], hedge: Callable[[], Any]) -> Any:
+        """
+        Run primary, hedging with backup after the hedge delay
+
+        Args:
+            primary: Zero-argument callable for the primary model
+            hedge: Zero-argument callable for the faster backup model
+
+        Returns:
+            The first successful result
+        """
+        self._count('calls')
+        delay = self.hedge_delay()
+        executor, hedge_executor = self._get_executors()
+
+        # Each branch keeps the caller's context (priority class, deadline) in the pool thread
+        primary_scope = CancelScope()
+        primary_future = executor.submit(contextvars.copy_context().run, self._branch(primary, self.primary_latency, primary_scope))
+        done, _ = wait([primary_future], timeout=delay)
+        if done:
+            self._count('primary_wins' if primary_future.exception() is None else 'primary_failed_fast')
+            return primary_future.result()
+        if not self._start_hedge():
+            return primary_future.result()
+
+        hedge_scope = CancelScope()
+        hedge_future = hedge_executor.submit(contextvars.copy_context().run, self._branch(hedge, self.hedge_latency, hedge_scope))
+        hedge_future.add_done_callback(lambda _: self._end_hedge())
+        branches = {primary_future: (PRIMARY, primary_scope), hedge_future: (HEDGE, hedge_scope)}
+        pending = set(branches)
+        last_error = None
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for loser in pending:
+                        if not loser.cancel():
+                            branches[loser][1].cancel()
+                    self._count(f"{branches[future][0]}_wins")
+                    return future.result()
+                last_error = future.exception()
+
+        self._count('both_failed')
+        raise last_error
+
+    async def call_async(self, primary: Callable[[], Awaitable[Any]], hedge: Callable[[], Awaitable[Any]]) -> Any:
+        """Async variant of call; the losing branch is cancelled"""
+        self._count('calls')
+        delay = self.hedge_delay()
+
+        async def timed(fn, tracker):
+            started = time.monotonic()
+            try:
+                result = await fn()
+            except asyncio.CancelledError:
+                # A cancelled loser ran at least this long; leaving it out would bias the tracker low
+                tracker.record(time.monotonic() - started)
+                raise
+            tracker.record(time.monotonic() - started)
+            return result
+
+        primary_task = asyncio.ensure_future(timed(primary, self.primary_latency))
+        try:
+            done, _ = await asyncio.wait({primary_task}, timeout=delay)
+        except asyncio.CancelledError:
+            # The caller gave up before the hedge delay; asyncio.wait leaves the task running
+            primary_task.cancel()
+            raise
+        if done:
+            self._count('primary_wins' if primary_task.exception() is None else 'primary_failed_fast')
+            return primary_task.result()
+        if not self._start_hedge():
+            return await primary_task
+
+        hedge_task = asyncio.ensure_future(timed(hedge, self.hedge_latency))
+        hedge_task.add_done_callback(lambda _: self._end_hedge())
+        branches = {primary_task: PRIMARY, hedge_task: HEDGE}
+        pending = set(branches)
+        last_error = None
+
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        self._count(f"{branches[task]}_wins")
+                        return task.result()
+                    last_error = task.exception()
+        finally:
+            for task in pending:
+                task.cancel()
+
+        self._count('both_failed')
+        raise last_error
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hedging statistics, including the live inputs for tuning the delay"""
+        with self._stats_lock:
+            stats = dict(self.stats)
+            stats['hedges_in_flight'] = self._hedges_in_flight
+        stats['hedge_delay'] = round(self.hedge_delay(), 3)
+        stats['primary_p50'] = self.primary_latency.percentile(50)
+        stats['primary_p99'] = self.primary_latency.percentile(99)
+        stats['hedge_p50'] = self.hedge_latency.percentile(50)
+        stats['hedge_rate'] = round(stats['hedges_fired'] / stats['calls'], 4) if stats['calls'] else 0.0
+        return stats
@@ -1,47 +1,322 @@
 """
 Logging configuration for AI services
+Queue-backed handlers, JSON records, payload truncation, secret redaction
+and per-category sampling, so that logging stays off the request path
 """
 
+import atexit
+import json
 import logging
 import os
-from logging.handlers import RotatingFileHandler
-from datetime import datetime
+import queue
+import random
+import re
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, TextIO
+
+# Attributes every LogRecord has; anything else was passed as a structured field
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+# Gemini keys and key=... query parameters in URLs or error bodies
+_SECRET_PATTERNS = [
+    (re.compile(r'AIza[0-9A-Za-z_\-]{20,}'), '[REDACTED]'),
+    (re.compile(r'([?&](?:key|api_key|token)=)[^&\s"\']+', re.IGNORECASE), r'\1[REDACTED]'),
+    (re.compile(r'(Bearer\s+)[A-Za-z0-9._\-]+'), r'\1[REDACTED]')
+]
+
+_listener: Optional[QueueListener] = None
+
+
+def redact(text: str) -> str:
+    """Mask API keys and bearer tokens in a log line"""
+    for pattern, replacement in _SECRET_PATTERNS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def truncate(value: Any, max_chars: int) -> Any:
+    """Shorten long strings (and strings inside lists/dicts) to max_chars"""
+    if isinstance(value, str):
+        return value if len(value) <= max_chars else f'{value[:max_chars]}...[{len(value) - max_chars} more chars]'
+    if isinstance(value, dict):
+        return {key: truncate(item, max_chars) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [truncate(item, max_chars) for item in value]
+    return value
+
+
+class TextFormatter(logging.Formatter):
+    """The usual text line, truncated and with secrets masked"""
+
+    def __init__(self, fmt: str = None, datefmt: str = None, max_chars: int = 2000):
+        super().__init__(fmt, datefmt)
+        self.max_chars = max_chars
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        # Other handlers format the same record, so restore the full message
+        message = record.message
+        record.message = truncate(message, self.max_chars)
+        try:
+            return redact(super().formatMessage(record))
+        finally:
+            record.message = message
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line: ts, level, logger, msg, plus the record's
+    structured fields (event and the fields given to log_event, or extra=
+    attributes). Long strings are truncated to max_field_chars and secrets
+    are masked.
+    """
+
+    def __init__(self, max_field_chars: int = 500):
+        super().__init__()
+        self.max_field_chars = max_field_chars
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': truncate(record.getMessage(), self.max_field_chars)
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and key != 'fields' and not key.startswith('_'):
+                entry[key] = truncate(value, self.max_field_chars)
+        # log_event fields may use names LogRecord reserves ('message', 'args')
+        for key, value in (getattr(record, 'fields', None) or {}).items():
+            entry[key] = truncate(value, self.max_field_chars)
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return redact(json.dumps(entry, ensure_ascii=False, default=str))
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps a fraction of INFO/DEBUG records per category. A record's category
+    is its `event` field, else its logger name (a rate set for 'src.services'
+    covers every logger below it). Warnings and errors are always kept.
+    """
+
+    def __init__(self, rates: Optional[Dict[str, float]] = None):
+        super().__init__()
+        self.rates = rates or {}
+        self.dropped = 0
+
+    def rate_for(self, record: logging.LogRecord) -> float:
+        event = getattr(record, 'event', None)
+        if event in self.rates:
+            return self.rates[event]
+        name = record.name
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition('.')[0]
+        return self.rates.get('*', 1.0)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        rate = self.rate_for(record)
+        if rate >= 1.0 or random.random() < rate:
+            return True
+        self.dropped += 1
+        return False
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Hands records to the listener thread without formatting them. Message
+    arguments are rendered by the listener, so they must not be mutated
+    after the call. When the queue is full the record is dropped and counted
+    rather than blocking the request.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    """Parse 'category=rate,...' (e.g. 'chat_turn=0.1,src.services.gemini_client=0.05')"""
+    rates = {}
+    for item in (spec or '').split(','):
+        name, _, rate = item.partition('=')
+        if name.strip() and rate.strip():
+            rates[name.strip()] = min(1.0, max(0.0, float(rate)))
+    return rates
+
+
+def configure_logging(
+    level: str = 'INFO',
+    fmt: str = 'text',
+    use_queue: bool = True,
+    queue_size: int = 10000,
+    max_field_chars: int = 500,
+    sample_rates: Optional[Dict[str, float]] = None,
+    log_file: Optional[str] = None,
+    stream: Optional[TextIO] = None
+) -> logging.Logger:
+    """
+    Configure the root logger for the service
+
+    Handlers (stderr, plus a rotating file if log_file is set) run on a
+    listener thread behind a bounded queue; the request thread only decides
+    sampling and enqueues the record.
+
+    Args:
+        level: Root log level
+        fmt: 'text' for the usual lines, 'json' for one JSON record per line
+        use_queue: Write from a background thread (False writes inline)
+        queue_size: Records buffered before new ones are dropped
+        max_field_chars: Longer strings in a record are truncated
+        sample_rates: Category -> fraction of INFO/DEBUG records kept
+        log_file: Optional path of a rotating log file
+        stream: Console stream (defaults to stderr)
+
+    Returns:
+        The root logger
+    """
+    global _listener
+
+    if fmt == 'json':
+        formatter = JsonFormatter(max_field_chars)
+    else:
+        formatter = TextFormatter('%(asctime)s - %(levelname)s - %(message)s', max_chars=max_field_chars * 4)
+
+    handlers: List[logging.Handler] = [logging.StreamHandler(stream)]
+    if log_file:
+        os.makedirs(os.path.dirname(os.path.abspath(log_file)), exist_ok=True)
+        handlers.append(RotatingFileHandler(log_file, maxBytes=10 * 1024 * 1024, backupCount=5))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    stop_logging()
+    # No formatter here uses the process name (logging's documented opt-out);
+    # the process id stays, gunicorn's own access/error formatters need it
+    logging.logMultiprocessing = False
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.setLevel(getattr(logging, level.upper(), logging.INFO))
+
+    sampler = SamplingFilter(sample_rates)
+    if use_queue:
+        log_queue = queue.Queue(maxsize=queue_size)
+        front = NonBlockingQueueHandler(log_queue)
+        _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        front.addFilter(sampler)
+        root.addHandler(front)
+    else:
+        for handler in handlers:
+            handler.addFilter(sampler)
+            root.addHandler(handler)
+    return root
+
+
+def stop_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def restart_logging():
+    """Start a fresh queue and listener thread (threads do not survive fork; call from a post-fork hook)"""
+    global _listener
+    if _listener is None:
+        return
+    log_queue = queue.Queue(maxsize=_listener.queue.maxsize)
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, NonBlockingQueueHandler):
+            handler.queue = log_queue
+    _listener = QueueListener(log_queue, *_listener.handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def get_logging_stats() -> Dict[str, Any]:
+    """Records dropped by sampling and by a full queue"""
+    stats = {'sampled_out': 0, 'queue_dropped': 0, 'queue_depth': 0}
+    for handler in logging.getLogger().handlers:
+        for log_filter in handler.filters:
+            if isinstance(log_filter, SamplingFilter):
+                stats['sampled_out'] += log_filter.dropped
+        if isinstance(handler, NonBlockingQueueHandler):
+            stats['queue_dropped'] += handler.dropped
+            stats['queue_depth'] += handler.queue.qsize()
+    return stats
+
+
+atexit.register(stop_logging)
+
+
+def log_event(logger: logging.Logger, event: str, msg: str, *args, level: int = logging.INFO, **fields):
+    """
+    Log a structured record
+
+    The text line is msg % args; JSON output also carries event and fields.
+    Nothing is formatted unless the level is enabled, and then only on the
+    listener thread.
+
+    Args:
+        logger: Logger instance
+        event: Category used for sampling and by log consumers ('chat_request', ...)
+        msg: %-style message for text output
+        level: Log level
+        **fields: Structured fields (strings are truncated when written)
+    """
+    if logger.isEnabledFor(level):
+        logger.log(level, msg, *args, extra={'event': event, 'fields': fields})
+
 
 def setup_logger(name: str, level: str = None) -> logging.Logger:
     """
     Set up a logger with both file and console handlers
-    
+
     Args:
         name: Logger name
         level: Log level (DEBUG, INFO, WARNING, ERROR, CRITICAL)
-        
+
     Returns:
         Configured logger instance
     """
     # Create logger
     logger = logging.getLogger(name)
-    
+
     # Set log level
     log_level = getattr(logging, (level or os.getenv('LOG_LEVEL', 'INFO')).upper())
     logger.setLevel(log_level)
-    
+
     # Prevent adding multiple handlers
     if logger.handlers:
         return logger
-    
+
     # Create formatters
-    file_formatter = logging.Formatter(
+    file_formatter = TextFormatter(
         '%(asctime)s - %(name)s - %(levelname)s - %(module)s:%(lineno)d - %(message)s'
     )
-    console_formatter = logging.Formatter(
+    console_formatter = TextFormatter(
         '%(asctime)s - %(levelname)s - %(message)s',
         datefmt='%H:%M:%S'
     )
-    
+
     # Create logs directory if it doesn't exist
     logs_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), '..', 'logs')
     os.makedirs(logs_dir, exist_ok=True)
-    
+
     # File handler (rotating)
     file_handler = RotatingFileHandler(
         filename=os.path.join(logs_dir, f'{name}.log'),
@@ -50,16 +325,16 @@ def setup_logger(name: str, level: str = None) -> logging.Logger:
     )
     file_handler.setLevel(logging.DEBUG)
     file_handler.setFormatter(file_formatter)
-    
+
     # Console handler
     console_handler = logging.StreamHandler()
     console_handler.setLevel(logging.INFO)
     console_handler.setFormatter(console_formatter)
-    
+
     # Add handlers to logger
     logger.addHandler(file_handler)
     logger.addHandler(console_handler)
-    
+
     return logger
 
 def log_ai_interaction(
@@ -72,7 +347,7 @@ def log_ai_interaction(
 ):
     """
     Log AI interaction for analysis and debugging
-    
+
     Args:
         logger: Logger instance
         user_message: User's input message
@@ -81,10 +356,11 @@ def log_ai_interaction(
         intent: Detected intent
         confidence: Response confidence score
     """
-    logger.info(
-        f"AI_INTERACTION | Session: {session_id} | Intent: {intent} | "
-        f"Confidence: {confidence:.2f} | User: {user_message[:100]}... | "
-        f"AI: {ai_response[:100]}..."
+    log_event(
+        logger, 'ai_interaction',
+        "AI_INTERACTION | Session: %s | Intent: %s | Confidence: %.2f | User: %.100s... | AI: %.100s...",
+        session_id, intent, confidence, user_message, ai_response,
+        session_id=session_id, intent=intent, confidence=confidence
     )
 
 def log_performance(
@@ -96,7 +372,7 @@ def log_performance(
 ):
     """
     Log performance metrics
-    
+
     Args:
         logger: Logger instance
         operation: Operation name
@@ -104,12 +380,11 @@ def log_performance(
         success: Whether operation was successful
         details: Additional performance details
     """
-    status = "SUCCESS" if success else "FAILED"
-    details_str = f" | Details: {details}" if details else ""
-    
-    logger.info(
-        f"PERFORMANCE | Operation: {operation} | Duration: {duration:.3f}s | "
-        f"Status: {status}{details_str}"
+    log_event(
+        logger, 'performance',
+        "PERFORMANCE | Operation: %s | Duration: %.3fs | Status: %s | Details: %s",
+        operation, duration, "SUCCESS" if success else "FAILED", details,
+        operation=operation, duration_ms=round(duration * 1000, 3), success=success, details=details
     )
 
 def log_error_with_context(
@@ -121,7 +396,7 @@ def log_error_with_context(
 ):
     """
     Log error with contextual information
-    
+
     Args:
         logger: Logger instance
         error: Exception that occurred
@@ -136,8 +411,8 @@ def log_error_with_context(
         context_str += f" | Session: {session_id}"
     if context:
         context_str += f" | Context: {context}"
-    
+
     logger.error(
         f"ERROR | {type(error).__name__}: {str(error)}{context_str}",
         exc_info=True
-    )
\ No newline at end of file
+    )
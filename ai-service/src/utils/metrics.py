@@ -0,0 +1,328 @@
+"""
+Metrics for Narad AI
+Counters, gauges and histograms exported in Prometheus text format, and
+aggregated across gunicorn workers through per-process snapshot files
+"""
+
+import atexit
+import bisect
+import glob
+import json
+import os
+import threading
+import time
+import logging
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+COUNTER = 'counter'
+GAUGE = 'gauge'
+HISTOGRAM = 'histogram'
+
+# Seconds; wide enough for local stages (sub-millisecond) and upstream calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# (metric name, labels, value) as returned by a collector
+Sample = Tuple[str, Dict[str, str], float]
+
+
+class StageTimer:
+    """
+    Splits one request into consecutive stages: mark(stage) charges the time
+    since the previous mark (or the start) to that stage
+    """
+
+    __slots__ = ('started', 'stages', '_last')
+
+    def __init__(self):
+        self.started = self._last = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+
+    def mark(self, stage: str):
+        now = time.perf_counter()
+        self.stages[stage] = self.stages.get(stage, 0.0) + now - self._last
+        self._last = now
+
+    def skip(self):
+        """Restart the clock without charging the time since the last mark to a stage"""
+        self._last = time.perf_counter()
+
+    def total(self) -> float:
+        return time.perf_counter() - self.started
+
+
+def _label_key(labels: Dict[str, Any]) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(pairs: Iterable[Tuple[str, str]]) -> str:
+    pairs = list(pairs)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class Metrics:
+    """
+    Process-local metric registry.
+
+    Updates are a dict lookup under a lock. Values that already live in
+    other components' stats (cache hits, limiter queue depth, ...) are read
+    by collectors when a snapshot is taken instead of being counted twice.
+
+    With a multiprocess directory each worker writes its snapshot to
+    `<directory>/<pid>.json` every `flush_interval` seconds, and render()
+    merges every snapshot: counters and histograms are summed over all
+    workers that ever wrote one (so totals survive worker restarts), gauges
+    over the workers still alive.
+    """
+
+    def __init__(self, directory: Optional[str] = None, flush_interval: float = 5.0, enabled: bool = True):
+        """
+        Initialize the registry
+
+        Args:
+            directory: Snapshot directory shared by the workers of one server (None keeps metrics per process)
+            flush_interval: Seconds between snapshot writes
+            enabled: Master switch; a disabled registry ignores updates
+        """
+        self.directory = directory or None
+        self.flush_interval = flush_interval
+        self.enabled = enabled
+
+        self._definitions: Dict[str, Dict[str, Any]] = {}
+        self._values: Dict[str, Dict[Tuple, Any]] = {}
+        self._collectors: List[Callable[[], Iterable[Sample]]] = []
+        self._lock = threading.Lock()
+        self._flusher = None
+        self._stop = threading.Event()
+
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            atexit.register(self.flush)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        """A forked worker starts with its own lock, no flusher and no inherited counts"""
+        self._lock = threading.Lock()
+        self._flusher = None
+        self._stop = threading.Event()
+        self._values = {name: {} for name in self._definitions}
+
+    def define(self, name: str, kind: str, help_text: str, buckets: Optional[Tuple[float, ...]] = None):
+        """Declare a metric (repeated definitions of the same name are ignored)"""
+        with self._lock:
+            if name not in self._definitions:
+                self._definitions[name] = {
+                    'type': kind,
+                    'help': help_text,
+                    'buckets': tuple(buckets or DEFAULT_BUCKETS) if kind == HISTOGRAM else None
+                }
+                self._values[name] = {}
+
+    def register_collector(self, collector: Callable[[], Iterable[Sample]]):
+        """
+        Add a callable read at snapshot time
+
+        It returns (name, labels, value) samples for defined counters or
+        gauges; counter values are the process's running totals. Registering
+        the same collector again has no effect.
+        """
+        with self._lock:
+            if collector not in self._collectors:
+                self._collectors.append(collector)
+
+    def unregister_collector(self, collector: Callable[[], Iterable[Sample]]):
+        """Remove a collector added by register_collector (unknown ones are ignored)"""
+        with self._lock:
+            if collector in self._collectors:
+                self._collectors.remove(collector)
+
+    def _ensure_flusher(self):
+        if self._flusher is None and self.directory:
+            self._flusher = threading.Thread(target=self._flush_loop, daemon=True, name='metrics-flush')
+            self._flusher.start()
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        """Add to a counter"""
+        if not self.enabled:
+            return
+        key = _label_key(labels)
+        with self._lock:
+            series = self._values[name]
+            series[key] = series.get(key, 0.0) + value
+        self._ensure_flusher()
+
+    def set(self, name: str, value: float, **labels):
+        """Set a gauge"""
+        if not self.enabled:
+            return
+        key = _label_key(labels)
+        with self._lock:
+            self._values[name][key] = value
+        self._ensure_flusher()
+
+    def observe(self, name: str, value: float, **labels):
+        """Record one observation in a histogram"""
+        if not self.enabled:
+            return
+        buckets = self._definitions[name]['buckets']
+        index = bisect.bisect_left(buckets, value)
+        key = _label_key(labels)
+        with self._lock:
+            series = self._values[name]
+            counts = series.get(key)
+            if counts is None:
+                # One count per bucket plus +Inf, then the sum
+                counts = series[key] = [0] * (len(buckets) + 1) + [0.0]
+            counts[index] += 1
+            counts[-1] += value
+        self._ensure_flusher()
+
+    def snapshot(self) -> Dict[str, List[Tuple[Tuple, Any]]]:
+        """This process's series, collectors included"""
+        with self._lock:
+            values = {
+                name: [(key, list(value) if isinstance(value, list) else value) for key, value in series.items()]
+                for name, series in self._values.items()
+            }
+        for collector in list(self._collectors):
+            try:
+                samples = list(collector())
+            except Exception as e:
+                logger.warning(f"Metrics collector failed: {e}")
+                continue
+            for name, labels, value in samples:
+                if name in values:
+                    values[name].append((_label_key(labels), value))
+        return values
+
+    def flush(self):
+        """Write this process's snapshot for the other workers to merge"""
+        if not self.directory or not self.enabled:
+            return
+        snapshot = {
+            'pid': os.getpid(),
+            'metrics': {name: [[list(key), value] for key, value in series] for name, series in self.snapshot().items()}
+        }
+        path = os.path.join(self.directory, f'{os.getpid()}.json')
+        temp_path = f'{path}.tmp'
+        try:
+            with open(temp_path, 'w') as f:
+                json.dump(snapshot, f)
+            os.replace(temp_path, path)
+        except FileNotFoundError:
+            # The server removed the directory on shutdown
+            pass
+        except OSError as e:
+            logger.warning(f"Could not write metrics snapshot: {e}")
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def _snapshots(self) -> List[Tuple[int, Dict[str, List]]]:
+        """Own snapshot (fresh) plus the latest snapshot of every other worker"""
+        own_pid = os.getpid()
+        own = {name: [[list(key), value] for key, value in series] for name, series in self.snapshot().items()}
+        snapshots = [(own_pid, own)]
+        if not self.directory:
+            return snapshots
+
+        for path in glob.glob(os.path.join(self.directory, '*.json')):
+            try:
+                with open(path) as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if data.get('pid') != own_pid:
+                snapshots.append((data.get('pid'), data.get('metrics', {})))
+        return snapshots
+
+    def render(self) -> str:
+        """All metrics in Prometheus text exposition format, merged across workers"""
+        self.flush()
+        snapshots = self._snapshots()
+        live = {pid for pid, _ in snapshots if pid == os.getpid() or _pid_alive(pid)}
+
+        merged: Dict[str, Dict[Tuple, Any]] = {name: {} for name in self._definitions}
+        for pid, metrics in snapshots:
+            for name, series in metrics.items():
+                definition = self._definitions.get(name)
+                if definition is None:
+                    continue
+                if definition['type'] == GAUGE and pid not in live:
+                    continue
+                target = merged[name]
+                for key, value in series:
+                    key = tuple(tuple(pair) for pair in key)
+                    if definition['type'] == HISTOGRAM:
+                        current = target.get(key)
+                        target[key] = value if current is None else [a + b for a, b in zip(current, value)]
+                    else:
+                        target[key] = target.get(key, 0.0) + value
+
+        lines = [
+            '# HELP narad_metrics_workers Processes whose metrics are merged here (live workers)',
+            '# TYPE narad_metrics_workers gauge',
+            f'narad_metrics_workers {len(live)}'
+        ]
+        for name in sorted(self._definitions):
+            definition = self._definitions[name]
+            lines.append(f"# HELP {name} {definition['help']}")
+            lines.append(f"# TYPE {name} {definition['type']}")
+            for key in sorted(merged[name]):
+                value = merged[name][key]
+                if definition['type'] != HISTOGRAM:
+                    lines.append(f'{name}{_format_labels(key)} {_format_value(value)}')
+                    continue
+                cumulative = 0
+                for bound, count in zip(definition['buckets'] + (float('inf'),), value[:-1]):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(key + (('le', _format_value(bound)),))} {cumulative}")
+                lines.append(f'{name}_sum{_format_labels(key)} {_format_value(value[-1])}')
+                lines.append(f'{name}_count{_format_labels(key)} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+
+_metrics: Optional[Metrics] = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics() -> Metrics:
+    """Process-wide registry configured from METRICS_CONFIG"""
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            try:
+                from ..config.settings import METRICS_CONFIG
+            except ImportError:
+                METRICS_CONFIG = {'enabled': True, 'multiprocess_dir': '', 'flush_interval': 5}
+            _metrics = Metrics(
+                directory=METRICS_CONFIG['multiprocess_dir'],
+                flush_interval=METRICS_CONFIG['flush_interval'],
+                enabled=METRICS_CONFIG['enabled']
+            )
+        return _metrics
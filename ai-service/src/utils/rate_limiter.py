@@ -0,0 +1,391 @@
+"""
+Rate limiting for Narad AI
+Token buckets per client identity, held in process or in Redis so limits hold across workers
+"""
+
+import hashlib
+import math
+import queue
+import socket
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import unquote, urlparse
+
+logger = logging.getLogger(__name__)
+
+# (capacity, refill rate in tokens per second) of one bucket
+BucketSpec = Tuple[float, float]
+
+# Atomic check-and-take across every bucket of a request. KEYS are buckets;
+# ARGV is now, cost, then capacity and rate for each key. A request is
+# admitted only if every bucket holds `cost` tokens, and then takes from all.
+TOKEN_BUCKET_SCRIPT = """
+local now = tonumber(ARGV[1])
+local cost = tonumber(ARGV[2])
+local tokens = {}
+local allowed = 1
+local retry_after = 0
+for i, key in ipairs(KEYS) do
+  local capacity = tonumber(ARGV[1 + 2 * i])
+  local rate = tonumber(ARGV[2 + 2 * i])
+  local state = redis.call('HMGET', key, 't', 'u')
+  local t = tonumber(state[1]) or capacity
+  local u = tonumber(state[2]) or now
+  t = math.min(capacity, t + math.max(0, now - u) * rate)
+  tokens[i] = t
+  if t < cost then
+    allowed = 0
+    retry_after = math.max(retry_after, (cost - t) / rate)
+  end
+end
+local remaining, limit, reset = -1, 0, 0
+for i, key in ipairs(KEYS) do
+  local capacity = tonumber(ARGV[1 + 2 * i])
+  local rate = tonumber(ARGV[2 + 2 * i])
+  local t = tokens[i]
+  if allowed == 1 then t = t - cost end
+  redis.call('HSET', key, 't', t, 'u', now)
+  redis.call('PEXPIRE', key, math.ceil((capacity - t) / rate * 1000) + 1000)
+  if remaining < 0 or t < remaining then
+    remaining, limit, reset = t, capacity, (capacity - t) / rate
+  end
+end
+return {allowed, tostring(remaining), tostring(retry_after), tostring(reset), tostring(limit)}
+"""
+
+
+def take_tokens(states: List[List[float]], specs: Sequence[BucketSpec], cost: float, now: float) -> Tuple[bool, float, float, float, float]:
+    """
+    Python twin of TOKEN_BUCKET_SCRIPT over [tokens, updated] bucket states
+
+    Args:
+        states: Mutable [tokens, updated_at] per bucket (updated in place)
+        specs: (capacity, rate) per bucket
+        cost: Tokens the request needs from every bucket
+        now: Current time in seconds
+
+    Returns:
+        (allowed, remaining, retry_after, reset, limit) for the tightest bucket
+    """
+    allowed = True
+    retry_after = 0.0
+    for state, (capacity, rate) in zip(states, specs):
+        state[0] = min(capacity, state[0] + max(0.0, now - state[1]) * rate)
+        state[1] = now
+        if state[0] < cost:
+            allowed = False
+            retry_after = max(retry_after, (cost - state[0]) / rate)
+
+    remaining, limit, reset = -1.0, 0.0, 0.0
+    for state, (capacity, rate) in zip(states, specs):
+        if allowed:
+            state[0] -= cost
+        if remaining < 0 or state[0] < remaining:
+            remaining, limit, reset = state[0], capacity, (capacity - state[0]) / rate
+    return allowed, remaining, retry_after, reset, limit
+
+
+class MemoryRateLimitBackend:
+    """
+    Buckets in a bounded in-process dict. Limits are per worker process;
+    the least recently used buckets are dropped beyond `max_keys`.
+    """
+
+    name = 'memory'
+
+    def __init__(self, max_keys: int = 100000):
+        """
+        Initialize the backend
+
+        Args:
+            max_keys: Buckets kept before the least recently used are evicted
+        """
+        self.max_keys = max_keys
+        self._buckets: 'OrderedDict[str, List[float]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, keys: Sequence[str], specs: Sequence[BucketSpec], cost: float) -> Tuple[bool, float, float, float, float]:
+        """Check and take `cost` tokens from every bucket; see take_tokens"""
+        now = time.monotonic()
+        with self._lock:
+            states = []
+            for key, (capacity, _) in zip(keys, specs):
+                state = self._buckets.get(key)
+                if state is None:
+                    state = self._buckets[key] = [capacity, now]
+                else:
+                    self._buckets.move_to_end(key)
+                states.append(state)
+            result = take_tokens(states, specs, cost, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {'backend': self.name, 'buckets': len(self._buckets)}
+
+
+class RedisError(Exception):
+    """Error reply from a Redis server"""
+
+
+class RedisRateLimitBackend:
+    """
+    Buckets in Redis (or anything speaking RESP), updated atomically by
+    TOKEN_BUCKET_SCRIPT, so every gunicorn worker and node shares one limit.
+
+    Uses a small pool of raw sockets rather than a client library; the only
+    commands sent are EVALSHA, EVAL and AUTH/SELECT on connect.
+    """
+
+    name = 'redis'
+
+    def __init__(self, url: str = 'redis://localhost:6379/0', timeout: float = 0.05, pool_size: int = 16, key_prefix: str = 'narad:rl'):
+        """
+        Initialize the backend (connections are opened lazily)
+
+        Args:
+            url: redis://[[user]:password@]host:port/db
+            timeout: Socket timeout in seconds for connect and each reply
+            pool_size: Idle connections kept for reuse
+            key_prefix: Namespace for bucket keys
+        """
+        parsed = urlparse(url)
+        self.host = parsed.hostname or 'localhost'
+        self.port = parsed.port or 6379
+        self.username = unquote(parsed.username) if parsed.username else None
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.db = int(parsed.path.lstrip('/') or 0)
+        self.timeout = timeout
+        self.key_prefix = key_prefix
+
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+        self._script_sha = hashlib.sha1(TOKEN_BUCKET_SCRIPT.encode('utf-8')).hexdigest()
+
+    def _connect(self) -> Tuple[socket.socket, Any]:
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        conn = (sock, sock.makefile('rb'))
+        if self.password:
+            self._send(conn, 'AUTH', *([self.username] if self.username else []), self.password)
+        if self.db:
+            self._send(conn, 'SELECT', self.db)
+        return conn
+
+    @staticmethod
+    def _encode(*args) -> bytes:
+        parts = [f'*{len(args)}\r\n'.encode('ascii')]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode('utf-8')
+            parts.append(b'$%d\r\n%s\r\n' % (len(data), data))
+        return b''.join(parts)
+
+    @classmethod
+    def _read_reply(cls, reader) -> Any:
+        line = reader.readline()
+        if not line:
+            raise ConnectionError('Redis closed the connection')
+        kind, body = line[:1], line[1:-2]
+        if kind == b'+':
+            return body.decode('utf-8')
+        if kind == b'-':
+            raise RedisError(body.decode('utf-8'))
+        if kind == b':':
+            return int(body)
+        if kind == b'$':
+            length = int(body)
+            if length < 0:
+                return None
+            data = reader.read(length + 2)
+            return data[:-2].decode('utf-8')
+        if kind == b'*':
+            length = int(body)
+            return None if length < 0 else [cls._read_reply(reader) for _ in range(length)]
+        raise RedisError(f'Unexpected RESP reply: {line[:50]!r}')
+
+    def _send(self, conn, *args) -> Any:
+        sock, reader = conn
+        sock.sendall(self._encode(*args))
+        return self._read_reply(reader)
+
+    def execute(self, *args) -> Any:
+        """Run one command on a pooled connection"""
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+
+        try:
+            reply = self._send(conn, *args)
+        except RedisError:
+            # The connection is still in a clean state after an error reply
+            self._release(conn)
+            raise
+        except Exception:
+            conn[0].close()
+            raise
+        self._release(conn)
+        return reply
+
+    def _release(self, conn):
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn[0].close()
+
+    def consume(self, keys: Sequence[str], specs: Sequence[BucketSpec], cost: float) -> Tuple[bool, float, float, float, float]:
+        """Check and take `cost` tokens from every bucket; see TOKEN_BUCKET_SCRIPT"""
+        keys = [f'{self.key_prefix}:{key}' for key in keys]
+        args = [time.time(), cost]
+        for capacity, rate in specs:
+            args.extend((capacity, rate))
+
+        try:
+            reply = self.execute('EVALSHA', self._script_sha, len(keys), *keys, *args)
+        except RedisError as e:
+            if not str(e).startswith('NOSCRIPT'):
+                raise
+            reply = self.execute('EVAL', TOKEN_BUCKET_SCRIPT, len(keys), *keys, *args)
+
+        allowed, remaining, retry_after, reset, limit = reply
+        return bool(int(allowed)), float(remaining), float(retry_after), float(reset), float(limit)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {'backend': self.name, 'host': f'{self.host}:{self.port}', 'idle_connections': self._pool.qsize()}
+
+
+class RateLimiter:
+    """
+    Token-bucket limiter keyed by client identities (user, session, IP).
+
+    Each identity gets one bucket per configured limit, e.g. 60/minute and
+    1000/hour; a request is admitted only if every bucket of every identity
+    it presents has room, so rotating one identifier does not escape the
+    others. If the shared backend fails, checks use an in-process backend
+    for `backend_retry_interval` seconds instead of rejecting traffic or
+    waiting on a dead server for every request.
+    """
+
+    def __init__(
+        self,
+        limits: Sequence[Tuple[int, float]],
+        backend=None,
+        enabled: bool = True,
+        max_keys: int = 100000,
+        backend_retry_interval: float = 5.0
+    ):
+        """
+        Initialize the limiter
+
+        Args:
+            limits: (requests, window seconds) pairs, e.g. [(60, 60), (1000, 3600)]
+            backend: MemoryRateLimitBackend or RedisRateLimitBackend (default in-process)
+            enabled: When False every check is admitted without touching a backend
+            max_keys: Bucket bound for the in-process backend and fallback
+            backend_retry_interval: Seconds to stay on the fallback after a backend error
+        """
+        self.limits = [(int(requests), float(window)) for requests, window in limits if requests > 0]
+        self.specs = [(float(requests), requests / window) for requests, window in self.limits]
+        self.enabled = enabled and bool(self.limits)
+        # Largest cost a full bucket can cover; anything above it could never pass
+        self.max_cost = min(requests for requests, _ in self.limits) if self.enabled else None
+        self.fallback = MemoryRateLimitBackend(max_keys)
+        self.backend = backend or self.fallback
+        self.backend_retry_interval = backend_retry_interval
+
+        self._backend_retry_at = 0.0
+        self.stats = {
+            'checked': 0,
+            'limited': 0,
+            'oversize': 0,
+            'backend_errors': 0
+        }
+
+    def check(self, identities: Sequence[str], cost: int = 1) -> Optional[Dict[str, Any]]:
+        """
+        Take `cost` requests from every identity's buckets
+
+        Args:
+            identities: Keys such as 'ip:1.2.3.4' or 'user:42'
+            cost: Requests this call counts as (a batch counts each item)
+
+        Returns:
+            None when limiting is disabled, else a dict with 'allowed',
+            'limit', 'remaining', 'reset' and 'retry_after' (seconds).
+            A cost above max_cost is rejected without taking tokens and
+            'oversize' is set, since waiting would never let it through.
+        """
+        if not self.enabled or not identities:
+            return None
+        if cost > self.max_cost:
+            self.stats['checked'] += 1
+            self.stats['limited'] += 1
+            self.stats['oversize'] += 1
+            return {
+                'allowed': False,
+                'oversize': True,
+                'limit': self.max_cost,
+                'remaining': 0,
+                'reset': 0,
+                'retry_after': 0
+            }
+
+        keys, specs = [], []
+        for identity in identities:
+            for (requests, window), spec in zip(self.limits, self.specs):
+                keys.append(f'{identity}:{int(window)}')
+                specs.append(spec)
+
+        backend = self.backend
+        if backend is not self.fallback and time.monotonic() < self._backend_retry_at:
+            backend = self.fallback
+        try:
+            allowed, remaining, retry_after, reset, limit = backend.consume(keys, specs, cost)
+        except Exception as e:
+            self.stats['backend_errors'] += 1
+            self._backend_retry_at = time.monotonic() + self.backend_retry_interval
+            logger.warning(
+                f"Rate limit backend unavailable, limiting per process for {self.backend_retry_interval}s: "
+                f"{type(e).__name__}: {e}"
+            )
+            allowed, remaining, retry_after, reset, limit = self.fallback.consume(keys, specs, cost)
+
+        self.stats['checked'] += 1
+        if not allowed:
+            self.stats['limited'] += 1
+        return {
+            'allowed': allowed,
+            'limit': int(limit),
+            'remaining': max(0, int(remaining)),
+            'reset': math.ceil(reset),
+            'retry_after': math.ceil(retry_after)
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get limiter statistics"""
+        stats = dict(self.stats)
+        stats['enabled'] = self.enabled
+        stats['limits'] = [{'requests': requests, 'window': window} for requests, window in self.limits]
+        stats['backend'] = self.backend.get_stats()
+        return stats
+
+
+def rate_limit_headers(result: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    """
+    Response headers for a check result: X-RateLimit-Limit / -Remaining /
+    -Reset (seconds until the tightest bucket is full again), plus
+    Retry-After when the request was rejected and retrying can help
+    """
+    if not result:
+        return {}
+    headers = {
+        'X-RateLimit-Limit': str(result['limit']),
+        'X-RateLimit-Remaining': str(result['remaining']),
+        'X-RateLimit-Reset': str(result['reset'])
+    }
+    if not result['allowed'] and not result.get('oversize'):
+        headers['Retry-After'] = str(max(1, result['retry_after']))
+    return headers
@@ -0,0 +1,287 @@
+"""
+Resilience helpers for upstream AI calls
+Jittered exponential-backoff retries within a total deadline, and a circuit breaker
+"""
+
+import asyncio
+import random
+import threading
+import time
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from .concurrency import call_abandoned
+from .deadline import cap_timeout, deadline_passed
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """Raised when the circuit breaker rejects a call without attempting it"""
+
+
+class CircuitBreaker:
+    """
+    Classic three-state circuit breaker.
+
+    Closed: calls flow; consecutive failures are counted.
+    Open: calls are rejected until `recovery_timeout` has elapsed.
+    Half-open: up to `half_open_max_calls` probe calls are let through; a
+    success closes the circuit, a failure opens it again, and a probe that
+    ends without a verdict (deadline, cancellation) gives its slot back.
+    """
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0, half_open_max_calls: int = 1):
+        """
+        Initialize the circuit breaker
+
+        Args:
+            failure_threshold: Consecutive failures that open the circuit
+            recovery_timeout: Seconds to stay open before probing
+            half_open_max_calls: Concurrent probe calls allowed while half-open
+        """
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+
+        self.stats = {
+            'opened': 0,
+            'rejected': 0,
+            'failures': 0,
+            'successes': 0
+        }
+
+    @property
+    def state(self) -> str:
+        """Current state, moving open -> half-open once the recovery timeout has passed"""
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            self._state = HALF_OPEN
+            self._probes = 0
+        return self._state
+
+    def allow_request(self) -> bool:
+        """
+        Ask permission for one call; a True answer while half-open claims a probe slot
+
+        Returns:
+            Whether the call may proceed
+        """
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and self._probes < self.half_open_max_calls:
+                self._probes += 1
+                return True
+            self.stats['rejected'] += 1
+            return False
+
+    def release_probe(self):
+        """Give back a half-open probe slot for a call that ended without an upstream verdict"""
+        with self._lock:
+            if self._state == HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def record_success(self):
+        """Record a call that reached a healthy upstream"""
+        with self._lock:
+            self.stats['successes'] += 1
+            self._failures = 0
+            if self._state != CLOSED:
+                logger.info("Circuit breaker closed - upstream recovered")
+            self._state = CLOSED
+            self._probes = 0
+
+    def record_failure(self):
+        """Record a call that failed because the upstream is unhealthy"""
+        with self._lock:
+            self.stats['failures'] += 1
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    self.stats['opened'] += 1
+                    logger.warning(f"Circuit breaker opened after {self._failures} consecutive failures")
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self._probes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get breaker statistics"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['state'] = self._current_state()
+            stats['consecutive_failures'] = self._failures
+        return stats
+
+
+class RetryPolicy:
+    """
+    Retries transient failures with full-jitter exponential backoff, never
+    exceeding a total deadline across all attempts. Each attempt is told how
+    much of the deadline remains so it can bound its own timeout.
+    """
+
+    def __init__(
+        self,
+        max_retries: int = 3,
+        base_delay: float = 0.25,
+        max_delay: float = 4.0,
+        total_timeout: float = 30.0,
+        is_retryable: Optional[Callable[[Exception], bool]] = None
+    ):
+        """
+        Initialize the retry policy
+
+        Args:
+            max_retries: Retries after the first attempt
+            base_delay: Backoff ceiling for the first retry, in seconds
+            max_delay: Upper bound on any single backoff, in seconds
+            total_timeout: Deadline for all attempts and backoffs together
+            is_retryable: Predicate deciding whether an error is transient
+        """
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.total_timeout = total_timeout
+        self.is_retryable = is_retryable or (lambda error: False)
+
+        self.stats = {
+            'attempts': 0,
+            'retries': 0,
+            'gave_up': 0
+        }
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter backoff for the given retry number (0-based)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def _next_delay(self, error: Exception, attempt: int, breaker: Optional[CircuitBreaker], deadline: float) -> Optional[float]:
+        """Record the failure and decide whether (and how long) to wait before retrying"""
+        retryable = self.is_retryable(error)
+        if (retryable and deadline_passed()) or call_abandoned():
+            # The client's deadline cut the attempt short, or nobody wants the
+            # answer any more (a hedge's loser); neither says anything about the upstream
+            if breaker:
+                breaker.release_probe()
+            return None
+        if breaker:
+            if retryable:
+                breaker.record_failure()
+            else:
+                # The upstream answered (e.g. a 400), so it is healthy
+                breaker.record_success()
+
+        if not retryable or attempt >= self.max_retries:
+            return None
+
+        delay = self.backoff(attempt)
+        if time.monotonic() + delay >= deadline:
+            return None
+
+        self.stats['retries'] += 1
+        logger.warning(f"Retrying upstream call in {delay:.2f}s after {type(error).__name__}: {str(error)[:100]}")
+        return delay
+
+    def call(self, fn: Callable[[float], Any], breaker: Optional[CircuitBreaker] = None, timeout: Optional[float] = None) -> Any:
+        """
+        Call fn(remaining_seconds) with retries
+
+        Args:
+            fn: Callable receiving the seconds left before the deadline
+            breaker: Optional circuit breaker consulted before every attempt
+            timeout: Optional deadline override in seconds
+
+        Returns:
+            fn's result
+
+        Raises:
+            CircuitOpenError: If the breaker rejects an attempt
+            Exception: The last error once retries or the deadline are exhausted
+        """
+        # A request deadline in scope shortens the budget further
+        deadline = time.monotonic() + cap_timeout(timeout if timeout is not None else self.total_timeout)
+
+        for attempt in range(self.max_retries + 1):
+            if breaker and not breaker.allow_request():
+                raise CircuitOpenError('Upstream circuit is open')
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                if breaker:
+                    breaker.release_probe()
+                self.stats['gave_up'] += 1
+                raise TimeoutError('Upstream deadline exceeded')
+
+            self.stats['attempts'] += 1
+            try:
+                result = fn(remaining)
+            except Exception as e:
+                delay = self._next_delay(e, attempt, breaker, deadline)
+                if delay is None:
+                    self.stats['gave_up'] += 1
+                    raise
+                time.sleep(delay)
+                continue
+
+            if breaker:
+                breaker.record_success()
+            return result
+
+        # Unreachable: the last attempt either returns or raises
+        raise TimeoutError('Upstream retries exhausted')
+
+    async def call_async(self, fn: Callable[[float], Awaitable[Any]], breaker: Optional[CircuitBreaker] = None, timeout: Optional[float] = None) -> Any:
+        """Async variant of call; fn(remaining_seconds) must return an awaitable"""
+        # A request deadline in scope shortens the budget further
+        deadline = time.monotonic() + cap_timeout(timeout if timeout is not None else self.total_timeout)
+
+        for attempt in range(self.max_retries + 1):
+            if breaker and not breaker.allow_request():
+                raise CircuitOpenError('Upstream circuit is open')
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                if breaker:
+                    breaker.release_probe()
+                self.stats['gave_up'] += 1
+                raise TimeoutError('Upstream deadline exceeded')
+
+            self.stats['attempts'] += 1
+            try:
+                result = await fn(remaining)
+            except asyncio.CancelledError:
+                # The caller went away mid-attempt; the upstream gave no verdict
+                if breaker:
+                    breaker.release_probe()
+                raise
+            except Exception as e:
+                delay = self._next_delay(e, attempt, breaker, deadline)
+                if delay is None:
+                    self.stats['gave_up'] += 1
+                    raise
+                await asyncio.sleep(delay)
+                continue
+
+            if breaker:
+                breaker.record_success()
+            return result
+
+        raise TimeoutError('Upstream retries exhausted')
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get retry statistics"""
+        return dict(self.stats)
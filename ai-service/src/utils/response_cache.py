@@ -0,0 +1,409 @@
+"""
+Response Cache for Narad AI
+Two-tier cache (in-process LRU in front of a SQLite file) for Gemini answers
+"""
+
+import asyncio
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+FRESH = 'fresh'
+STALE = 'stale'
+
+
+class ResponseCache:
+    """
+    Caches generated answers keyed on the normalized message, language, model
+    and a fingerprint of the conversation history that went into the prompt.
+
+    Entries younger than `ttl` are fresh. Entries between `ttl` and
+    `ttl + stale_ttl` are still served but reported as stale so the caller
+    can refresh them in the background (stale-while-revalidate).
+
+    Workers sharing the SQLite file share invalidations: invalidate() bumps
+    a generation counter stored in the file, and a memory hit first checks
+    that counter, dropping the whole memory tier when another process has
+    bumped it (the surviving entries are reloaded from disk). Without a disk
+    tier an invalidation only reaches the calling process.
+
+    The memory tier has its own lock, so disk I/O never blocks memory hits
+    of other threads; async callers use get_async/set_async, which run the
+    disk tier in a worker thread instead of on the event loop.
+    """
+
+    # Expired rows are purged from the disk tier every PURGE_EVERY stores
+    PURGE_EVERY = 256
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: int = 3600,
+        stale_ttl: int = 600,
+        disk_path: Optional[str] = None,
+        enabled: bool = True
+    ):
+        """
+        Initialize the response cache
+
+        Args:
+            max_entries: Maximum entries held in the in-process LRU tier
+            ttl: Seconds an entry is considered fresh
+            stale_ttl: Extra seconds a stale entry may still be served
+            disk_path: SQLite file for the persistent tier (None disables it)
+            enabled: Master switch; a disabled cache never hits or stores
+        """
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.disk_path = disk_path
+
+        self._memory: "OrderedDict[str, Tuple[str, float, str, str]]" = OrderedDict()
+        # Memory tier, stats and refresh claims; the SQLite connection has _disk_lock
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        self._refreshing = set()
+        # Invalidation generation of the disk file the memory tier matches (None: not read yet)
+        self._generation = None
+
+        # The SQLite connection is opened lazily and per process, so a cache
+        # built before a fork never shares a connection with its children
+        self._conn = None
+        self._conn_pid = None
+
+        self.stats = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'stale_hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'evictions': 0,
+            'invalidations': 0,
+            'remote_invalidations': 0
+        }
+
+        logger.info(
+            f"Response cache initialized (enabled={enabled}, max_entries={max_entries}, "
+            f"ttl={ttl}s, stale_ttl={stale_ttl}s, disk={'on' if disk_path else 'off'})"
+        )
+
+    @staticmethod
+    def normalize_message(message: str) -> str:
+        """Lowercase, collapse whitespace and drop trailing punctuation"""
+        normalized = re.sub(r'\s+', ' ', message.strip().lower())
+        return normalized.rstrip('?!.। ')
+
+    @classmethod
+    def make_key(cls, message: str, language: str, model: str, history_context: str = '') -> str:
+        """
+        Build a cache key
+
+        Args:
+            message: Raw user message
+            language: Resolved response language code
+            model: Model that produces the answer
+            history_context: Conversation history text included in the prompt
+
+        Returns:
+            Hex digest identifying the request
+        """
+        history_fingerprint = hashlib.sha1(history_context.encode('utf-8')).hexdigest()
+        raw = '\x1f'.join([cls.normalize_message(message), language, model, history_fingerprint])
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _get_conn(self) -> Optional[sqlite3.Connection]:
+        """Open (or reopen after fork) the SQLite connection"""
+        if not self.disk_path:
+            return None
+        if self._conn is None or self._conn_pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.disk_path)), exist_ok=True)
+            conn = sqlite3.connect(self.disk_path, timeout=1.0, check_same_thread=False, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS responses ('
+                'key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, '
+                'message TEXT NOT NULL, language TEXT NOT NULL)'
+            )
+            conn.execute('CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+            conn.execute("INSERT OR IGNORE INTO meta (name, value) VALUES ('generation', 0)")
+            self._conn = conn
+            self._conn_pid = os.getpid()
+            if self._generation is None:
+                # Whatever the memory tier holds was stored after this generation's invalidation
+                generation = self._read_generation(conn)
+                with self._lock:
+                    self._generation = generation
+        return self._conn
+
+    def warm_up(self):
+        """Open the disk store now rather than on the first lookup"""
+        if not self.enabled:
+            return
+        try:
+            with self._disk_lock:
+                self._get_conn()
+        except sqlite3.Error as e:
+            logger.warning(f"Response cache disk store unavailable: {e}")
+
+    def _disk(self, operation, action: str):
+        """
+        Run operation(conn) on the disk tier under the connection lock
+
+        Returns:
+            Its result, or None when there is no disk tier or SQLite fails
+        """
+        if not self.disk_path:
+            return None
+        try:
+            with self._disk_lock:
+                return operation(self._get_conn())
+        except sqlite3.Error as e:
+            logger.warning(f"Response cache disk {action} failed: {e}")
+            return None
+
+    @staticmethod
+    def _read_generation(conn: sqlite3.Connection) -> int:
+        return conn.execute("SELECT value FROM meta WHERE name = 'generation'").fetchone()[0]
+
+    def _memory_is_current(self) -> bool:
+        """
+        Check the memory tier against the shared invalidation generation,
+        dropping it when another process has invalidated since it was filled
+
+        Returns:
+            False if the memory tier was dropped
+        """
+        generation = self._disk(self._read_generation, 'read')
+        if generation is None:
+            return True
+        with self._lock:
+            if generation == self._generation:
+                return True
+            if self._generation is not None:
+                self.stats['remote_invalidations'] += 1
+            self._memory.clear()
+            self._generation = generation
+        return False
+
+    def _state(self, created_at: float, now: float) -> Optional[str]:
+        """Classify an entry's age"""
+        age = now - created_at
+        if age <= self.ttl:
+            return FRESH
+        if age <= self.ttl + self.stale_ttl:
+            return STALE
+        return None
+
+    def get(self, key: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Look up a cached answer
+
+        Args:
+            key: Key from make_key
+
+        Returns:
+            Tuple of (value, state) where state is 'fresh', 'stale' or None on a miss
+        """
+        if not self.enabled:
+            return None, None
+
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            state = self._state(entry[1], now) if entry is not None else None
+            if entry is not None and not state:
+                del self._memory[key]
+
+        if state and self._memory_is_current():
+            with self._lock:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                if state == STALE:
+                    self.stats['stale_hits'] += 1
+            return entry[0], state
+
+        row = self._disk(
+            lambda conn: conn.execute(
+                'SELECT value, created_at, message, language FROM responses WHERE key = ?', (key,)
+            ).fetchone(),
+            'read'
+        )
+
+        with self._lock:
+            if row is not None:
+                state = self._state(row[1], now)
+                if state:
+                    self._remember(key, (row[0], row[1], row[2], row[3]))
+                    self.stats['disk_hits'] += 1
+                    if state == STALE:
+                        self.stats['stale_hits'] += 1
+                    return row[0], state
+
+            self.stats['misses'] += 1
+            return None, None
+
+    async def get_async(self, key: str) -> Tuple[Optional[str], Optional[str]]:
+        """get() for the event loop: the disk tier is read in a worker thread"""
+        if not self.enabled or not self.disk_path:
+            return self.get(key)
+        return await asyncio.to_thread(self.get, key)
+
+    def set(self, key: str, value: str, message: str = '', language: str = ''):
+        """
+        Store an answer in both tiers
+
+        Args:
+            key: Key from make_key
+            value: Answer text
+            message: Raw user message (kept for targeted invalidation)
+            language: Language code (kept for targeted invalidation)
+        """
+        if not self.enabled:
+            return
+
+        entry = (value, time.time(), self.normalize_message(message), language)
+        with self._lock:
+            self._remember(key, entry)
+            self._refreshing.discard(key)
+            self.stats['stores'] += 1
+            purge = self.stats['stores'] % self.PURGE_EVERY == 0
+
+        def write(conn):
+            conn.execute(
+                'INSERT OR REPLACE INTO responses (key, value, created_at, message, language) VALUES (?, ?, ?, ?, ?)',
+                (key, entry[0], entry[1], entry[2], entry[3])
+            )
+            if purge:
+                conn.execute('DELETE FROM responses WHERE created_at < ?', (entry[1] - self.ttl - self.stale_ttl,))
+
+        self._disk(write, 'write')
+
+    async def set_async(self, key: str, value: str, message: str = '', language: str = ''):
+        """set() for the event loop: the disk tier is written in a worker thread"""
+        if not self.enabled or not self.disk_path:
+            self.set(key, value, message, language)
+            return
+        await asyncio.to_thread(self.set, key, value, message, language)
+
+    def fresh_for(self, key: str) -> float:
+        """
+        Seconds an entry stays fresh (0 when stale or missing), without counting a lookup
+
+        Args:
+            key: Key from make_key
+        """
+        if not self.enabled:
+            return 0.0
+
+        with self._lock:
+            entry = self._memory.get(key)
+        created_at = entry[1] if entry is not None and self._memory_is_current() else None
+        if created_at is None:
+            row = self._disk(lambda conn: conn.execute('SELECT created_at FROM responses WHERE key = ?', (key,)).fetchone(), 'read')
+            created_at = row[0] if row is not None else None
+
+        if created_at is None:
+            return 0.0
+        return max(0.0, created_at + self.ttl - time.time())
+
+    def _remember(self, key: str, entry: Tuple[str, float, str, str]):
+        """Insert into the LRU tier, evicting the least recently used entry"""
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def begin_refresh(self, key: str) -> bool:
+        """
+        Claim the background refresh of a stale entry
+
+        Returns:
+            True if the caller should refresh, False if a refresh is already running
+        """
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def end_refresh(self, key: str):
+        """Release a refresh claim without storing a value (e.g. the refresh failed)"""
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def invalidate(self, message: Optional[str] = None, language: Optional[str] = None) -> int:
+        """
+        Remove cached answers
+
+        Args:
+            message: Only remove answers to this message (any history/model)
+            language: Only remove answers in this language
+
+        Returns:
+            Number of entries removed from the persistent tier (or memory tier if disk is off)
+        """
+        normalized = self.normalize_message(message) if message else None
+        with self._lock:
+            doomed = [
+                key for key, entry in self._memory.items()
+                if (normalized is None or entry[2] == normalized) and (language is None or entry[3] == language)
+            ]
+            for key in doomed:
+                del self._memory[key]
+            self.stats['invalidations'] += 1
+        removed = len(doomed)
+
+        def delete(conn):
+            clauses, params = [], []
+            if normalized is not None:
+                clauses.append('message = ?')
+                params.append(normalized)
+            if language is not None:
+                clauses.append('language = ?')
+                params.append(language)
+            where = f" WHERE {' AND '.join(clauses)}" if clauses else ''
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                count = conn.execute(f'DELETE FROM responses{where}', params).rowcount
+                # Tells the other processes to drop their memory tiers
+                conn.execute("UPDATE meta SET value = value + 1 WHERE name = 'generation'")
+                conn.execute('COMMIT')
+            except sqlite3.Error:
+                conn.execute('ROLLBACK')
+                raise
+            return count, self._read_generation(conn)
+
+        result = self._disk(delete, 'invalidation')
+        if result is not None:
+            removed, generation = result
+            with self._lock:
+                # This process's memory tier is already filtered; only a missed
+                # generation from elsewhere means it may hold invalidated entries
+                if self._generation is not None and generation != self._generation + 1:
+                    self._memory.clear()
+                self._generation = generation
+
+        logger.info(f"Response cache invalidated {removed} entries (message={message!r}, language={language!r})")
+        return removed
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['memory_entries'] = len(self._memory)
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['memory_hits'] + stats['disk_hits']) / lookups, 4) if lookups else 0.0
+        stats['enabled'] = self.enabled
+        return stats
@@ -0,0 +1,209 @@
+"""
+Single-flight request coalescing for Narad AI
+Concurrent identical upstream calls share one execution and its result
+"""
+
+import asyncio
+import contextvars
+import math
+import threading
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from .deadline import Deadline, DeadlineExceededError, cap_timeout, current_deadline, deadline_passed, deadline_scope
+
+logger = logging.getLogger(__name__)
+
+
+class _SharedDeadline(Deadline):
+    """Deadline of a shared call: the latest deadline among the callers that joined it"""
+
+    __slots__ = ()
+
+    def __init__(self, deadline: Optional[Deadline]):
+        self.expires_at = math.inf if deadline is None else deadline.expires_at
+
+    def widen(self, deadline: Optional[Deadline]):
+        """Give the call at least the time this caller is still waiting (forever without a deadline)"""
+        self.expires_at = max(self.expires_at, math.inf if deadline is None else deadline.expires_at)
+
+
+class _Flight:
+    """An in-progress call that other callers can wait on"""
+
+    __slots__ = ('event', 'result', 'error', 'waiters', 'deadline', 'cut_short', 'task')
+
+    def __init__(self, deadline: Optional[Deadline]):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+        self.deadline = _SharedDeadline(deadline)
+        # Set when the call failed because the shared deadline ran out
+        self.cut_short = False
+        self.task = None
+
+    def finish(self, error: Optional[BaseException]):
+        self.error = error
+        self.cut_short = error is not None and (isinstance(error, DeadlineExceededError) or self.deadline.expired)
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent calls that share a key.
+
+    The first caller for a key starts the function; callers that arrive
+    while it is running wait for and receive the same result or exception.
+    Thread callers (gthread/sync workers) use do(); coroutines on an ASGI
+    worker use do_async(). The two paths coalesce independently.
+
+    The shared call runs in its own thread or task under a shared deadline,
+    widened to the latest deadline of the callers that join it, so one
+    caller with a short deadline does not cut the call short for the others.
+    Every caller, the one that started it included, still waits only until
+    its own deadline. If the shared call does run out of deadline, callers
+    with time left start a new call instead of taking that error.
+    """
+
+    def __init__(self):
+        """Initialize the coalescing tables and counters"""
+        self._lock = threading.Lock()
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._async_flights: Dict[Tuple[int, Hashable], _Flight] = {}
+
+        self.stats = {
+            'executions': 0,
+            'coalesced': 0,
+            'in_flight': 0,
+            'retried': 0
+        }
+
+    def _retry(self, flight: _Flight) -> bool:
+        """Whether a caller should start over after the shared call failed"""
+        if not flight.cut_short or deadline_passed():
+            return False
+        with self._lock:
+            self.stats['retried'] += 1
+        return True
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Run fn once per key among concurrent threads
+
+        Args:
+            key: Identity of the call
+            fn: Zero-argument callable performing the work (it runs in a
+                separate thread, in a copy of the first caller's context)
+
+        Returns:
+            The shared result (re-raises the shared exception)
+
+        Raises:
+            DeadlineExceededError: If the caller's request deadline passes first
+        """
+        while True:
+            deadline = current_deadline()
+            with self._lock:
+                flight = self._flights.get(key)
+                if flight is None:
+                    flight = _Flight(deadline)
+                    self._flights[key] = flight
+                    self.stats['executions'] += 1
+                    self.stats['in_flight'] += 1
+                    leader = True
+                else:
+                    flight.deadline.widen(deadline)
+                    flight.waiters += 1
+                    self.stats['coalesced'] += 1
+                    leader = False
+
+            if leader:
+                threading.Thread(
+                    target=contextvars.copy_context().run, args=(self._run, key, flight, fn),
+                    daemon=True, name='single-flight'
+                ).start()
+
+            if not flight.event.wait(cap_timeout(None)):
+                raise DeadlineExceededError('Request deadline passed while waiting for a shared call')
+            if flight.error is None:
+                return flight.result
+            if not self._retry(flight):
+                raise flight.error
+
+    def _run(self, key: Hashable, flight: _Flight, fn: Callable[[], Any]):
+        """Run a shared call under its shared deadline and wake its callers"""
+        try:
+            with deadline_scope(flight.deadline):
+                flight.result = fn()
+            flight.finish(None)
+        except BaseException as e:
+            flight.finish(e)
+        finally:
+            with self._lock:
+                del self._flights[key]
+                self.stats['in_flight'] -= 1
+            if flight.waiters:
+                logger.debug(f"Single-flight shared one upstream call with {flight.waiters} waiters")
+            flight.event.set()
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run the coroutine returned by fn once per key among concurrent coroutines
+
+        The work runs in its own task, so a caller that is cancelled (client
+        gone, hedge lost) does not cancel the call the other waiters share.
+
+        Args:
+            key: Identity of the call
+            fn: Zero-argument callable returning an awaitable
+
+        Returns:
+            The shared result (re-raises the shared exception)
+        """
+        loop = asyncio.get_running_loop()
+        loop_key = (id(loop), key)
+
+        while True:
+            deadline = current_deadline()
+            flight = self._async_flights.get(loop_key)
+            if flight is None:
+                flight = _Flight(deadline)
+
+                async def run(flight=flight):
+                    with deadline_scope(flight.deadline):
+                        return await fn()
+
+                flight.task = loop.create_task(run())
+                self._async_flights[loop_key] = flight
+                with self._lock:
+                    self.stats['executions'] += 1
+                    self.stats['in_flight'] += 1
+
+                def _done(task, loop_key=loop_key, flight=flight):
+                    self._async_flights.pop(loop_key, None)
+                    with self._lock:
+                        self.stats['in_flight'] -= 1
+                    flight.finish(None if task.cancelled() else task.exception())
+
+                flight.task.add_done_callback(_done)
+            else:
+                flight.deadline.widen(deadline)
+                with self._lock:
+                    self.stats['coalesced'] += 1
+
+            try:
+                return await asyncio.wait_for(asyncio.shield(flight.task), cap_timeout(None))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                if not flight.task.done():
+                    raise DeadlineExceededError('Request deadline passed while waiting for a shared call') from None
+                if not self._retry(flight):
+                    raise
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get coalescing statistics"""
+        stats = dict(self.stats)
+        calls = stats['executions'] + stats['coalesced']
+        stats['coalesced_ratio'] = round(stats['coalesced'] / calls, 4) if calls else 0.0
+        return stats
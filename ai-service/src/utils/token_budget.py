@@ -0,0 +1,188 @@
+"""
+Token Budget Manager for Narad AI
+Local token estimates, history trimming to an input budget and per-intent output budgets
+"""
+
+import math
+import re
+import threading
+import logging
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r'\s+')
+_NON_ASCII = re.compile(r'[^\x00-\x7f]')
+
+
+class TokenBudget:
+    """
+    Keeps prompts and answers inside configured token budgets without calling
+    the tokenizer endpoint.
+
+    Token counts are estimated from character classes: roughly four ASCII
+    characters per token, and two characters per token for Indic and other
+    non-ASCII scripts, which SentencePiece vocabularies split more finely.
+    The estimate errs on the high side, so budgets are conservative.
+    """
+
+    ASCII_CHARS_PER_TOKEN = 4.0
+    NON_ASCII_CHARS_PER_TOKEN = 2.0
+
+    def __init__(
+        self,
+        history_budget: int = 400,
+        max_history_pairs: int = 3,
+        excerpt_tokens: int = 80,
+        output_tokens: Optional[Dict[str, int]] = None,
+        default_output_tokens: int = 350,
+        enabled: bool = True
+    ):
+        """
+        Initialize the budget manager
+
+        Args:
+            history_budget: Tokens the conversation history may use in a prompt
+            max_history_pairs: Most recent user/AI exchanges considered
+            excerpt_tokens: Each stored message is compressed to at most this many tokens
+            output_tokens: maxOutputTokens per intent
+            default_output_tokens: maxOutputTokens for intents without an entry
+            enabled: When False history is passed through and outputs are not capped
+        """
+        self.history_budget = history_budget
+        self.max_history_pairs = max_history_pairs
+        self.excerpt_tokens = excerpt_tokens
+        self.output_tokens = dict(output_tokens or {})
+        self.default_output_tokens = default_output_tokens
+        self.enabled = enabled
+
+        self._lock = threading.Lock()
+        self.stats = {
+            'prompts': 0,
+            'history_tokens_in': 0,
+            'history_tokens_out': 0,
+            'pairs_dropped': 0,
+            'messages_compressed': 0,
+            'output_tokens_capped': 0
+        }
+
+        logger.info(
+            f"Token budget initialized (enabled={enabled}, history_budget={history_budget}, "
+            f"default_output_tokens={default_output_tokens})"
+        )
+
+    @classmethod
+    def estimate_tokens(cls, text: str) -> int:
+        """
+        Estimate the token count of text
+
+        Args:
+            text: Any prompt or answer text
+
+        Returns:
+            Estimated number of tokens
+        """
+        if not text:
+            return 0
+        non_ascii = len(_NON_ASCII.findall(text))
+        ascii_chars = len(text) - non_ascii
+        return math.ceil(ascii_chars / cls.ASCII_CHARS_PER_TOKEN + non_ascii / cls.NON_ASCII_CHARS_PER_TOKEN)
+
+    def compress(self, text: str, max_tokens: int) -> str:
+        """
+        Collapse whitespace and cut text to about max_tokens at a word boundary
+
+        Args:
+            text: Message text
+            max_tokens: Token allowance
+
+        Returns:
+            The text, shortened with an ellipsis if it was over the allowance
+        """
+        text = _WHITESPACE.sub(' ', text).strip()
+        estimate = self.estimate_tokens(text)
+        if estimate <= max_tokens:
+            return text
+
+        cut = max(1, int(len(text) * max_tokens / estimate))
+        shortened = text[:cut]
+        if ' ' in shortened:
+            shortened = shortened.rsplit(' ', 1)[0]
+        return shortened.rstrip(' ,;:-') + ' …'
+
+    def fit_history(self, pairs: List[Tuple[str, str]]) -> str:
+        """
+        Render the most recent exchanges that fit the history budget
+
+        Args:
+            pairs: (user message, AI answer) tuples, oldest first
+
+        Returns:
+            History text for the prompt, oldest kept exchange first
+        """
+        if not pairs:
+            return ''
+
+        recent = pairs[-self.max_history_pairs:]
+        if not self.enabled:
+            return '\n'.join(f"User: {user}\nNarad: {ai}" for user, ai in recent)
+
+        tokens_in = sum(self.estimate_tokens(f"User: {user}\nNarad: {ai}") for user, ai in recent)
+        kept, used, compressed = [], 0, 0
+        for user, ai in reversed(recent):
+            short_user = self.compress(user, self.excerpt_tokens)
+            short_ai = self.compress(ai, self.excerpt_tokens)
+            compressed += (short_user != user.strip()) + (short_ai != ai.strip())
+
+            entry = f"User: {short_user}\nNarad: {short_ai}"
+            cost = self.estimate_tokens(entry) + 1
+            if used + cost > self.history_budget:
+                break
+            kept.append(entry)
+            used += cost
+
+        dropped = len(recent) - len(kept)
+        with self._lock:
+            self.stats['prompts'] += 1
+            self.stats['history_tokens_in'] += tokens_in
+            self.stats['history_tokens_out'] += used
+            self.stats['pairs_dropped'] += dropped + len(pairs) - len(recent)
+            self.stats['messages_compressed'] += compressed
+
+        logger.debug(
+            "📏 History budget: %d -> %d tokens (kept %d/%d exchanges, compressed %d messages, budget %d)",
+            tokens_in, used, len(kept), len(pairs), compressed, self.history_budget
+        )
+        return '\n'.join(reversed(kept))
+
+    def output_budget(self, intent: str, tier_max: Optional[int] = None) -> int:
+        """
+        maxOutputTokens for a turn
+
+        Args:
+            intent: Intent from NaradAI._classify_intent
+            tier_max: maxOutputTokens of the routed model tier, if any
+
+        Returns:
+            The intent's budget, never above the tier's limit
+        """
+        if not self.enabled:
+            return tier_max or self.default_output_tokens
+
+        budget = self.output_tokens.get(intent, self.default_output_tokens)
+        if tier_max is not None and tier_max < budget:
+            budget = tier_max
+        elif tier_max is not None and budget < tier_max:
+            with self._lock:
+                self.stats['output_tokens_capped'] += 1
+
+        logger.debug("📏 Output budget for %s: %s tokens (tier limit %s)", intent, budget, tier_max)
+        return budget
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get budgeting statistics, including the estimated history tokens saved"""
+        with self._lock:
+            stats = dict(self.stats)
+        stats['history_tokens_saved'] = stats['history_tokens_in'] - stats['history_tokens_out']
+        stats['enabled'] = self.enabled
+        return stats
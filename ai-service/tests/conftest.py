@@ -0,0 +1,61 @@
+"""
+Shared set-up for the ai-service unit tests
+
+One mock Gemini server (benchmarks/mock_gemini_server.py) runs for the
+whole session and GEMINI_API_ENDPOINT points at it before any service
+module is imported, so nothing under test can reach the real API.
+
+Run from ai-service/:
+    python -m pytest -q tests
+"""
+
+import os
+import sys
+
+import pytest
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The service packages, and benchmarks/ for the mock Gemini server
+for path in (SERVICE_DIR, os.path.join(SERVICE_DIR, 'benchmarks')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from mock_gemini_server import start_mock_server  # noqa: E402
+
+MOCK_BEHAVIOR = {'latency': 0, 'chunk_interval': 0}
+MOCK_SERVER, _ = start_mock_server(**MOCK_BEHAVIOR)
+MOCK_ENDPOINT = f'http://127.0.0.1:{MOCK_SERVER.server_port}/v1beta/models'
+
+# Deterministic settings, read once when src.config.settings is imported: no
+# disk cache, no start-up or cache warm-up, no context caching, Gemini only
+os.environ.update(
+    GEMINI_API_KEY='test-key',
+    GEMINI_API_ENDPOINT=MOCK_ENDPOINT,
+    CACHE_ENABLED='false',
+    CACHE_WARMUP_ENABLED='false',
+    CONTEXT_CACHE_ENABLED='false',
+    PREFETCH_SUGGESTIONS='false',
+    RATE_LIMIT_ENABLED='false',
+    STARTUP_WARMUP='false',
+    LLM_FAILOVER_ORDER='gemini',
+    METRICS_DIR=''
+)
+
+
+@pytest.fixture
+def mock_gemini():
+    """The session's mock Gemini server as (server, models endpoint), with its profile and counters reset afterwards"""
+    yield MOCK_SERVER, MOCK_ENDPOINT
+    MOCK_SERVER.behavior.reset(**MOCK_BEHAVIOR)
+    MOCK_SERVER.reset()
+
+
+@pytest.fixture
+def narad(mock_gemini):
+    """NaradAI with its own provider layer (breaker, limiter), talking to the mock server"""
+    from src.services.llm_providers import build_llm_gateway
+    from src.services.narad_ai import NaradAI
+
+    instance = NaradAI(llm_gateway=build_llm_gateway())
+    yield instance
+    instance.metrics.unregister_collector(instance._collect_metrics)
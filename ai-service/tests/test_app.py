@@ -0,0 +1,125 @@
+"""Tests for the Flask app's routes (app.py)"""
+
+import time
+
+import pytest
+
+from src.config.settings import BATCH_CONFIG
+from src.utils.metrics import get_metrics
+
+
+@pytest.fixture(scope='module')
+def client():
+    import app
+    return app.app.test_client()
+
+
+def test_conversation_memory_check_does_not_leak_collectors(client):
+    collectors = len(get_metrics()._collectors)
+
+    for _ in range(3):
+        response = client.get('/api/test/conversation-memory')
+        assert response.status_code == 200
+        assert response.get_json()['is_working'] is True
+
+    assert len(get_metrics()._collectors) == collectors
+
+
+def test_metrics_gauges_are_collected_once(client):
+    import app
+
+    client.get('/api/test/conversation-memory')
+    lines = client.get('/metrics').get_data(as_text=True).splitlines()
+    sessions = next(line for line in lines if line.startswith('narad_active_sessions '))
+    assert float(sessions.split()[1]) == len(app.narad_ai.conversation_memory.sessions)
+
+
+def test_collector_registration_is_idempotent_and_removable():
+    metrics = get_metrics()
+    collector = lambda: []  # noqa: E731
+    metrics.register_collector(collector)
+    metrics.register_collector(collector)
+    assert metrics._collectors.count(collector) == 1
+
+    metrics.unregister_collector(collector)
+    metrics.unregister_collector(collector)
+    assert collector not in metrics._collectors
+
+
+def test_batch_answers_items_concurrently_in_input_order(client, mock_gemini):
+    server, _ = mock_gemini
+    server.behavior.update(latency=0.2)
+    items = [{'message': f'Tell me about festival number {n}', 'session_id': f'batch-{n}'} for n in range(6)]
+
+    started = time.monotonic()
+    response = client.post('/api/ai/chat/batch', json={'items': items, 'concurrency': 6})
+    elapsed = time.monotonic() - started
+
+    body = response.get_json()
+    assert response.status_code == 200
+    assert [result['index'] for result in body['results']] == list(range(6))
+    assert [result['metadata']['session_id'] for result in body['results']] == [item['session_id'] for item in items]
+    assert body['summary'] == dict(body['summary'], total=6, succeeded=6, failed=0, concurrency=6)
+    assert server.get_stats()['max_in_flight'] > 1
+    assert elapsed < 6 * 0.2
+
+
+def test_batch_reports_bad_items_without_failing_the_rest(client):
+    response = client.post('/api/ai/chat/batch', json=[{'message': 'Namaste'}, {'message': '  '}, 'hello'])
+
+    results = response.get_json()['results']
+    assert response.status_code == 200
+    assert [result['status'] for result in results] == ['success', 'error', 'error']
+    assert results[1]['error'] == 'No message provided'
+    assert results[2]['error'] == 'Item must be an object'
+    assert response.get_json()['summary']['failed'] == 2
+
+
+@pytest.mark.parametrize('body, error', [
+    ({'items': []}, 'Provide a non-empty items array'),
+    ({'message': 'not a batch'}, 'Provide a non-empty items array'),
+    ([{'message': 'hi'}] * (BATCH_CONFIG['max_items'] + 1), f"At most {BATCH_CONFIG['max_items']} items per batch"),
+])
+def test_batch_rejects_invalid_bodies(client, body, error):
+    response = client.post('/api/ai/chat/batch', json=body)
+    assert response.status_code == 400
+    assert response.get_json() == {'error': error}
+
+
+@pytest.mark.parametrize('requested, expected', [
+    (None, min(3, BATCH_CONFIG['default_concurrency'])),
+    ('lots', min(3, BATCH_CONFIG['default_concurrency'])),
+    (2, 2),
+    (1000, 3),
+])
+def test_batch_concurrency_is_clamped_to_the_item_count(requested, expected):
+    from app import parse_batch_request
+
+    _, concurrency, _ = parse_batch_request({'items': [{}] * 3, 'concurrency': requested})
+    assert concurrency == expected
+
+
+def test_generate_answers_through_the_gateway(client, mock_gemini):
+    server, _ = mock_gemini
+
+    response = client.post('/api/ai/generate', json={'messages': [{'role': 'user', 'content': 'Tell me about Hampi'}], 'provider': 'gemini'})
+
+    body = response.get_json()
+    assert response.status_code == 200
+    assert (body['provider'], body['failover']) == ('gemini', False)
+    assert body['text']
+    assert server.get_stats()['requests'] == {'generateContent': 1}
+
+
+@pytest.mark.parametrize('body, status', [
+    ([{'role': 'user', 'content': 'hi'}], 400),
+    ({'temperature': 0.2}, 400),
+    ({'prompt': 'hi', 'model': 'gemini-ultra-unlisted'}, 400)
+])
+def test_generate_rejects_bad_requests_before_any_upstream_call(client, mock_gemini, body, status):
+    server, _ = mock_gemini
+
+    response = client.post('/api/ai/generate', json=body)
+
+    assert response.status_code == status
+    assert server.get_stats()['requests'] == {}
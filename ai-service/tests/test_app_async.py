@@ -0,0 +1,109 @@
+"""Tests for the ASGI entry point (app_async.py) and the async chat pipeline"""
+
+import asyncio
+import json
+import time
+
+import pytest
+from starlette.testclient import TestClient
+
+from mock_gemini_server import CANNED_ANSWER
+
+
+@pytest.fixture(scope='module')
+def client():
+    import app_async
+    # One portal (event loop) for the module, so the pooled httpx client stays on one loop
+    with TestClient(app_async.app) as test_client:
+        yield test_client
+
+
+def sse_events(body: str):
+    events = []
+    for frame in body.strip().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in frame.splitlines() if ': ' in line)
+        events.append((fields.get('event'), json.loads(fields.get('data', 'null'))))
+    return events
+
+
+def test_chat_is_answered_through_the_async_client(client, mock_gemini):
+    server, _ = mock_gemini
+    response = client.post('/api/ai/chat', json={'message': 'Tell me about the caves of Ajanta', 'session_id': 'asgi'})
+
+    assert response.status_code == 200
+    assert response.json()['response'] == CANNED_ANSWER.strip()
+    assert server.get_stats()['requests'] == {'generateContent': 1}
+
+
+@pytest.mark.parametrize('body', [{}, {'message': '   '}, {'message': 42}, ['Tell me about Hampi'], 'Tell me about Hampi'])
+def test_chat_validation_matches_the_flask_app(client, body):
+    import app
+
+    flask_client = app.app.test_client()
+    for path in ('/api/ai/chat', '/api/ai/chat/stream'):
+        assert client.post(path, json=body).status_code == 400
+        assert flask_client.post(path, json=body).status_code == 400
+
+
+def test_native_routes_are_timed_and_carry_rate_limit_headers(client, monkeypatch):
+    import app_async
+    from src.utils.rate_limiter import RateLimiter
+
+    observed = []
+    monkeypatch.setattr(app_async, 'rate_limiter', RateLimiter([(1, 60)]))
+    monkeypatch.setattr(app_async.metrics, 'observe', lambda name, value, **labels: observed.append((name, labels)))
+    body = {'message': 'Namaste', 'session_id': 'asgi-limited'}
+
+    first = client.post('/api/ai/chat', json=body)
+    second = client.post('/api/ai/chat', json=body)
+
+    assert first.headers['X-RateLimit-Remaining'] == '0'
+    assert second.status_code == 429
+    assert second.headers['Retry-After'] == '60'
+    requests = [labels for name, labels in observed if name == 'narad_http_request_duration_seconds']
+    assert requests == [
+        {'route': '/api/ai/chat', 'method': 'POST', 'status': 200},
+        {'route': '/api/ai/chat', 'method': 'POST', 'status': 429}
+    ]
+
+
+def test_other_routes_are_served_by_the_mounted_flask_app(client):
+    import app
+
+    response = client.get('/health')
+    assert response.status_code == 200
+    assert response.json().keys() == app.app.test_client().get('/health').get_json().keys()
+
+
+def test_stream_route_sends_sse_events(client):
+    response = client.post('/api/ai/chat/stream', json={'message': 'Tell me a legend of Hampi', 'session_id': 'asgi-stream'})
+
+    assert response.headers['content-type'].startswith('text/event-stream')
+    events = sse_events(response.content.decode('utf-8'))
+    assert events[0][0] == 'meta'
+    name, data = events[-1]
+    assert name == 'done' and data['session_id'] == 'asgi-stream'
+    assert ''.join(data['text'] for name, data in events if name == 'chunk') == CANNED_ANSWER
+
+
+def test_async_turns_do_not_block_each_other(narad, mock_gemini):
+    server, _ = mock_gemini
+    server.behavior.update(latency=0.3)
+
+    async def run():
+        try:
+            return await asyncio.gather(*(
+                narad.process_message_async(f'Tell me about fort number {index}', f'concurrent-{index}')
+                for index in range(8)
+            ))
+        finally:
+            await narad.async_gemini_client.aclose()
+
+    started = time.monotonic()
+    results = asyncio.run(run())
+    elapsed = time.monotonic() - started
+
+    assert all(result['response'] == CANNED_ANSWER.strip() for result in results)
+    # Eight 0.3s upstream calls overlap on one event loop
+    assert elapsed < 1.2
+    assert server.get_stats()['max_in_flight'] > 1
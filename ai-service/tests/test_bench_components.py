@@ -0,0 +1,124 @@
+"""Tests for the component microbenchmarks' data, timing and release gates (benchmarks/bench_components.py)"""
+
+import json
+import os
+import random
+import sys
+
+import pytest
+
+SMALL = 50
+
+
+@pytest.fixture(scope='module')
+def bench():
+    # The module blanks GEMINI_API_KEY on import; the other tests need the mock's key
+    saved = dict(os.environ)
+    import bench_components
+    yield bench_components
+    os.environ.clear()
+    os.environ.update(saved)
+
+
+def run_main(bench, monkeypatch, *argv):
+    monkeypatch.setattr(sys, 'argv', ['bench_components.py', '--sizes', str(SMALL), '--min-time', '0.001', '--repeat', '1', *argv])
+    bench.main()
+
+
+def result(median_us):
+    return {'median_us': median_us, 'best_us': median_us, 'calls': 1}
+
+
+def test_synthetic_data_is_seeded_and_sized(bench):
+    text = bench.synthetic_text(500, random.Random(7))
+    assert len(text) == 500
+    assert text == bench.synthetic_text(500, random.Random(7))
+
+    memory = bench.synthetic_memory(SMALL, random.Random(7))
+    assert len(memory.sessions) == SMALL
+    kb = bench.synthetic_knowledge_base(SMALL, 3, random.Random(7))
+    assert (len(kb.stories_db), len(kb.monuments_db)) == (SMALL, 3)
+    recommender = bench.synthetic_recommender(SMALL, random.Random(7))
+    assert sum(len(items) for items in recommender.content_database.values()) == SMALL
+
+
+@pytest.mark.parametrize('case', [
+    'detect_language', 'classify_intent', 'format_history', 'memory_add_message', 'memory_get_history',
+    'memory_cleanup', 'kb_search_stories', 'kb_related_monuments', 'recommendations', 'summarize'
+])
+def test_every_case_builds_a_runnable_operation(bench, case):
+    operation = bench.CASES[case](SMALL, random.Random(7))
+    operation()
+
+
+def test_measure_grows_the_batch_to_min_time(bench):
+    calls = []
+
+    timing = bench.measure(lambda: calls.append(1), min_time=0.001, repeat=3)
+
+    assert timing['calls'] > 1
+    assert 0 < timing['best_us'] <= timing['median_us']
+    # Calibration batches come on top of the repeat timed batches
+    assert len(calls) > 3 * timing['calls']
+
+
+def test_threshold_gate(bench):
+    results = {'summarize': {'1000': result(90.0), '10000': result(1200.0)}, 'new_case': {'1000': result(5.0)}}
+    thresholds = {'summarize': {'1000': 100.0, '10000': 1000.0}}
+
+    failures = bench.check_thresholds(results, thresholds)
+
+    # Cases or sizes without a threshold are not gated
+    assert failures == ['summarize @ 10000: 1200.0us > threshold 1000.0us']
+
+
+def test_baseline_gate_allows_the_tolerance(bench):
+    baseline = {'summarize': {'1000': result(100.0), '10000': result(1000.0)}}
+    results = {
+        'summarize': {'1000': result(124.0), '10000': result(1300.0), '100000': result(9000.0)},
+        'new_case': {'1000': result(5.0)}
+    }
+
+    failures = bench.check_baseline(results, baseline, tolerance=0.25)
+
+    assert failures == ['summarize @ 10000: 1300.0us vs 1000.0us (+30%)']
+
+
+def test_shipped_thresholds_cover_every_case(bench):
+    with open(bench.THRESHOLDS) as f:
+        thresholds = json.load(f)
+
+    assert set(thresholds) == set(bench.CASES)
+    for sizes in thresholds.values():
+        assert all(str(int(size)) == size and limit > 0 for size, limit in sizes.items())
+
+
+def test_main_fails_over_threshold_and_writes_results(bench, monkeypatch, tmp_path, capsys):
+    thresholds = tmp_path / 'thresholds.json'
+    thresholds.write_text(json.dumps({'summarize': {str(SMALL): 0.001}}))
+    output = tmp_path / 'run.json'
+
+    with pytest.raises(SystemExit) as exit_info:
+        run_main(bench, monkeypatch, '--cases', 'summarize', '--check', str(thresholds), '--json', str(output))
+
+    assert exit_info.value.code == 1
+    assert 'summarize @ 50' in capsys.readouterr().out
+    assert set(json.loads(output.read_text())['results']['summarize']) == {str(SMALL)}
+
+
+def test_main_passes_and_updates_thresholds(bench, monkeypatch, tmp_path):
+    thresholds = tmp_path / 'thresholds.json'
+    thresholds.write_text(json.dumps({'summarize': {'1000': 42.0}}))
+
+    run_main(bench, monkeypatch, '--cases', 'summarize', '--update-thresholds', str(thresholds), '--headroom', '1000')
+    updated = json.loads(thresholds.read_text())
+    assert updated['summarize']['1000'] == 42.0
+    assert updated['summarize'][str(SMALL)] > 0
+
+    run_main(bench, monkeypatch, '--cases', 'summarize', '--check', str(thresholds))
+
+
+def test_main_rejects_unknown_cases(bench, monkeypatch):
+    with pytest.raises(SystemExit) as exit_info:
+        run_main(bench, monkeypatch, '--cases', 'summarize,teleport')
+    assert exit_info.value.code == 2
@@ -0,0 +1,143 @@
+"""Tests for cache pre-warming (src/services/cache_warmer.py)"""
+
+import json
+import types
+
+from src.services.cache_warmer import CacheWarmer, top_messages
+from src.utils.response_cache import ResponseCache
+
+
+def fake_narad(messages, outcome='warmed', disk_path=None):
+    calls = []
+
+    def warm_answers(message, languages, min_fresh):
+        calls.append((message, tuple(languages), min_fresh))
+        return dict.fromkeys(languages, outcome(message) if callable(outcome) else outcome)
+
+    narad = types.SimpleNamespace(
+        response_cache=types.SimpleNamespace(disk_path=disk_path),
+        suggestion_messages=lambda: list(messages),
+        warm_answers=warm_answers
+    )
+    return narad, calls
+
+
+def test_top_messages_counts_both_log_formats(tmp_path):
+    (tmp_path / 'app.log').write_text(
+        '2026-01-01 INFO - Received chat request: Tell me about Hampi\n'
+        '2026-01-01 INFO - Received streaming chat request: tell me about hampi?\n'
+        '2026-01-01 INFO - Received chat request: ' + 'x' * 300 + '\n'
+        'unrelated line\n',
+        encoding='utf-8'
+    )
+    (tmp_path / 'app.log.1').write_text(
+        json.dumps({'event': 'chat_request', 'message': 'Who built Konark?'}) + '\n'
+        + json.dumps({'event': 'chat_response', 'message': 'ignored'}) + '\n'
+        + '{broken json\n',
+        encoding='utf-8'
+    )
+
+    assert top_messages([str(tmp_path / 'app.log*')], limit=5) == ['Tell me about Hampi', 'Who built Konark?']
+    assert top_messages([str(tmp_path / 'app.log*')], limit=1) == ['Tell me about Hampi']
+    assert top_messages([str(tmp_path / 'missing.log')], limit=5) == []
+
+
+def test_round_warms_every_message_in_every_language(tmp_path):
+    log = tmp_path / 'app.log'
+    log.write_text('Received chat request: tell me about diwali\nReceived chat request: Who built Konark?\n', encoding='utf-8')
+    narad, calls = fake_narad(['Tell me about Diwali', 'Famous forts'])
+    warmer = CacheWarmer(narad, ['en', 'hi'], interval=900, access_logs=[str(log)])
+
+    assert warmer.messages() == ['Tell me about Diwali', 'Famous forts', 'Who built Konark?']
+    summary = warmer.run_once()
+
+    assert (summary['warmed'], summary['messages'], summary['languages']) == (6, 3, 2)
+    assert {languages for _, languages, _ in calls} == {('en', 'hi')}
+    # Entries must outlive the next round
+    assert {min_fresh for _, _, min_fresh in calls} == {900 + CacheWarmer.ROUND_SLACK}
+
+
+def test_outcomes_are_counted_across_rounds():
+    narad, _ = fake_narad(['a', 'b', 'c'], outcome=lambda message: {'a': 'warmed', 'b': 'fresh', 'c': 'failed'}[message])
+    warmer = CacheWarmer(narad, ['en'], interval=0)
+    warmer.run_once()
+    warmer.run_once()
+
+    stats = warmer.get_stats()
+    assert (stats['rounds'], stats['warmed'], stats['fresh'], stats['failed']) == (2, 2, 2, 2)
+
+
+def test_only_one_worker_warms_a_shared_disk_cache(tmp_path):
+    disk_path = str(tmp_path / 'responses.db')
+    first, _ = fake_narad(['a'], disk_path=disk_path)
+    second, calls = fake_narad(['a'], disk_path=disk_path)
+    holder = CacheWarmer(first, ['en'])
+    other = CacheWarmer(second, ['en'])
+
+    lock_file = holder._claim_host_lock()
+    try:
+        assert other.run_once() == {'skipped': 'another worker is warming the shared cache'}
+    finally:
+        lock_file.close()
+    assert calls == []
+    assert other.run_once()['warmed'] == 1
+
+
+def test_disabled_warmer_does_not_start():
+    narad, _ = fake_narad(['a'])
+    warmer = CacheWarmer(narad, ['en'], enabled=False)
+    warmer.start()
+    assert warmer._thread is None
+
+
+def test_warmed_suggestion_is_answered_from_cache(narad, mock_gemini):
+    server, _ = mock_gemini
+    narad.response_cache = ResponseCache()
+    narad.suggestion_messages = lambda: ['Tell me about the Ajanta caves']
+    warmer = CacheWarmer(narad, ['en'], interval=900)
+
+    assert warmer.run_once()['warmed'] == 1
+    assert warmer.run_once()['fresh'] == 1
+    narad.process_message('Tell me about the Ajanta caves', 'warmed-session', {'preferences': {'language': 'en'}})
+
+    assert server.get_stats()['requests'] == {'generateContent': 1}
+    assert narad.response_cache.get_stats()['memory_hits'] >= 1
+
+
+def test_languages_sending_the_same_request_share_one_call(narad, mock_gemini):
+    server, _ = mock_gemini
+    narad.response_cache = ResponseCache()
+    narad.suggestion_messages = lambda: ['Tell me about the Ajanta caves']
+    warmer = CacheWarmer(narad, ['en', 'hi', 'ta'], interval=900)
+
+    summary = warmer.run_once()
+
+    assert (summary['warmed'], summary['shared']) == (1, 2)
+    assert server.get_stats()['requests'] == {'generateContent': 1}
+    assert warmer.run_once()['fresh'] == 3
+
+
+def test_failed_shared_call_fails_every_language(narad, mock_gemini):
+    server, _ = mock_gemini
+    narad.response_cache = ResponseCache()
+    server.behavior.update(error_rate=1.0, error_codes=[400])
+
+    outcomes = narad.warm_answers('Tell me about the Ajanta caves', ['en', 'hi'])
+
+    assert outcomes == {'en': 'failed', 'hi': 'failed'}
+    assert narad.response_cache.get_stats()['memory_entries'] == 0
+    assert server.get_stats()['requests'] == {'generateContent': 1}
+
+
+def test_mid_session_suggestion_keeps_its_history(narad, mock_gemini):
+    server, _ = mock_gemini
+    narad.response_cache = ResponseCache()
+    narad.suggestion_messages = lambda: ['Tell me about the Ajanta caves']
+    CacheWarmer(narad, ['en'], interval=900).run_once()
+    narad._store_turn('ongoing-session', 'Who painted the Ajanta murals?', 'Buddhist monks, over centuries.')
+
+    turn = narad._prepare_turn('Tell me about the Ajanta caves', 'ongoing-session', {'preferences': {'language': 'en'}})
+    narad.process_message('Tell me about the Ajanta caves', 'ongoing-session', {'preferences': {'language': 'en'}})
+
+    assert 'Who painted the Ajanta murals?' in turn['prompt']
+    assert server.get_stats()['requests'] == {'generateContent': 2}
@@ -0,0 +1,296 @@
+"""Tests for the upstream concurrency limiter and its AIMD controller (src/utils/concurrency.py)"""
+
+import asyncio
+import threading
+import time
+import types
+
+import pytest
+
+from src.utils import concurrency as concurrency_module
+from src.utils.concurrency import (
+    AdaptiveLimit, CallAbandonedError, CancelScope, ConcurrencyLimiter, LimitExceededError, cancel_scope, upstream_priority
+)
+from src.utils.deadline import Deadline, deadline_scope
+
+
+class Overloaded(Exception):
+    pass
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(concurrency_module, 'time', types.SimpleNamespace(monotonic=clock.monotonic))
+    return clock
+
+
+def adaptive(limiter, **kwargs):
+    return AdaptiveLimit(limiter, is_overload=lambda error: isinstance(error, Overloaded), **kwargs)
+
+
+def hold(limiter, slots):
+    for _ in range(slots):
+        limiter.acquire()
+
+
+def test_slow_start_grows_only_a_limit_in_use(clock):
+    limiter = ConcurrencyLimiter(16)
+    controller = adaptive(limiter, max_limit=16, initial_limit=2)
+    assert limiter.limit == 2
+
+    hold(limiter, 2)
+    for _ in range(10):
+        controller.record(0.1)
+
+    # Growth stops once two calls in flight no longer use half the limit
+    assert limiter.limit == 5
+    assert controller.get_stats()['increases'] == 3
+
+
+def test_overload_cuts_the_limit_once_per_cooldown(clock):
+    limiter = ConcurrencyLimiter(16)
+    controller = adaptive(limiter, initial_limit=8, min_limit=2, cooldown=1.0)
+
+    controller.record(0.1, overloaded=True)
+    controller.record(0.1, overloaded=True)
+    assert limiter.limit == 4
+
+    clock.now += 1.0
+    controller.record(0.1, overloaded=True)
+    clock.now += 1.0
+    controller.record(0.1, overloaded=True)
+    assert limiter.limit == 2
+    stats = controller.get_stats()
+    assert (stats['overloads'], stats['decreases'], stats['min_limit_seen']) == (4, 2, 2)
+
+
+def test_increase_is_additive_after_a_decrease(clock):
+    limiter = ConcurrencyLimiter(16)
+    controller = adaptive(limiter, initial_limit=8)
+    controller.record(0.1, overloaded=True)
+    hold(limiter, 4)
+
+    # Each success adds 1/limit, so about a limit's worth of successes adds one
+    for _ in range(4):
+        controller.record(0.1)
+    assert limiter.limit == 4
+    controller.record(0.1)
+    assert limiter.limit == 5
+
+
+def test_latency_spike_backs_off_gently(clock):
+    limiter = ConcurrencyLimiter(10)
+    controller = adaptive(limiter, min_samples=5, latency_tolerance=2.0, spike_backoff_ratio=0.8)
+    for _ in range(5):
+        controller.record(0.1)
+    for _ in range(10):
+        controller.record(1.0)
+
+    assert limiter.limit == 8
+    assert controller.get_stats()['spikes'] == 1
+
+
+def test_measure_records_successes_and_overloads_only(clock):
+    controller = adaptive(ConcurrencyLimiter(8))
+
+    with controller.measure():
+        pass
+    with pytest.raises(Overloaded):
+        with controller.measure():
+            raise Overloaded('503')
+    with pytest.raises(ValueError):
+        with controller.measure():
+            raise ValueError('400')
+
+    stats = controller.get_stats()
+    assert (stats['samples'], stats['overloads']) == (2, 1)
+
+
+def test_timeout_past_the_client_deadline_is_not_an_overload(clock):
+    controller = adaptive(ConcurrencyLimiter(8))
+    with deadline_scope(Deadline(-1)):
+        with pytest.raises(Overloaded):
+            controller.call(lambda: (_ for _ in ()).throw(Overloaded('timeout')))
+    assert controller.get_stats()['samples'] == 0
+
+
+def test_disabled_controller_leaves_the_limit_alone(clock):
+    limiter = ConcurrencyLimiter(8)
+    controller = adaptive(limiter, initial_limit=2, enabled=False)
+    controller.record(0.1, overloaded=True)
+    assert limiter.limit == 8
+    assert controller.get_stats()['samples'] == 0
+
+
+def test_raising_the_limit_starts_queued_callers():
+    limiter = ConcurrencyLimiter(1)
+    limiter.acquire()
+    started = threading.Event()
+
+    def waiter():
+        limiter.acquire(timeout=2)
+        started.set()
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    assert not started.wait(0.05)
+    limiter.set_limit(2)
+    assert started.wait(1)
+    thread.join()
+    assert limiter.get_stats()['max_in_flight'] >= 2
+
+
+def test_waiting_past_the_timeout_or_a_full_queue_is_rejected():
+    limiter = ConcurrencyLimiter(1, max_queue=0)
+    limiter.acquire()
+    with pytest.raises(LimitExceededError):
+        limiter.acquire(timeout=0.01)
+    assert limiter.get_stats()['rejected'] == 1
+
+    limiter = ConcurrencyLimiter(1)
+    limiter.acquire()
+    with pytest.raises(LimitExceededError):
+        limiter.acquire(timeout=0.01)
+    assert (limiter.get_stats()['timeouts'], limiter.get_stats()['queue_depth']) == (1, 0)
+
+
+CLASSES = {
+    'interactive': {'weight': 3},
+    'prefetch': {'weight': 2, 'max_share': 0.25, 'preemptible': True},
+    'batch': {'weight': 1, 'max_share': 0.5}
+}
+
+
+def queue_waiter(limiter, priority, outcomes):
+    """Start a thread waiting for a slot and return once it is queued"""
+    def depth():
+        return limiter.get_stats()['classes'][priority]['queue_depth']
+
+    queued = depth()
+
+    def wait():
+        try:
+            limiter.acquire(timeout=2, priority=priority)
+        except LimitExceededError:
+            outcomes.append(f'{priority}:rejected')
+            return
+        outcomes.append(priority)
+        limiter.release(priority)
+
+    thread = threading.Thread(target=wait)
+    thread.start()
+    while depth() == queued and thread.is_alive():
+        time.sleep(0.001)
+    return thread
+
+
+def test_waiting_classes_share_slots_by_weight():
+    limiter = ConcurrencyLimiter(1, classes=CLASSES)
+    limiter.acquire(priority='interactive')
+    outcomes = []
+    threads = [queue_waiter(limiter, priority, outcomes) for priority in ['batch'] * 4 + ['interactive'] * 4]
+
+    limiter.release('interactive')
+    for thread in threads:
+        thread.join()
+
+    # Three interactive grants for every batch grant while both wait
+    assert outcomes[:4].count('interactive') == 3
+    assert sorted(outcomes) == ['batch'] * 4 + ['interactive'] * 4
+
+
+def test_max_share_caps_a_class_but_not_the_others():
+    limiter = ConcurrencyLimiter(4, classes=CLASSES)
+    limiter.acquire(priority='batch')
+    limiter.acquire(priority='batch')
+
+    with pytest.raises(LimitExceededError):
+        limiter.acquire(timeout=0.01, priority='batch')
+    assert limiter.acquire(timeout=0.01, priority='interactive') == 'interactive'
+    assert limiter.get_stats()['classes']['batch']['class_limit'] == 2
+
+
+def test_preemptible_waiters_give_way_to_higher_classes():
+    limiter = ConcurrencyLimiter(1, classes=CLASSES)
+    limiter.acquire(priority='interactive')
+    outcomes = []
+    prefetch = queue_waiter(limiter, 'prefetch', outcomes)
+    interactive = queue_waiter(limiter, 'interactive', outcomes)
+
+    prefetch.join(1)
+    assert outcomes == ['prefetch:rejected']
+    limiter.release('interactive')
+    interactive.join()
+    assert outcomes == ['prefetch:rejected', 'interactive']
+    assert limiter.get_stats()['classes']['prefetch']['preempted'] == 1
+
+
+def test_full_queue_drops_the_lowest_class_first():
+    limiter = ConcurrencyLimiter(1, max_queue=1, classes=CLASSES)
+    limiter.acquire(priority='interactive')
+    outcomes = []
+    batch = queue_waiter(limiter, 'batch', outcomes)
+    interactive = queue_waiter(limiter, 'interactive', outcomes)
+    batch.join(1)
+    assert outcomes == ['batch:rejected']
+
+    # Nothing lower left to drop: a second interactive caller is turned away
+    with pytest.raises(LimitExceededError):
+        limiter.acquire(priority='interactive')
+    limiter.release('interactive')
+    interactive.join()
+    assert limiter.get_stats()['rejected'] == 1
+
+
+def test_class_follows_the_context_and_unknown_classes_use_the_first():
+    limiter = ConcurrencyLimiter(4, classes=CLASSES)
+    with upstream_priority('batch'):
+        assert limiter.acquire() == 'batch'
+    assert limiter.acquire(priority='nightly') == 'interactive'
+    assert limiter.get_stats()['classes']['batch']['in_flight'] == 1
+
+
+def test_cancelled_async_waiter_leaves_the_queue():
+    limiter = ConcurrencyLimiter(1, classes=CLASSES)
+    limiter.acquire()
+
+    async def run():
+        waiter = asyncio.ensure_future(limiter.acquire_async(priority='batch'))
+        await asyncio.sleep(0.01)
+        assert limiter.queue_depth == 1
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+    asyncio.run(run())
+    assert limiter.queue_depth == 0
+    limiter.release()
+    assert limiter.in_flight == 0
+
+
+def test_cancel_scope_releases_held_slots_once_and_refuses_new_ones():
+    limiter = ConcurrencyLimiter(1)
+    scope = CancelScope()
+
+    with cancel_scope(scope):
+        with limiter.slot():
+            scope.cancel()
+            # The slot went back while the block is still running
+            assert limiter.in_flight == 0
+        assert limiter.in_flight == 0
+        with pytest.raises(CallAbandonedError):
+            with limiter.slot():
+                pass
+
+    with limiter.slot():
+        assert limiter.in_flight == 1
+    assert limiter.in_flight == 0
@@ -0,0 +1,176 @@
+"""Tests for the Gemini context cache (src/services/context_cache.py)"""
+
+import time
+
+import pytest
+
+from src.services.context_cache import ContextCache
+from src.services.gemini_client import GeminiAPIError, GeminiClient
+
+MODEL = 'gemini-1.5-flash'
+INSTRUCTION = 'You are Narad, a storyteller of Indian legends and culture. ' * 20
+
+
+@pytest.fixture
+def client(mock_gemini):
+    _, endpoint = mock_gemini
+    client = GeminiClient(api_key='test-key', api_endpoint=endpoint)
+    yield client
+    client.close()
+
+
+def wait_for_refresh(cache, model=MODEL, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while model in cache._refreshing and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_start_creates_an_entry_per_model(client, mock_gemini):
+    server, _ = mock_gemini
+    cache = ContextCache(client, INSTRUCTION)
+    cache.start([MODEL, 'gemini-1.5-pro'])
+
+    name = cache.get(MODEL)
+    assert name.startswith('cachedContents/')
+    assert name in server.cached_contents
+    assert cache.get('gemini-1.5-pro') not in (None, name)
+    stats = cache.get_stats()
+    assert (stats['created'], stats['hits'], stats['misses']) == (2, 2, 0)
+
+
+def test_entry_near_expiry_is_extended_in_the_background(client):
+    cache = ContextCache(client, INSTRUCTION, ttl=3600, refresh_margin=300)
+    cache.start([MODEL])
+    name = cache.get(MODEL)
+    cache._entries[MODEL]['expires_at'] = time.monotonic() + 100
+
+    # Still usable while the refresh runs
+    assert cache.get(MODEL) == name
+    wait_for_refresh(cache)
+    assert cache.get_stats()['extended'] == 1
+    assert cache.get_stats()['entries'][MODEL]['expires_in'] > 3000
+
+
+def test_entry_gone_upstream_is_recreated_on_refresh(client, mock_gemini):
+    server, _ = mock_gemini
+    cache = ContextCache(client, INSTRUCTION)
+    cache.start([MODEL])
+    old_name = cache.get(MODEL)
+    server.cached_contents.clear()
+
+    cache._refresh(MODEL)
+
+    assert cache.get(MODEL) not in (None, old_name)
+    assert cache.get_stats()['created'] == 2
+
+
+def count_creates(client, monkeypatch):
+    creates = []
+    create = client.create_cached_content
+
+    def counting_create(*args, **kwargs):
+        creates.append(args[0])
+        return create(*args, **kwargs)
+
+    monkeypatch.setattr(client, 'create_cached_content', counting_create)
+    return creates
+
+
+def test_failed_create_falls_back_inline_and_waits_before_retrying(mock_gemini):
+    _, endpoint = mock_gemini
+    unreachable = GeminiClient(api_key='test-key', api_endpoint='http://127.0.0.1:9/v1beta/models')
+    cache = ContextCache(unreachable, INSTRUCTION, retry_interval=300)
+    cache.start([MODEL])
+
+    assert cache.get(MODEL) is None
+    assert cache.get(MODEL) is None
+    wait_for_refresh(cache)
+    stats = cache.get_stats()
+    assert (stats['failures'], stats['misses'], stats['entries']) == (1, 2, {})
+
+    # Retried once the interval has passed
+    unreachable.api_endpoint = endpoint
+    cache._retry_after[MODEL] = time.monotonic() - 1
+    cache.get(MODEL)
+    wait_for_refresh(cache)
+    assert cache.get(MODEL).startswith('cachedContents/')
+    unreachable.close()
+
+
+def test_model_that_rejects_the_instruction_as_too_small_is_not_asked_again(client, mock_gemini, monkeypatch):
+    server, _ = mock_gemini
+    server.behavior.update(cache_min_tokens=100_000)
+    creates = count_creates(client, monkeypatch)
+    cache = ContextCache(client, INSTRUCTION, retry_interval=0)
+    cache.start([MODEL])
+
+    for _ in range(3):
+        assert cache.get(MODEL) is None
+        wait_for_refresh(cache)
+
+    assert creates == [MODEL]
+    assert cache.get_stats()['too_small'] == [MODEL]
+
+
+def test_instruction_below_min_tokens_is_never_offered(client, monkeypatch):
+    creates = count_creates(client, monkeypatch)
+    cache = ContextCache(client, INSTRUCTION, min_tokens=10_000)
+    cache.start([MODEL])
+
+    assert cache.get(MODEL) is None
+    assert creates == []
+    stats = cache.get_stats()
+    assert stats['enabled'] is False
+    assert 0 < stats['instruction_tokens'] < 10_000
+
+
+def test_invalidate_drops_the_entry(client):
+    cache = ContextCache(client, INSTRUCTION, retry_interval=300)
+    cache.start([MODEL])
+    cache.invalidate(MODEL)
+    cache._retry_after[MODEL] = time.monotonic() + 300
+
+    assert cache.get(MODEL) is None
+    assert cache.get_stats()['invalidated'] == 1
+
+
+@pytest.mark.parametrize('error, expected', [
+    (GeminiAPIError(404, '{"error": {"message": "CachedContent not found"}}'), True),
+    (GeminiAPIError(403, 'Permission denied on cachedContent'), True),
+    (GeminiAPIError(400, 'Invalid temperature'), False),
+    (GeminiAPIError(503, 'cachedContent backend unavailable'), False),
+    (TimeoutError(), False),
+])
+def test_cache_errors_are_recognised(error, expected):
+    assert ContextCache.is_cache_error(error) is expected
+
+
+@pytest.mark.parametrize('error, expected', [
+    (GeminiAPIError(400, 'Cached content is too small. total_token_count=423, min_total_token_count=1024'), True),
+    (GeminiAPIError(400, 'Invalid temperature'), False),
+    (GeminiAPIError(404, 'CachedContent not found'), False),
+])
+def test_too_small_errors_are_recognised(error, expected):
+    assert ContextCache.is_too_small_error(error) is expected
+
+
+def test_cache_without_a_client_is_disabled():
+    cache = ContextCache(None, INSTRUCTION)
+    cache.start([MODEL])
+    assert cache.get(MODEL) is None
+    assert cache.get_stats()['enabled'] is False
+
+
+def test_turn_resends_inline_when_its_cache_was_evicted(narad, mock_gemini):
+    server, _ = mock_gemini
+    narad.context_cache = ContextCache(narad.gemini_client, narad.system_instruction)
+    narad.context_cache.start(narad.model_router.get_models())
+
+    first = narad.process_message('Tell me about the Konark Sun Temple', 'context-cache')
+    server.cached_contents.clear()
+    second = narad.process_message('Who built the Meenakshi temple?', 'context-cache')
+
+    assert 'Indian craftsmanship' in second['response']
+    assert narad.context_cache.get_stats()['invalidated'] == 1
+    # First turn once, second turn once with the stale cache and once inline
+    assert server.get_stats()['requests'] == {'generateContent': 3}
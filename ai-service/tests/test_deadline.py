@@ -0,0 +1,131 @@
+"""Tests for request deadline propagation (src/utils/deadline.py and its use in app.py)"""
+
+import asyncio
+import contextvars
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.utils.deadline import Deadline, cap_timeout, current_deadline, deadline_passed, deadline_scope
+
+
+def test_cap_timeout_without_a_deadline_is_unchanged():
+    assert cap_timeout(5) == 5
+    assert cap_timeout(None) is None
+    assert not deadline_passed()
+
+
+def test_cap_timeout_shortens_to_the_time_left():
+    with deadline_scope(Deadline(2)):
+        assert 1.9 < cap_timeout(5) <= 2
+        assert cap_timeout(1) == 1
+        assert 1.9 < cap_timeout(None) <= 2
+    with deadline_scope(Deadline(-1)):
+        assert cap_timeout(5) == 0
+        assert deadline_passed()
+
+
+def test_scopes_nest_and_none_keeps_the_enclosing_deadline():
+    outer, inner = Deadline(10), Deadline(1)
+    with deadline_scope(outer):
+        with deadline_scope(None):
+            assert current_deadline() is outer
+        with deadline_scope(inner):
+            assert current_deadline() is inner
+        assert current_deadline() is outer
+    assert current_deadline() is None
+
+
+def test_deadline_follows_the_context_into_tasks_and_pool_threads():
+    deadline = Deadline(10)
+
+    async def in_task():
+        return await asyncio.ensure_future(asyncio.sleep(0, result=current_deadline()))
+
+    with deadline_scope(deadline):
+        assert asyncio.run(in_task()) is deadline
+        with ThreadPoolExecutor(1) as pool:
+            assert pool.submit(contextvars.copy_context().run, current_deadline).result() is deadline
+            # A plain submit does not carry the context
+            assert pool.submit(current_deadline).result() is None
+
+
+@pytest.mark.parametrize('headers, body, expected', [
+    ({'X-Request-Timeout': '2.5'}, {}, 2.5),
+    ({}, {'timeout': 3}, 3),
+    ({'X-Request-Timeout': '1'}, {'timeout': 30}, 1),
+    ({}, {'timeout': 10_000}, 120),
+])
+def test_request_timeouts_are_parsed_and_clamped(headers, body, expected):
+    from app import parse_request_deadline
+
+    assert math.isclose(parse_request_deadline(headers, body).remaining(), expected, abs_tol=0.1)
+
+
+def test_absolute_deadline_is_converted_to_time_left():
+    from app import parse_request_deadline
+
+    deadline = parse_request_deadline({'X-Request-Deadline': str(time.time() + 4)}, {})
+    assert math.isclose(deadline.remaining(), 4, abs_tol=0.1)
+    assert parse_request_deadline({}, {}) is None
+
+
+@pytest.mark.parametrize('value', ['soon', 'nan', 'inf', True, [1]])
+def test_malformed_deadlines_are_rejected(value):
+    from app import parse_request_deadline
+
+    with pytest.raises(ValueError):
+        parse_request_deadline({}, {'timeout': value})
+
+
+def test_chat_route_validates_the_deadline(mock_gemini):
+    import app
+
+    client = app.app.test_client()
+    assert client.post('/api/ai/chat', json={'message': 'Hi', 'timeout': 'soon'}).status_code == 400
+    assert client.post('/api/ai/chat', json={'message': 'Hi', 'timeout': -1}).status_code == 504
+
+
+def test_turn_with_too_little_time_is_answered_locally(narad, mock_gemini):
+    server, _ = mock_gemini
+
+    result = narad.process_message('Tell me about the Ajanta caves', 'deadline-close', deadline=Deadline(0.5))
+
+    assert result['response']
+    assert server.get_stats()['requests'] == {}
+
+
+def test_slow_upstream_is_cut_off_at_the_deadline(narad, mock_gemini):
+    server, _ = mock_gemini
+    server.behavior.update(latency=3)
+
+    started = time.monotonic()
+    result = narad.process_message('Tell me about the Ajanta caves', 'deadline-slow', deadline=Deadline(1.5))
+
+    assert time.monotonic() - started < 2.0
+    assert 'Indian craftsmanship' not in result['response']
+    assert server.get_stats()['requests'] == {'generateContent': 1}
+
+
+def fallbacks(narad, reason):
+    return narad.metrics._values['narad_fallbacks_total'].get((('reason', reason),), 0)
+
+
+def test_read_timeout_at_the_deadline_is_not_reported_as_overload(narad, monkeypatch):
+    import requests
+
+    def timed_out_at_deadline(turn):
+        time.sleep(max(0.0, current_deadline().remaining()) + 0.01)
+        raise requests.ReadTimeout('read timed out')
+
+    monkeypatch.setattr(narad, '_request_gemini', timed_out_at_deadline)
+    # Surface the upstream error itself rather than the waiter's own deadline
+    monkeypatch.setattr(narad.single_flight, 'do', lambda key, fn: fn())
+    deadline_before, overload_before = fallbacks(narad, 'request_deadline_reached'), fallbacks(narad, 'upstream_overloaded')
+
+    narad.process_message('Tell me about the Ajanta caves', 'deadline-timeout', deadline=Deadline(1.1))
+
+    assert fallbacks(narad, 'request_deadline_reached') == deadline_before + 1
+    assert fallbacks(narad, 'upstream_overloaded') == overload_before
@@ -0,0 +1,111 @@
+"""Tests for the pooled Gemini REST clients (src/services/gemini_client.py)"""
+
+import asyncio
+
+import pytest
+import requests
+
+from mock_gemini_server import CANNED_ANSWER
+from src.services.gemini_client import (
+    AsyncGeminiClient, GeminiAPIError, GeminiClient, is_overload_error, is_retryable_error, parse_stream_line
+)
+
+PAYLOAD = {'contents': [{'role': 'user', 'parts': [{'text': 'Tell me about Hampi'}]}]}
+
+
+def test_parse_stream_line_skips_keep_alives_and_bad_frames():
+    assert parse_stream_line('') == []
+    assert parse_stream_line(': keep-alive') == []
+    assert parse_stream_line('data: {"cand') == []
+    assert parse_stream_line('data: {"candidates": [{"content": {"parts": [{"text": "नमस्ते"}]}}]}') == ['नमस्ते']
+
+
+def test_stream_decodes_utf8_without_a_charset(mock_gemini):
+    _, endpoint = mock_gemini
+    client = GeminiClient('test-key', api_endpoint=endpoint)
+    try:
+        text = ''.join(client.stream_generate_content('gemini-test', PAYLOAD))
+    finally:
+        client.close()
+    assert text == CANNED_ANSWER
+
+
+def test_async_stream_decodes_utf8_without_a_charset(mock_gemini):
+    _, endpoint = mock_gemini
+
+    async def run():
+        client = AsyncGeminiClient('test-key', api_endpoint=endpoint)
+        try:
+            return ''.join([text async for text in client.stream_generate_content('gemini-test', PAYLOAD)])
+        finally:
+            await client.aclose()
+
+    assert asyncio.run(run()) == CANNED_ANSWER
+
+
+def test_generate_content_keeps_non_ascii_text(mock_gemini):
+    _, endpoint = mock_gemini
+    client = GeminiClient('test-key', api_endpoint=endpoint)
+    try:
+        response = client.generate_content('gemini-test', PAYLOAD)
+    finally:
+        client.close()
+    assert GeminiClient.extract_text(response) == CANNED_ANSWER.strip()
+
+
+def test_calls_reuse_one_pooled_connection(mock_gemini):
+    _, endpoint = mock_gemini
+    client = GeminiClient('test-key', api_endpoint=endpoint)
+    try:
+        for _ in range(5):
+            client.generate_content('gemini-test', PAYLOAD)
+        pool = client.session.get_adapter(endpoint).poolmanager.connection_from_url(endpoint)
+        assert pool.num_connections == 1
+        assert client.get_stats()['requests'] == 5
+    finally:
+        client.close()
+
+
+def test_error_status_raises_gemini_api_error(mock_gemini):
+    server, endpoint = mock_gemini
+    server.behavior.update(error_rate=1.0, error_codes=[503])
+    client = GeminiClient('test-key', api_endpoint=endpoint)
+    try:
+        with pytest.raises(GeminiAPIError) as raised:
+            client.generate_content('gemini-test', PAYLOAD)
+    finally:
+        client.close()
+    assert raised.value.status_code == 503
+    assert client.get_stats()['errors'] == 1
+
+
+@pytest.mark.parametrize('error, retryable, overload', [
+    (GeminiAPIError(429), True, True),
+    (GeminiAPIError(503), True, True),
+    (GeminiAPIError(500), True, False),
+    (GeminiAPIError(400), False, False),
+    (requests.ConnectionError(), True, False),
+    (requests.ReadTimeout(), True, True),
+    (ValueError(), False, False)
+])
+def test_error_classification(error, retryable, overload):
+    assert is_retryable_error(error) is retryable
+    assert is_overload_error(error) is overload
+
+
+def test_warm_up_opens_a_connection(mock_gemini):
+    _, endpoint = mock_gemini
+    client = GeminiClient('test-key', api_endpoint=endpoint)
+    try:
+        assert client.warm_up() is True
+        assert client.get_stats()['warmed_up'] is True
+    finally:
+        client.close()
+
+
+def test_warm_up_failure_is_reported_not_raised():
+    client = GeminiClient('test-key', api_endpoint='http://127.0.0.1:9/v1beta/models', connect_timeout=0.2)
+    try:
+        assert client.warm_up() is False
+    finally:
+        client.close()
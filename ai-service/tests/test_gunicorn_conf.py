@@ -0,0 +1,115 @@
+"""Tests for the gunicorn settings (gunicorn.conf.py)"""
+
+import gc
+import os
+import runpy
+import sys
+import types
+
+import pytest
+
+CONFIG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'gunicorn.conf.py')
+
+
+def test_preload_is_opt_in(monkeypatch):
+    monkeypatch.delenv('GUNICORN_PRELOAD', raising=False)
+    settings = runpy.run_path(CONFIG)
+    assert settings['preload_app'] is False
+    assert 'GUNICORN_PRELOAD' not in os.environ
+    assert gc.isenabled()
+
+
+def test_preload_from_environment(monkeypatch):
+    monkeypatch.setenv('GUNICORN_PRELOAD', 'true')
+    try:
+        assert runpy.run_path(CONFIG)['preload_app'] is True
+    finally:
+        gc.enable()
+
+
+def load_config(monkeypatch, tmp_path, preload=False, metrics_dir=None):
+    monkeypatch.setenv('GUNICORN_PRELOAD', 'true' if preload else 'false')
+    if metrics_dir is None:
+        monkeypatch.delenv('METRICS_DIR', raising=False)
+        monkeypatch.setattr('tempfile.tempdir', str(tmp_path))
+    else:
+        monkeypatch.setenv('METRICS_DIR', metrics_dir)
+    return runpy.run_path(CONFIG)
+
+
+def test_starting_clears_stale_metric_snapshots(monkeypatch, tmp_path):
+    directory = tmp_path / 'metrics'
+    directory.mkdir()
+    (directory / '4242.json').write_text('{}')
+    (directory / 'notes.txt').write_text('kept')
+
+    load_config(monkeypatch, tmp_path, metrics_dir=str(directory))['on_starting'](None)
+
+    assert sorted(path.name for path in directory.iterdir()) == ['notes.txt']
+
+
+def test_exit_removes_only_a_directory_it_created(monkeypatch, tmp_path):
+    settings = load_config(monkeypatch, tmp_path)
+    created = os.environ['METRICS_DIR']
+    assert os.path.dirname(created) == str(tmp_path)
+    settings['on_starting'](None)
+    settings['on_exit'](None)
+    assert not os.path.exists(created)
+
+    own = tmp_path / 'own'
+    settings = load_config(monkeypatch, tmp_path, metrics_dir=str(own))
+    settings['on_starting'](None)
+    settings['on_exit'](None)
+    assert own.is_dir()
+
+
+def test_post_fork_without_preload_starts_nothing(monkeypatch, tmp_path):
+    started = []
+    monkeypatch.setitem(sys.modules, 'app', types.SimpleNamespace(start_worker=lambda: started.append(1)))
+
+    load_config(monkeypatch, tmp_path)['post_fork'](None, None)
+    assert started == []
+
+
+def test_preloaded_worker_restarts_its_threads(monkeypatch, tmp_path):
+    from src.utils import logger
+
+    calls = []
+    monkeypatch.setitem(sys.modules, 'app', types.SimpleNamespace(start_worker=lambda: calls.append('worker')))
+    monkeypatch.setattr(logger, 'restart_logging', lambda: calls.append('logging'))
+
+    try:
+        settings = load_config(monkeypatch, tmp_path, preload=True)
+        assert not gc.isenabled()
+        settings['pre_fork'](None, None)
+        assert gc.get_freeze_count() > 0
+        settings['post_fork'](None, None)
+    finally:
+        gc.unfreeze()
+        gc.enable()
+
+    assert calls == ['logging', 'worker']
+    assert gc.isenabled()
+
+
+class FakeLog:
+    def __init__(self):
+        self.warnings = []
+
+    def warning(self, message, *args):
+        self.warnings.append(message % args)
+
+
+@pytest.mark.parametrize('workers, backend, warned', [(4, 'memory', True), (1, 'memory', False), (4, 'redis', False)])
+def test_per_worker_rate_limits_are_flagged_at_startup(monkeypatch, tmp_path, workers, backend, warned):
+    from src.config.settings import SECURITY_CONFIG
+
+    monkeypatch.setitem(SECURITY_CONFIG['rate_limiting'], 'enabled', True)
+    monkeypatch.setitem(SECURITY_CONFIG['rate_limiting'], 'backend', backend)
+    server = types.SimpleNamespace(cfg=types.SimpleNamespace(workers=workers), log=FakeLog())
+
+    load_config(monkeypatch, tmp_path)['when_ready'](server)
+
+    assert bool(server.log.warnings) is warned
+    if warned:
+        assert 'RATE_LIMIT_BACKEND=redis' in server.log.warnings[0]
@@ -0,0 +1,199 @@
+"""Tests for hedged requests (src/utils/hedging.py)"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.utils.concurrency import ConcurrencyLimiter
+from src.utils.hedging import HedgePolicy, LatencyTracker
+from src.utils.resilience import RetryPolicy
+
+
+class Rejected(Exception):
+    pass
+
+
+def policy(**kwargs) -> HedgePolicy:
+    kwargs.setdefault('initial_delay', 0.05)
+    kwargs.setdefault('min_delay', 0.01)
+    return HedgePolicy(**kwargs)
+
+
+def test_latency_tracker_percentiles():
+    tracker = LatencyTracker(window_size=100)
+    assert tracker.percentile(95) is None
+    for value in range(1, 101):
+        tracker.record(value / 100)
+    assert tracker.percentile(50) == 0.5
+    assert tracker.percentile(95) == 0.95
+
+
+def test_hedge_delay_follows_primary_percentile_within_bounds():
+    hedges = policy(min_samples=5, max_delay=0.5)
+    assert hedges.hedge_delay() == 0.05
+    for _ in range(5):
+        hedges.primary_latency.record(0.2)
+    assert hedges.hedge_delay() == 0.2
+    for _ in range(50):
+        hedges.primary_latency.record(3.0)
+    assert hedges.hedge_delay() == 0.5
+
+
+def test_fast_primary_wins_without_hedging():
+    hedges = policy()
+    assert hedges.call(lambda: 'primary', lambda: 'hedge') == 'primary'
+    stats = hedges.get_stats()
+    assert (stats['primary_wins'], stats['hedges_fired']) == (1, 0)
+    assert len(hedges.primary_latency) == 1
+
+
+def test_slow_primary_is_hedged():
+    hedges = policy()
+
+    def slow():
+        time.sleep(0.3)
+        return 'primary'
+
+    assert hedges.call(slow, lambda: 'hedge') == 'hedge'
+    stats = hedges.get_stats()
+    assert (stats['hedges_fired'], stats['hedge_wins']) == (1, 1)
+
+
+def test_fast_failure_is_counted_separately_and_not_hedged():
+    hedges = policy()
+    hedged = []
+
+    def fail():
+        raise Rejected('bad request')
+
+    for run in (lambda: hedges.call(fail, lambda: hedged.append(1)),
+                lambda: asyncio.run(hedges.call_async(async_raise(Rejected('bad request')), async_value('hedge')))):
+        with pytest.raises(Rejected):
+            run()
+
+    stats = hedges.get_stats()
+    assert stats['primary_failed_fast'] == 2
+    assert stats['primary_wins'] == 0
+    assert stats['hedges_fired'] == 0
+    assert not hedged
+
+
+def test_both_failing_raises():
+    hedges = policy()
+
+    def slow_fail():
+        time.sleep(0.1)
+        raise Rejected('primary')
+
+    def fail():
+        raise Rejected('hedge')
+
+    with pytest.raises(Rejected):
+        hedges.call(slow_fail, fail)
+    assert hedges.get_stats()['both_failed'] == 1
+
+
+def test_losing_thread_gives_back_its_slot_and_stops_retrying():
+    hedges = policy()
+    limiter = ConcurrencyLimiter(4)
+    retries = RetryPolicy(max_retries=3, base_delay=0, is_retryable=lambda error: True)
+    loser_done = threading.Event()
+
+    def slow_flaky():
+        time.sleep(0.2)
+        raise ConnectionError('reset')
+
+    def primary():
+        try:
+            with limiter.slot():
+                return retries.call(lambda remaining: slow_flaky())
+        finally:
+            loser_done.set()
+
+    def hedge():
+        with limiter.slot():
+            return 'hedge'
+
+    assert hedges.call(primary, hedge) == 'hedge'
+    # The primary's request is still on the wire, but its slot is free
+    assert limiter.in_flight == 0
+
+    assert loser_done.wait(2)
+    assert limiter.in_flight == 0
+    assert retries.get_stats()['attempts'] == 1
+
+
+def test_hedges_beyond_the_cap_are_skipped():
+    hedges = policy(max_hedges=1)
+    release = threading.Event()
+
+    def slow(value):
+        def run():
+            time.sleep(0.15)
+            return value
+        return run
+
+    def stuck_hedge():
+        release.wait(2)
+        return 'hedge'
+
+    first = threading.Thread(target=hedges.call, args=(lambda: release.wait(2) and 'primary', stuck_hedge))
+    first.start()
+    try:
+        time.sleep(0.1)
+        assert hedges.get_stats()['hedges_in_flight'] == 1
+        # The only hedge slot is taken, so the slow primary is simply awaited
+        assert hedges.call(slow('primary'), slow('hedge')) == 'primary'
+    finally:
+        release.set()
+        first.join()
+
+    stats = hedges.get_stats()
+    assert (stats['hedges_fired'], stats['hedges_skipped'], stats['hedges_in_flight']) == (1, 1, 0)
+
+
+def async_value(value, delay=0.0):
+    async def run():
+        await asyncio.sleep(delay)
+        return value
+    return run
+
+
+def async_raise(error):
+    async def run():
+        raise error
+    return run
+
+
+def test_cancelled_async_primary_records_its_latency():
+    hedges = policy()
+
+    async def run():
+        result = await hedges.call_async(async_value('primary', delay=10), async_value('hedge'))
+        # Let the cancelled loser run its cancellation
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(run()) == 'hedge'
+    assert hedges.get_stats()['hedge_wins'] == 1
+    assert len(hedges.primary_latency) == 1
+    # The loser ran at least until the hedge fired
+    assert hedges.primary_latency.percentile(50) >= 0.05
+
+
+def test_cancelled_caller_cancels_the_primary():
+    hedges = policy(initial_delay=5, max_delay=5)
+
+    async def run():
+        task = asyncio.ensure_future(hedges.call_async(async_value('primary', delay=10), async_value('hedge')))
+        await asyncio.sleep(0.02)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(0)
+        return [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+
+    assert asyncio.run(run()) == []
+    assert len(hedges.primary_latency) == 1
@@ -0,0 +1,142 @@
+"""Tests for the LLM provider layer and failover gateway (src/services/llm_providers.py)"""
+
+import pytest
+
+from src.services.gemini_client import GeminiClient
+from src.services.llm_providers import (
+    GeminiProvider, LLMGateway, LLMProviderError, OpenAIProvider, _build_limiter,
+    build_llm_gateway, describe_provider_error, normalize_messages, usable_api_key
+)
+from src.services.openai_client import OpenAIClient
+from src.utils.resilience import CircuitBreaker, RetryPolicy
+
+
+def make_provider(cls, client, model, allowed_models=None):
+    limiter, adaptive_limit = _build_limiter(4)
+    return cls(
+        client=client,
+        model=model,
+        allowed_models=allowed_models,
+        limiter=limiter,
+        adaptive_limit=adaptive_limit,
+        retry_policy=RetryPolicy(max_retries=0),
+        breaker=CircuitBreaker()
+    )
+
+
+@pytest.fixture
+def providers(mock_gemini):
+    """A Gemini provider on a dead port and an OpenAI provider served by the mock"""
+    _, endpoint = mock_gemini
+    dead_gemini = make_provider(GeminiProvider, GeminiClient('test-key', api_endpoint='http://127.0.0.1:9/v1beta/models', connect_timeout=0.5), 'gemini-1.5-pro')
+    openai = make_provider(OpenAIProvider, OpenAIClient('test-key', api_base=endpoint.split('/v1beta', 1)[0] + '/v1'), 'mock-gpt', ['gpt-4o-mini'])
+    live_gemini = build_llm_gateway().get('gemini')
+    return dead_gemini, openai, live_gemini
+
+
+def test_messages_are_normalized():
+    assert normalize_messages('Namaste') == [{'role': 'user', 'content': 'Namaste'}]
+    assert normalize_messages([
+        'hi', {'role': 'model', 'content': 'hello'}, {'role': 'system', 'content': 'be brief'}, {'role': 'tool', 'content': 3}
+    ]) == [
+        {'role': 'user', 'content': 'hi'},
+        {'role': 'assistant', 'content': 'hello'},
+        {'role': 'system', 'content': 'be brief'},
+        {'role': 'user', 'content': '3'}
+    ]
+
+
+def test_gemini_answer_is_normalized(providers, mock_gemini):
+    _, _, gemini = providers
+    result = LLMGateway([gemini]).generate('Tell me about Hampi', system='Be brief', options={'max_tokens': 8})
+
+    assert result['provider'] == 'gemini'
+    assert result['failover'] is False
+    assert result['finish_reason'] == 'STOP'
+    assert len(result['text'].split(' ')) == 6
+    assert result['usage']['total_tokens'] > 0
+
+
+def test_failing_provider_fails_over_to_the_next(providers, mock_gemini):
+    server, _ = mock_gemini
+    dead_gemini, openai, _ = providers
+    gateway = LLMGateway([dead_gemini, openai])
+
+    result = gateway.generate('Tell me about Hampi')
+
+    assert (result['provider'], result['failover']) == ('openai', True)
+    assert server.get_stats()['requests'] == {'chatCompletions': 1}
+    assert gateway.get_stats()['failovers'] == 1
+
+
+def test_preferred_provider_and_model_go_first(providers, mock_gemini):
+    server, _ = mock_gemini
+    dead_gemini, openai, _ = providers
+    result = LLMGateway([dead_gemini, openai]).generate('Hi', preferred='openai', model='gpt-4o-mini')
+
+    assert (result['provider'], result['model'], result['failover']) == ('openai', 'gpt-4o-mini', False)
+    assert server.get_stats()['models'] == {'gpt-4o-mini': 1}
+
+
+def test_models_outside_the_allow_list_are_rejected(providers, mock_gemini):
+    server, _ = mock_gemini
+    dead_gemini, openai, _ = providers
+    gateway = LLMGateway([dead_gemini, openai])
+
+    with pytest.raises(ValueError):
+        gateway.generate('Hi', preferred='openai', model='gpt-4-32k')
+    assert server.get_stats()['requests'] == {}
+    assert gateway.generate('Hi', preferred='openai', model='mock-gpt')['model'] == 'mock-gpt'
+
+
+def test_failover_can_be_disabled_or_excluded(providers):
+    dead_gemini, openai, _ = providers
+
+    with pytest.raises(LLMProviderError) as error:
+        LLMGateway([dead_gemini, openai], failover_enabled=False).generate('Hi')
+    assert list(error.value.errors) == ['gemini']
+
+    assert LLMGateway([dead_gemini, openai]).generate('Hi', exclude=['gemini'])['provider'] == 'openai'
+
+
+def test_exhausted_gateway_reports_only_error_types(providers, mock_gemini):
+    server, _ = mock_gemini
+    server.behavior.update(error_rate=1.0, error_codes=[500])
+    dead_gemini, openai, _ = providers
+    gateway = LLMGateway([dead_gemini, openai])
+
+    with pytest.raises(LLMProviderError) as error:
+        gateway.generate('Hi')
+
+    body, status = describe_provider_error(error.value)
+    assert status == 502
+    assert body == {'error': 'AI provider error', 'details': {'gemini': 'ConnectionError', 'openai': 'OpenAIAPIError'}}
+    assert gateway.get_stats()['exhausted'] == 1
+
+
+def test_gateway_without_providers_is_not_configured():
+    with pytest.raises(LLMProviderError) as error:
+        LLMGateway([]).generate('Hi')
+    assert describe_provider_error(error.value) == ({'error': 'AI service not configured'}, 503)
+
+
+@pytest.mark.parametrize('api_key, usable', [
+    (None, None),
+    ('  ', None),
+    ('your_gemini_api_key_here', None),
+    ('your-gemini-api-key-here', None),
+    ('YOUR_OPENAI_API_KEY', None),
+    (' AIza-real-key ', 'AIza-real-key')
+])
+def test_usable_api_key(api_key, usable):
+    assert usable_api_key(api_key) == usable
+
+
+def test_placeholder_keys_configure_neither_the_gateway_nor_narad(monkeypatch):
+    from src.services.narad_ai import NaradAI
+
+    # The .env.example spelling, which NaradAI used to accept as a real key
+    monkeypatch.setenv('GEMINI_API_KEY', 'your-gemini-api-key-here')
+    gateway = build_llm_gateway()
+    assert gateway.order == []
+    assert NaradAI(llm_gateway=gateway).model is None
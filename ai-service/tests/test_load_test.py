@@ -0,0 +1,161 @@
+"""Tests for the load-test tool's request generation and bookkeeping (benchmarks/load_test.py)"""
+
+import json
+import random
+import types
+
+import pytest
+
+import load_test
+
+CHAT_PATH = '/api/ai/chat'
+
+
+def user_args(**overrides):
+    args = dict(session_turns=3, unique_ratio=0.0, languages=['en'])
+    args.update(overrides)
+    return types.SimpleNamespace(**args)
+
+
+def chat_template(name='chat', weight=1.0):
+    return {'name': name, 'method': 'POST', 'path': CHAT_PATH, 'body': {'message': 'Tell me about Holi'}, 'weight': weight}
+
+
+def test_percentile_is_nearest_rank():
+    values = list(range(10, 0, -1))
+    assert load_test.percentile(values, 50) == 5
+    assert load_test.percentile(values, 95) == 10
+    assert load_test.percentile(values, 0) == 1
+    assert load_test.percentile([], 95) == 0.0
+
+
+def test_latency_summary_rates():
+    summary = load_test.latency_summary([0.1, 0.2, 0.3, 0.4], errors=1, elapsed=2.0)
+    assert summary['requests'] == 4
+    assert summary['error_rate'] == 0.25
+    assert summary['throughput_rps'] == 2.0
+    assert summary['p50_ms'] == 200.0
+    assert summary['p99_ms'] == 400.0
+
+    empty = load_test.latency_summary([], errors=0, elapsed=0)
+    assert (empty['error_rate'], empty['throughput_rps'], empty['p95_ms']) == (0.0, 0.0, 0.0)
+
+
+def test_parse_mapping():
+    assert load_test.parse_mapping('/api/chat=/api/ai/chat, /a = /b ,') == {'/api/chat': '/api/ai/chat', '/a': '/b'}
+    assert load_test.parse_mapping('Health Check=0.1', float) == {'Health Check': 0.1}
+    assert load_test.parse_mapping('') == {}
+    with pytest.raises(ValueError):
+        load_test.parse_mapping('Health Check=often', float)
+
+
+def test_shipped_collection_maps_chat_requests():
+    templates = load_test.load_collection(load_test.COLLECTION, {'/api/chat': CHAT_PATH}, {})
+
+    health = next(template for template in templates if template['name'].endswith('Health Check'))
+    assert (health['method'], health['path'], health['body']) == ('GET', '/health', None)
+    chats = [template for template in templates if template['method'] == 'POST']
+    assert chats and all(template['path'] == CHAT_PATH for template in chats)
+    assert all('message' in template['body'] for template in chats)
+    assert all(template['weight'] == 1.0 for template in templates)
+
+
+def test_collection_folders_weights_and_exclusions(tmp_path):
+    collection = {'item': [
+        {'name': 'Health', 'request': {'method': 'GET', 'url': '{{base_url}}/health'}},
+        {'name': 'Folder', 'item': [
+            {'name': 'Chat', 'request': {
+                'method': 'POST',
+                'url': {'raw': '{{base_url}}/api/chat'},
+                'body': {'mode': 'raw', 'raw': json.dumps({'message': 'hi'})}
+            }},
+            {'name': 'Root', 'request': {'method': 'GET', 'url': '{{base_url}}'}}
+        ]}
+    ]}
+    path = tmp_path / 'collection.json'
+    path.write_text(json.dumps(collection))
+
+    templates = load_test.load_collection(str(path), {}, {'Health': 0, 'Chat': 2.5})
+
+    assert [(template['name'], template['path'], template['weight']) for template in templates] == [
+        ('Chat', '/api/chat', 2.5),
+        ('Root', '/', 1.0)
+    ]
+    assert templates[0]['body'] == {'message': 'hi'}
+
+
+def test_virtual_user_churns_its_session():
+    user = load_test.VirtualUser(7, [chat_template()], user_args(session_turns=2), random.Random(1))
+
+    sessions = [user.next_request()['body']['session_id'] for _ in range(5)]
+
+    assert sessions == ['load-7-1', 'load-7-1', 'load-7-2', 'load-7-2', 'load-7-3']
+    assert user.sessions == 3
+
+
+def test_virtual_user_parameterizes_without_touching_the_template():
+    template = chat_template()
+    args = user_args(unique_ratio=1.0, languages=['hi', 'ta'])
+    user = load_test.VirtualUser(0, [template], args, random.Random(3))
+
+    requests = [user.next_request() for _ in range(20)]
+
+    assert all(request['body']['message'].startswith('Tell me about Holi (variant ') for request in requests)
+    assert {request['body']['context']['preferences']['language'] for request in requests} == {'hi', 'ta'}
+    assert template['body'] == {'message': 'Tell me about Holi'}
+
+
+def test_virtual_user_leaves_non_chat_requests_alone():
+    health = {'name': 'Health Check', 'method': 'GET', 'path': '/health', 'body': None, 'weight': 1.0}
+    user = load_test.VirtualUser(0, [health], user_args(), random.Random(0))
+
+    request = user.next_request()
+
+    assert request == {'name': 'Health Check', 'method': 'GET', 'path': '/health', 'body': None}
+    assert user.turns == 0
+
+
+def test_virtual_user_follows_weights():
+    templates = [chat_template('often', weight=9.0), chat_template('rarely', weight=1.0)]
+    user = load_test.VirtualUser(0, templates, user_args(), random.Random(5))
+
+    names = [user.next_request()['name'] for _ in range(1000)]
+
+    assert 800 < names.count('often') < 980
+
+
+def test_recorder_counts_errors_and_windows():
+    recorder = load_test.Recorder()
+    recorder.record('chat', 0.1, 200)
+    recorder.record('chat', 0.3, 503)
+    recorder.record('health', 0.05, None)
+
+    assert recorder.errors == 2
+    assert recorder.status_codes == {'200': 1, '503': 1, 'connection_error': 1}
+    assert recorder.by_name['chat'] == {'latencies': [0.1, 0.3], 'errors': 1}
+
+    window = recorder.take_window(elapsed=1.0)
+    assert (window['requests'], window['errors']) == (3, 2)
+    assert recorder.take_window(elapsed=1.0)['requests'] == 0
+    # The run totals outlive the window
+    assert len(recorder.latencies) == 3
+
+
+def test_memory_growth_per_worker():
+    timeline = [
+        {'t_s': 0, 'workers': {'101': {'rss_mb': 100.0, 'pss_mb': 60.0}}},
+        {'t_s': 60, 'workers': {'101': {'rss_mb': 110.0, 'pss_mb': 65.0}, '102': {'rss_mb': 90.0, 'pss_mb': 50.0}}},
+        {'t_s': 120, 'workers': {'101': {'rss_mb': 130.0, 'pss_mb': 70.0}}}
+    ]
+
+    growth = load_test.memory_growth(timeline)
+
+    assert growth['101'] == {
+        'rss_start_mb': 100.0,
+        'rss_end_mb': 130.0,
+        'pss_start_mb': 60.0,
+        'pss_end_mb': 70.0,
+        'rss_growth_mb_per_min': 15.0
+    }
+    # A single sample has no rate
+    assert growth['102']['rss_growth_mb_per_min'] == 0.0
@@ -0,0 +1,132 @@
+"""Tests for the queued, structured and sampled logging pipeline (src/utils/logger.py)"""
+
+import io
+import json
+import logging
+import queue
+
+import pytest
+
+from src.utils import logger as logger_module
+from src.utils.logger import (
+    JsonFormatter, NonBlockingQueueHandler, SamplingFilter, configure_logging, get_logging_stats,
+    log_event, parse_sample_rates, redact, restart_logging, stop_logging, truncate
+)
+
+
+@pytest.fixture
+def root_logging():
+    """Give the test the root logger and put the previous handlers back afterwards"""
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    yield root
+    stop_logging()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    for handler in handlers:
+        root.addHandler(handler)
+    root.setLevel(level)
+
+
+def make_record(name='src.services.narad_ai', level=logging.INFO, msg='hello', args=(), **extra):
+    record = logging.LogRecord(name, level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+@pytest.mark.parametrize('line, expected', [
+    ('POST /models/gemini:generateContent?key=AIzaSyA1234567890abcdefghijk', 'POST /models/gemini:generateContent?key=[REDACTED]'),
+    ('key AIzaSyA1234567890abcdefghijk leaked', 'key [REDACTED] leaked'),
+    ('Authorization: Bearer sk-abc.def', 'Authorization: Bearer [REDACTED]'),
+    ('/stats?page=2&token=s3cret&x=1', '/stats?page=2&token=[REDACTED]&x=1'),
+])
+def test_secrets_are_redacted(line, expected):
+    assert redact(line) == expected
+
+
+def test_truncate_reaches_into_containers():
+    assert truncate('abcdef', 3) == 'abc...[3 more chars]'
+    assert truncate({'a': ['abcdef', 1]}, 3) == {'a': ['abc...[3 more chars]', 1]}
+    assert truncate(12345, 3) == 12345
+
+
+def test_json_records_carry_structured_fields():
+    record = make_record(
+        msg='Answered %s', args=('turn',), event='chat_turn',
+        fields={'message': 'x' * 20, 'session_id': 's1', 'url': '?key=s3c'}
+    )
+
+    entry = json.loads(JsonFormatter(max_field_chars=10).format(record))
+
+    assert (entry['level'], entry['logger'], entry['msg'], entry['event']) == ('INFO', 'src.services.narad_ai', 'Answered t...[3 more chars]', 'chat_turn')
+    assert entry['message'] == 'x' * 10 + '...[10 more chars]'
+    assert (entry['session_id'], entry['url']) == ('s1', '?key=[REDACTED]')
+
+
+def test_sampling_keeps_warnings_and_matches_the_closest_category():
+    sampler = SamplingFilter({'src.services': 0.0, 'chat_turn': 1.0, 'src.services.gemini_client': 1.0})
+
+    assert not sampler.filter(make_record('src.services.narad_ai'))
+    assert sampler.filter(make_record('src.services.gemini_client'))
+    assert sampler.filter(make_record('src.services.narad_ai', event='chat_turn'))
+    assert sampler.filter(make_record('src.services.narad_ai', level=logging.WARNING))
+    assert sampler.filter(make_record('app'))
+    assert sampler.dropped == 1
+
+
+def test_default_rate_applies_to_unlisted_categories():
+    sampler = SamplingFilter({'*': 0.0})
+    assert not sampler.filter(make_record('app'))
+    assert SamplingFilter().filter(make_record('app'))
+
+
+def test_sample_rates_are_parsed_and_clamped():
+    assert parse_sample_rates('chat_turn=0.1, src.services = 2 ,bad,=0.5,') == {'chat_turn': 0.1, 'src.services': 1.0}
+    assert parse_sample_rates('') == {}
+
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=1))
+    handler.handle(make_record())
+    handler.handle(make_record())
+    assert handler.dropped == 1
+
+
+def test_records_are_written_by_the_listener(root_logging):
+    stream = io.StringIO()
+    configure_logging(fmt='json', stream=stream, sample_rates={'noisy': 0.0})
+    log = logging.getLogger('src.services.narad_ai')
+
+    log_event(log, 'chat_request', 'Received chat request: %s', 'Namaste', message='Namaste', session_id='s1')
+    log_event(log, 'noisy', 'dropped')
+    stats = get_logging_stats()
+    stop_logging()
+
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [line['msg'] for line in lines] == ['Received chat request: Namaste']
+    assert (lines[0]['event'], lines[0]['message'], lines[0]['session_id']) == ('chat_request', 'Namaste', 's1')
+    assert stats['sampled_out'] == 1
+
+
+def test_text_lines_and_inline_writing(root_logging):
+    stream = io.StringIO()
+    configure_logging(fmt='text', use_queue=False, stream=stream)
+    logging.getLogger('app').info('calling https://host/v1?key=abc')
+
+    assert stream.getvalue().rstrip().endswith('INFO - calling https://host/v1?key=[REDACTED]')
+    assert logger_module._listener is None
+
+
+def test_restart_gives_the_queue_a_fresh_listener(root_logging):
+    stream = io.StringIO()
+    configure_logging(stream=stream)
+    before = logger_module._listener
+
+    restart_logging()
+    # Only the new listener's thread would exist in a forked child
+    before.stop()
+    assert logger_module._listener is not before
+    logging.getLogger('app').info('after fork')
+    stop_logging()
+
+    assert 'after fork' in stream.getvalue()
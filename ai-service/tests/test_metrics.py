@@ -0,0 +1,158 @@
+"""Tests for the metrics registry and Prometheus export (src/utils/metrics.py)"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+
+from src.utils.metrics import COUNTER, GAUGE, HISTOGRAM, Metrics, StageTimer
+
+
+def registry(**kwargs) -> Metrics:
+    metrics = Metrics(**kwargs)
+    metrics.define('narad_turns_total', COUNTER, 'Chat turns')
+    metrics.define('narad_active_sessions', GAUGE, 'Sessions')
+    metrics.define('narad_turn_duration_seconds', HISTOGRAM, 'Turn latency', buckets=(0.1, 1))
+    return metrics
+
+
+def dead_pid() -> int:
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+
+def write_snapshot(directory, pid, metrics):
+    with open(os.path.join(directory, f'{pid}.json'), 'w') as f:
+        json.dump({'pid': pid, 'metrics': metrics}, f)
+
+
+def test_stage_timer_charges_time_between_marks():
+    timer = StageTimer()
+    time.sleep(0.01)
+    timer.mark('prepare')
+    time.sleep(0.05)
+    timer.skip()
+    timer.mark('upstream')
+    timer.mark('prepare')
+
+    assert set(timer.stages) == {'prepare', 'upstream'}
+    assert timer.stages['prepare'] >= 0.01
+    assert timer.stages['upstream'] < 0.01
+    assert timer.total() >= 0.06
+
+
+def test_render_counters_and_gauges_with_escaped_labels():
+    metrics = registry()
+    metrics.inc('narad_turns_total', source='gemini')
+    metrics.inc('narad_turns_total', 2, source='gemini')
+    metrics.inc('narad_turns_total', source='say "hi"\n')
+    metrics.set('narad_active_sessions', 7)
+
+    lines = metrics.render().splitlines()
+    assert '# TYPE narad_turns_total counter' in lines
+    assert 'narad_turns_total{source="gemini"} 3' in lines
+    assert 'narad_turns_total{source="say \\"hi\\"\\n"} 1' in lines
+    assert 'narad_active_sessions 7' in lines
+    assert 'narad_metrics_workers 1' in lines
+
+
+def test_histogram_buckets_are_cumulative():
+    metrics = registry()
+    for seconds in (0.05, 0.1, 0.5, 3):
+        metrics.observe('narad_turn_duration_seconds', seconds, model='pro')
+
+    lines = [line for line in metrics.render().splitlines() if line.startswith('narad_turn_duration_seconds')]
+    assert lines == [
+        'narad_turn_duration_seconds_bucket{model="pro",le="0.1"} 2',
+        'narad_turn_duration_seconds_bucket{model="pro",le="1"} 3',
+        'narad_turn_duration_seconds_bucket{model="pro",le="+Inf"} 4',
+        'narad_turn_duration_seconds_sum{model="pro"} 3.65',
+        'narad_turn_duration_seconds_count{model="pro"} 4'
+    ]
+
+
+def test_collectors_are_read_at_snapshot_time():
+    metrics = registry()
+    sessions = {'count': 1}
+
+    def collect():
+        return [('narad_active_sessions', {}, sessions['count']), ('narad_unknown', {}, 1)]
+
+    def broken():
+        raise RuntimeError('stats unavailable')
+
+    metrics.register_collector(collect)
+    metrics.register_collector(broken)
+    sessions['count'] = 4
+    assert 'narad_active_sessions 4' in metrics.render().splitlines()
+
+    metrics.unregister_collector(collect)
+    assert metrics.snapshot()['narad_active_sessions'] == []
+
+
+def test_disabled_registry_ignores_updates():
+    metrics = registry(enabled=False)
+    metrics.inc('narad_turns_total', source='gemini')
+    metrics.observe('narad_turn_duration_seconds', 0.2)
+    assert metrics.snapshot()['narad_turns_total'] == []
+
+
+def test_workers_are_merged_and_dead_workers_keep_only_counters(tmp_path):
+    metrics = registry(directory=str(tmp_path))
+    metrics.inc('narad_turns_total', source='gemini')
+    metrics.set('narad_active_sessions', 2)
+    metrics.observe('narad_turn_duration_seconds', 0.5)
+    histogram = [[[], [0, 1, 0, 0.5]]]
+    write_snapshot(tmp_path, os.getppid(), {
+        'narad_turns_total': [[[['source', 'gemini']], 2]],
+        'narad_active_sessions': [[[], 3]],
+        'narad_turn_duration_seconds': histogram
+    })
+    write_snapshot(tmp_path, dead_pid(), {
+        'narad_turns_total': [[[['source', 'gemini']], 4]],
+        'narad_active_sessions': [[[], 100]],
+        'narad_turn_duration_seconds': histogram
+    })
+    (tmp_path / 'corrupt.json').write_text('{', encoding='utf-8')
+
+    lines = metrics.render().splitlines()
+
+    assert 'narad_turns_total{source="gemini"} 7' in lines
+    assert 'narad_active_sessions 5' in lines
+    assert 'narad_turn_duration_seconds_count 3' in lines
+    assert 'narad_metrics_workers 2' in lines
+    assert (tmp_path / f'{os.getpid()}.json').exists()
+
+
+def test_forked_worker_starts_from_zero():
+    metrics = registry()
+    metrics.inc('narad_turns_total', source='gemini')
+    metrics._after_fork()
+    assert metrics.snapshot()['narad_turns_total'] == []
+    metrics.inc('narad_turns_total', source='gemini')
+    assert metrics.snapshot()['narad_turns_total'] == [((('source', 'gemini'),), 1.0)]
+
+
+def test_chat_turn_exports_its_stages(narad, mock_gemini):
+    metrics = Metrics()
+    narad.metrics = metrics
+    narad._define_metrics()
+
+    narad.process_message('Tell me about the Ajanta caves', 'metrics-session')
+
+    snapshot = metrics.snapshot()
+    stages = {dict(key)['stage'] for key, _ in snapshot['narad_stage_duration_seconds']}
+    assert 'upstream' in stages
+    assert snapshot['narad_turns_total'] == [((('source', 'upstream'),), 1.0)]
+    assert 'narad_turn_duration_seconds_count{intent=' in metrics.render()
+
+
+def test_metrics_endpoint_serves_prometheus_text():
+    import app
+
+    response = app.app.test_client().get('/metrics')
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain')
+    assert '# TYPE narad_turns_total counter' in response.get_data(as_text=True)
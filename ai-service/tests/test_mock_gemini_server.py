@@ -0,0 +1,107 @@
+"""Tests for the mock Gemini server and its fault profiles (benchmarks/mock_gemini_server.py)"""
+
+import math
+
+import pytest
+import requests
+
+from mock_gemini_server import CANNED_ANSWER, MockBehavior
+
+BODY = {'contents': [{'role': 'user', 'parts': [{'text': 'Namaste'}]}]}
+
+
+def generate(endpoint, model='gemini-1.5-pro', body=BODY):
+    return requests.post(f'{endpoint}/{model}:generateContent?key=test-key', json=body, timeout=5)
+
+
+def test_unknown_or_invalid_fields_are_rejected():
+    with pytest.raises(ValueError):
+        MockBehavior(latencyy=0.1)
+    with pytest.raises(ValueError):
+        MockBehavior(latency_distribution='pareto')
+
+
+def test_seeded_profiles_are_repeatable():
+    samples = []
+    for _ in range(2):
+        behavior = MockBehavior(latency=0.2, latency_distribution='lognormal', latency_jitter=0.8, seed=7)
+        samples.append([behavior.sample_latency() for _ in range(20)])
+    assert samples[0] == samples[1]
+    assert len(set(samples[0])) > 1
+
+
+def test_latency_profile_shapes():
+    assert MockBehavior(latency=0.2).sample_latency() == 0.2
+    assert MockBehavior(latency=0.2, slow_ratio=1.0, slow_latency=3.0).sample_latency() == 3.0
+    scaled = MockBehavior(latency=0.2, model_latency={'flash': 0.5})
+    assert math.isclose(scaled.sample_latency('gemini-1.5-flash'), 0.1)
+    assert scaled.sample_latency('gemini-1.5-pro') == 0.2
+    # Jitter never produces a negative delay
+    normal = MockBehavior(latency=0.01, latency_distribution='normal', latency_jitter=1.0, seed=1)
+    assert min(normal.sample_latency() for _ in range(50)) == 0.0
+
+
+def test_reset_restores_defaults_but_keeps_overrides():
+    behavior = MockBehavior(error_codes=[503])
+    behavior.error_codes.append(500)
+    behavior.reset(latency=0)
+    assert behavior.latency == 0
+    assert behavior.error_codes == MockBehavior.DEFAULTS['error_codes']
+    assert behavior.error_codes is not MockBehavior.DEFAULTS['error_codes']
+
+
+def test_answers_are_capped_by_max_output_tokens(mock_gemini):
+    _, endpoint = mock_gemini
+    full = generate(endpoint).json()
+    capped = generate(endpoint, body=dict(BODY, generationConfig={'maxOutputTokens': 4})).json()
+
+    assert full['candidates'][0]['content']['parts'][0]['text'] == CANNED_ANSWER
+    assert capped['candidates'][0]['content']['parts'][0]['text'] == ' '.join(CANNED_ANSWER.split(' ')[:3])
+    assert full['usageMetadata']['promptTokenCount'] > 0
+
+
+def test_injected_errors_use_the_configured_codes(mock_gemini):
+    server, endpoint = mock_gemini
+    server.behavior.update(error_rate=1.0, error_codes=[503])
+
+    response = generate(endpoint)
+    assert response.status_code == 503
+    assert response.json()['error']['status'] == 'UNAVAILABLE'
+    assert server.get_stats()['injected'] == {'errors': 1}
+
+
+def test_quota_answers_429_with_retry_after(mock_gemini):
+    server, endpoint = mock_gemini
+    server.behavior.update(rpm_limit=2, retry_after=7)
+
+    statuses = [generate(endpoint).status_code for _ in range(3)]
+    assert statuses == [200, 200, 429]
+    assert generate(endpoint).headers['Retry-After'] == '7'
+    assert server.get_stats()['injected'] == {'quota_429': 2}
+
+
+def test_aborted_stream_breaks_the_connection(mock_gemini):
+    server, endpoint = mock_gemini
+    server.behavior.update(stream_abort_rate=1.0, chunk_words=4)
+
+    response = requests.post(
+        f'{endpoint}/gemini-1.5-pro:streamGenerateContent?alt=sse&key=test-key', json=BODY, stream=True, timeout=5
+    )
+    with pytest.raises(requests.exceptions.RequestException):
+        for _ in response.iter_lines():
+            pass
+    assert server.get_stats()['injected'] == {'stream_aborts': 1}
+
+
+def test_profile_can_be_changed_over_http(mock_gemini):
+    server, endpoint = mock_gemini
+    base = endpoint.split('/v1beta', 1)[0]
+
+    assert requests.post(f'{base}/mock/config', json={'error_rate': 0.5}, timeout=5).json()['error_rate'] == 0.5
+    assert server.behavior.error_rate == 0.5
+    assert requests.post(f'{base}/mock/config', json={'bogus': 1}, timeout=5).status_code == 400
+
+    generate(endpoint)
+    assert requests.get(f'{base}/mock/stats', timeout=5).json()['requests'] == {'generateContent': 1}
+    requests.post(f'{base}/mock/reset', timeout=5)
+    assert server.get_stats()['requests'] == {}
@@ -0,0 +1,123 @@
+"""Tests for the model router (src/services/model_router.py)"""
+
+import json
+import os
+
+import pytest
+
+from src.config.settings import MODEL_ROUTING_CONFIG
+from src.services.model_router import DEFAULT_GENERATION_CONFIG, ModelRouter
+
+RULES = {
+    'default_tier': 'quality',
+    'tiers': {
+        'fast': {'model': 'gemini-1.5-flash', 'generation_config': {'temperature': 0.4, 'maxOutputTokens': 300}},
+        'quality': {'model': None, 'generation_config': {'temperature': 0.7, 'maxOutputTokens': 500}}
+    },
+    'rules': [
+        {'name': 'long_conversation', 'tier': 'quality', 'min_history_messages': 12},
+        {'name': 'short_factual', 'tier': 'fast', 'intents': ['greeting', 'informational'], 'max_message_chars': 200}
+    ]
+}
+
+
+def write_rules(path, config, mtime=None):
+    path.write_text(json.dumps(config), encoding='utf-8')
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+@pytest.fixture
+def rules_file(tmp_path):
+    path = tmp_path / 'model_routing.json'
+    write_rules(path, RULES, mtime=1_000_000)
+    return path
+
+
+def test_first_matching_rule_wins(rules_file):
+    router = ModelRouter('gemini-1.5-pro', str(rules_file), reload_interval=0)
+
+    fast = router.route('greeting', 'Namaste!')
+    assert (fast['tier'], fast['model'], fast['rule']) == ('fast', 'gemini-1.5-flash', 'short_factual')
+    assert fast['generation_config'] == {'temperature': 0.4, 'maxOutputTokens': 300}
+
+    # A long conversation matches the earlier rule even for a short greeting
+    assert router.route('greeting', 'Namaste!', history_size=12)['rule'] == 'long_conversation'
+
+
+@pytest.mark.parametrize('intent, message', [
+    ('story_request', 'Tell me a story'),
+    ('greeting', 'x' * 201),
+])
+def test_unmatched_turns_use_the_default_tier(rules_file, intent, message):
+    route = ModelRouter('gemini-1.5-pro', str(rules_file)).route(intent, message)
+    assert (route['tier'], route['model'], route['rule']) == ('quality', 'gemini-1.5-pro', 'default')
+
+
+def test_routes_get_their_own_generation_config(rules_file):
+    router = ModelRouter('gemini-1.5-pro', str(rules_file))
+    router.route('greeting', 'Hi')['generation_config']['maxOutputTokens'] = 1
+    assert router.route('greeting', 'Hi')['generation_config']['maxOutputTokens'] == 300
+
+
+def test_disabled_router_sends_everything_to_the_primary_model(rules_file):
+    router = ModelRouter('gemini-1.5-pro', str(rules_file), enabled=False)
+    route = router.route('greeting', 'Hi')
+    assert (route['tier'], route['model']) == ('quality', 'gemini-1.5-pro')
+    assert route['generation_config'] == DEFAULT_GENERATION_CONFIG
+    assert router.get_models() == ['gemini-1.5-pro']
+
+
+def test_missing_rules_file_falls_back_to_a_single_tier(tmp_path):
+    router = ModelRouter('gemini-1.5-pro', str(tmp_path / 'missing.json'))
+    assert router.get_tiers() == ['quality']
+    assert router.route('greeting', 'Hi')['model'] == 'gemini-1.5-pro'
+
+
+def test_changed_rules_are_reloaded(rules_file):
+    router = ModelRouter('gemini-1.5-pro', str(rules_file), reload_interval=0)
+    changed = dict(RULES, rules=[])
+    write_rules(rules_file, changed, mtime=1_000_100)
+
+    assert router.route('greeting', 'Hi')['tier'] == 'quality'
+    assert router.get_stats()['reloads'] == 2
+
+
+def test_reload_is_throttled(rules_file):
+    router = ModelRouter('gemini-1.5-pro', str(rules_file), reload_interval=60)
+    write_rules(rules_file, dict(RULES, rules=[]), mtime=1_000_100)
+    assert router.route('greeting', 'Hi')['tier'] == 'fast'
+
+
+@pytest.mark.parametrize('broken', [
+    '{not json',
+    json.dumps(dict(RULES, default_tier='turbo')),
+    json.dumps(dict(RULES, rules=[{'name': 'bad', 'tier': 'turbo'}])),
+    json.dumps({'default_tier': 'quality', 'tiers': {}}),
+])
+def test_invalid_rules_keep_the_last_good_ones(rules_file, broken):
+    router = ModelRouter('gemini-1.5-pro', str(rules_file), reload_interval=0)
+    rules_file.write_text(broken, encoding='utf-8')
+    os.utime(rules_file, (1_000_100, 1_000_100))
+
+    assert router.route('greeting', 'Hi')['tier'] == 'fast'
+    assert router.get_stats()['reload_errors'] == 1
+    # The broken version is not re-parsed on every turn
+    router.route('greeting', 'Hi')
+    assert router.get_stats()['reload_errors'] == 1
+
+
+def test_routing_counts_and_models(rules_file):
+    router = ModelRouter('gemini-1.5-pro', str(rules_file))
+    router.route('greeting', 'Hi')
+    router.route('story_request', 'Tell me a story')
+    router.route('greeting', 'Hello')
+
+    assert router.get_stats()['routed'] == {'fast': 2, 'quality': 1}
+    assert router.get_models() == ['gemini-1.5-flash', 'gemini-1.5-pro']
+
+
+def test_shipped_rules_are_valid():
+    router = ModelRouter('gemini-1.5-pro', MODEL_ROUTING_CONFIG['rules_path'])
+    assert router.get_stats()['reloads'] == 1
+    assert router.route('story_request', 'Tell me the legend of Bhangarh')['tier'] == 'quality'
@@ -0,0 +1,140 @@
+"""Tests for the streaming chat turn (NaradAI.process_message_stream and its async variant)"""
+
+import asyncio
+import time
+
+from mock_gemini_server import CANNED_ANSWER
+from src.utils.metrics import Metrics
+from src.utils.resilience import CLOSED, HALF_OPEN
+from src.utils.response_cache import ResponseCache
+
+MESSAGE = 'Tell me the story of the Konark Sun Temple'
+
+
+def stream(narad, session_id):
+    return list(narad.process_message_stream(MESSAGE, session_id))
+
+
+def stream_async(narad, session_id):
+    async def run():
+        return [event async for event in narad.process_message_stream_async(MESSAGE, session_id)]
+    return asyncio.run(run())
+
+
+def answer_text(events):
+    return ''.join(event['data']['text'] for event in events if event['event'] == 'chunk')
+
+
+def test_complete_stream_is_stored(narad):
+    events = stream(narad, 'complete')
+
+    assert [events[0]['event'], events[-1]['event']] == ['meta', 'done']
+    assert answer_text(events) == CANNED_ANSWER
+    history = narad.conversation_memory.get_history('complete')
+    assert [entry['content'] for entry in history] == [MESSAGE, CANNED_ANSWER.strip()]
+
+
+def test_broken_stream_ends_with_truncated_error_and_is_not_stored(narad, mock_gemini):
+    server, _ = mock_gemini
+    server.behavior.update(stream_abort_rate=1.0)
+
+    for run, session_id in ((stream, 'sync'), (stream_async, 'async')):
+        events = run(narad, session_id)
+
+        assert 'done' not in [event['event'] for event in events]
+        assert events[-1]['event'] == 'error'
+        assert events[-1]['data']['truncated'] is True
+        assert answer_text(events)  # part of the answer had already been sent
+        assert narad.conversation_memory.get_history(session_id) == []
+
+
+def test_broken_stream_is_not_cached(narad, mock_gemini):
+    server, _ = mock_gemini
+    narad.response_cache = ResponseCache()
+    server.behavior.update(stream_abort_rate=1.0)
+    stream(narad, 'first')
+
+    server.behavior.update(stream_abort_rate=0.0)
+    events = stream(narad, 'second')
+    assert answer_text(events) == CANNED_ANSWER
+    assert events[-1]['event'] == 'done'
+
+
+def use_own_metrics(narad) -> Metrics:
+    narad.metrics = Metrics()
+    narad._define_metrics()
+    return narad.metrics
+
+
+def turns_by_source(metrics: Metrics):
+    return {dict(key)['source']: value for key, value in metrics.snapshot()['narad_turns_total']}
+
+
+def stages(metrics: Metrics):
+    return {dict(key)['stage'] for key, _ in metrics.snapshot()['narad_stage_duration_seconds']}
+
+
+def test_streamed_turns_are_recorded(narad):
+    metrics = use_own_metrics(narad)
+    samples = narad.adaptive_limit.get_stats()['samples']
+
+    stream(narad, 'sync')
+    stream_async(narad, 'async')
+
+    assert turns_by_source(metrics) == {'upstream': 2}
+    assert {'prompt', 'prefetch', 'upstream', 'store'} <= stages(metrics)
+    # Each stream is one attempt for the adaptive limit
+    assert narad.adaptive_limit.get_stats()['samples'] == samples + 2
+
+
+def test_truncated_and_abandoned_streams_are_recorded(narad, mock_gemini):
+    server, _ = mock_gemini
+    metrics = use_own_metrics(narad)
+
+    server.behavior.update(stream_abort_rate=1.0)
+    stream(narad, 'truncated')
+    server.behavior.update(stream_abort_rate=0.0)
+
+    events = narad.process_message_stream(MESSAGE, 'disconnected')
+    next(events)  # meta
+    events.close()
+
+    assert turns_by_source(metrics) == {'truncated': 1, 'disconnected': 1}
+
+
+def half_open(narad):
+    breaker = narad.circuit_breaker
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    breaker._opened_at = time.monotonic() - breaker.recovery_timeout
+    assert breaker.state == HALF_OPEN
+    return breaker
+
+
+def test_half_open_stream_waits_for_the_probe(narad, mock_gemini):
+    server, _ = mock_gemini
+    breaker = half_open(narad)
+    assert breaker.allow_request()  # another request holds the probe
+
+    for run, session_id in ((stream, 'sync'), (stream_async, 'async')):
+        events = run(narad, session_id)
+        assert events[-1]['event'] == 'done'
+    assert server.get_stats()['requests'] == {}
+
+    breaker.release_probe()
+    assert answer_text(stream(narad, 'probe')) == CANNED_ANSWER
+    assert breaker.state == CLOSED
+
+
+def test_disconnected_stream_gives_the_probe_back(narad, mock_gemini):
+    server, _ = mock_gemini
+    breaker = half_open(narad)
+
+    events = narad.process_message_stream(MESSAGE, 'disconnected')
+    while next(events)['event'] != 'chunk':
+        pass
+    events.close()
+
+    assert breaker.state == HALF_OPEN
+    assert answer_text(stream_async(narad, 'next')) == CANNED_ANSWER
+    assert breaker.state == CLOSED
@@ -0,0 +1,181 @@
+"""Tests for token-bucket rate limiting (src/utils/rate_limiter.py)"""
+
+import types
+
+import pytest
+
+from mock_redis_server import start_mock_redis
+from src.utils import rate_limiter as rate_limiter_module
+from src.utils.rate_limiter import MemoryRateLimitBackend, RateLimiter, RedisRateLimitBackend, rate_limit_headers
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limiter_module, 'time', types.SimpleNamespace(time=clock.time, monotonic=clock.time))
+    return clock
+
+
+@pytest.fixture(scope='module')
+def redis_server():
+    server, _ = start_mock_redis()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def redis_backend(server, **kwargs):
+    host, port = server.server_address
+    return RedisRateLimitBackend(f'redis://{host}:{port}/0', timeout=1.0, **kwargs)
+
+
+def test_bucket_admits_its_capacity_then_refills(clock):
+    limiter = RateLimiter([(3, 60)])
+
+    results = [limiter.check(['ip:1.2.3.4']) for _ in range(4)]
+    assert [result['allowed'] for result in results] == [True, True, True, False]
+    assert [result['remaining'] for result in results[:3]] == [2, 1, 0]
+    assert results[3]['retry_after'] == 20
+
+    clock.now += 20
+    assert limiter.check(['ip:1.2.3.4'])['allowed']
+    assert limiter.get_stats()['limited'] == 1
+
+
+def test_tightest_of_several_windows_applies(clock):
+    limiter = RateLimiter([(5, 60), (2, 3600)])
+    assert [limiter.check(['user:42'])['allowed'] for _ in range(3)] == [True, True, False]
+    result = limiter.check(['user:42'])
+    assert (result['limit'], result['retry_after']) == (2, 1800)
+
+
+def test_every_identity_must_have_room(clock):
+    limiter = RateLimiter([(2, 60)])
+    limiter.check(['ip:1.2.3.4', 'session:a'])
+    limiter.check(['ip:1.2.3.4', 'session:a'])
+
+    # A fresh session from the same address is still limited by the address
+    assert not limiter.check(['ip:1.2.3.4', 'session:b'])['allowed']
+    assert limiter.check(['ip:5.6.7.8', 'session:b'])['allowed']
+
+
+def test_rejected_request_takes_no_tokens(clock):
+    limiter = RateLimiter([(3, 60)])
+    limiter.check(['ip:1'], cost=2)
+    assert not limiter.check(['ip:1'], cost=2)['allowed']
+    assert limiter.check(['ip:1'], cost=1)['allowed']
+
+
+def test_cost_above_a_full_bucket_is_rejected_without_taking_tokens(clock):
+    limiter = RateLimiter([(3, 60), (100, 3600)])
+    assert limiter.max_cost == 3
+
+    result = limiter.check(['ip:1'], cost=4)
+
+    assert (result['allowed'], result['oversize'], result['limit']) == (False, True, 3)
+    assert 'Retry-After' not in rate_limit_headers(result)
+    assert limiter.check(['ip:1'], cost=3)['allowed']
+    assert limiter.get_stats()['oversize'] == 1
+
+
+def test_disabled_limiter_checks_nothing():
+    assert RateLimiter([(1, 60)], enabled=False).check(['ip:1']) is None
+    assert RateLimiter([(0, 60)]).check(['ip:1']) is None
+    assert rate_limit_headers(None) == {}
+
+
+def test_memory_backend_evicts_least_recently_used_buckets(clock):
+    backend = MemoryRateLimitBackend(max_keys=2)
+    limiter = RateLimiter([(1, 60)], backend=backend)
+    limiter.check(['ip:1'])
+    limiter.check(['ip:2'])
+    limiter.check(['ip:3'])
+
+    assert backend.get_stats()['buckets'] == 2
+    # ip:1 was evicted, so it starts with a full bucket again
+    assert limiter.check(['ip:1'])['allowed']
+
+
+def test_headers_describe_the_tightest_bucket(clock):
+    limiter = RateLimiter([(1, 60)])
+    assert rate_limit_headers(limiter.check(['ip:1'])) == {
+        'X-RateLimit-Limit': '1', 'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': '60'
+    }
+    assert rate_limit_headers(limiter.check(['ip:1']))['Retry-After'] == '60'
+
+
+def test_redis_backend_shares_limits_between_limiters(redis_server):
+    redis_server.data.clear()
+    first = RateLimiter([(3, 60)], backend=redis_backend(redis_server))
+    second = RateLimiter([(3, 60)], backend=redis_backend(redis_server))
+
+    allowed = [limiter.check(['ip:9.9.9.9'])['allowed'] for limiter in (first, second, first, second)]
+    assert allowed == [True, True, True, False]
+    assert 'narad:rl:ip:9.9.9.9:60' in redis_server.data
+
+
+def test_redis_backend_loads_the_script_when_missing(redis_server):
+    redis_server.data.clear()
+    redis_server.scripts.clear()
+    backend = redis_backend(redis_server)
+
+    assert backend.consume(['ip:1:60'], [(2.0, 2 / 60)], 1)[0] is True
+    assert backend.get_stats()['idle_connections'] == 1
+
+
+def test_unreachable_backend_falls_back_to_process_limits(clock):
+    backend = RedisRateLimitBackend('redis://127.0.0.1:9/0', timeout=0.2)
+    limiter = RateLimiter([(1, 60)], backend=backend, backend_retry_interval=5)
+
+    assert limiter.check(['ip:1'])['allowed']
+    assert not limiter.check(['ip:1'])['allowed']
+    # The dead backend is not retried until the interval has passed
+    assert limiter.get_stats()['backend_errors'] == 1
+    clock.now += 5
+    limiter.check(['ip:1'])
+    assert limiter.get_stats()['backend_errors'] == 2
+
+
+def test_chat_route_answers_429_with_headers(monkeypatch, mock_gemini):
+    import app
+
+    monkeypatch.setattr(app, 'rate_limiter', RateLimiter([(1, 60)]))
+    client = app.app.test_client()
+    body = {'message': 'Namaste', 'session_id': 'rate-limited'}
+
+    first = client.post('/api/ai/chat', json=body)
+    second = client.post('/api/ai/chat', json=body)
+
+    assert first.status_code == 200
+    assert first.headers['X-RateLimit-Remaining'] == '0'
+    assert second.status_code == 429
+    assert second.get_json()['retry_after'] == int(second.headers['Retry-After']) == 60
+
+
+def test_oversize_batch_answers_413(monkeypatch):
+    import app
+
+    monkeypatch.setattr(app, 'rate_limiter', RateLimiter([(2, 60)]))
+    response = app.app.test_client().post('/api/ai/chat/batch', json={'items': [{'message': 'Namaste'}] * 3})
+
+    assert response.status_code == 413
+    assert response.get_json()['max_cost'] == 2
+    assert 'Retry-After' not in response.headers
+
+
+def test_forwarded_for_is_ignored_unless_a_proxy_is_trusted(monkeypatch):
+    import app
+
+    assert app.RATE_LIMIT_CONFIG['proxy_hops'] == 0
+    assert app.client_address('10.0.0.5', '6.6.6.6') == '10.0.0.5'
+
+    monkeypatch.setitem(app.RATE_LIMIT_CONFIG, 'proxy_hops', 1)
+    assert app.client_address('10.0.0.5', '6.6.6.6, 203.0.113.7') == '203.0.113.7'
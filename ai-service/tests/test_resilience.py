@@ -0,0 +1,229 @@
+"""Tests for the retry policy and circuit breaker (src/utils/resilience.py)"""
+
+import asyncio
+import time
+
+import pytest
+
+from src.utils.deadline import Deadline, deadline_scope
+from src.utils.resilience import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError, RetryPolicy
+
+
+class Transient(Exception):
+    pass
+
+
+def half_open_breaker() -> CircuitBreaker:
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+    assert breaker.state == HALF_OPEN
+    return breaker
+
+
+def retry_policy(**kwargs) -> RetryPolicy:
+    kwargs.setdefault('base_delay', 0)
+    return RetryPolicy(is_retryable=lambda error: isinstance(error, Transient), **kwargs)
+
+
+def test_probe_cut_short_by_deadline_is_released():
+    breaker = half_open_breaker()
+
+    def slow_attempt(remaining):
+        time.sleep(0.03)
+        raise Transient('read timeout')
+
+    with deadline_scope(Deadline(0.01)):
+        with pytest.raises(Transient):
+            retry_policy().call(slow_attempt, breaker=breaker)
+
+    # No verdict was recorded, so the breaker is still probing and admits the next call
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow_request()
+
+
+def test_probe_started_after_deadline_is_released():
+    breaker = half_open_breaker()
+
+    with deadline_scope(Deadline(-1)):
+        with pytest.raises(TimeoutError):
+            retry_policy().call(lambda remaining: 'unreachable', breaker=breaker)
+
+    assert breaker.allow_request()
+
+
+def test_cancelled_async_probe_is_released():
+    breaker = half_open_breaker()
+
+    async def hanging_attempt(remaining):
+        await asyncio.sleep(10)
+
+    async def run():
+        task = asyncio.ensure_future(retry_policy().call_async(hanging_attempt, breaker=breaker))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow_request()
+
+
+def test_release_outside_half_open_is_a_no_op():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0.01, half_open_max_calls=1)
+    breaker.release_probe()
+    assert breaker.state == CLOSED
+
+    breaker = half_open_breaker()
+    assert breaker.allow_request()
+    breaker.release_probe()
+    breaker.release_probe()
+    # A double release must not grant more probes than half_open_max_calls
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+
+
+def test_breaker_opens_after_threshold_and_rejects():
+    breaker = CircuitBreaker(failure_threshold=3, recovery_timeout=60)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+
+    assert breaker.state == OPEN
+    assert not breaker.allow_request()
+    stats = breaker.get_stats()
+    assert (stats['opened'], stats['rejected'], stats['consecutive_failures']) == (1, 1, 3)
+
+
+def test_success_resets_the_failure_streak():
+    breaker = CircuitBreaker(failure_threshold=2)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+
+
+def test_half_open_probe_outcome_decides_the_state():
+    breaker = half_open_breaker()
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    breaker = half_open_breaker()
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+
+
+def test_transient_errors_are_retried_until_success():
+    policy = retry_policy()
+    breaker = CircuitBreaker()
+    attempts = []
+
+    def flaky(remaining):
+        attempts.append(remaining)
+        if len(attempts) < 3:
+            raise Transient('503')
+        return 'ok'
+
+    assert policy.call(flaky, breaker=breaker) == 'ok'
+    assert len(attempts) == 3
+    assert attempts[0] > attempts[-1] > 0
+    assert policy.get_stats() == {'attempts': 3, 'retries': 2, 'gave_up': 0}
+    assert breaker.get_stats()['consecutive_failures'] == 0
+
+
+def test_retries_stop_at_max_retries():
+    policy = retry_policy(max_retries=2)
+    calls = []
+
+    def always_failing(remaining):
+        calls.append(1)
+        raise Transient('503')
+
+    with pytest.raises(Transient):
+        policy.call(always_failing)
+    assert len(calls) == 3
+    assert policy.get_stats()['gave_up'] == 1
+
+
+def test_non_retryable_error_is_raised_at_once_and_counts_as_healthy():
+    policy = retry_policy()
+    breaker = CircuitBreaker(failure_threshold=1)
+    calls = []
+
+    def bad_request(remaining):
+        calls.append(1)
+        raise ValueError('400')
+
+    with pytest.raises(ValueError):
+        policy.call(bad_request, breaker=breaker)
+    assert len(calls) == 1
+    assert breaker.state == CLOSED
+    assert breaker.get_stats()['successes'] == 1
+
+
+def test_backoff_that_would_overrun_the_deadline_gives_up():
+    policy = retry_policy(base_delay=1.0, max_delay=1.0, total_timeout=0.2)
+    # Full jitter can draw a tiny delay; pin it to the ceiling
+    policy.backoff = lambda attempt: 1.0
+
+    def failing(remaining):
+        raise Transient('503')
+
+    started = time.monotonic()
+    with pytest.raises(Transient):
+        policy.call(failing)
+    assert time.monotonic() - started < 0.2
+    assert policy.get_stats()['retries'] == 0
+
+
+def test_open_circuit_rejects_without_calling():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=60)
+    breaker.record_failure()
+
+    with pytest.raises(CircuitOpenError):
+        retry_policy().call(lambda remaining: pytest.fail('called through an open circuit'), breaker=breaker)
+
+
+def test_backoff_is_bounded_by_max_delay():
+    policy = RetryPolicy(base_delay=0.25, max_delay=1.0)
+    for attempt in range(8):
+        assert 0 <= policy.backoff(attempt) <= min(1.0, 0.25 * 2 ** attempt)
+
+
+def test_async_retries_transient_errors():
+    policy = retry_policy()
+    attempts = []
+
+    async def flaky(remaining):
+        attempts.append(1)
+        if len(attempts) < 2:
+            raise Transient('503')
+        return 'ok'
+
+    assert asyncio.run(policy.call_async(flaky)) == 'ok'
+    assert policy.get_stats()['retries'] == 1
+
+
+def test_gemini_provider_retries_503s_and_opens_its_breaker(mock_gemini):
+    from src.services.llm_providers import build_llm_gateway
+    from src.services.gemini_client import GeminiAPIError
+
+    server, _ = mock_gemini
+    server.behavior.update(error_rate=1.0, error_codes=[503])
+    provider = build_llm_gateway().get('gemini')
+    provider.retry_policy.base_delay = 0
+    provider.breaker.failure_threshold = 4
+
+    with pytest.raises(GeminiAPIError):
+        provider.generate([{'role': 'user', 'content': 'Tell me about Diwali'}])
+    assert server.get_stats()['requests'] == {'generateContent': 4}
+    assert provider.breaker.state == OPEN
+
+    with pytest.raises(CircuitOpenError):
+        provider.generate([{'role': 'user', 'content': 'Tell me about Holi'}])
+    assert server.get_stats()['requests'] == {'generateContent': 4}
@@ -0,0 +1,192 @@
+"""Tests for the two-tier response cache (src/utils/response_cache.py)"""
+
+import types
+
+import pytest
+
+from src.utils import response_cache as response_cache_module
+from src.utils.response_cache import FRESH, STALE, ResponseCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(response_cache_module, 'time', types.SimpleNamespace(time=clock.time))
+    return clock
+
+
+def test_keys_ignore_case_spacing_and_trailing_punctuation():
+    key = ResponseCache.make_key('Tell me about  Hampi?', 'en-IN', 'gemini-pro')
+    assert key == ResponseCache.make_key('tell me about hampi', 'en-IN', 'gemini-pro')
+    assert ResponseCache.normalize_message('हम्पी के बारे में बताइए।') == 'हम्पी के बारे में बताइए'
+
+
+@pytest.mark.parametrize('changed', [
+    ('Tell me about Hampi', 'hi-IN', 'gemini-pro', ''),
+    ('Tell me about Hampi', 'en-IN', 'gemini-flash', ''),
+    ('Tell me about Hampi', 'en-IN', 'gemini-pro', 'User: earlier question')
+])
+def test_keys_separate_language_model_and_history(changed):
+    assert ResponseCache.make_key(*changed) != ResponseCache.make_key('Tell me about Hampi', 'en-IN', 'gemini-pro', '')
+
+
+def test_entries_go_fresh_then_stale_then_expire(clock):
+    cache = ResponseCache(ttl=60, stale_ttl=30)
+    cache.set('k', 'answer')
+
+    assert cache.get('k') == ('answer', FRESH)
+    clock.now += 61
+    assert cache.get('k') == ('answer', STALE)
+    clock.now += 30
+    assert cache.get('k') == (None, None)
+
+    stats = cache.get_stats()
+    assert (stats['memory_hits'], stats['stale_hits'], stats['misses']) == (2, 1, 1)
+
+
+def test_fresh_for_reports_remaining_freshness(clock):
+    cache = ResponseCache(ttl=60, stale_ttl=30)
+    assert cache.fresh_for('k') == 0.0
+    cache.set('k', 'answer')
+    clock.now += 20
+    assert cache.fresh_for('k') == 40
+    # Not a lookup
+    assert cache.get_stats()['misses'] == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(max_entries=2)
+    cache.set('a', '1')
+    cache.set('b', '2')
+    cache.get('a')
+    cache.set('c', '3')
+
+    assert cache.get('b') == (None, None)
+    assert cache.get('a')[0] == '1' and cache.get('c')[0] == '3'
+    assert cache.get_stats()['evictions'] == 1
+
+
+def test_disk_tier_survives_a_new_instance(tmp_path):
+    path = str(tmp_path / 'responses.sqlite3')
+    ResponseCache(disk_path=path).set('k', 'answer', 'Tell me about Hampi', 'en-IN')
+
+    cache = ResponseCache(disk_path=path)
+    assert cache.get('k') == ('answer', FRESH)
+    assert cache.get_stats()['disk_hits'] == 1
+    # Promoted to the memory tier
+    assert cache.get('k') == ('answer', FRESH)
+    assert cache.get_stats()['memory_hits'] == 1
+
+
+def test_invalidate_by_message_and_language(tmp_path):
+    cache = ResponseCache(disk_path=str(tmp_path / 'responses.sqlite3'))
+    cache.set('en', 'a', 'Tell me about Hampi', 'en-IN')
+    cache.set('hi', 'b', 'Tell me about Hampi', 'hi-IN')
+    cache.set('other', 'c', 'What is Onam?', 'en-IN')
+
+    assert cache.invalidate(message='tell me about hampi', language='hi-IN') == 1
+    assert cache.get('hi') == (None, None)
+    assert cache.invalidate(message='Tell me about Hampi?') == 1
+    assert cache.get('en') == (None, None)
+    assert cache.get('other')[0] == 'c'
+
+
+def test_disabled_cache_never_stores_or_hits():
+    cache = ResponseCache(enabled=False)
+    cache.set('k', 'answer')
+    assert cache.get('k') == (None, None)
+    assert cache.get_stats()['stores'] == 0
+
+
+def test_only_one_refresh_is_claimed_per_key():
+    cache = ResponseCache()
+    assert cache.begin_refresh('k') is True
+    assert cache.begin_refresh('k') is False
+    cache.end_refresh('k')
+    assert cache.begin_refresh('k') is True
+    # Storing a value also releases the claim
+    cache.set('k', 'answer')
+    assert cache.begin_refresh('k') is True
+
+
+def test_repeated_turn_is_served_from_cache(narad, mock_gemini):
+    server, _ = mock_gemini
+    narad.response_cache = ResponseCache()
+
+    first = narad.process_message('What is the history of Hampi?', 'cache-a')
+    second = narad.process_message('what is the history of hampi', 'cache-b')
+
+    assert first['response'] == second['response']
+    assert server.get_stats()['requests'] == {'generateContent': 1}
+    assert narad.response_cache.get_stats()['memory_hits'] == 1
+
+
+def test_invalidation_reaches_other_processes_memory_tier(tmp_path):
+    path = str(tmp_path / 'responses.sqlite3')
+    worker_a, worker_b = ResponseCache(disk_path=path), ResponseCache(disk_path=path)
+    worker_a.set('hampi', 'old answer', 'Tell me about Hampi', 'en-IN')
+    worker_a.set('onam', 'kept', 'What is Onam?', 'en-IN')
+    assert worker_b.get('hampi') == ('old answer', FRESH)
+    assert worker_b.get('onam')[0] == 'kept'
+
+    assert worker_a.invalidate(message='Tell me about Hampi') == 1
+
+    assert worker_b.get('hampi') == (None, None)
+    # Survivors are reloaded from disk after the memory tier is dropped
+    assert worker_b.get('onam') == ('kept', FRESH)
+    assert worker_b.get_stats()['remote_invalidations'] == 1
+    # The invalidating process keeps its own (already filtered) memory tier
+    assert worker_a.get('onam') == ('kept', FRESH)
+    assert worker_a.get_stats()['memory_hits'] == 1
+
+
+def test_fresh_for_sees_invalidation_by_another_process(tmp_path):
+    path = str(tmp_path / 'responses.sqlite3')
+    worker_a, worker_b = ResponseCache(disk_path=path), ResponseCache(disk_path=path)
+    worker_b.set('k', 'answer', 'Tell me about Hampi', 'en-IN')
+
+    worker_a.invalidate()
+
+    assert worker_b.fresh_for('k') == 0.0
+
+
+def test_unreadable_disk_tier_degrades_to_memory(tmp_path):
+    cache = ResponseCache(disk_path=str(tmp_path / 'responses.sqlite3'))
+    cache.set('k', 'answer')
+    cache._conn.execute('DROP TABLE meta')
+
+    # No generation to compare against: the memory tier keeps serving
+    assert cache.get('k') == ('answer', FRESH)
+    assert cache.get('missing') == (None, None)
+
+
+def test_async_lookups_keep_disk_io_off_the_event_loop(tmp_path, monkeypatch):
+    import asyncio
+    import threading
+
+    cache = ResponseCache(disk_path=str(tmp_path / 'responses.sqlite3'))
+    loop_thread = []
+    disk_threads = set()
+    disk = cache._disk
+
+    def recording_disk(operation, action):
+        disk_threads.add(threading.get_ident())
+        return disk(operation, action)
+
+    monkeypatch.setattr(cache, '_disk', recording_disk)
+
+    async def run():
+        loop_thread.append(threading.get_ident())
+        await cache.set_async('k', 'answer', 'Tell me about Hampi', 'en-IN')
+        return await cache.get_async('k')
+
+    assert asyncio.run(run()) == ('answer', FRESH)
+    assert disk_threads and loop_thread[0] not in disk_threads
@@ -0,0 +1,221 @@
+"""Tests for single-flight coalescing (src/utils/single_flight.py)"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.utils.deadline import Deadline, DeadlineExceededError, cap_timeout, deadline_scope
+from src.utils.single_flight import SingleFlight
+
+
+class UpstreamError(Exception):
+    pass
+
+
+def run_concurrently(flight, key, fn, callers=8):
+    """Call flight.do from several threads; the leader's fn runs once all the others wait on it"""
+    def leader_fn():
+        deadline = time.monotonic() + 2
+        while flight.get_stats()['coalesced'] < callers - 1 and time.monotonic() < deadline:
+            time.sleep(0.005)
+        return fn()
+
+    with ThreadPoolExecutor(callers) as pool:
+        futures = [pool.submit(flight.do, key, leader_fn) for _ in range(callers)]
+    return futures
+
+
+def test_concurrent_threads_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return 'answer'
+
+    futures = run_concurrently(flight, 'k', fetch)
+
+    assert [future.result() for future in futures] == ['answer'] * 8
+    assert len(calls) == 1
+    stats = flight.get_stats()
+    assert (stats['executions'], stats['coalesced'], stats['in_flight']) == (1, 7, 0)
+
+
+def test_waiters_receive_the_leaders_error():
+    flight = SingleFlight()
+
+    def fail():
+        raise UpstreamError('503')
+
+    futures = run_concurrently(flight, 'k', fail, callers=4)
+    for future in futures:
+        with pytest.raises(UpstreamError):
+            future.result()
+
+
+def test_different_keys_and_later_calls_run_separately():
+    flight = SingleFlight()
+    assert flight.do('a', lambda: 1) == 1
+    assert flight.do('b', lambda: 2) == 2
+    assert flight.do('a', lambda: 3) == 3
+    assert flight.get_stats()['executions'] == 3
+
+
+def test_waiter_gives_up_at_its_deadline():
+    flight = SingleFlight()
+    started = threading.Event()
+
+    def slow():
+        started.set()
+        time.sleep(0.5)
+        return 'late'
+
+    with ThreadPoolExecutor(1) as pool:
+        leader = pool.submit(flight.do, 'k', slow)
+        started.wait()
+        with deadline_scope(Deadline(0.05)):
+            with pytest.raises(DeadlineExceededError):
+                flight.do('k', slow)
+        assert leader.result() == 'late'
+
+
+def wait_for_waiters(flight, count):
+    deadline = time.monotonic() + 2
+    while flight.get_stats()['coalesced'] < count and time.monotonic() < deadline:
+        time.sleep(0.005)
+
+
+def test_short_leader_deadline_does_not_cut_the_shared_call():
+    flight = SingleFlight()
+    budgets = []
+
+    def fetch():
+        wait_for_waiters(flight, 1)
+        budgets.append(cap_timeout(None))
+        time.sleep(0.2)
+        return 'answer'
+
+    def impatient_leader():
+        with deadline_scope(Deadline(0.05)):
+            return flight.do('k', fetch)
+
+    with ThreadPoolExecutor(1) as pool:
+        leader = pool.submit(impatient_leader)
+        while flight.get_stats()['executions'] == 0:
+            time.sleep(0.005)
+        assert flight.do('k', fetch) == 'answer'
+
+    with pytest.raises(DeadlineExceededError):
+        leader.result()
+    # Widened to the waiter, which has no deadline
+    assert budgets == [None]
+
+
+def test_waiter_with_budget_retries_a_call_cut_short_by_the_deadline():
+    flight = SingleFlight()
+    capped = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        if len(calls) == 1:
+            # The read timeout is capped before the patient waiter joins
+            budget = cap_timeout(10)
+            capped.set()
+            wait_for_waiters(flight, 1)
+            time.sleep(budget)
+            raise DeadlineExceededError('read timed out at the deadline')
+        return 'answer'
+
+    def impatient_leader():
+        with deadline_scope(Deadline(0.1)):
+            return flight.do('k', fetch)
+
+    with ThreadPoolExecutor(1) as pool:
+        leader = pool.submit(impatient_leader)
+        capped.wait()
+        with deadline_scope(Deadline(5)):
+            assert flight.do('k', fetch) == 'answer'
+
+    with pytest.raises(DeadlineExceededError):
+        leader.result()
+    assert len(calls) == 2
+    assert flight.get_stats()['retried'] == 1
+
+
+def test_concurrent_coroutines_share_one_task():
+    flight = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return 'answer'
+
+    async def run():
+        return await asyncio.gather(*(flight.do_async('k', fetch) for _ in range(8)))
+
+    assert asyncio.run(run()) == ['answer'] * 8
+    assert len(calls) == 1
+    assert flight.get_stats()['coalesced'] == 7
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_call():
+    flight = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.05)
+        return 'answer'
+
+    async def run():
+        first = asyncio.ensure_future(flight.do_async('k', fetch))
+        second = asyncio.ensure_future(flight.do_async('k', fetch))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run()) == 'answer'
+
+
+def test_async_shared_call_outlives_a_short_leader_deadline():
+    flight = SingleFlight()
+    budgets = []
+
+    async def fetch():
+        await asyncio.sleep(0.01)
+        budgets.append(cap_timeout(None))
+        await asyncio.sleep(0.1)
+        return 'answer'
+
+    async def impatient():
+        with deadline_scope(Deadline(0.03)):
+            return await flight.do_async('k', fetch)
+
+    async def patient():
+        await asyncio.sleep(0)
+        with deadline_scope(Deadline(5)):
+            return await flight.do_async('k', fetch)
+
+    async def run():
+        return await asyncio.gather(impatient(), patient(), return_exceptions=True)
+
+    leader, waiter = asyncio.run(run())
+    assert isinstance(leader, DeadlineExceededError)
+    assert waiter == 'answer'
+    assert budgets[0] > 4
+
+
+def test_concurrent_identical_turns_make_one_upstream_call(narad, mock_gemini):
+    server, _ = mock_gemini
+    server.behavior.update(latency=0.5)
+
+    with ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(
+            lambda index: narad.process_message('Why is the Taj Mahal famous?', f'coalesce-{index}'), range(4)
+        ))
+
+    assert len({result['response'] for result in results}) == 1
+    assert server.get_stats()['requests'] == {'generateContent': 1}
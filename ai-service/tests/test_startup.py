@@ -0,0 +1,100 @@
+"""Tests for lazy start-up and the warm-up phase (NaradAI.warm_up, app.run_warmup, /health)"""
+
+import sys
+import threading
+
+import pytest
+
+
+@pytest.fixture
+def app_module():
+    import app
+    saved = dict(app.startup)
+    yield app
+    app.startup.clear()
+    app.startup.update(saved)
+
+
+def test_construction_is_lazy_and_offline(narad, mock_gemini):
+    server, _ = mock_gemini
+
+    assert narad._knowledge_base is None
+    assert narad.gemini_client.stats.get('warmed_up') is not True
+    assert server.get_stats()['requests'] == {}
+
+    knowledge_base = narad.knowledge_base
+    assert knowledge_base is not None
+    assert narad.knowledge_base is knowledge_base
+
+
+def test_app_import_skips_the_generativeai_sdk(app_module):
+    assert 'google.generativeai' not in sys.modules
+
+
+def test_warm_up_primes_tables_and_the_connection_pool(narad):
+    steps = narad.warm_up()
+
+    assert {'tables', 'response_cache', 'connection_pool'} <= set(steps)
+    assert all(seconds >= 0 for seconds in steps.values())
+    assert narad._knowledge_base is not None
+    assert narad.gemini_client.stats['warmed_up'] is True
+
+
+def test_warm_up_skips_the_pool_when_disabled(narad, monkeypatch):
+    from src.services import narad_ai
+
+    monkeypatch.setitem(narad_ai.GEMINI_CLIENT_CONFIG, 'warmup_on_start', False)
+    steps = narad.warm_up()
+
+    assert 'connection_pool' not in steps
+    assert narad.gemini_client.stats.get('warmed_up') is not True
+
+
+def test_unreachable_api_leaves_the_pool_cold(narad):
+    narad.set_api_endpoint('http://127.0.0.1:9/v1beta/models')
+
+    steps = narad.warm_up()
+
+    assert 'connection_pool' in steps
+    assert narad.gemini_client.stats.get('warmed_up') is not True
+
+
+def test_health_reports_warming_until_the_warm_up_finishes(app_module, monkeypatch):
+    client = app_module.app.test_client()
+    app_module.startup.update(ready=False, warmup=None)
+    response = client.get('/health')
+    assert response.status_code == 503
+    assert response.get_json()['status'] == 'warming'
+
+    monkeypatch.setattr(app_module.narad_ai, 'warm_up', lambda: {'tables': 0.01})
+    app_module.run_warmup()
+
+    assert app_module.startup['warmup']['tables'] == 0.01
+    assert app_module.startup['warmup']['total'] >= 0
+    response = client.get('/health')
+    assert response.status_code == 200
+    assert response.get_json()['status'] == 'healthy'
+
+
+def test_failed_warm_up_still_reports_ready(app_module, monkeypatch):
+    def broken_warm_up():
+        raise RuntimeError('disk full')
+
+    app_module.startup.update(ready=False, warmup=None)
+    monkeypatch.setattr(app_module.narad_ai, 'warm_up', broken_warm_up)
+    app_module.run_warmup()
+
+    assert app_module.startup['ready'] is True
+    assert set(app_module.startup['warmup']) == {'total'}
+
+
+def test_prime_builds_lookup_data_without_io(narad, mock_gemini):
+    server, _ = mock_gemini
+    threads = threading.active_count()
+
+    narad.prime()
+
+    assert narad._knowledge_base is not None
+    assert server.get_stats()['requests'] == {}
+    assert narad.gemini_client.stats.get('warmed_up') is not True
+    assert threading.active_count() == threads
@@ -0,0 +1,165 @@
+"""Tests for speculative suggestion prefetching (src/services/suggestion_prefetcher.py)"""
+
+import asyncio
+import threading
+import time
+
+from src.services.suggestion_prefetcher import SuggestionPrefetcher
+from src.utils.concurrency import current_priority
+
+
+class Generator:
+    """Stand-in for NaradAI._prefetch_answer that records its calls"""
+
+    def __init__(self, delay=0.0, release=None, fail=False):
+        self.delay = delay
+        self.release = release
+        self.fail = fail
+        self.calls = []
+
+    def __call__(self, message, session_id, language):
+        self.calls.append((message, current_priority()))
+        if self.release is not None:
+            self.release.wait(2)
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError('upstream down')
+        return {'response': f'Answer to {message}', 'intent': 'informational', 'language': language, 'tokens': 10}
+
+
+def wait_idle(prefetcher):
+    deadline = time.monotonic() + 2
+    while prefetcher.get_stats()['pending'] and time.monotonic() < deadline:
+        time.sleep(0.005)
+
+
+def test_clicked_suggestion_is_answered_from_the_prefetch():
+    generate = Generator()
+    prefetcher = SuggestionPrefetcher(generate, enabled=True)
+    prefetcher.schedule('s1', ['Tell me about Holi', 'Famous forts'], 'en')
+
+    result = prefetcher.take('s1', 'tell me about holi?', 'en')
+
+    assert result['response'] == 'Answer to Tell me about Holi'
+    assert {priority for _, priority in generate.calls} == {'prefetch'}
+    stats = prefetcher.get_stats()
+    assert (stats['hits'], stats['used_tokens']) == (1, 10)
+    # Claimed once: a second click is a normal turn
+    assert prefetcher.take('s1', 'Tell me about Holi', 'en') is None
+
+
+def test_click_waits_for_an_answer_still_being_generated():
+    generate = Generator(delay=0.1)
+    prefetcher = SuggestionPrefetcher(generate, enabled=True)
+    prefetcher.schedule('s1', ['Tell me about Holi'], 'en')
+
+    assert prefetcher.take('s1', 'Tell me about Holi', 'en') is not None
+    assert len(generate.calls) == 1
+
+
+def test_answer_in_another_language_is_wasted():
+    prefetcher = SuggestionPrefetcher(Generator(), enabled=True)
+    prefetcher.schedule('s1', ['Tell me about Holi'], 'en')
+
+    assert prefetcher.take('s1', 'Tell me about Holi', 'hi') is None
+    stats = prefetcher.get_stats()
+    assert (stats['misses'], stats['wasted_tokens'], stats['wasted_token_ratio']) == (1, 10, 1.0)
+
+
+def test_new_turn_supersedes_the_previous_prefetches():
+    release = threading.Event()
+    generate = Generator(release=release)
+    prefetcher = SuggestionPrefetcher(generate, max_workers=1, enabled=True)
+    prefetcher.schedule('s1', ['first', 'second'], 'en')
+    while not generate.calls:
+        time.sleep(0.005)
+
+    prefetcher.schedule('s1', ['third'], 'en')
+    release.set()
+    wait_idle(prefetcher)
+
+    # 'second' never started; 'first' finished for nobody
+    assert [message for message, _ in generate.calls] == ['first', 'third']
+    stats = prefetcher.get_stats()
+    assert (stats['superseded'], stats['wasted_tokens'], stats['sessions']) == (1, 10, 1)
+    assert prefetcher.take('s1', 'first', 'en') is None
+    assert prefetcher.take('s1', 'third', 'en') is not None
+
+
+def test_expired_prefetches_are_discarded():
+    prefetcher = SuggestionPrefetcher(Generator(), ttl=0.05, enabled=True)
+    prefetcher.schedule('s1', ['Tell me about Holi'], 'en')
+    wait_idle(prefetcher)
+    time.sleep(0.06)
+
+    assert prefetcher.take('s1', 'Tell me about Holi', 'en') is None
+    stats = prefetcher.get_stats()
+    assert (stats['expired'], stats['wasted_tokens'], stats['sessions']) == (1, 10, 0)
+
+
+def test_pending_bound_skips_extra_suggestions():
+    release = threading.Event()
+    prefetcher = SuggestionPrefetcher(Generator(release=release), max_pending=2, enabled=True)
+    prefetcher.schedule('s1', ['a', 'b', 'c'], 'en')
+    release.set()
+    wait_idle(prefetcher)
+
+    stats = prefetcher.get_stats()
+    assert (stats['scheduled'], stats['skipped'], stats['generated']) == (2, 1, 2)
+
+
+def test_failed_prefetch_falls_back_to_a_normal_turn():
+    prefetcher = SuggestionPrefetcher(Generator(fail=True), enabled=True)
+    prefetcher.schedule('s1', ['Tell me about Holi'], 'en')
+
+    assert prefetcher.take('s1', 'Tell me about Holi', 'en') is None
+    assert prefetcher.get_stats()['failed'] == 1
+
+
+def test_disabled_prefetcher_never_generates():
+    generate = Generator()
+    prefetcher = SuggestionPrefetcher(generate, enabled=False)
+    prefetcher.schedule('s1', ['Tell me about Holi'], 'en')
+    assert prefetcher.take('s1', 'Tell me about Holi', 'en') is None
+    assert generate.calls == []
+
+
+def test_async_take_waits_without_blocking_the_loop():
+    prefetcher = SuggestionPrefetcher(Generator(delay=0.1), enabled=True)
+    prefetcher.schedule('s1', ['Tell me about Holi'], 'en')
+
+    async def run():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        ticker = asyncio.ensure_future(tick())
+        result = await prefetcher.take_async('s1', 'Tell me about Holi', 'en')
+        ticker.cancel()
+        return result, ticks
+
+    result, ticks = asyncio.run(run())
+    assert result is not None
+    assert ticks > 3
+
+
+def test_clicking_a_returned_suggestion_needs_no_new_upstream_call(narad, mock_gemini):
+    server, _ = mock_gemini
+    narad.prefetcher = SuggestionPrefetcher(narad._prefetch_answer, enabled=True)
+
+    first = narad.process_message('Tell me about the Ajanta caves', 'prefetch-session')
+    wait_idle(narad.prefetcher)
+    scheduled = narad.prefetcher.get_stats()['scheduled']
+    assert server.get_stats()['requests'] == {'generateContent': 1 + scheduled}
+
+    second = narad.process_message(first['suggestions'][0], 'prefetch-session')
+    wait_idle(narad.prefetcher)
+
+    # Every call since was a prefetch for the second turn's suggestions; the click made none
+    assert server.get_stats()['requests'] == {'generateContent': 1 + narad.prefetcher.get_stats()['scheduled']}
+    assert 'Indian craftsmanship' in second['response']
+    assert narad.prefetcher.get_stats()['hits'] == 1
@@ -0,0 +1,72 @@
+"""Tests for the token budget manager (src/utils/token_budget.py)"""
+
+import pytest
+
+from src.utils.token_budget import TokenBudget
+
+
+@pytest.mark.parametrize('text, tokens', [
+    ('', 0),
+    ('abcd', 1),
+    ('abcde', 2),
+    ('नमस्ते', 3),
+    ('Hi नमस्ते', 4),
+])
+def test_estimate_counts_indic_text_more_densely(text, tokens):
+    assert TokenBudget.estimate_tokens(text) == tokens
+
+
+def test_compress_cuts_at_a_word_boundary():
+    budget = TokenBudget()
+    text = 'The   Bhangarh fort\nis known as the most haunted place in India ' * 5
+
+    short = budget.compress(text, 10)
+    assert short.endswith(' …')
+    assert budget.estimate_tokens(short[:-2]) <= 10
+    assert '  ' not in short and '\n' not in short
+    assert text.split()[0:3] == short.split()[0:3]
+
+
+def test_compress_leaves_short_text_alone_except_whitespace():
+    assert TokenBudget().compress('  Namaste \n ji ', 80) == 'Namaste ji'
+
+
+def test_history_keeps_only_the_most_recent_pairs():
+    budget = TokenBudget(max_history_pairs=2)
+    pairs = [(f'question {n}', f'answer {n}') for n in range(5)]
+
+    history = budget.fit_history(pairs)
+    assert history == 'User: question 3\nNarad: answer 3\nUser: question 4\nNarad: answer 4'
+    assert budget.get_stats()['pairs_dropped'] == 3
+
+
+def test_history_drops_oldest_pairs_over_the_budget():
+    budget = TokenBudget(history_budget=40, max_history_pairs=5, excerpt_tokens=15)
+    pairs = [(f'question {n} ' + 'word ' * 20, f'answer {n} ' + 'word ' * 20) for n in range(3)]
+
+    history = budget.fit_history(pairs)
+    assert 'question 2' in history
+    assert 'question 0' not in history
+    assert budget.estimate_tokens(history) <= 40
+
+    stats = budget.get_stats()
+    assert stats['messages_compressed'] > 0
+    assert stats['history_tokens_saved'] == stats['history_tokens_in'] - stats['history_tokens_out'] > 0
+
+
+def test_disabled_budget_passes_history_through():
+    budget = TokenBudget(history_budget=1, max_history_pairs=1, enabled=False)
+    long_answer = 'word ' * 200
+    assert budget.fit_history([('q', long_answer)]) == f'User: q\nNarad: {long_answer}'
+    assert budget.fit_history([]) == ''
+    assert budget.output_budget('greeting', tier_max=300) == 300
+
+
+def test_output_budget_is_per_intent_and_capped_by_the_tier():
+    budget = TokenBudget(output_tokens={'greeting': 120, 'story_request': 600}, default_output_tokens=350)
+
+    assert budget.output_budget('greeting') == 120
+    assert budget.output_budget('unknown') == 350
+    assert budget.output_budget('greeting', tier_max=500) == 120
+    assert budget.output_budget('story_request', tier_max=500) == 500
+    assert budget.get_stats()['output_tokens_capped'] == 1
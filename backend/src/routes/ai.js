@@ -34,7 +34,9 @@ router.post('/chat', optionalAuth, async (req, res) => {
     }, {
       timeout: 30000, // 30 second timeout
       headers: {
-        'Content-Type': 'application/json'
+        'Content-Type': 'application/json',
+        // Leave the AI service time to answer locally before axios gives up
+        'X-Request-Timeout': '28'
       }
     })
 
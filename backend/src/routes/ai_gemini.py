@@ -2,8 +2,15 @@ from flask import Blueprint, request, jsonify, current_app
 import os
 import requests
 
+# The provider layer (pooled clients, per-provider limits, failover, model
+# allow-lists) lives in the AI service; this route forwards to its HTTP API
+AI_SERVICE_URL = os.getenv('AI_SERVICE_URL', 'http://localhost:8000')
+AI_SERVICE_TIMEOUT = float(os.getenv('AI_SERVICE_TIMEOUT', '60'))
+session = requests.Session()
+
 bp = Blueprint('ai_gemini', __name__, url_prefix='/api/ai')
 
+
 @bp.route('/chat', methods=['POST'])
 def chat():
     # Basic validation
@@ -12,45 +19,26 @@ def chat():
     if not messages:
         return jsonify({'error': 'messages (array) or prompt required in request body'}), 400
 
-    # Load config
-    api_key = os.getenv('GEMINI_API_KEY')
-    model = os.getenv('MODEL_NAME', 'gemini-2.0-flash')
-    if not api_key:
-        current_app.logger.error('Missing GEMINI_API_KEY in environment')
-        return jsonify({'error': 'AI service not configured'}), 503
-
-    # Build request for Google's Generative Language REST endpoint.
-    # NOTE: Google GenAI REST contract can vary; adapt `data` to the precise body your project expects.
-    url = f'https://generativelanguage.googleapis.com/v1beta/models/{model}:generate'
-    headers = {
-        'Authorization': f'Bearer {api_key}',
-        'Content-Type': 'application/json'
+    # Gemini first; the service fails over to OpenAI on errors or timeouts and
+    # rejects models outside its allow-list. The response is normalized: text,
+    # provider, model, finish_reason, usage, failover.
+    body = {
+        'messages': messages if isinstance(messages, list) else str(messages),
+        'temperature': payload.get('temperature', 0.7),
+        'max_tokens': payload.get('max_tokens', 512),
+        'provider': 'gemini',
+        'model': payload.get('model')
     }
-
-    # Convert messages to a single prompt if client sent an array of messages (simple example)
-    if isinstance(messages, list):
-        # join user messages into a single text prompt — adapt this to your conversation format
-        user_text = "\n".join([m.get('content') if isinstance(m, dict) else str(m) for m in messages])
-    else:
-        user_text = str(messages)
-
-    data = {
-        "prompt": {
-            "text": user_text
-        },
-        # optional: tuning params; remove or adapt as necessary
-        "temperature": 0.7,
-        "maxOutputTokens": 512
-    }
-
+    headers = {name: request.headers[name] for name in ('X-Request-Timeout', 'X-Request-Deadline') if name in request.headers}
     try:
-        resp = requests.post(url, headers=headers, json=data, timeout=60)
+        resp = session.post(f'{AI_SERVICE_URL}/api/ai/generate', json=body, headers=headers, timeout=AI_SERVICE_TIMEOUT)
     except requests.RequestException as e:
-        current_app.logger.exception('Error calling Gemini API')
-        return jsonify({'error': 'AI provider request failed', 'details': str(e)}), 502
+        current_app.logger.error('AI service request failed: %s', e)
+        return jsonify({'error': 'AI service unavailable'}), 502
 
-    if not resp.ok:
-        current_app.logger.error('Gemini API returned error: %s %s', resp.status_code, resp.text)
-        return jsonify({'error': 'AI provider error', 'status': resp.status_code, 'details': resp.text}), 502
-
-    return jsonify(resp.json())
+    if resp.status_code >= 500:
+        current_app.logger.error('AI service returned error: %s %s', resp.status_code, resp.text[:500])
+    try:
+        return jsonify(resp.json()), resp.status_code
+    except ValueError:
+        return jsonify({'error': 'AI service error'}), 502
@@ -2,6 +2,12 @@ from flask import Blueprint, request, jsonify, current_app
 import os
 import requests
 
+# The provider layer (pooled clients, per-provider limits, failover, model
+# allow-lists) lives in the AI service; this route forwards to its HTTP API
+AI_SERVICE_URL = os.getenv('AI_SERVICE_URL', 'http://localhost:8000')
+AI_SERVICE_TIMEOUT = float(os.getenv('AI_SERVICE_TIMEOUT', '60'))
+session = requests.Session()
+
 bp = Blueprint('ai_openai', __name__, url_prefix='/api/ai')
 
 @bp.route('/chat', methods=['POST'])
@@ -11,28 +17,24 @@ def chat():
     if not messages:
         return jsonify({'error': 'messages array required'}), 400
 
-    api_key = os.getenv('OPENAI_API_KEY')
-    if not api_key:
-        current_app.logger.error('Missing OPENAI_API_KEY')
-        return jsonify({'error': 'AI service not configured'}), 503
-
-    url = 'https://api.openai.com/v1/chat/completions'
-    headers = {'Authorization': f'Bearer {api_key}', 'Content-Type': 'application/json'}
+    # OpenAI first, other configured providers after it; same normalized response as ai_gemini
     payload = {
-        "model": body.get('model', 'gpt-3.5-turbo'),
-        "messages": messages,
-        "max_tokens": body.get('max_tokens', 512),
-        "temperature": body.get('temperature', 0.7)
+        'messages': messages,
+        'temperature': body.get('temperature', 0.7),
+        'max_tokens': body.get('max_tokens', 512),
+        'provider': 'openai',
+        'model': body.get('model')
     }
-
+    headers = {name: request.headers[name] for name in ('X-Request-Timeout', 'X-Request-Deadline') if name in request.headers}
     try:
-        resp = requests.post(url, headers=headers, json=payload, timeout=60)
+        resp = session.post(f'{AI_SERVICE_URL}/api/ai/generate', json=payload, headers=headers, timeout=AI_SERVICE_TIMEOUT)
     except requests.RequestException as e:
-        current_app.logger.exception('Error calling OpenAI')
-        return jsonify({'error': 'AI provider request failed', 'details': str(e)}), 502
+        current_app.logger.error('AI service request failed: %s', e)
+        return jsonify({'error': 'AI service unavailable'}), 502
 
-    if not resp.ok:
-        current_app.logger.error('OpenAI returned error: %s %s', resp.status_code, resp.text)
-        return jsonify({'error': 'AI provider error', 'status': resp.status_code, 'details': resp.text}), 502
-
-    return jsonify(resp.json())
+    if resp.status_code >= 500:
+        current_app.logger.error('AI service returned error: %s %s', resp.status_code, resp.text[:500])
+    try:
+        return jsonify(resp.json()), resp.status_code
+    except ValueError:
+        return jsonify({'error': 'AI service error'}), 502